@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Home.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Long-lived streams (live notifications) are served without a thread per client
+from school.streaming import route_streams  # noqa: E402  (needs the app registry)
+
+application = route_streams(django_application)
@@ -0,0 +1,81 @@
+"""Database profiles selected with the DJANGO_DB_PROFILE environment variable.
+
+``sqlite`` (default) keeps the local db.sqlite3 file but tunes it for several
+concurrent workers; ``postgresql`` reads its connection details from DB_*
+variables and uses persistent or pooled connections.
+"""
+
+import os
+
+from django.db.backends.signals import connection_created
+
+SQLITE_PRAGMAS = {
+    # Readers no longer block the writer (and vice versa)
+    'journal_mode': 'WAL',
+    # Safe with WAL; fsync only at checkpoints instead of every commit
+    'synchronous': 'NORMAL',
+    # Wait for a competing writer instead of failing with "database is locked"
+    'busy_timeout': os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'),
+}
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+def sqlite_profile(base_dir):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('SQLITE_PATH', os.path.join(base_dir, 'db.sqlite3')),
+        'OPTIONS': {
+            # Take the write lock at BEGIN so transactions don't deadlock on upgrade
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': int(SQLITE_PRAGMAS['busy_timeout']) / 1000,
+        },
+    }
+
+
+def postgresql_profile():
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'smart_campus'),
+        'USER': os.environ.get('DB_USER', 'smart_campus'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+    if _env_bool('DB_POOL', True):
+        # Django's native psycopg pool; it cannot be combined with CONN_MAX_AGE
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+    else:
+        database['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+    return database
+
+
+def database_profile(base_dir, profile=None):
+    """Return the ``default`` DATABASES entry for the selected profile"""
+    profile = (profile or os.environ.get('DJANGO_DB_PROFILE', 'sqlite')).lower()
+    if profile == 'sqlite':
+        return sqlite_profile(base_dir)
+    if profile in ('postgres', 'postgresql'):
+        return postgresql_profile()
+    raise ValueError(f"Unknown DJANGO_DB_PROFILE '{profile}'. Use 'sqlite' or 'postgresql'.")
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply SQLITE_PRAGMAS to every new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+connection_created.connect(configure_sqlite, dispatch_uid='Home.db.configure_sqlite')
@@ -3,6 +3,8 @@
 
 import os
 
+from .db import database_profile
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -35,8 +37,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'school.middleware.RequestMetricsMiddleware',  # inactive unless REQUEST_METRICS_ENABLED
     'django.middleware.security.SecurityMiddleware',
-        'whitenoise.middleware.WhiteNoiseMiddleware', 
+    'school.middleware.StaticFilesMiddleware',  # WhiteNoise, async-capable for ASGI
 
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +62,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'school.context_processors.notifications',
             ],
         },
     },
@@ -69,14 +73,40 @@ WSGI_APPLICATION = 'Home.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
+# Pick a profile with DJANGO_DB_PROFILE=sqlite|postgresql (see Home/db.py)
 
 DATABASES = {
+    'default': database_profile(BASE_DIR),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Locmem is per process; point this at a shared backend (file, redis, memcached)
+# when running several workers so unread counters agree across them.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'smart-campus',
     }
 }
 
+# Seconds a cached unread-notification counter lives before it is recomputed
+NOTIFICATION_COUNT_CACHE_TIMEOUT = 300
+# ... and a cached unread inbox-message counter
+MESSAGE_COUNT_CACHE_TIMEOUT = 300
+
+# Live notification stream (/notification/stream/, served by the ASGI app).
+# LocalBroker reaches clients of the publishing process only; with several
+# ASGI workers, configure a BaseBroker subclass over a shared transport.
+PUSH_BROKER = {
+    'BACKEND': 'school.broker.LocalBroker',
+    'OPTIONS': {'max_pending': 100},
+}
+# Seconds between keep-alive comments on an idle stream
+NOTIFICATION_STREAM_KEEPALIVE = 15
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -148,3 +178,30 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# Derived images (see school/thumbnails.py)
+THUMBNAIL_FORMAT = 'WEBP'
+THUMBNAIL_WORKERS = 2
+
+# Report-card PDFs (manage.py generate_report_cards); None = one process per CPU
+REPORT_CARD_WORKERS = None
+SCHOOL_NAME = 'Smart Campus'
+
+# Library circulation (school/library.py)
+LIBRARY_LOAN_DAYS = 14
+LIBRARY_LOAN_LIMIT = 5  # open loans per borrower
+
+# School bus route planning (school/transport.py)
+SCHOOL_LOCATION = (23.7465, 90.3760)  # latitude, longitude of the school gate
+TRANSPORT_ARRIVAL_TIME = '07:45'
+TRANSPORT_WALK_METRES = 400  # furthest a rider walks to a stop
+TRANSPORT_MAX_RIDE_MINUTES = 60  # first pickup to school
+TRANSPORT_SPEED_KMH = 20
+TRANSPORT_STOP_MINUTES = 1
+TRANSPORT_DETOUR = 1.3  # road distance per straight-line distance
+
+# Per-view timing/SQL instrumentation (school/middleware.py); opt in with REQUEST_METRICS=1
+REQUEST_METRICS_ENABLED = os.environ.get('REQUEST_METRICS', '0') == '1'
+REQUEST_METRICS_DIR = os.path.join(BASE_DIR, 'request_metrics')
+REQUEST_METRICS_WINDOW = 1000  # samples kept per view and process
+REQUEST_METRICS_N_PLUS_ONE_THRESHOLD = 5  # same SQL this many times in one request
@@ -23,7 +23,19 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from school.admin_views import dashboard_cache_stats, request_metrics
+
 urlpatterns = [
+    path(
+        "admin/dashboard-cache/",
+        admin.site.admin_view(dashboard_cache_stats),
+        name="admin_dashboard_cache",
+    ),
+    path(
+        "admin/request-metrics/",
+        admin.site.admin_view(request_metrics),
+        name="admin_request_metrics",
+    ),
     path("admin/", admin.site.urls),
     path("", include("school.urls")),
     path("student/", include("student.urls")),
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DefaultUserAdmin
-from .models import CustomUser
+from .models import CustomUser, OutboxEmail
 
 # Custom UserAdmin with conditional logic for superusers and staff
 class CustomUserAdmin(DefaultUserAdmin):
@@ -39,3 +39,10 @@ class CustomUserAdmin(DefaultUserAdmin):
 
 # Register the CustomUser model with the custom admin
 admin.site.register(CustomUser, CustomUserAdmin)
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to', 'subject')
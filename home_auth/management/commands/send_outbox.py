@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from home_auth.outbox import OUTBOX_BATCH_SIZE, drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails in batches over one reused connection"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=OUTBOX_BATCH_SIZE)
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep polling instead of exiting when drained"
+        )
+        parser.add_argument(
+            "--interval", type=float, default=5.0, help="Seconds to sleep between polls"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        total_sent = total_failed = 0
+
+        while True:
+            sent, failed = drain_outbox(batch_size=batch_size)
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Outbox drained: {total_sent} sent, {total_failed} failed")
+        )
@@ -1,7 +1,5 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from django.core.mail import send_mail
-from django.conf import settings
 from django.utils.crypto import get_random_string
 from django.utils import timezone
 
@@ -44,16 +42,45 @@ class PasswordResetRequest(models.Model):
         return timezone.now() <= self.created_at + self.TOKEN_VALIDITY_PERIOD
 
     def send_reset_email(self):
-        subject = "Password Reset Request"
-        message = f"Click the following link to reset your password: http://localhost:8000/reset-password/{self.token}"
-        from_email = settings.DEFAULT_FROM_EMAIL
-        recipient_list = [self.email]
-        send_mail(subject, message, from_email, recipient_list)
+        """Queue the reset email in the outbox; the send_outbox worker delivers it"""
+        from .outbox import enqueue_email  # outbox imports this module
+
         reset_link = f"http://localhost:8000/authentication/reset-password/{self.token}/"
-        send_mail(
+        return enqueue_email(
             "Password Reset Request",
             f"Click the following link to reset your password: {reset_link}",
-            settings.DEFAULT_FROM_EMAIL,
-            [self.email],
-            fail_silently=False,
+            self.email,
         )
+
+
+class OutboxEmail(models.Model):
+    """An email waiting to be delivered by the send_outbox worker"""
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (SENT, "Sent"),
+        (FAILED, "Failed"),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.EmailField(max_length=255)
+    to = models.EmailField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["next_attempt_at", "id"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
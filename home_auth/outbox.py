@@ -0,0 +1,108 @@
+"""Database-backed email outbox drained by the send_outbox management command."""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+OUTBOX_BATCH_SIZE = 100
+
+
+def _max_attempts():
+    return getattr(settings, "OUTBOX_MAX_ATTEMPTS", 5)
+
+
+def _backoff_seconds():
+    return getattr(settings, "OUTBOX_BACKOFF_SECONDS", 30)
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2x base, 4x base... capped at one hour"""
+    return timedelta(seconds=min(_backoff_seconds() * 2 ** (attempts - 1), 3600))
+
+
+def enqueue_email(subject, body, to, from_email=None):
+    """Queue an email for background delivery and return the outbox row"""
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        to=to,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def _claim_seconds():
+    return getattr(settings, "OUTBOX_CLAIM_SECONDS", 300)
+
+
+def drain_outbox(batch_size=OUTBOX_BATCH_SIZE, connection=None, now=None):
+    """Send one batch of due emails over a single connection
+
+    The batch is claimed in a short transaction: its attempt is counted and it
+    is not due again for ``OUTBOX_CLAIM_SECONDS``, so a worker that dies while
+    sending only delays it. Mail is sent with no transaction or row locks held.
+    Each email is sent individually on the shared connection so one bad
+    recipient only delays that row; when the connection cannot be opened the
+    whole batch fails this attempt. Failed rows are rescheduled with backoff and
+    marked failed after ``OUTBOX_MAX_ATTEMPTS``. Returns ``(sent, failed)``.
+    """
+    now = now or timezone.now()
+    sent = failed = 0
+
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True).filter(
+                status=OutboxEmail.PENDING, next_attempt_at__lte=now
+            )[:batch_size]
+        )
+        if not batch:
+            return sent, failed
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+            attempts=F("attempts") + 1,
+            next_attempt_at=now + timedelta(seconds=_claim_seconds()),
+        )
+
+    def fail(email, error):
+        email.last_error = str(error)
+        if email.attempts >= _max_attempts():
+            email.status = OutboxEmail.FAILED
+        else:
+            email.next_attempt_at = now + retry_delay(email.attempts)
+
+    for email in batch:
+        email.attempts += 1
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for email in batch:
+            fail(email, e)
+        failed = len(batch)
+    else:
+        try:
+            for email in batch:
+                message = EmailMessage(
+                    email.subject, email.body, email.from_email, [email.to], connection=connection
+                )
+                try:
+                    connection.send_messages([message])
+                except Exception as e:
+                    failed += 1
+                    fail(email, e)
+                else:
+                    sent += 1
+                    email.status = OutboxEmail.SENT
+                    email.sent_at = timezone.now()
+                    email.last_error = ""
+        finally:
+            connection.close()
+
+    OutboxEmail.objects.bulk_update(
+        batch, ["status", "attempts", "next_attempt_at", "last_error", "sent_at"]
+    )
+    return sent, failed
@@ -1,3 +1,90 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import CustomUser, OutboxEmail
+from .outbox import drain_outbox, enqueue_email
+
+
+class FlakyBackend(EmailBackend):
+    """Locmem backend that refuses one recipient"""
+
+    def send_messages(self, messages):
+        if any("bounce@example.com" in message.to for message in messages):
+            raise ConnectionError("550 mailbox unavailable")
+        return super().send_messages(messages)
+
+
+class DownBackend(EmailBackend):
+    """Backend whose server refuses connections"""
+
+    def open(self):
+        raise ConnectionRefusedError("111 connection refused")
+
+
+class OutboxTests(TestCase):
+    def test_forgot_password_only_enqueues(self):
+        CustomUser.objects.create_user(username="ana", email="ana@example.com", password="x")
+
+        with mock.patch("home_auth.outbox.enqueue_email", wraps=enqueue_email) as enqueue:
+            response = self.client.post(reverse("forgot-password"), {"email": "ana@example.com"})
+
+        self.assertEqual(response.status_code, 200)
+        enqueue.assert_called_once()
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboxEmail.objects.get()
+        self.assertEqual(queued.to, "ana@example.com")
+        self.assertIn("/authentication/reset-password/", queued.body)
+
+        self.assertEqual(drain_outbox(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, OutboxEmail.SENT)
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        enqueue_email("Hello", "Body", "ok@example.com")
+        bounce = enqueue_email("Hello", "Body", "bounce@example.com")
+        now = timezone.now()
+
+        self.assertEqual(drain_outbox(connection=FlakyBackend(), now=now), (1, 1))
+        bounce.refresh_from_db()
+        self.assertEqual(bounce.status, OutboxEmail.PENDING)
+        self.assertEqual(bounce.attempts, 1)
+        self.assertGreater(bounce.next_attempt_at, now)
+
+        # not due yet, so nothing is picked up
+        self.assertEqual(drain_outbox(connection=FlakyBackend(), now=now), (0, 0))
+
+        later = now
+        for _ in range(4):
+            later += timedelta(hours=1)
+            drain_outbox(connection=FlakyBackend(), now=later)
+        bounce.refresh_from_db()
+        self.assertEqual(bounce.status, OutboxEmail.FAILED)
+        self.assertEqual(bounce.attempts, 5)
+
+    def test_unreachable_server_fails_the_batch_with_backoff(self):
+        emails = [enqueue_email("Hello", "Body", f"user{i}@example.com") for i in range(3)]
+        now = timezone.now()
+
+        self.assertEqual(drain_outbox(connection=DownBackend(), now=now), (0, 3))
+        for email in emails:
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutboxEmail.PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertIn("connection refused", email.last_error)
+            self.assertGreater(email.next_attempt_at, now)
+        self.assertEqual(drain_outbox(connection=DownBackend(), now=now), (0, 0))
 
-# Create your tests here.
+        # the server is back
+        later = now + timedelta(hours=1)
+        self.assertEqual(drain_outbox(now=later), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(
+            set(OutboxEmail.objects.values_list("status", "attempts")), {(OutboxEmail.SENT, 2)}
+        )
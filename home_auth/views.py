@@ -79,7 +79,7 @@ def forgot_password_view(request):
         if user:
             token = get_random_string(32)
             reset_request = PasswordResetRequest.objects.create(user=user, email=email, token=token)
-            reset_request.send_reset_email()
+            reset_request.send_reset_email()  # queued; delivered by the send_outbox worker
             messages.success(request, "Reset link sent to your email.")
         else:
             messages.error(request, "Email not found.")
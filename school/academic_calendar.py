@@ -0,0 +1,207 @@
+"""Materialised academic calendar: the days the school is closed.
+
+Each year is expanded once into a date-sorted list of its active holidays
+(one-off holidays of that year plus every recurring holiday moved onto it) and
+kept in the cache until a holiday changes. Lookups are binary searches over
+that list and weekends are counted arithmetically, so "is this a working day"
+and "how many working days between A and B" cost O(log n) per year touched.
+
+Working weekdays default to Monday-Friday (``SCHOOL_WORKING_WEEKDAYS``, with
+0 = Monday as in :attr:`Period.DAYS_OF_WEEK <school.models.Period.DAYS_OF_WEEK>`).
+"""
+
+import bisect
+import datetime
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Holiday
+
+VERSION_KEY = "calendar:version"
+UPCOMING_YEARS = 2
+
+UpcomingHoliday = namedtuple("UpcomingHoliday", "name date holiday_type days_until holiday")
+
+
+def _working_weekdays():
+    return frozenset(getattr(settings, "SCHOOL_WORKING_WEEKDAYS", (0, 1, 2, 3, 4)))
+
+
+def _cache_timeout():
+    return getattr(settings, "CALENDAR_CACHE_TIMEOUT", 24 * 60 * 60)
+
+
+def observed_date(date, year):
+    """The day a recurring holiday falls on in ``year`` (29 February is kept on the 28th)"""
+    try:
+        return date.replace(year=year)
+    except ValueError:
+        return datetime.date(year, 2, 28)
+
+
+def expand_year(year):
+    """Active holidays of ``year`` as Holiday instances sorted by date, in one query
+
+    Recurring holidays repeat every year from the year of their own date on;
+    their instances carry the observed date and must not be saved.
+    """
+    rows = Holiday.objects.filter(is_active=True).filter(
+        Q(date__year=year) | Q(is_recurring=True, date__year__lt=year)
+    )
+    holidays = []
+    seen = set()
+    for holiday in rows.order_by("date", "id"):
+        if holiday.date.year != year:
+            holiday.date = observed_date(holiday.date, year)
+        # a one-off row may already duplicate the recurring occurrence
+        if (holiday.name, holiday.date) not in seen:
+            seen.add((holiday.name, holiday.date))
+            holidays.append(holiday)
+    holidays.sort(key=lambda holiday: (holiday.date, holiday.pk))
+    return holidays
+
+
+class YearCalendar:
+    """Sorted holiday index of one year"""
+
+    def __init__(self, year, holidays, weekdays):
+        self.year = year
+        self.holidays = holidays
+        self.weekdays = weekdays
+        self.ordinals = [holiday.date.toordinal() for holiday in holidays]
+        # distinct holiday dates that would otherwise have been working days
+        self.closed = sorted(
+            {holiday.date.toordinal() for holiday in holidays if holiday.date.weekday() in weekdays}
+        )
+
+    def between(self, start, end):
+        """Holidays dated ``start``..``end`` inclusive"""
+        low = bisect.bisect_left(self.ordinals, start.toordinal())
+        high = bisect.bisect_right(self.ordinals, end.toordinal())
+        return self.holidays[low:high]
+
+    def holiday_on(self, date):
+        index = bisect.bisect_left(self.ordinals, date.toordinal())
+        if index < len(self.ordinals) and self.ordinals[index] == date.toordinal():
+            return self.holidays[index]
+        return None
+
+    def closed_days(self, start, end):
+        """Number of working weekdays in ``start``..``end`` lost to holidays"""
+        return bisect.bisect_right(self.closed, end.toordinal()) - bisect.bisect_left(
+            self.closed, start.toordinal()
+        )
+
+
+# year -> (version, weekdays, YearCalendar), kept for the life of the process
+_years = {}
+
+
+def bump_version():
+    """Invalidate every process's calendars after a holiday changed
+
+    The version is a random token rather than a counter so a cache flush can
+    never make an old in-process calendar look current again.
+    """
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_year(year, version=None):
+    """The YearCalendar of ``year``: from this process, then the cache, then the database"""
+    version = version or _version()
+    weekdays = _working_weekdays()
+    memo = _years.get(year)
+    if memo and memo[0] == version and memo[1] == weekdays:
+        return memo[2]
+
+    key = f"calendar:{version}:{year}"
+    holidays = cache.get(key)
+    if holidays is None:
+        holidays = expand_year(year)
+        cache.set(key, holidays, _cache_timeout())
+    calendar = YearCalendar(year, holidays, weekdays)
+    _years[year] = (version, weekdays, calendar)
+    return calendar
+
+
+def _years_between(start, end):
+    version = _version()
+    return [get_year(year, version) for year in range(start.year, end.year + 1)]
+
+
+def holidays_between(start, end):
+    """Holiday instances dated ``start``..``end`` inclusive, recurring ones expanded"""
+    found = []
+    for calendar in _years_between(start, end):
+        found.extend(calendar.between(start, end))
+    return found
+
+
+def holiday_dates(start, end):
+    """{date: holiday name} for active holidays between ``start`` and ``end`` (inclusive)"""
+    found = {}
+    for holiday in holidays_between(start, end):
+        found.setdefault(holiday.date, holiday.name)
+    return found
+
+
+def holiday_on(date):
+    """The holiday on ``date``, or None"""
+    return get_year(date.year).holiday_on(date)
+
+
+def is_working_day(date):
+    return date.weekday() in _working_weekdays() and holiday_on(date) is None
+
+
+def _weekdays_between(start, end, weekdays):
+    weeks, extra = divmod(end.toordinal() - start.toordinal() + 1, 7)
+    first = start.weekday()
+    return weeks * len(weekdays) + sum((first + i) % 7 in weekdays for i in range(extra))
+
+
+def working_days_between(start, end):
+    """Working days in ``start``..``end`` inclusive (0 when ``end`` is before ``start``)"""
+    if end < start:
+        return 0
+    total = _weekdays_between(start, end, _working_weekdays())
+    return total - sum(calendar.closed_days(start, end) for calendar in _years_between(start, end))
+
+
+def next_working_day(date):
+    """``date`` itself if the school is open then, otherwise the next day it is"""
+    if not _working_weekdays():
+        raise ValueError("SCHOOL_WORKING_WEEKDAYS is empty")
+    while not is_working_day(date):
+        date += datetime.timedelta(days=1)
+    return date
+
+
+def upcoming_holidays(today=None, limit=None):
+    """Holidays from ``today`` on (looking up to UPCOMING_YEARS ahead) with days remaining"""
+    today = today or timezone.localdate()
+    end = datetime.date(today.year + UPCOMING_YEARS - 1, 12, 31)
+    upcoming = [
+        UpcomingHoliday(
+            holiday.name,
+            holiday.date,
+            holiday.holiday_type,
+            (holiday.date - today).days,
+            holiday,
+        )
+        for holiday in holidays_between(today, end)
+    ]
+    return upcoming[:limit] if limit is not None else upcoming
@@ -48,3 +48,185 @@ class HolidayAdmin(admin.ModelAdmin):
         ("Holiday Information", {"fields": ("name", "date", "holiday_type", "description")}),
         ("Settings", {"fields": ("is_recurring", "is_active"), "classes": ("collapse",)}),
     )
+
+
+@admin.register(Room)
+class RoomAdmin(admin.ModelAdmin):
+    list_display = ["name", "capacity"]
+    search_fields = ["name"]
+
+
+@admin.register(Period)
+class PeriodAdmin(admin.ModelAdmin):
+    list_display = ["day_of_week", "start_time", "end_time"]
+    list_filter = ["day_of_week"]
+    ordering = ["day_of_week", "start_time"]
+
+
+@admin.register(Assignment)
+class AssignmentAdmin(admin.ModelAdmin):
+    # Assignment.clean() rejects teacher, room and class double-bookings
+    list_display = ["student_class", "period", "subject", "teacher", "room"]
+    list_filter = ["period__day_of_week", "student_class", "room"]
+    search_fields = ["student_class", "subject__name", "teacher__first_name", "teacher__last_name"]
+    list_select_related = ["period", "subject", "teacher", "room"]
+    autocomplete_fields = ["teacher", "subject", "room"]
+
+
+@admin.register(AttendanceSheet)
+class AttendanceSheetAdmin(admin.ModelAdmin):
+    # the bitmaps are written by school.attendance.mark_class, never by hand
+    list_display = ["date", "student_class", "subject", "present_count", "total", "marked_by"]
+    list_filter = ["student_class", "subject"]
+    date_hierarchy = "date"
+    list_select_related = ["subject", "marked_by"]
+    exclude = ["roster", "present"]
+    readonly_fields = ["present_count", "total", "marked_by"]
+
+
+@admin.register(AttendanceRollup)
+class AttendanceRollupAdmin(admin.ModelAdmin):
+    list_display = ["student", "subject", "month", "present", "sessions"]
+    list_filter = ["month", "subject"]
+    list_select_related = ["student", "subject"]
+    readonly_fields = ["student", "subject", "month", "present", "sessions"]
+
+
+@admin.register(MessageThread)
+class MessageThreadAdmin(admin.ModelAdmin):
+    # counters and last-message copies are maintained by school.messaging
+    list_display = ["subject", "created_by", "last_seq", "last_message_at"]
+    search_fields = ["subject"]
+    date_hierarchy = "last_message_at"
+    list_select_related = ["created_by"]
+    readonly_fields = [
+        "created_by",
+        "last_seq",
+        "last_message_at",
+        "last_message_sender",
+        "last_message_preview",
+    ]
+
+
+class ExamSubjectInline(admin.TabularInline):
+    model = ExamSubject
+    extra = 0
+    autocomplete_fields = ["subject"]
+
+
+@admin.register(Exam)
+class ExamAdmin(admin.ModelAdmin):
+    list_display = ["name", "term", "exam_type", "start_date", "end_date", "results_computed_at"]
+    list_filter = ["exam_type", "term"]
+    search_fields = ["name", "term"]
+    date_hierarchy = "start_date"
+    inlines = [ExamSubjectInline]
+
+
+@admin.register(ExamResult)
+class ExamResultAdmin(admin.ModelAdmin):
+    # rows are rewritten wholesale by school.exams.compute_results
+    list_display = ["student", "exam", "student_class", "total", "gpa", "class_rank", "percentile"]
+    list_filter = ["exam", "student_class"]
+    list_select_related = ["student", "exam"]
+    ordering = ["exam", "student_class", "class_rank"]
+
+
+class CopyInline(admin.TabularInline):
+    model = Copy
+    extra = 0
+
+
+@admin.register(Book)
+class BookAdmin(admin.ModelAdmin):
+    list_display = ["title", "author", "isbn", "copies_available", "copies_total", "loans_total"]
+    list_filter = ["category", "language"]
+    search_fields = ["isbn", "title", "author"]
+    readonly_fields = ["copies_total", "copies_available", "loans_total"]
+    inlines = [CopyInline]
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # copies edited inline bypass the circulation counters
+        from .library import recount
+
+        recount(Book.objects.filter(pk=form.instance.pk))
+
+
+@admin.register(Loan)
+class LoanAdmin(admin.ModelAdmin):
+    # checkouts and returns go through school.library so the counters stay right
+    list_display = ["copy", "borrower", "issued_at", "due_date", "returned_at"]
+    list_filter = ["due_date", "returned_at"]
+    search_fields = ["copy__barcode", "borrower__username", "copy__book__title"]
+    list_select_related = ["copy__book", "borrower"]
+    readonly_fields = ["copy", "borrower", "issued_by", "issued_at", "returned_at"]
+
+
+class BedInline(admin.TabularInline):
+    model = Bed
+    extra = 0
+    raw_id_fields = ["student"]
+
+
+@admin.register(Hostel)
+class HostelAdmin(admin.ModelAdmin):
+    list_display = ["name", "gender", "warden"]
+    list_filter = ["gender"]
+    search_fields = ["name"]
+
+
+@admin.register(HostelRoom)
+class HostelRoomAdmin(admin.ModelAdmin):
+    list_display = ["__str__", "floor", "year_group", "is_available"]
+    list_filter = ["hostel", "is_available", "year_group"]
+    search_fields = ["number", "hostel__name"]
+    inlines = [BedInline]
+
+
+@admin.register(HostelApplication)
+class HostelApplicationAdmin(admin.ModelAdmin):
+    # beds are given out by school.hostel.allocate_beds
+    list_display = ["student", "preferred_hostel", "applied_at"]
+    list_filter = ["preferred_hostel"]
+    search_fields = ["student__student_id", "student__first_name", "student__last_name"]
+    raw_id_fields = ["student"]
+
+
+@admin.register(Bus)
+class BusAdmin(admin.ModelAdmin):
+    list_display = ["registration", "capacity", "driver_name", "driver_phone", "is_active"]
+    list_filter = ["is_active"]
+    search_fields = ["registration", "driver_name"]
+
+
+class StopInline(admin.TabularInline):
+    model = Stop
+    extra = 0
+    fields = ["sequence", "name", "latitude", "longitude", "minutes_to_school", "rider_count"]
+    readonly_fields = ["latitude", "longitude", "minutes_to_school", "rider_count"]
+
+
+@admin.register(Route)
+class RouteAdmin(admin.ModelAdmin):
+    # stops and routes are planned by school.transport.plan_routes; only names are edited
+    list_display = ["name", "bus", "rider_count", "distance_km", "ride_minutes", "planned_at"]
+    search_fields = ["name", "bus__registration"]
+    list_select_related = ["bus"]
+    inlines = [StopInline]
+
+
+@admin.register(Stop)
+class StopAdmin(admin.ModelAdmin):
+    list_display = ["__str__", "route", "sequence", "rider_count", "minutes_to_school"]
+    list_filter = ["route"]
+    search_fields = ["name"]
+    list_select_related = ["route"]
+
+
+@admin.register(Rider)
+class RiderAdmin(admin.ModelAdmin):
+    list_display = ["student", "stop", "latitude", "longitude", "registered_at"]
+    search_fields = ["student__student_id", "student__first_name", "student__last_name"]
+    raw_id_fields = ["student"]
+    list_select_related = ["student", "stop"]
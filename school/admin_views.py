@@ -0,0 +1,38 @@
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+
+from .dashboard import fragment_stats, reset_stats
+from .metrics import clear_snapshots, load_snapshots, summarize
+
+
+def dashboard_cache_stats(request):
+    """Admin page listing dashboard fragment cache hits and misses"""
+    if request.method == "POST":
+        reset_stats()
+        messages.success(request, "Dashboard cache counters have been reset.")
+        return redirect("admin_dashboard_cache")
+
+    context = {
+        **admin.site.each_context(request),
+        "title": "Dashboard cache",
+        "rows": fragment_stats(),
+    }
+    return TemplateResponse(request, "admin/dashboard_cache.html", context)
+
+
+def request_metrics(request):
+    """Admin page with p50/p95/p99 timings per view from RequestMetricsMiddleware"""
+    if request.method == "POST":
+        clear_snapshots()
+        messages.success(request, "Request metrics have been cleared.")
+        return redirect("admin_request_metrics")
+
+    sort_by = request.GET.get("sort", "wall_p95")
+    context = {
+        **admin.site.each_context(request),
+        "title": "Request metrics",
+        "rows": summarize(load_snapshots(), sort_by=sort_by),
+        "sort_by": sort_by,
+    }
+    return TemplateResponse(request, "admin/request_metrics.html", context)
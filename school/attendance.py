@@ -0,0 +1,281 @@
+"""Attendance stored as one packed bitmap per class-day.
+
+A class-day (optionally per subject) is a single :class:`AttendanceSheet`
+row: the class roster as packed uint32 student ids plus one presence bit per
+roster entry. Marking a class is therefore one row write whatever the class
+size, instead of a row per student per period.
+
+Reads never count individual marks:
+
+- daily class totals are the popcounts stored on each sheet when it is marked;
+- per-student percentages come from :class:`AttendanceRollup` rows (one per
+  student and month), which :func:`mark_class` moves by the difference between
+  the old and new bitmaps;
+- arbitrary date ranges (terms, "below 75%" alerts) unpack the bitmaps with
+  NumPy and sum them per student with ``bincount``.
+"""
+
+import struct
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from . import academic_calendar
+from .models import AttendanceRollup, AttendanceSheet
+from .notifications import notify_users
+
+SHEET_CHUNK_SIZE = 2000
+
+
+class AttendanceError(ValueError):
+    """Attendance cannot be recorded as requested"""
+
+
+def alert_threshold():
+    return getattr(settings, "ATTENDANCE_ALERT_THRESHOLD", 0.75)
+
+
+def pack_roster(student_ids):
+    return struct.pack(f"<{len(student_ids)}I", *student_ids)
+
+
+def unpack_roster(data):
+    return list(struct.unpack(f"<{len(data) // 4}I", data))
+
+
+def pack_bits(flags):
+    """One bit per flag, most significant bit first (the layout of ``numpy.packbits``)"""
+    data = bytearray((len(flags) + 7) // 8)
+    for index, flag in enumerate(flags):
+        if flag:
+            data[index >> 3] |= 0x80 >> (index & 7)
+    return bytes(data)
+
+
+def unpack_bits(data, size):
+    return [bool(data[index >> 3] & (0x80 >> (index & 7))) for index in range(size)]
+
+
+def popcount(data):
+    return int.from_bytes(data, "big").bit_count()
+
+
+def class_roster(student_class):
+    """Student ids of a class in the order their bits are stored"""
+    from student.models import Student
+
+    return list(
+        Student.objects.filter(student_class=student_class)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+def _month(date):
+    return date.replace(day=1)
+
+
+def _apply_rollups(before, after, subject_id, month):
+    """Move the monthly roll-ups from the ``before`` to the ``after`` {student: present} maps
+
+    Students are grouped by their (sessions, present) change so a whole class
+    costs one insert plus at most a handful of UPDATE statements.
+    """
+    deltas = defaultdict(list)
+    for student_id in before.keys() | after.keys():
+        delta = (
+            (student_id in after) - (student_id in before),
+            after.get(student_id, False) - before.get(student_id, False),
+        )
+        if delta != (0, 0):
+            deltas[delta].append(student_id)
+    if not deltas:
+        return
+
+    new_ids = [student_id for student_id in after if student_id not in before]
+    AttendanceRollup.objects.bulk_create(
+        [
+            AttendanceRollup(student_id=student_id, subject_id=subject_id, month=month)
+            for student_id in new_ids
+        ],
+        ignore_conflicts=True,
+    )
+    for (sessions, present), student_ids in deltas.items():
+        AttendanceRollup.objects.filter(
+            student_id__in=student_ids, subject_id=subject_id, month=month
+        ).update(sessions=F("sessions") + sessions, present=F("present") + present)
+
+
+def mark_class(student_class, date, present_ids, subject=None, marked_by=None):
+    """Record which students of ``student_class`` attended on ``date``
+
+    ``present_ids`` are student pks; everyone else on the class roster is
+    marked absent. ``subject`` (a Subject or its pk) separates lesson
+    attendance from the daily roll call. Marking the same class-day again
+    replaces it and moves the roll-ups by the difference.
+    """
+    if not academic_calendar.is_working_day(date):
+        raise AttendanceError(f"{date} is not a working day")
+    roster = class_roster(student_class)
+    if not roster:
+        raise AttendanceError(f"Class '{student_class}' has no students")
+    present = set(present_ids)
+    unknown = present.difference(roster)
+    if unknown:
+        raise AttendanceError(
+            f"Not in class {student_class}: {', '.join(str(pk) for pk in sorted(unknown))}"
+        )
+
+    flags = [student_id in present for student_id in roster]
+    subject_id = getattr(subject, "pk", subject)
+    try:
+        return _write_sheet(student_class, subject_id, date, roster, flags, marked_by)
+    except IntegrityError:
+        # a concurrent first mark created the class-day's sheet; mark over it
+        return _write_sheet(student_class, subject_id, date, roster, flags, marked_by)
+
+
+def _locked_sheet(student_class, subject_id, date):
+    return (
+        AttendanceSheet.objects.select_for_update()
+        .filter(student_class=student_class, subject_id=subject_id, date=date)
+        .first()
+    )
+
+
+def _write_sheet(student_class, subject_id, date, roster, flags, marked_by):
+    with transaction.atomic():
+        sheet = _locked_sheet(student_class, subject_id, date)
+        if sheet is None:
+            sheet = AttendanceSheet(student_class=student_class, subject_id=subject_id, date=date)
+            before = {}
+        else:
+            before = dict(zip(unpack_roster(sheet.roster), unpack_bits(sheet.present, sheet.total)))
+        sheet.roster = pack_roster(roster)
+        sheet.present = pack_bits(flags)
+        sheet.present_count = popcount(sheet.present)
+        sheet.total = len(roster)
+        sheet.marked_by = marked_by
+        sheet.save()
+        _apply_rollups(before, dict(zip(roster, flags)), subject_id, _month(date))
+    return sheet
+
+
+def student_attendance(student, subject=None, start=None, end=None):
+    """Sessions, attended and percentage of one student from the monthly roll-ups
+
+    ``start`` and ``end`` select whole months.
+    """
+    rollups = AttendanceRollup.objects.filter(student=student, subject=subject)
+    if start:
+        rollups = rollups.filter(month__gte=_month(start))
+    if end:
+        rollups = rollups.filter(month__lte=_month(end))
+    totals = rollups.aggregate(sessions=Sum("sessions"), present=Sum("present"))
+    sessions, present = totals["sessions"] or 0, totals["present"] or 0
+    return {
+        "sessions": sessions,
+        "present": present,
+        "percentage": present / sessions * 100 if sessions else None,
+    }
+
+
+def class_daily_totals(student_class, start, end, subject=None):
+    """Present/total per day for one class, read from the counts stored on each sheet"""
+    rows = AttendanceSheet.objects.filter(
+        student_class=student_class, subject=subject, date__range=(start, end)
+    ).values_list("date", "present_count", "total")
+    return [
+        {
+            "date": date,
+            "present": present,
+            "total": total,
+            "percentage": present / total * 100 if total else None,
+        }
+        for date, present, total in rows.order_by("date")
+    ]
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImproperlyConfigured("Attendance reports require numpy (pip install numpy)")
+    return numpy
+
+
+def attendance_totals(start, end, student_class=None, subject=None):
+    """Per-student ``(student_ids, sessions, attended)`` NumPy arrays for a date range
+
+    Every matching bitmap is unpacked and concatenated, then summed per
+    student with ``bincount``; students who changed class keep all their days.
+    """
+    np = _numpy()
+    sheets = AttendanceSheet.objects.filter(subject=subject, date__range=(start, end))
+    if student_class is not None:
+        sheets = sheets.filter(student_class=student_class)
+
+    rosters, bits = [], []
+    rows = sheets.values_list("roster", "present", "total").iterator(chunk_size=SHEET_CHUNK_SIZE)
+    for roster, present, total in rows:
+        rosters.append(np.frombuffer(roster, dtype="<u4"))
+        bits.append(np.unpackbits(np.frombuffer(present, dtype=np.uint8), count=total))
+    if not rosters:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+
+    student_ids, index = np.unique(np.concatenate(rosters), return_inverse=True)
+    sessions = np.bincount(index)
+    attended = np.bincount(index, weights=np.concatenate(bits)).astype(np.int64)
+    return student_ids.astype(np.int64), sessions, attended
+
+
+def low_attendance(start, end, threshold=None, student_class=None, subject=None):
+    """Students attending less than ``threshold`` (default ATTENDANCE_ALERT_THRESHOLD)
+
+    Returns ``{"student_id", "sessions", "present", "percentage"}`` dicts, worst first.
+    """
+    threshold = alert_threshold() if threshold is None else threshold
+    student_ids, sessions, attended = attendance_totals(start, end, student_class, subject)
+    below = attended < sessions * threshold
+    rates = attended[below] / sessions[below]
+    order = rates.argsort(kind="stable")
+    return [
+        {
+            "student_id": int(student_id),
+            "sessions": int(total),
+            "present": int(present),
+            "percentage": float(rate * 100),
+        }
+        for student_id, total, present, rate in zip(
+            student_ids[below][order],
+            sessions[below][order],
+            attended[below][order],
+            rates[order],
+        )
+    ]
+
+
+def send_low_attendance_alerts(start, end, threshold=None, student_class=None):
+    """Notify every student below the threshold who has a user account; returns the count"""
+    from student.models import Student
+
+    threshold = alert_threshold() if threshold is None else threshold
+    rows = {row["student_id"]: row for row in low_attendance(start, end, threshold, student_class)}
+    if not rows:
+        return 0
+
+    def messages():
+        users = Student.objects.filter(pk__in=rows, user__isnull=False)
+        for student_id, user_id in users.values_list("pk", "user_id").iterator():
+            row = rows[student_id]
+            yield user_id, (
+                f"Your attendance from {start:%d %b} to {end:%d %b %Y} is "
+                f"{row['percentage']:.0f}% ({row['present']} of {row['sessions']} days), "
+                f"below the required {threshold * 100:.0f}%."
+            )
+
+    return notify_users(messages())
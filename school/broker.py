@@ -0,0 +1,163 @@
+"""Publish/subscribe for pushing events to connected clients.
+
+Publishers are ordinary sync code (signal handlers, ``transaction.on_commit``
+callbacks, management commands); subscribers are async views holding a
+streaming response open. The broker hands each event to the subscriptions of
+its channel and nothing else, so an idle subscriber costs an ``asyncio.Queue``
+and no work at all until something is published for it.
+
+The backend is chosen with the ``PUSH_BROKER`` setting::
+
+    PUSH_BROKER = {
+        "BACKEND": "school.broker.LocalBroker",
+        "OPTIONS": {"max_pending": 100},
+    }
+
+:class:`LocalBroker` only reaches clients connected to the same process. To
+fan out across several ASGI workers, subclass :class:`BaseBroker` over a shared
+transport (Redis pub/sub, PostgreSQL ``LISTEN``/``NOTIFY``) and deliver what it
+receives with :meth:`BaseBroker.deliver`.
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULT_BROKER = {"BACKEND": "school.broker.LocalBroker", "OPTIONS": {}}
+
+
+class Subscription:
+    """The queue of events published to one channel for one client
+
+    Must be created on the event loop that reads it. When a client falls more
+    than ``max_pending`` events behind, the oldest are dropped and counted in
+    :attr:`dropped`.
+    """
+
+    def __init__(self, broker, channel, max_pending):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(max_pending)
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, event):
+        """Queue an event; called on the subscriber's loop"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """The next event, or None once ``timeout`` seconds pass without one"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.broker.unsubscribe(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+class BaseBroker:
+    """Keeps the subscriptions of this process and hands events to them
+
+    Subclasses implement :meth:`publish`; this base only delivers locally.
+    """
+
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self._channels = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        """A new :class:`Subscription` to ``channel`` (call from async code)"""
+        subscription = Subscription(self, channel, self.max_pending)
+        with self._lock:
+            self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._channels.get(channel, ()))
+            return sum(len(subscribers) for subscribers in self._channels.values())
+
+    def deliver(self, channel, event):
+        """Hand ``event`` to this process's subscribers of ``channel``; safe from any thread"""
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # the subscriber's loop has shut down without closing it
+                subscription.close()
+        return len(subscribers)
+
+    def publish(self, channel, event):
+        """Send ``event`` to every subscriber of ``channel``"""
+        raise NotImplementedError("subclasses of BaseBroker must provide a publish() method")
+
+    def publish_many(self, events):
+        """Publish ``(channel, event)`` pairs"""
+        for channel, event in events:
+            self.publish(channel, event)
+
+
+class LocalBroker(BaseBroker):
+    """Delivers events to subscribers in the publishing process only"""
+
+    def publish(self, channel, event):
+        return self.deliver(channel, event)
+
+    def publish_many(self, events):
+        with self._lock:
+            if not self._channels:
+                return
+        super().publish_many(events)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker configured by PUSH_BROKER"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                config = getattr(settings, "PUSH_BROKER", DEFAULT_BROKER)
+                backend = import_string(config.get("BACKEND", DEFAULT_BROKER["BACKEND"]))
+                _broker = backend(**config.get("OPTIONS", {}))
+    return _broker
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    global _broker
+    if setting == "PUSH_BROKER":
+        _broker = None
@@ -0,0 +1,29 @@
+from django.utils.functional import SimpleLazyObject
+
+from .models import Notification
+from .notifications import get_unread_count
+
+UNREAD_DROPDOWN_LIMIT = 20
+
+
+def notifications(request):
+    """Expose the header badge count and a lazily loaded unread dropdown"""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {"unread_notification_count": 0, "unread_notification": []}
+
+    count = get_unread_count(user)
+
+    def unread_notifications():
+        if not count:
+            return []
+        return list(
+            Notification.objects.filter(user=user, is_read=False)
+            .select_related("user")
+            .order_by("-created_at")[:UNREAD_DROPDOWN_LIMIT]
+        )
+
+    return {
+        "unread_notification_count": count,
+        "unread_notification": SimpleLazyObject(unread_notifications),
+    }
@@ -0,0 +1,190 @@
+"""Per-role caching of dashboard fragments with model-driven invalidation.
+
+Each fragment is cached under ``dashboard:<role>:<name>`` and lists the models
+whose changes make it stale. ``post_save``/``post_delete`` signals (see
+``school.signals``) call :func:`invalidate_model`, which deletes exactly the
+keys of the fragments depending on the changed model.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Department, Holiday, Subject, Teacher
+
+# fragment name -> model labels it is built from
+FRAGMENT_DEPENDENCIES = {
+    "overview": {
+        "home_auth.CustomUser",
+        "school.Teacher",
+        "school.Department",
+        "school.Subject",
+        "school.Holiday",
+    },
+    "students": {"home_auth.CustomUser"},
+}
+
+# role -> fragments rendered on that role's dashboard
+ROLE_FRAGMENTS = {
+    "admin": ("overview", "students"),
+    "teacher": ("overview",),
+}
+
+STATS_KEY = "dashboard:stats:{role}:{name}:{outcome}"
+
+
+def fragment_key(role, name):
+    return f"dashboard:{role}:{name}"
+
+
+def _timeout():
+    return getattr(settings, "DASHBOARD_CACHE_TIMEOUT", 600)
+
+
+def _count(role, name, outcome):
+    key = STATS_KEY.format(role=role, name=name, outcome=outcome)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def get_fragment(role, name, build):
+    """Return the cached fragment for ``role``, calling ``build()`` on a miss"""
+    key = fragment_key(role, name)
+    value = cache.get(key)
+    if value is not None:
+        _count(role, name, "hits")
+        return value
+
+    _count(role, name, "misses")
+    value = build()
+    cache.set(key, value, _timeout())
+    return value
+
+
+async def _acount(role, name, outcome):
+    key = STATS_KEY.format(role=role, name=name, outcome=outcome)
+    if not await cache.aadd(key, 1, None):
+        try:
+            await cache.aincr(key)
+        except ValueError:
+            await cache.aset(key, 1, None)
+
+
+async def aget_fragment(role, name, abuild):
+    """Async get_fragment; ``abuild`` is a coroutine function"""
+    key = fragment_key(role, name)
+    value = await cache.aget(key)
+    if value is not None:
+        await _acount(role, name, "hits")
+        return value
+
+    await _acount(role, name, "misses")
+    value = await abuild()
+    await cache.aset(key, value, _timeout())
+    return value
+
+
+def invalidate_model(label):
+    """Delete every role's fragments that depend on the model ``label``"""
+    keys = [
+        fragment_key(role, name)
+        for role, names in ROLE_FRAGMENTS.items()
+        for name in names
+        if label in FRAGMENT_DEPENDENCIES[name]
+    ]
+    if keys:
+        cache.delete_many(keys)
+    return keys
+
+
+def fragment_stats():
+    """Hit/miss counters for every role fragment, for the admin stats page"""
+    keys = {
+        (role, name, outcome): STATS_KEY.format(role=role, name=name, outcome=outcome)
+        for role, names in ROLE_FRAGMENTS.items()
+        for name in names
+        for outcome in ("hits", "misses")
+    }
+    values = cache.get_many(keys.values())
+    rows = []
+    for role, names in ROLE_FRAGMENTS.items():
+        for name in names:
+            hits = values.get(keys[(role, name, "hits")], 0)
+            misses = values.get(keys[(role, name, "misses")], 0)
+            total = hits + misses
+            rows.append(
+                {
+                    "role": role,
+                    "fragment": name,
+                    "key": fragment_key(role, name),
+                    "cached": cache.get(fragment_key(role, name)) is not None,
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": hits / total * 100 if total else 0,
+                }
+            )
+    return rows
+
+
+def reset_stats():
+    cache.delete_many(
+        [
+            STATS_KEY.format(role=role, name=name, outcome=outcome)
+            for role, names in ROLE_FRAGMENTS.items()
+            for name in names
+            for outcome in ("hits", "misses")
+        ]
+    )
+
+
+def build_overview():
+    """Headline counts shown on the admin and teacher dashboards"""
+    users = get_user_model().objects.aggregate(
+        students=Count("id", filter=Q(is_student=True)),
+        teachers=Count("id", filter=Q(is_teacher=True)),
+    )
+    return {
+        "students": users["students"],
+        "teacher_accounts": users["teachers"],
+        "teachers": Teacher.objects.count(),
+        "departments": Department.objects.count(),
+        "subjects": Subject.objects.count(),
+        "upcoming_holidays": Holiday.objects.filter(
+            is_active=True, date__gte=timezone.now().date()
+        ).count(),
+    }
+
+
+def render_student_table(request):
+    """Render the admin dashboard student table once; the result is cached as HTML"""
+    students = (
+        get_user_model()
+        .objects.filter(is_student=True)
+        .only("id", "username", "first_name", "last_name", "email", "profile_image")
+        .order_by("first_name", "last_name")
+    )
+    return render_to_string("Home/student_table.html", {"students": students}, request=request)
+
+
+async def abuild_overview():
+    """build_overview with the async ORM, for async views"""
+    users = await get_user_model().objects.aaggregate(
+        students=Count("id", filter=Q(is_student=True)),
+        teachers=Count("id", filter=Q(is_teacher=True)),
+    )
+    return {
+        "students": users["students"],
+        "teacher_accounts": users["teachers"],
+        "teachers": await Teacher.objects.acount(),
+        "departments": await Department.objects.acount(),
+        "subjects": await Subject.objects.acount(),
+        "upcoming_holidays": await Holiday.objects.filter(
+            is_active=True, date__gte=timezone.now().date()
+        ).acount(),
+    }
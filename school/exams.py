@@ -0,0 +1,237 @@
+"""Examinations: bulk marks entry and the batch result computation.
+
+Marks are entered a paper at a time as one upsert per chunk. Results are a
+separate stage run once marking is done (:func:`compute_results`): every mark
+of the exam is loaded into a NumPy student-by-paper grid and totals, GPA,
+class rank and percentile come out of array reductions and ``lexsort`` over
+the whole cohort at once, then replace the exam's :class:`ExamResult` rows in
+bulk.
+
+Grades follow ``EXAM_GRADE_SCALE``: ``(minimum percentage, letter, points)``
+rows, best first. A paper's grade points are weighted by its credits in the
+GPA; an absent student, or one with no mark entered, scores 0 on that paper.
+"""
+
+import decimal
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import Exam, ExamResult, ExamSubject, Mark
+
+MARK_CHUNK_SIZE = 2000
+RESULT_CHUNK_SIZE = 2000
+
+DEFAULT_GRADE_SCALE = (
+    (90, "A+", 4.0),
+    (80, "A", 3.7),
+    (70, "B+", 3.3),
+    (60, "B", 3.0),
+    (50, "C", 2.0),
+    (40, "D", 1.0),
+    (0, "F", 0.0),
+)
+
+
+class ExamError(ValueError):
+    """Marks or results cannot be recorded as requested"""
+
+
+def grade_scale():
+    return getattr(settings, "EXAM_GRADE_SCALE", DEFAULT_GRADE_SCALE)
+
+
+def grade_for(percentage):
+    """``(letter, points)`` for a percentage"""
+    for minimum, letter, points in grade_scale():
+        if percentage >= minimum:
+            return letter, points
+    return grade_scale()[-1][1:]
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImproperlyConfigured("Exam results require numpy (pip install numpy)")
+    return numpy
+
+
+def _score(value, paper):
+    if value is None or value == "":
+        return None
+    try:
+        score = decimal.Decimal(str(value))
+    except decimal.InvalidOperation:
+        raise ExamError(f"'{value}' is not a number")
+    if not score.is_finite():
+        raise ExamError(f"'{value}' is not a number")
+    if not 0 <= score <= paper.max_marks:
+        raise ExamError(f"{score} is outside 0-{paper.max_marks} for {paper.subject}")
+    return score.quantize(decimal.Decimal("0.01"))
+
+
+def record_marks(paper, scores, entered_by=None, chunk_size=MARK_CHUNK_SIZE):
+    """Insert or update the marks of one paper from ``{student_id: score}``
+
+    A ``None`` or empty score records the student as absent. Every score and
+    student id is validated before anything is written; the rows are then upserted with one
+    statement per chunk. Returns the number of marks written.
+    """
+    from student.models import Student
+
+    marks = [
+        Mark(paper=paper, student_id=student_id, score=_score(value, paper), entered_by=entered_by)
+        for student_id, value in scores.items()
+    ]
+    unknown = set(scores).difference(
+        Student.objects.filter(pk__in=list(scores)).values_list("pk", flat=True)
+    )
+    if unknown:
+        raise ExamError(f"Unknown students: {', '.join(str(pk) for pk in sorted(unknown))}")
+    with transaction.atomic():
+        for start in range(0, len(marks), chunk_size):
+            Mark.objects.bulk_create(
+                marks[start : start + chunk_size],
+                update_conflicts=True,
+                unique_fields=["paper", "student"],
+                update_fields=["score", "entered_by", "updated_at"],
+            )
+    return len(marks)
+
+
+def _class_ranks(np, class_codes, totals):
+    """Competition rank ("1224") of each total within its class, highest first"""
+    order = np.lexsort((-totals, class_codes))
+    sorted_classes, sorted_totals = class_codes[order], totals[order]
+    positions = np.arange(len(order))
+    new_class = np.ones(len(order), dtype=bool)
+    new_class[1:] = sorted_classes[1:] != sorted_classes[:-1]
+    new_total = new_class.copy()
+    new_total[1:] |= sorted_totals[1:] != sorted_totals[:-1]
+    class_start = np.maximum.accumulate(np.where(new_class, positions, 0))
+    tie_start = np.maximum.accumulate(np.where(new_total, positions, 0))
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = tie_start - class_start + 1
+    return ranks
+
+
+def compute_results(exam):
+    """Compute and store every student's total, GPA, class rank and percentile
+
+    Returns the number of results written. Students with no marks for the
+    exam get no result; the exam's previous results are replaced.
+    """
+    from student.models import Student
+
+    np = _numpy()
+    papers = list(ExamSubject.objects.filter(exam=exam).values_list("pk", "max_marks", "credits"))
+    if not papers:
+        raise ExamError(f"{exam} has no papers")
+    paper_ids = np.array([pk for pk, _max, _credits in papers], dtype=np.int64)
+    paper_order = np.argsort(paper_ids)
+    paper_ids = paper_ids[paper_order]
+    paper_max = np.array([max_marks for _pk, max_marks, _c in papers], dtype=float)[paper_order]
+    paper_credits = np.array([float(c) for _pk, _m, c in papers], dtype=float)[paper_order]
+
+    rows = (
+        Mark.objects.filter(paper__exam=exam)
+        .annotate(points=Cast("score", FloatField()))
+        .values_list("student_id", "paper_id", "points")
+    )
+    student_ids, mark_papers, scores = [], [], []
+    for student_id, paper_id, score in rows.iterator(chunk_size=MARK_CHUNK_SIZE):
+        student_ids.append(student_id)
+        mark_papers.append(paper_id)
+        scores.append(score)
+
+    with transaction.atomic():
+        ExamResult.objects.filter(exam=exam).delete()
+        if not student_ids:
+            Exam.objects.filter(pk=exam.pk).update(results_computed_at=timezone.now())
+            return 0
+
+        students, index = np.unique(np.array(student_ids, dtype=np.int64), return_inverse=True)
+        paper_index = np.searchsorted(paper_ids, np.array(mark_papers, dtype=np.int64))
+        # every student sits every paper: missing rows and absent (NULL) marks score 0
+        grid = np.zeros((len(students), len(paper_ids)))
+        grid[index, paper_index] = np.nan_to_num(np.array(scores, dtype=float))
+
+        totals = grid.sum(axis=1)
+        max_total = paper_max.sum()
+        percentages = totals * 100 / max_total if max_total > 0 else np.zeros_like(totals)
+
+        # grade points per paper: thresholds ascending for searchsorted
+        scale = sorted(grade_scale())
+        thresholds = np.array([minimum for minimum, _letter, _points in scale], dtype=float)
+        points = np.array([points for _minimum, _letter, points in scale], dtype=float)
+        paper_percentages = np.divide(
+            grid * 100, paper_max, out=np.zeros_like(grid), where=paper_max > 0
+        )
+        grade_index = np.maximum(np.searchsorted(thresholds, paper_percentages, "right") - 1, 0)
+        credit_total = paper_credits.sum()
+        gpas = (
+            points[grade_index] @ paper_credits / credit_total
+            if credit_total > 0
+            else np.zeros_like(totals)
+        )
+
+        classes = dict(
+            Student.objects.filter(pk__in=students.tolist()).values_list("pk", "student_class")
+        )
+        class_names = np.array([classes.get(int(pk), "") for pk in students], dtype=object)
+        class_labels, class_codes = np.unique(class_names.astype(str), return_inverse=True)
+        ranks = _class_ranks(np, class_codes, totals)
+        class_sizes = np.bincount(class_codes)[class_codes]
+
+        ordered = np.sort(totals)
+        below = np.searchsorted(ordered, totals, "left")
+        percentiles = below * 100 / len(totals)
+
+        ExamResult.objects.bulk_create(
+            (
+                ExamResult(
+                    exam=exam,
+                    student_id=int(students[i]),
+                    student_class=class_labels[class_codes[i]],
+                    total=round(float(totals[i]), 2),
+                    max_total=int(max_total),
+                    percentage=round(float(percentages[i]), 2),
+                    gpa=round(float(gpas[i]), 2),
+                    class_rank=int(ranks[i]),
+                    class_size=int(class_sizes[i]),
+                    percentile=round(float(percentiles[i]), 2),
+                )
+                for i in range(len(students))
+            ),
+            batch_size=RESULT_CHUNK_SIZE,
+        )
+        Exam.objects.filter(pk=exam.pk).update(results_computed_at=timezone.now())
+    return len(students)
+
+
+def compute_term(term):
+    """Compute the results of every exam of ``term``; returns ``{exam: count}``"""
+    return {exam: compute_results(exam) for exam in Exam.objects.filter(term=term).order_by("pk")}
+
+
+def class_results(exam, student_class=None):
+    """Stored results of an exam, by class and rank"""
+    results = ExamResult.objects.filter(exam=exam).select_related("student")
+    if student_class:
+        results = results.filter(student_class=student_class)
+    return results.order_by("student_class", "class_rank", "student_id")
+
+
+def exam_status(exam, today=None):
+    """Whether ``exam`` is "upcoming", "ongoing" or "completed" on ``today``"""
+    today = today or timezone.localdate()
+    if exam.start_date > today:
+        return "upcoming"
+    if (exam.end_date or exam.start_date) >= today:
+        return "ongoing"
+    return "completed"
@@ -0,0 +1,202 @@
+"""Streaming CSV/XLSX exports of the list pages.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` and written
+out as they arrive, so memory use does not depend on the number of rows:
+
+- CSV is produced by a generator behind a ``StreamingHttpResponse``.
+- XLSX is written by openpyxl in write-only mode, which appends each row to a
+  temporary file on disk; the finished file is then streamed with
+  ``FileResponse``.
+
+Text cells that start like a formula are prefixed with ``'`` in both formats.
+"""
+
+import csv
+import datetime
+import tempfile
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Department, Holiday, Subject, Teacher
+
+EXPORT_CHUNK_SIZE = getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+FORMATS = ("csv", "xlsx")
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# spreadsheet apps evaluate text starting with these as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+@dataclass(frozen=True)
+class Export:
+    """A named export: a queryset factory and its ``(lookup, header)`` columns"""
+
+    queryset: object
+    columns: tuple
+
+    @property
+    def headers(self):
+        return [header for _lookup, header in self.columns]
+
+    def rows(self, chunk_size=EXPORT_CHUNK_SIZE):
+        lookups = [lookup for lookup, _header in self.columns]
+        return self.queryset().values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def _students():
+    from student.models import Student
+
+    return Student.objects.order_by("student_class", "last_name", "id")
+
+
+EXPORTS = {
+    "teachers": Export(
+        lambda: Teacher.objects.order_by("last_name", "first_name", "id"),
+        (
+            ("id", "ID"),
+            ("first_name", "First Name"),
+            ("last_name", "Last Name"),
+            ("email", "Email"),
+            ("mobile", "Mobile"),
+            ("gender", "Gender"),
+            ("date_of_birth", "Date of Birth"),
+            ("joining_date", "Joining Date"),
+            ("address", "Address"),
+        ),
+    ),
+    "users": Export(
+        lambda: get_user_model().objects.order_by("-date_joined", "-id"),
+        (
+            ("id", "ID"),
+            ("username", "Username"),
+            ("first_name", "First Name"),
+            ("last_name", "Last Name"),
+            ("email", "Email"),
+            ("is_admin", "Admin"),
+            ("is_teacher", "Teacher"),
+            ("is_student", "Student"),
+            ("is_active", "Active"),
+            ("date_joined", "Date Joined"),
+            ("last_login", "Last Login"),
+        ),
+    ),
+    "subjects": Export(
+        lambda: Subject.objects.order_by("department__name", "name", "id"),
+        (
+            ("code", "Code"),
+            ("name", "Name"),
+            ("department__name", "Department"),
+        ),
+    ),
+    "departments": Export(
+        lambda: Department.objects.annotate(subject_count=Count("subject")).order_by("name"),
+        (
+            ("name", "Name"),
+            ("description", "Description"),
+            ("subject_count", "Subjects"),
+        ),
+    ),
+    "holidays": Export(
+        lambda: Holiday.objects.order_by("date", "name"),
+        (
+            ("date", "Date"),
+            ("name", "Name"),
+            ("holiday_type", "Type"),
+            ("description", "Description"),
+            ("is_recurring", "Recurring"),
+            ("is_active", "Active"),
+        ),
+    ),
+    "students": Export(
+        _students,
+        (
+            ("student_id", "Student ID"),
+            ("first_name", "First Name"),
+            ("last_name", "Last Name"),
+            ("gender", "Gender"),
+            ("date_of_birth", "Date of Birth"),
+            ("student_class", "Class"),
+            ("section", "Section"),
+            ("department__name", "Department"),
+            ("joining_date", "Joining Date"),
+            ("mobile_number", "Mobile"),
+            ("parent__father_name", "Father"),
+            ("parent__mother_name", "Mother"),
+        ),
+    ),
+}
+
+
+def _filename(name, fmt):
+    return f"{name}-{timezone.localdate():%Y%m%d}.{fmt}"
+
+
+def _escape(value):
+    """Quote user text that a spreadsheet would otherwise run as a formula"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def csv_response(name, chunk_size=EXPORT_CHUNK_SIZE):
+    export = EXPORTS[name]
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow(export.headers)
+        for row in export.rows(chunk_size):
+            yield writer.writerow([_escape(value) for value in row])
+
+    response = StreamingHttpResponse(lines(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{_filename(name, "csv")}"'
+    return response
+
+
+def _xlsx_value(value):
+    # openpyxl cannot store timezone-aware datetimes
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value)
+    return _escape(value)
+
+
+def xlsx_response(name, chunk_size=EXPORT_CHUNK_SIZE):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ImproperlyConfigured("XLSX exports require openpyxl (pip install openpyxl)")
+
+    export = EXPORTS[name]
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=name.title())
+    sheet.append(export.headers)
+    for row in export.rows(chunk_size):
+        sheet.append([_xlsx_value(value) for value in row])
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=_filename(name, "xlsx"),
+        content_type=XLSX_CONTENT_TYPE,
+    )
+
+
+def export_response(name, fmt):
+    """Streaming download of the export ``name`` as ``fmt`` ("csv" or "xlsx")"""
+    if name not in EXPORTS or fmt not in FORMATS:
+        raise KeyError(f"{name}.{fmt}")
+    return csv_response(name) if fmt == "csv" else xlsx_response(name)
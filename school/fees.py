@@ -0,0 +1,211 @@
+"""Fee ledger: balances, arrears ageing and collection rates.
+
+Everything except :func:`project_collections` is computed by the database with
+conditional aggregation, so a report is a handful of queries regardless of the
+number of fee rows. Arrears are aged by days past ``due_date``.
+"""
+
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Fee
+
+# (label, first day past due, last day past due or None for open-ended)
+AGING_BUCKETS = (
+    ("0-30", 0, 30),
+    ("31-60", 31, 60),
+    ("61-90", 61, 90),
+    ("90+", 91, None),
+)
+
+# report dimension -> Fee lookup it groups on
+GROUPINGS = {
+    "class": "student__student_class",
+    "department": "student__department__name",
+}
+
+# share of each bucket's arrears expected to be recovered, for projections
+DEFAULT_RECOVERY_RATES = {"0-30": 0.9, "31-60": 0.7, "61-90": 0.5, "90+": 0.2}
+
+ZERO = Decimal("0.00")
+
+
+def _today(today):
+    return today or timezone.localdate()
+
+
+def _sum(condition=None):
+    return Coalesce(
+        Sum("amount", filter=condition),
+        Value(ZERO),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def _bucket_condition(today, first_day, last_day):
+    condition = Q(paid=False, due_date__lt=today)
+    if first_day:
+        condition &= Q(due_date__lte=today - datetime.timedelta(first_day))
+    if last_day is not None:
+        condition &= Q(due_date__gte=today - datetime.timedelta(last_day))
+    return condition
+
+
+def _ledger_aggregates(today):
+    """Aggregate expressions shared by the school-wide and grouped reports"""
+    aggregates = {
+        "billed": _sum(),
+        "collected": _sum(Q(paid=True)),
+        "outstanding": _sum(Q(paid=False)),
+        "overdue": _sum(Q(paid=False, due_date__lt=today)),
+        "billed_to_date": _sum(Q(due_date__lte=today)),
+        "collected_to_date": _sum(Q(paid=True, due_date__lte=today)),
+        "students_owing": Count("student", filter=Q(paid=False), distinct=True),
+    }
+    for index, (_label, first_day, last_day) in enumerate(AGING_BUCKETS):
+        aggregates[f"bucket_{index}"] = _sum(_bucket_condition(today, first_day, last_day))
+    return aggregates
+
+
+def _finish(row):
+    """Turn raw aggregates into a report row with a bucket list and a collection rate"""
+    billed = row.pop("billed_to_date")
+    collected = row.pop("collected_to_date")
+    row["collection_rate"] = float(collected / billed * 100) if billed else 0.0
+    row["buckets"] = [
+        {"label": label, "amount": row.pop(f"bucket_{index}")}
+        for index, (label, _first, _last) in enumerate(AGING_BUCKETS)
+    ]
+    return row
+
+
+def ledger_summary(queryset=None, today=None):
+    """School-wide (or ``queryset``-wide) totals in a single query
+
+    ``collection_rate`` is the percentage of the amount already due that has
+    been paid; fees due in the future do not lower it.
+    """
+    queryset = Fee.objects.all() if queryset is None else queryset
+    return _finish(queryset.aggregate(**_ledger_aggregates(_today(today))))
+
+
+def collection_by(grouping, queryset=None, today=None):
+    """One report row per class or department, in one grouped query"""
+    try:
+        lookup = GROUPINGS[grouping]
+    except KeyError:
+        raise ValueError(f"Unknown grouping '{grouping}'. Expected one of: {', '.join(GROUPINGS)}")
+
+    queryset = Fee.objects.all() if queryset is None else queryset
+    rows = queryset.values(lookup).annotate(**_ledger_aggregates(_today(today))).order_by(lookup)
+    return [_finish({"name": row.pop(lookup) or "Unassigned", **row}) for row in rows]
+
+
+def fee_report(today=None):
+    """Everything the fees page shows: totals plus per-class and per-department rows"""
+    today = _today(today)
+    return {
+        "as_of": today,
+        "summary": ledger_summary(today=today),
+        "by_class": collection_by("class", today=today),
+        "by_department": collection_by("department", today=today),
+    }
+
+
+def student_balance(student, today=None):
+    """Outstanding and overdue amounts of one student (uses the student/due_date index)"""
+    today = _today(today)
+    return Fee.objects.filter(student=student, paid=False).aggregate(
+        outstanding=_sum(), overdue=_sum(Q(due_date__lt=today))
+    )
+
+
+def overdue_fees(today=None, min_days=0):
+    """Unpaid fees at least ``min_days`` past due, oldest first (uses the paid/due_date index)"""
+    cutoff = _today(today) - datetime.timedelta(min_days)
+    return Fee.objects.filter(paid=False, due_date__lt=cutoff).order_by("due_date", "pk")
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImproperlyConfigured("Fee projections require numpy (pip install numpy)")
+    return numpy
+
+
+def project_collections(months=6, recovery_rates=None, fee_change=0.0, today=None):
+    """What-if projection of the cash expected from every unpaid fee
+
+    Loads the unpaid ``(amount, due_date)`` pairs once into NumPy arrays and
+    evaluates the scenario with vectorised bucketing:
+
+    - arrears are expected to be recovered at ``recovery_rates`` per ageing
+      bucket (defaults: ``FEE_RECOVERY_RATES`` / :data:`DEFAULT_RECOVERY_RATES`);
+    - fees falling due in each of the next ``months`` are scaled by
+      ``1 + fee_change`` and expected to be collected at the historical
+      collection rate.
+
+    Returns plain Python numbers so the result can be rendered or serialised.
+    """
+    np = _numpy()
+    today = _today(today)
+    rates = {**getattr(settings, "FEE_RECOVERY_RATES", DEFAULT_RECOVERY_RATES)}
+    rates.update(recovery_rates or {})
+    historical = ledger_summary(today=today)["collection_rate"] / 100
+
+    rows = list(
+        Fee.objects.filter(paid=False).values_list("amount", "due_date").iterator(chunk_size=5000)
+    )
+    amounts = np.fromiter((amount for amount, _due in rows), dtype=np.float64, count=len(rows))
+    ordinals = np.fromiter((due.toordinal() for _a, due in rows), dtype=np.int64, count=len(rows))
+    months_index = np.fromiter(
+        (due.year * 12 + due.month - 1 for _a, due in rows), dtype=np.int64, count=len(rows)
+    )
+
+    days_past_due = today.toordinal() - ordinals
+    overdue = days_past_due > 0
+
+    # bucket i holds days_past_due in [edges[i], edges[i + 1])
+    edges = np.array([first for _label, first, _last in AGING_BUCKETS[1:]])
+    bucket_index = np.digitize(days_past_due[overdue], edges)
+    arrears = np.bincount(bucket_index, weights=amounts[overdue], minlength=len(AGING_BUCKETS))
+    recovery = np.array([rates[label] for label, _first, _last in AGING_BUCKETS])
+    expected_arrears = arrears * recovery
+
+    month_offset = months_index[~overdue] - (today.year * 12 + today.month - 1)
+    upcoming = month_offset < months
+    scheduled = np.bincount(
+        month_offset[upcoming], weights=amounts[~overdue][upcoming], minlength=months
+    )[:months] * (1 + fee_change)
+
+    month_labels = []
+    year, month = today.year, today.month
+    for _ in range(months):
+        month_labels.append(f"{year}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    return {
+        "as_of": today,
+        "collection_rate": historical * 100,
+        "arrears": [
+            {
+                "label": label,
+                "outstanding": float(arrears[index]),
+                "recovery_rate": float(recovery[index]),
+                "expected": float(expected_arrears[index]),
+            }
+            for index, (label, _first, _last) in enumerate(AGING_BUCKETS)
+        ],
+        "months": [
+            {"month": label, "scheduled": float(amount), "expected": float(amount * historical)}
+            for label, amount in zip(month_labels, scheduled)
+        ],
+        "expected_total": float(expected_arrears.sum() + scheduled.sum() * historical),
+    }
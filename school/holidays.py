@@ -0,0 +1,38 @@
+"""Aggregated holiday statistics for the holiday calendar page."""
+
+from collections import OrderedDict
+
+from django.utils import timezone
+
+from .academic_calendar import get_year, upcoming_holidays
+from .models import Holiday
+
+UPCOMING_LIMIT = 5
+
+
+def holiday_summary(year, today=None, upcoming_limit=UPCOMING_LIMIT):
+    """Return holidays, per-type counts, month grouping and upcoming list for a year
+
+    Everything is read from the materialised academic calendar, so recurring holidays
+    appear in every year from their first one on, and once the calendar years involved
+    are cached the page costs no holiday queries at all. Days remaining are computed
+    against one ``today`` instead of once per row while rendering.
+    """
+    if today is None:
+        today = timezone.localdate()
+
+    holidays = get_year(year).holidays
+
+    counts = {holiday_type: 0 for holiday_type, _label in Holiday.HOLIDAY_TYPES}
+    holidays_by_month = OrderedDict()
+    for holiday in holidays:
+        counts[holiday.holiday_type] = counts.get(holiday.holiday_type, 0) + 1
+        holidays_by_month.setdefault(holiday.date.strftime("%B"), []).append(holiday)
+
+    return {
+        "holidays": holidays,
+        "holidays_by_month": holidays_by_month,
+        "upcoming_holidays": upcoming_holidays(today, upcoming_limit),
+        "total_holidays": len(holidays),
+        "holiday_type_counts": counts,
+    }
@@ -0,0 +1,367 @@
+"""Hostel bed allocation.
+
+:func:`allocate_beds` places every applicant without a bed in one batch:
+
+- a hostel only takes students of its gender, and a bed holds one student;
+- a room kept for a year group (``Student.student_class``) goes to that year
+  first, and roommates are kept to one year group wherever beds allow;
+- applicants are admitted in ``applied_at`` order, so the latest wait when
+  a gender's beds run out;
+- a preferred hostel is honoured while it has room.
+
+The plan is built in memory from three queries. Greedy placement fills one
+room at a time per cohort (gender, year group, preferred hostel). A repair
+pass then moves or swaps students out of mixed rooms while that lowers the
+number of roommates from another year. Only beds whose occupant changes are
+written.
+
+Runs are incremental by default. Residents keep their beds unless they are
+no longer eligible, e.g. their application was withdrawn, their gender
+changed or their room was closed. Only students placed in the run are moved
+by the repair pass. ``full=True`` replans every bed.
+"""
+
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Bed, Hostel, HostelApplication, HostelRoom
+
+REPAIR_PASSES = 3
+WRITE_CHUNK_SIZE = 500
+
+
+@dataclass(eq=False)
+class _Room:
+    pk: int
+    hostel: int
+    gender: str
+    year_group: str
+    free: list  # bed pks, next bed last
+    years: Counter  # year group -> occupants
+
+    @property
+    def occupants(self):
+        return sum(self.years.values())
+
+    def cost(self, years=None):
+        """Roommates outside the room's main year, plus occupants of the wrong year"""
+        years = self.years if years is None else years
+        total = sum(years.values())
+        if not total:
+            return 0
+        cost = total - max(years.values())
+        if self.year_group:
+            cost += total - years[self.year_group]
+        return cost
+
+    def keeps(self, year):
+        """The room only holds ``year`` and may take more of it"""
+        return bool(self.free) and set(+self.years) == {year} and self.year_group in ("", year)
+
+
+@dataclass(eq=False)
+class _Student:
+    pk: int
+    gender: str
+    year: str
+    preferred: int
+    movable: bool = True
+    room: _Room = None
+    bed: int = None
+
+
+@dataclass
+class AllocationRun:
+    """Outcome of :func:`allocate_beds`"""
+
+    full: bool
+    placed: int = 0  # applicants who had no bed and now have one
+    moved: int = 0  # residents given a different bed
+    released: int = 0  # residents who lost their bed
+    waiting: int = 0  # applicants left without a bed
+    mixed_rooms: int = 0  # occupied rooms holding more than one year group
+    beds_written: int = 0
+    plan_seconds: float = 0.0
+    seconds: float = 0.0
+
+    def summary(self):
+        return (
+            f"{self.placed} placed, {self.moved} moved, {self.released} released, "
+            f"{self.waiting} waiting; {self.mixed_rooms} mixed rooms"
+        )
+
+
+class _Index:
+    """Rooms with free beds, looked up by what a cohort prefers"""
+
+    def __init__(self, rooms):
+        self.partial = {}  # (gender, year): {room pk: room} of rooms that keep the year
+        self.empty = {}  # (gender, year_group, hostel or None): [room], first room last
+        self.open = {}  # gender: {room pk: room}
+        for room in reversed(rooms):
+            if not room.free:
+                continue
+            self.open.setdefault(room.gender, {})[room.pk] = room
+            if not room.years:
+                for hostel in (room.hostel, None):
+                    key = (room.gender, room.year_group, hostel)
+                    self.empty.setdefault(key, []).append(room)
+            else:
+                self.refresh(room)
+
+    def refresh(self, room):
+        for year in room.years:
+            rooms = self.partial.get((room.gender, year))
+            if rooms and room.pk in rooms and not room.keeps(year):
+                del rooms[room.pk]
+        if not room.free:
+            self.open.get(room.gender, {}).pop(room.pk, None)
+        else:
+            self.open.setdefault(room.gender, {})[room.pk] = room
+            if len(+room.years) == 1:
+                year = next(iter(+room.years))
+                if room.keeps(year):
+                    self.partial.setdefault((room.gender, year), {})[room.pk] = room
+
+    def _empty(self, gender, year_group, hostel):
+        rooms = self.empty.get((gender, year_group, hostel))
+        while rooms:
+            if rooms[-1].free and not rooms[-1].occupants:
+                return rooms[-1]
+            rooms.pop()  # filled since it was listed
+        return None
+
+    def pick(self, student):
+        """The best room with a free bed for ``student``, or None"""
+        gender, year = student.gender, student.year
+        for hostel in (student.preferred, None) if student.preferred else (None,):
+            for room in self.partial.get((gender, year), {}).values():
+                if hostel is None or room.hostel == hostel:
+                    return room
+            room = self._empty(gender, year, hostel) or self._empty(gender, "", hostel)
+            if room:
+                return room
+        # every room of the year is full: the least disruptive other bed
+        rooms = self.open.get(gender, {}).values()
+        return min(
+            rooms,
+            key=lambda room: (room.cost(room.years + Counter({year: 1})) - room.cost(), room.pk),
+            default=None,
+        )
+
+
+def _place(student, room, index):
+    student.room, student.bed = room, room.free.pop()
+    room.years[student.year] += 1
+    index.refresh(room)
+
+
+def _unplace(student, index):
+    room = student.room
+    room.free.append(student.bed)
+    room.years[student.year] -= 1
+    student.room = student.bed = None
+    index.refresh(room)
+
+
+def _repair(students, index):
+    """Move or swap movable students out of mixed rooms while the total cost falls"""
+    for _ in range(REPAIR_PASSES):
+        improved = 0
+        strays = {}  # (gender, year, main year of the room): [student]
+        for student in students:
+            room = student.room
+            if room is None or not student.movable or not room.cost():
+                continue
+            main = room.years.most_common(1)[0][0]
+            if student.year != main or room.year_group not in ("", student.year):
+                strays.setdefault((student.gender, student.year, main), []).append(student)
+
+        for (gender, year, main), group in strays.items():
+            partners = strays.get((gender, main, year), [])
+            for student in group:
+                here = student.room
+                if not here.cost():
+                    continue
+                # a free bed in a room of the student's own year
+                target = None
+                for room in index.partial.get((gender, year), {}).values():
+                    if room is not here and _allowed(student, room):
+                        target = room
+                        break
+                if target is not None:
+                    before = here.cost() + target.cost()
+                    after = here.cost(here.years - Counter({year: 1})) + target.cost(
+                        target.years + Counter({year: 1})
+                    )
+                    if after < before:
+                        _unplace(student, index)
+                        _place(student, target, index)
+                        improved += 1
+                        continue
+                # a student of this room's year stranded in a room of ours
+                while partners:
+                    other = partners[-1]
+                    there = other.room
+                    if there is here or not (_allowed(student, there) and _allowed(other, here)):
+                        partners.pop()
+                        continue
+                    before = here.cost() + there.cost()
+                    swap_here = here.years - Counter({year: 1}) + Counter({main: 1})
+                    swap_there = there.years - Counter({main: 1}) + Counter({year: 1})
+                    if here.cost(swap_here) + there.cost(swap_there) < before:
+                        partners.pop()
+                        # each takes the bed the other just freed
+                        _unplace(student, index)
+                        _unplace(other, index)
+                        _place(student, there, index)
+                        _place(other, here, index)
+                        improved += 1
+                    break
+        if not improved:
+            break
+
+
+def _allowed(student, room):
+    """Moving keeps a student in their preferred hostel once they have it"""
+    return (
+        not student.preferred
+        or student.room is None
+        or student.room.hostel != student.preferred
+        or room.hostel == student.preferred
+    )
+
+
+def allocate_beds(full=False, now=None):
+    """Give every hostel applicant a bed where one fits; returns an :class:`AllocationRun`
+
+    ``full`` replans all beds instead of keeping residents in place.
+    """
+    from student.models import Student
+
+    started = time.perf_counter()
+    now = now or timezone.now()
+    run = AllocationRun(full=full)
+    with transaction.atomic():
+        # one allocation at a time
+        list(Hostel.objects.select_for_update().values_list("pk", flat=True))
+
+        applicants = {
+            pk: _Student(pk, gender, year, preferred)
+            for pk, gender, year, preferred in Student.objects.filter(
+                hostel_application__isnull=False
+            )
+            .order_by("hostel_application__applied_at", "hostel_application__id")
+            .values_list("pk", "gender", "student_class", "hostel_application__preferred_hostel")
+        }
+        rooms = {
+            pk: _Room(pk, hostel, gender, year_group, [], Counter())
+            for pk, hostel, gender, year_group in HostelRoom.objects.filter(is_available=True)
+            .order_by("hostel__name", "floor", "number")
+            .values_list("pk", "hostel", "hostel__gender", "year_group")
+        }
+        current = {}  # bed: student
+        labels = {}  # bed: label, for the upsert
+        for bed, room_pk, label, student_pk in Bed.objects.order_by("-pk").values_list(
+            "pk", "room", "label", "student"
+        ):
+            labels[bed] = (room_pk, label)
+            if student_pk is not None:
+                current[bed] = student_pk
+            room = rooms.get(room_pk)
+            if room is None:
+                continue  # a closed room; its residents need another bed
+            student = applicants.get(student_pk)
+            if full or student is None or student.gender != room.gender:
+                room.free.append(bed)
+            else:
+                student.room, student.bed, student.movable = room, bed, False
+                room.years[student.year] += 1
+
+        index = _Index(list(rooms.values()))
+        free = Counter()
+        for room in rooms.values():
+            free[room.gender] += len(room.free)
+        waiting = []
+        cohorts = {}
+        for student in applicants.values():
+            if student.room is not None:
+                continue
+            if free[student.gender]:
+                free[student.gender] -= 1
+                key = (student.gender, student.year, student.preferred)
+                cohorts.setdefault(key, []).append(student)
+            else:
+                waiting.append(student)
+        # hostel preferences first, then larger cohorts so they get whole rooms
+        for key in sorted(cohorts, key=lambda key: (key[2] is None, -len(cohorts[key]))):
+            for student in cohorts[key]:
+                _place(student, index.pick(student), index)
+        _repair(list(applicants.values()), index)
+        run.plan_seconds = time.perf_counter() - started
+
+        planned = {
+            student.bed: student.pk for student in applicants.values() if student.bed is not None
+        }
+        changed = {
+            bed for bed in current.keys() | planned.keys() if current.get(bed) != planned.get(bed)
+        }
+        # clear first: a student changing beds must not hold two at once
+        cleared = sorted(bed for bed in changed if bed in current)
+        for start in range(0, len(cleared), WRITE_CHUNK_SIZE):
+            Bed.objects.filter(pk__in=cleared[start : start + WRITE_CHUNK_SIZE]).update(
+                student=None, assigned_at=None
+            )
+        # an upsert on the primary key writes a chunk in one statement, where
+        # bulk_update would build a CASE per column
+        assigned = [
+            Bed(
+                pk=bed,
+                room_id=labels[bed][0],
+                label=labels[bed][1],
+                student_id=planned[bed],
+                assigned_at=now,
+            )
+            for bed in sorted(changed)
+            if bed in planned
+        ]
+        for start in range(0, len(assigned), WRITE_CHUNK_SIZE):
+            Bed.objects.bulk_create(
+                assigned[start : start + WRITE_CHUNK_SIZE],
+                update_conflicts=True,
+                unique_fields=["id"],
+                update_fields=["student", "assigned_at"],
+            )
+
+    before = {student: bed for bed, student in current.items()}
+    run.placed = sum(1 for student in planned.values() if student not in before)
+    run.moved = sum(
+        1 for bed, student in planned.items() if student in before and before[student] != bed
+    )
+    run.released = len(before.keys() - set(planned.values()))
+    run.waiting = len(waiting)
+    run.mixed_rooms = sum(1 for room in rooms.values() if len(+room.years) > 1)
+    run.beds_written = len(changed)
+    run.seconds = time.perf_counter() - started
+    return run
+
+
+def hostel_occupancy():
+    """Hostels annotated with ``room_count``, ``bed_count`` and ``occupied``"""
+    return Hostel.objects.annotate(
+        room_count=Count("rooms", distinct=True),
+        bed_count=Count("rooms__beds"),
+        occupied=Count("rooms__beds", filter=Q(rooms__beds__student__isnull=False)),
+    )
+
+
+def waiting_list():
+    """Applications whose student has no bed yet, in the order they are placed"""
+    return HostelApplication.objects.filter(student__hostel_bed__isnull=True).select_related(
+        "student", "preferred_hostel"
+    )
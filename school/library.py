@@ -0,0 +1,271 @@
+"""Library circulation: catalogue search, checkout and return.
+
+Counter-desk operations touch a handful of rows by key:
+
+- checkout and return lock the copy row (``select_for_update``) and the open
+  loan, so two desks scanning the same barcode cannot both lend it;
+- a book's ``copies_total``/``copies_available``/``loans_total`` counters move
+  with ``F()`` updates in the same transaction instead of being recounted;
+- overdue loans come from the ``(due_date, returned_at)`` index;
+- catalogue search is a prefix range scan over the unique ISBN index or the
+  normalised-title index.
+
+:func:`recount` rebuilds the counters from the copies should they drift,
+e.g. after copies are edited in the admin.
+"""
+
+import datetime
+import re
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Book, Copy, Loan
+
+DEFAULT_LOAN_DAYS = 14
+DEFAULT_LOAN_LIMIT = 5
+SEARCH_LIMIT = 20
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+_ISBN_QUERY = re.compile(r"^\d{3,12}[\dX]?$")
+_ISBN = re.compile(r"^(\d{9}[\dX]|\d{13})$")
+
+# SQLite has one writer at a time and a polling busy handler, which starves
+# waiting desks; threads of one process queue here instead
+_sqlite_writer = threading.Lock()
+
+
+class LibraryError(ValueError):
+    """A circulation request cannot be carried out"""
+
+
+def loan_days():
+    return getattr(settings, "LIBRARY_LOAN_DAYS", DEFAULT_LOAN_DAYS)
+
+
+def loan_limit():
+    return getattr(settings, "LIBRARY_LOAN_LIMIT", DEFAULT_LOAN_LIMIT)
+
+
+def normalize_title(title):
+    """Lower-case words separated by single spaces: the key title prefixes match"""
+    return " ".join(_NON_WORD.sub(" ", title.casefold()).split())
+
+
+def normalize_isbn(value):
+    """ISBN digits without hyphens or spaces; raises LibraryError if malformed"""
+    isbn = re.sub(r"[\s-]", "", value or "").upper()
+    if not _ISBN.match(isbn):
+        raise LibraryError(f"'{value}' is not an ISBN-10 or ISBN-13")
+    return isbn
+
+
+def _successor(prefix):
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _prefix(field, prefix):
+    """``field`` starts with ``prefix``, as an index range scan"""
+    if connection.vendor == "postgresql" and field == "title_key":
+        # served by the varchar_pattern_ops index whatever the collation
+        return Q(**{f"{field}__startswith": prefix})
+    # ISBN digits sort the same under every collation; SQLite compares bytes
+    return Q(**{f"{field}__gte": prefix, f"{field}__lt": _successor(prefix)})
+
+
+def search_catalog(query, limit=SEARCH_LIMIT):
+    """Books whose ISBN or normalised title starts with ``query``
+
+    A query of digits may be either, e.g. "978014" or "1984": ISBN matches come
+    first, then title matches.
+    """
+    books = []
+    compact = re.sub(r"[\s-]", "", query).upper()
+    if _ISBN_QUERY.match(compact):
+        books = list(Book.objects.filter(_prefix("isbn", compact)).order_by("isbn")[:limit])
+    key = normalize_title(query)
+    if key and len(books) < limit:
+        found = {book.pk for book in books}
+        titles = Book.objects.filter(_prefix("title_key", key)).order_by("title_key", "id")
+        books += [book for book in titles[:limit] if book.pk not in found][: limit - len(books)]
+    return books
+
+
+def add_copies(book, barcodes, acquired_on=None):
+    """Register new copies of ``book``; returns them"""
+    copies = [
+        Copy(book=book, barcode=barcode, acquired_on=acquired_on or timezone.localdate())
+        for barcode in barcodes
+    ]
+    with transaction.atomic():
+        Copy.objects.bulk_create(copies)
+        Book.objects.filter(pk=book.pk).update(
+            copies_total=F("copies_total") + len(copies),
+            copies_available=F("copies_available") + len(copies),
+        )
+    return copies
+
+
+def find_borrower(lookup):
+    """Active user by username, e-mail or student id"""
+    from student.models import Student
+
+    lookup = (lookup or "").strip()
+    if not lookup:
+        raise LibraryError("Enter the borrower's username, e-mail or student id")
+    users = get_user_model().objects.filter(is_active=True)
+    user = users.filter(Q(username__iexact=lookup) | Q(email__iexact=lookup)).first()
+    if user is None:
+        user = users.filter(
+            pk__in=Student.objects.filter(student_id=lookup).values("user_id")
+        ).first()
+    if user is None:
+        raise LibraryError(f"No borrower matches '{lookup}'")
+    return user
+
+
+@contextmanager
+def _circulation():
+    """Transaction of a counter-desk write"""
+    if connection.vendor == "sqlite" and not connection.in_atomic_block:
+        with _sqlite_writer, transaction.atomic():
+            yield
+    else:
+        with transaction.atomic():
+            yield
+
+
+def _locked_copy(barcode):
+    try:
+        return Copy.objects.select_for_update().get(barcode=barcode.strip())
+    except Copy.DoesNotExist:
+        raise LibraryError(f"No copy has barcode '{barcode}'")
+
+
+def checkout(barcode, borrower, issued_by=None, days=None, today=None):
+    """Lend the copy with ``barcode`` to ``borrower``; returns the loan"""
+    today = today or timezone.localdate()
+    with _circulation():
+        copy = _locked_copy(barcode)
+        if copy.status != Copy.AVAILABLE:
+            raise LibraryError(f"Copy {copy.barcode} is {copy.get_status_display().lower()}")
+        open_loans = Loan.objects.filter(borrower=borrower, returned_at__isnull=True).count()
+        if open_loans >= loan_limit():
+            raise LibraryError(f"{borrower} already has {open_loans} books on loan")
+
+        loan = Loan.objects.create(
+            copy=copy,
+            borrower=borrower,
+            issued_by=issued_by,
+            due_date=today + datetime.timedelta(days=loan_days() if days is None else days),
+        )
+        Copy.objects.filter(pk=copy.pk).update(status=Copy.ON_LOAN)
+        Book.objects.filter(pk=copy.book_id).update(
+            copies_available=F("copies_available") - 1, loans_total=F("loans_total") + 1
+        )
+    return loan
+
+
+def return_copy(barcode):
+    """Close the open loan of the copy with ``barcode``; returns the loan"""
+    with _circulation():
+        copy = _locked_copy(barcode)
+        loan = (
+            Loan.objects.select_for_update()
+            .select_related("borrower")
+            .filter(copy=copy, returned_at__isnull=True)
+            .first()
+        )
+        if loan is None:
+            raise LibraryError(f"Copy {copy.barcode} is not on loan")
+        loan.returned_at = timezone.now()
+        loan.save(update_fields=["returned_at"])
+        if copy.status == Copy.ON_LOAN:
+            Copy.objects.filter(pk=copy.pk).update(status=Copy.AVAILABLE)
+            Book.objects.filter(pk=copy.book_id).update(copies_available=F("copies_available") + 1)
+            copy.status = Copy.AVAILABLE
+    loan.copy = copy
+    return loan
+
+
+def set_copy_status(barcode, status):
+    """Mark a copy lost, withdrawn or available again, keeping the counters"""
+    if status not in dict(Copy.STATUSES) or status == Copy.ON_LOAN:
+        raise LibraryError(f"Cannot set a copy to '{status}'")
+    with _circulation():
+        copy = _locked_copy(barcode)
+        if copy.status == Copy.ON_LOAN:
+            raise LibraryError(f"Copy {copy.barcode} is on loan; return it first")
+        if copy.status == status:
+            return copy
+        delta = (status == Copy.AVAILABLE) - (copy.status == Copy.AVAILABLE)
+        Copy.objects.filter(pk=copy.pk).update(status=status)
+        Book.objects.filter(pk=copy.book_id).update(
+            copies_total=F("copies_total") + delta, copies_available=F("copies_available") + delta
+        )
+        copy.status = status
+    return copy
+
+
+def recount(books=None):
+    """Rebuild the counters of ``books`` (default all) from their copies and loans"""
+    books = Book.objects.all() if books is None else books
+
+    def count(**filters):
+        copies = Copy.objects.filter(book=OuterRef("pk"), **filters).order_by()
+        return Coalesce(Subquery(copies.values("book").annotate(n=Count("pk")).values("n")), 0)
+
+    return books.update(
+        copies_total=count(status__in=[Copy.AVAILABLE, Copy.ON_LOAN]),
+        copies_available=count(status=Copy.AVAILABLE),
+        loans_total=Coalesce(
+            Subquery(
+                Loan.objects.filter(copy__book=OuterRef("pk"))
+                .order_by()
+                .values("copy__book")
+                .annotate(n=Count("pk"))
+                .values("n")
+            ),
+            0,
+        ),
+    )
+
+
+def overdue_loans(today=None):
+    """Open loans past their due date, longest overdue first"""
+    today = today or timezone.localdate()
+    return (
+        Loan.objects.filter(due_date__lt=today, returned_at__isnull=True)
+        .select_related("copy__book", "borrower")
+        .order_by("due_date", "id")
+    )
+
+
+def borrower_loans(user):
+    """A user's open loans, soonest due first"""
+    return (
+        Loan.objects.filter(borrower=user, returned_at__isnull=True)
+        .select_related("copy__book")
+        .order_by("due_date")
+    )
+
+
+def library_stats(today=None):
+    """Catalogue and circulation totals for the library dashboard"""
+    today = today or timezone.localdate()
+    totals = Book.objects.aggregate(
+        titles=Count("pk"),
+        copies=Coalesce(Sum("copies_total"), 0),
+        available=Coalesce(Sum("copies_available"), 0),
+    )
+    open_loans = Loan.objects.filter(returned_at__isnull=True)
+    totals["on_loan"] = totals["copies"] - totals["available"]
+    totals["overdue"] = open_loans.filter(due_date__lt=today).count()
+    totals["borrowers"] = open_loans.values("borrower").distinct().count()
+    return totals
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from school.hostel import allocate_beds
+
+
+class Command(BaseCommand):
+    help = "Give hostel applicants beds; residents keep theirs unless --full is given"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full", action="store_true", help="Replan every bed (residents may move)"
+        )
+
+    def handle(self, *args, **options):
+        run = allocate_beds(full=options["full"])
+        self.stdout.write(
+            f"Planned in {run.plan_seconds * 1000:.0f} ms; "
+            f"{run.beds_written} beds written in {run.seconds:.2f}s"
+        )
+        self.stdout.write(self.style.SUCCESS(run.summary()))
@@ -0,0 +1,43 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from school.attendance import alert_threshold, low_attendance, send_low_attendance_alerts
+
+
+class Command(BaseCommand):
+    help = "Notify students whose attendance over a recent window is below the threshold"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=90, help="Length of the window")
+        parser.add_argument("--end", help="Last day of the window (YYYY-MM-DD, default today)")
+        parser.add_argument("--threshold", type=float, help="Fraction, e.g. 0.75")
+        parser.add_argument("--class", dest="student_class", help="Only this class")
+        parser.add_argument(
+            "--dry-run", action="store_true", help="List the students without notifying them"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            end = datetime.date.fromisoformat(options["end"]) if options["end"] else None
+        except ValueError:
+            raise CommandError("--end must be a YYYY-MM-DD date")
+        end = end or timezone.localdate()
+        start = end - datetime.timedelta(days=options["days"])
+        threshold = options["threshold"] or alert_threshold()
+
+        if options["dry_run"]:
+            rows = low_attendance(start, end, threshold, options["student_class"])
+            for row in rows:
+                self.stdout.write(
+                    f"student {row['student_id']}: {row['percentage']:.1f}% "
+                    f"({row['present']}/{row['sessions']})"
+                )
+            self.stdout.write(f"{len(rows)} students below {threshold:.0%} from {start} to {end}")
+            return
+
+        sent = send_low_attendance_alerts(start, end, threshold, options["student_class"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Sent {sent} alerts for {start} to {end} below {threshold:.0%}")
+        )
@@ -0,0 +1,98 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from school.exams import compute_results, record_marks
+from school.models import Department, Exam, ExamResult, ExamSubject, Subject
+from student.models import Parent, Student
+
+
+class Command(BaseCommand):
+    help = "Benchmark marks entry and result computation for a synthetic term (rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=5000)
+        parser.add_argument("--subjects", type=int, default=10)
+        parser.add_argument("--classes", type=int, default=12)
+        parser.add_argument("--repeat", type=int, default=3, help="Timed runs; the best is shown")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        count, subjects = options["students"], options["subjects"]
+
+        with transaction.atomic():
+            self.stdout.write(f"Creating {count} students and {subjects} papers...")
+            department = Department.objects.create(name="bench-exams")
+            parents = Parent.objects.bulk_create(
+                (Parent(father_name=f"Parent {i}") for i in range(count)), batch_size=1000
+            )
+            students = Student.objects.bulk_create(
+                (
+                    Student(
+                        parent=parent,
+                        first_name="Bench",
+                        last_name=str(i),
+                        student_id=f"bench-exams-{i}",
+                        slug=f"bench-exams-{i}",
+                        gender="Others",
+                        date_of_birth=datetime.date(2010, 1, 1),
+                        joining_date=datetime.date(2020, 1, 1),
+                        student_class=str(i % options["classes"] + 1),
+                    )
+                    for i, parent in enumerate(parents)
+                ),
+                batch_size=1000,
+            )
+            exam = Exam.objects.create(
+                name="Bench finals", term="bench", start_date=datetime.date(2025, 3, 1)
+            )
+            papers = [
+                ExamSubject.objects.create(
+                    exam=exam,
+                    subject=Subject.objects.create(
+                        name=f"Bench subject {i}", code=f"BX{i}", department=department
+                    ),
+                    max_marks=rng.choice((50, 100)),
+                    credits=rng.choice((1, 2, 3)),
+                )
+                for i in range(subjects)
+            ]
+
+            started = time.perf_counter()
+            for paper in papers:
+                record_marks(
+                    paper,
+                    {
+                        student.pk: (
+                            None if rng.random() < 0.02 else rng.randint(0, paper.max_marks)
+                        )
+                        for student in students
+                    },
+                )
+            entry = time.perf_counter() - started
+            self.stdout.write(
+                f"record_marks: {count * subjects} marks in {entry * 1000:.0f} ms "
+                f"({entry / subjects * 1000:.0f} ms per paper)"
+            )
+
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                written = compute_results(exam)
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(
+                f"compute_results: {written} results, best {min(timings) * 1000:.0f} ms"
+            )
+            top = ExamResult.objects.filter(exam=exam, class_rank=1).order_by("student_class")
+            for result in top[:3]:
+                self.stdout.write(
+                    f"  class {result.student_class} top: {result.total:.0f}/{result.max_total} "
+                    f"GPA {result.gpa:.2f}, percentile {result.percentile:.1f}"
+                )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("Changes rolled back"))
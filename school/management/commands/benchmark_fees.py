@@ -0,0 +1,81 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from school.fees import fee_report, project_collections
+from school.models import Department, Fee
+from student.models import Parent, Student
+
+
+class Command(BaseCommand):
+    help = "Benchmark the fee ledger report against synthetic fees (rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fees", type=int, default=100000, help="Number of fee rows")
+        parser.add_argument("--students", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=3, help="Timed runs; the best is shown")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        today = timezone.localdate()
+
+        with transaction.atomic():
+            self.stdout.write(
+                f"Creating {options['students']} students and {options['fees']} fees..."
+            )
+            departments = Department.objects.bulk_create(
+                Department(name=f"bench-fees-{i}") for i in range(8)
+            )
+            parents = Parent.objects.bulk_create(
+                (Parent(father_name=f"Parent {i}") for i in range(options["students"])),
+                batch_size=1000,
+            )
+            students = Student.objects.bulk_create(
+                (
+                    Student(
+                        parent=parent,
+                        first_name="Bench",
+                        last_name=str(i),
+                        student_id=f"bench-fees-{i}",
+                        slug=f"bench-fees-{i}",
+                        gender="Others",
+                        date_of_birth=datetime.date(2010, 1, 1),
+                        joining_date=datetime.date(2020, 1, 1),
+                        student_class=str(i % 12 + 1),
+                        department=departments[i % len(departments)],
+                    )
+                    for i, parent in enumerate(parents)
+                ),
+                batch_size=1000,
+            )
+            Fee.objects.bulk_create(
+                (
+                    Fee(
+                        student=students[i % len(students)],
+                        amount=rng.choice((500, 1000, 1500, 8000)),
+                        due_date=today + datetime.timedelta(days=rng.randint(-200, 180)),
+                        paid=rng.random() < 0.7,
+                    )
+                    for i in range(options["fees"])
+                ),
+                batch_size=2000,
+            )
+
+            for label, run in (
+                ("fee_report (DB aggregation)", lambda: fee_report(today=today)),
+                ("project_collections (NumPy)", lambda: project_collections(today=today)),
+            ):
+                timings = []
+                for _ in range(options["repeat"]):
+                    started = time.perf_counter()
+                    run()
+                    timings.append(time.perf_counter() - started)
+                self.stdout.write(f"{label}: best {min(timings) * 1000:.0f} ms")
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("Changes rolled back"))
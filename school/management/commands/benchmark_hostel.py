@@ -0,0 +1,157 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from school.hostel import allocate_beds
+from school.models import Bed, Hostel, HostelApplication, HostelRoom
+from student.models import Parent, Student
+
+
+class Command(BaseCommand):
+    help = "Benchmark a full and an incremental hostel bed allocation (rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=5000)
+        parser.add_argument("--classes", type=int, default=12)
+        parser.add_argument(
+            "--beds", type=float, default=1.05, help="Beds per applicant of each gender"
+        )
+        parser.add_argument(
+            "--changes", type=int, default=25, help="Students changed before the incremental run"
+        )
+
+    def report(self, label, run):
+        self.stdout.write(
+            f"{label}: {run.seconds * 1000:.0f} ms (plan {run.plan_seconds * 1000:.0f} ms, "
+            f"{run.beds_written} beds written); {run.summary()}"
+        )
+
+    def cohesion(self):
+        """Share of boarders whose roommates are all of their own year group"""
+        rooms = {}
+        for room, year in Bed.objects.filter(student__isnull=False).values_list(
+            "room", "student__student_class"
+        ):
+            rooms.setdefault(room, []).append(year)
+        boarders = sum(len(years) for years in rooms.values())
+        alike = sum(len(years) for years in rooms.values() if len(set(years)) == 1)
+        return alike * 100 / boarders if boarders else 100.0
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        count, classes = options["students"], options["classes"]
+        genders = rng.choices(("Male", "Female", "Others"), weights=(48, 48, 4), k=count)
+        applied = timezone.now() - datetime.timedelta(days=60)
+
+        with transaction.atomic():
+            self.stdout.write(f"Creating {count} applicants and their hostels...")
+            hostels = {}
+            for gender, halls in (("Male", 4), ("Female", 4), ("Others", 1)):
+                need = int(genders.count(gender) * options["beds"]) + 1
+                hostels[gender] = [
+                    Hostel.objects.create(name=f"bench-hostel {gender} {n}", gender=gender)
+                    for n in range(halls)
+                ]
+                beds, number = [], 0
+                while len(beds) < need:
+                    hostel = hostels[gender][number % halls]
+                    room = HostelRoom.objects.create(
+                        hostel=hostel,
+                        number=str(number),
+                        floor=number // 40 + 1,
+                        year_group=str(rng.randint(1, classes)) if rng.random() < 0.05 else "",
+                    )
+                    beds.extend(
+                        Bed(room=room, label=chr(65 + n)) for n in range(rng.choice((2, 3, 4)))
+                    )
+                    number += 1
+                Bed.objects.bulk_create(beds, batch_size=1000)
+
+            parents = Parent.objects.bulk_create(
+                (Parent(father_name=f"Parent {i}") for i in range(count)), batch_size=1000
+            )
+            students = Student.objects.bulk_create(
+                (
+                    Student(
+                        parent=parent,
+                        first_name="Bench",
+                        last_name=str(i),
+                        student_id=f"bench-hostel-{i}",
+                        slug=f"bench-hostel-{i}",
+                        gender=genders[i],
+                        date_of_birth=datetime.date(2010, 1, 1),
+                        joining_date=datetime.date(2020, 1, 1),
+                        student_class=str(rng.randint(1, classes)),
+                    )
+                    for i, parent in enumerate(parents)
+                ),
+                batch_size=1000,
+            )
+            HostelApplication.objects.bulk_create(
+                (
+                    HostelApplication(
+                        student=student,
+                        preferred_hostel=(
+                            rng.choice(hostels[student.gender]) if rng.random() < 0.1 else None
+                        ),
+                        applied_at=applied + datetime.timedelta(minutes=i),
+                    )
+                    for i, student in enumerate(students)
+                ),
+                batch_size=1000,
+            )
+
+            self.report("Full allocation", allocate_beds(full=True))
+            self.stdout.write(f"  {self.cohesion():.1f}% of boarders room with their year only")
+            self.report("Unchanged rerun", allocate_beds())
+
+            changes = options["changes"]
+            self.stdout.write(
+                f"Withdrawing {changes} applications, closing {changes // 5} rooms "
+                f"and adding {changes} applicants..."
+            )
+            HostelApplication.objects.filter(
+                pk__in=[a.pk for a in rng.sample(list(HostelApplication.objects.all()), changes)]
+            ).delete()
+            HostelRoom.objects.filter(
+                pk__in=rng.sample(
+                    list(
+                        HostelRoom.objects.filter(beds__student__isnull=False)
+                        .values_list("pk", flat=True)
+                        .distinct()
+                    ),
+                    changes // 5,
+                )
+            ).update(is_available=False)
+            parents = Parent.objects.bulk_create(
+                Parent(father_name=f"Parent new {i}") for i in range(changes)
+            )
+            newcomers = Student.objects.bulk_create(
+                Student(
+                    parent=parent,
+                    first_name="Bench",
+                    last_name=f"new {i}",
+                    student_id=f"bench-hostel-new-{i}",
+                    slug=f"bench-hostel-new-{i}",
+                    gender=rng.choice(("Male", "Female")),
+                    date_of_birth=datetime.date(2010, 1, 1),
+                    joining_date=datetime.date(2020, 1, 1),
+                    student_class=str(rng.randint(1, classes)),
+                )
+                for i, parent in enumerate(parents)
+            )
+            HostelApplication.objects.bulk_create(
+                HostelApplication(student=student) for student in newcomers
+            )
+            started = time.perf_counter()
+            self.report("Incremental", allocate_beds())
+            self.stdout.write(f"  {self.cohesion():.1f}% of boarders room with their year only")
+            self.stdout.write(f"  {(time.perf_counter() - started) * 1000:.0f} ms wall time")
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("Changes rolled back"))
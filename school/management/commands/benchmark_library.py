@@ -0,0 +1,140 @@
+import random
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from school.library import add_copies, checkout, recount, return_copy, search_catalog
+from school.models import Book
+
+MARKER = "bench-library"
+
+
+def _percentile(samples, share):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * share))] * 1000 if samples else 0.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark counter-desk checkouts, returns and catalogue searches from concurrent "
+        "desks (synthetic rows are committed, then deleted)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, default=10000)
+        parser.add_argument("--copies", type=int, default=3, help="Copies per book")
+        parser.add_argument("--desks", type=int, default=8, help="Concurrent threads")
+        parser.add_argument("--loans", type=int, default=200, help="Checkouts per desk")
+        parser.add_argument(
+            "--think",
+            type=float,
+            default=20,
+            help="Mean milliseconds between a desk's operations (0 saturates the database)",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        desks = options["desks"]
+        User = get_user_model()
+        self.stdout.write(f"Creating {options['books']} books x {options['copies']} copies...")
+        with transaction.atomic():
+            Book.objects.bulk_create(
+                (
+                    Book(
+                        isbn=f"99{i:011d}",
+                        title=f"{rng.choice(('A', 'The', 'On'))} {MARKER} title {i}",
+                        title_key=f"{MARKER} title {i}",
+                        category=MARKER,
+                    )
+                    for i in range(options["books"])
+                ),
+                batch_size=2000,
+            )
+            for book in Book.objects.filter(category=MARKER):
+                add_copies(book, [f"{MARKER}-{book.pk}-{n}" for n in range(options["copies"])])
+            User.objects.bulk_create(
+                User(username=f"{MARKER}-{i}", email=f"{MARKER}-{i}@example.invalid", password="!")
+                for i in range(desks * 5)
+            )
+            borrowers = list(User.objects.filter(username__startswith=f"{MARKER}-"))
+
+        barcodes = [
+            f"{MARKER}-{pk}-{n}"
+            for pk in Book.objects.filter(category=MARKER).values_list("pk", flat=True)
+            for n in range(options["copies"])
+        ]
+        rng.shuffle(barcodes)
+        timings = {"checkout": [], "return": [], "search": []}
+        errors = []
+        lock = threading.Lock()
+
+        def desk(number):
+            # each desk works its own copies and borrowers, so waits are database locks only
+            own = barcodes[number::desks][: options["loans"]]
+            readers = borrowers[number::desks]
+            local = {name: [] for name in timings}
+            pause = random.Random(number)
+            try:
+                for i, barcode in enumerate(own):
+                    for name, operation in (
+                        ("search", lambda: search_catalog(f"{MARKER} title {i}")),
+                        ("checkout", lambda: checkout(barcode, readers[i % len(readers)])),
+                        ("return", lambda: return_copy(barcode)),
+                    ):
+                        if options["think"]:
+                            time.sleep(pause.expovariate(1000 / options["think"]))
+                        started = time.perf_counter()
+                        operation()
+                        local[name].append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(f"desk {number}: {e}")
+            finally:
+                connection.close()
+            with lock:
+                for name, samples in local.items():
+                    timings[name].extend(samples)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=desk, args=(n,)) for n in range(desks)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        try:
+            expected = list(
+                Book.objects.filter(category=MARKER)
+                .order_by("pk")
+                .values_list("copies_total", "copies_available", "loans_total")
+            )
+            recount(Book.objects.filter(category=MARKER))
+            recounted = list(
+                Book.objects.filter(category=MARKER)
+                .order_by("pk")
+                .values_list("copies_total", "copies_available", "loans_total")
+            )
+            consistent = expected == recounted
+        finally:
+            Book.objects.filter(category=MARKER).delete()
+            User.objects.filter(username__startswith=f"{MARKER}-").delete()
+
+        operations = sum(len(samples) for samples in timings.values())
+        self.stdout.write(
+            f"{desks} desks ({options['think']:g} ms think time), {operations} operations "
+            f"in {elapsed:.2f}s "
+            f"({operations / elapsed:,.0f} ops/s) on {connection.vendor}"
+        )
+        for name, samples in timings.items():
+            self.stdout.write(
+                f"  {name:<8} p50 {_percentile(samples, 0.5):.2f} ms  "
+                f"p95 {_percentile(samples, 0.95):.2f} ms  p99 {_percentile(samples, 0.99):.2f} ms"
+            )
+        for error in errors:
+            self.stderr.write(error)
+        if not consistent:
+            self.stderr.write("Counters drifted from a full recount")
+        self.stdout.write(self.style.SUCCESS("Synthetic rows deleted"))
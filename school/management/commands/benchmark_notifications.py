@@ -0,0 +1,52 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from school.models import Notification
+from school.notifications import BROADCAST_CHUNK_SIZE, broadcast_to_role
+
+
+class Command(BaseCommand):
+    help = "Benchmark the bulk notification fan-out against synthetic students (rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50000, help="Number of recipients")
+        parser.add_argument("--chunk-size", type=int, default=BROADCAST_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        users = options["users"]
+        chunk_size = options["chunk_size"]
+        User = get_user_model()
+
+        with transaction.atomic():
+            self.stdout.write(f"Creating {users} synthetic students...")
+            User.objects.bulk_create(
+                (
+                    User(
+                        username=f"bench-notify-{i}",
+                        email=f"bench-notify-{i}@example.invalid",
+                        password="!",
+                        is_student=True,
+                    )
+                    for i in range(users)
+                ),
+                batch_size=chunk_size,
+            )
+            before = Notification.objects.count()
+
+            started = time.perf_counter()
+            created = broadcast_to_role("student", "Benchmark broadcast", chunk_size=chunk_size)
+            elapsed = time.perf_counter() - started
+
+            assert Notification.objects.count() - before == created
+            transaction.set_rollback(True)
+
+        rate = created / elapsed if elapsed else float("inf")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created} notifications in {elapsed:.2f}s "
+                f"({rate:,.0f} rows/second, chunk size {chunk_size}); changes rolled back"
+            )
+        )
@@ -0,0 +1,91 @@
+import time
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import PermissionDenied
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.shortcuts import redirect
+from django.test import RequestFactory
+from django.utils.functional import SimpleLazyObject
+
+from school.views import role_required
+
+
+def legacy_role_required(*allowed_roles):
+    """The pre-roles-service decorator, kept here as the benchmark baseline"""
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return redirect("login")
+
+            user_roles = []
+            if hasattr(request.user, "is_admin") and request.user.is_admin:
+                user_roles.append("admin")
+            if hasattr(request.user, "is_teacher") and request.user.is_teacher:
+                user_roles.append("teacher")
+            if hasattr(request.user, "is_student") and request.user.is_student:
+                user_roles.append("student")
+
+            if any(role in allowed_roles for role in user_roles):
+                return view_func(request, *args, **kwargs)
+            else:
+                raise PermissionDenied
+
+        return wrapper
+
+    return decorator
+
+
+RESPONSE = HttpResponse()
+
+
+def view(request):
+    return RESPONSE
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark role_required overhead per call, legacy checks vs the roles service"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20000)
+        parser.add_argument(
+            "--checks-per-request",
+            type=int,
+            default=5,
+            help="Role checks made against the same request (decorators, view, templates)",
+        )
+
+    def run(self, decorated, requests, checks):
+        User = get_user_model()
+        factory = RequestFactory()
+        prepared = []
+        for _ in range(requests):
+            request = factory.get("/")
+            # request.user is lazy in real requests; the proxy cost is part of the check
+            user = User(username="bench", is_student=True)
+            request.user = SimpleLazyObject(lambda user=user: user)
+            prepared.append(request)
+
+        started = time.perf_counter()
+        for request in prepared:
+            for _ in range(checks):
+                decorated(request)
+        return (time.perf_counter() - started) / (requests * checks) * 1e9
+
+    def handle(self, *args, **options):
+        requests = options["requests"]
+        checks = options["checks_per_request"]
+        allowed = ("admin", "teacher", "student")
+
+        plain = self.run(view, requests, checks)
+        legacy = self.run(legacy_role_required(*allowed)(view), requests, checks) - plain
+        current = self.run(role_required(*allowed)(view), requests, checks) - plain
+
+        self.stdout.write(f"{requests} requests x {checks} role checks")
+        self.stdout.write(f"legacy hasattr checks: {legacy:>8,.0f} ns per call")
+        self.stdout.write(f"roles service:         {current:>8,.0f} ns per call")
+        if current > 0:
+            self.stdout.write(self.style.SUCCESS(f"speed-up: {legacy / current:.1f}x"))
@@ -0,0 +1,129 @@
+import datetime
+import math
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from school.models import Bus, Rider, Route, Stop
+from school.transport import plan_routes, transport_limits
+from student.models import Parent, Student
+
+MARKER = "bench-transport"
+
+
+class Command(BaseCommand):
+    help = "Benchmark a full and an incremental route plan for synthetic riders (rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--riders", type=int, default=3000)
+        parser.add_argument("--buses", type=int, default=90)
+        parser.add_argument("--seats", type=int, default=40)
+        parser.add_argument(
+            "--neighbourhoods", type=int, default=60, help="Clusters of homes around the school"
+        )
+        parser.add_argument(
+            "--changes", type=int, default=30, help="Riders who leave, join or move house"
+        )
+
+    def report(self, label, run):
+        self.stdout.write(
+            f"{label}: {run.seconds * 1000:.0f} ms (cluster {run.cluster_seconds * 1000:.0f} ms, "
+            f"route {run.route_seconds * 1000:.0f} ms); {run.summary()}"
+        )
+
+    def home(self, rng, centres, origin):
+        """A random home near one of ``centres`` (metres east and north of the school)"""
+        x, y = rng.choice(centres)
+        x, y = rng.gauss(x, 600), rng.gauss(y, 600)
+        lat0 = math.radians(origin[0])
+        return (
+            origin[0] + math.degrees(y / 6_371_000),
+            origin[1] + math.degrees(x / (6_371_000 * math.cos(lat0))),
+        )
+
+    def students(self, count, prefix):
+        parents = Parent.objects.bulk_create(
+            (Parent(father_name=f"Parent {i}") for i in range(count)), batch_size=1000
+        )
+        return Student.objects.bulk_create(
+            (
+                Student(
+                    parent=parent,
+                    first_name="Bench",
+                    last_name=str(i),
+                    student_id=f"{prefix}-{i}",
+                    slug=f"{prefix}-{i}",
+                    gender="Male",
+                    date_of_birth=datetime.date(2010, 1, 1),
+                    joining_date=datetime.date(2020, 1, 1),
+                    student_class="1",
+                )
+                for i, parent in enumerate(parents)
+            ),
+            batch_size=1000,
+        )
+
+    def check_plan(self):
+        limits = transport_limits()
+        loads = max(Route.objects.values_list("rider_count", flat=True), default=0)
+        ride = max(Route.objects.values_list("ride_minutes", flat=True), default=0)
+        counted = sum(Stop.objects.values_list("rider_count", flat=True))
+        self.stdout.write(
+            f"  fullest route {loads} riders, longest ride {ride:.1f} of {limits.ride} min; "
+            f"{counted} riders counted at stops"
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        count = options["riders"]
+        origin = transport_limits().origin
+        centres = []
+        for _ in range(options["neighbourhoods"]):
+            angle, radius = rng.uniform(0, 2 * math.pi), rng.uniform(1500, 12000)
+            centres.append((radius * math.sin(angle), radius * math.cos(angle)))
+
+        with transaction.atomic():
+            self.stdout.write(
+                f"Creating {count} riders in {len(centres)} neighbourhoods and "
+                f"{options['buses']} buses of {options['seats']} seats..."
+            )
+            Bus.objects.bulk_create(
+                Bus(registration=f"{MARKER}-{n}", capacity=options["seats"])
+                for n in range(options["buses"])
+            )
+            Rider.objects.bulk_create(
+                (
+                    Rider(student=student, **dict(zip(("latitude", "longitude"), home)))
+                    for student in self.students(count, MARKER)
+                    for home in [self.home(rng, centres, origin)]
+                ),
+                batch_size=1000,
+            )
+
+            self.report("Full plan", plan_routes(full=True))
+            self.check_plan()
+            self.report("Unchanged rerun", plan_routes())
+
+            changes = options["changes"]
+            self.stdout.write(f"{changes} riders leave, {changes} join and {changes} move house...")
+            riders = list(Rider.objects.values_list("pk", flat=True))
+            rng.shuffle(riders)
+            Rider.objects.filter(pk__in=riders[:changes]).delete()
+            for pk in riders[changes : 2 * changes]:
+                lat, lon = self.home(rng, centres, origin)
+                Rider.objects.filter(pk=pk).update(latitude=lat, longitude=lon)
+            Rider.objects.bulk_create(
+                Rider(student=student, **dict(zip(("latitude", "longitude"), home)))
+                for student in self.students(changes, f"{MARKER}-new")
+                for home in [self.home(rng, centres, origin)]
+            )
+            started = time.perf_counter()
+            self.report("Incremental", plan_routes())
+            self.check_plan()
+            self.stdout.write(f"  {(time.perf_counter() - started) * 1000:.0f} ms wall time")
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("Changes rolled back"))
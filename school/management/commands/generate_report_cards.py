@@ -0,0 +1,72 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from school.report_cards import ReportCardError, generate_report_cards, report_card_workers
+
+
+class Command(BaseCommand):
+    help = "Render a PDF report card for every student with results in a term into a zip file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("term", help='Exam term, e.g. "2025-T1"')
+        parser.add_argument(
+            "--output", help="Zip file to write (default MEDIA_ROOT/report_cards/<term>.zip)"
+        )
+        parser.add_argument(
+            "--workers", type=int, help="Worker processes (default one per CPU; 0 renders inline)"
+        )
+        parser.add_argument(
+            "--restart", action="store_true", help="Ignore cards left by an interrupted run"
+        )
+        parser.add_argument(
+            "--keep-parts", action="store_true", help="Keep the per-card files and journal"
+        )
+
+    def handle(self, *args, **options):
+        term = options["term"]
+        archive = options["output"] or os.path.join(
+            settings.MEDIA_ROOT, "report_cards", f"{term}.zip"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(archive)), exist_ok=True)
+        workers = options["workers"]
+        if workers is None:
+            workers = report_card_workers()
+
+        last = [0.0]
+
+        def progress(done, total):
+            now = time.monotonic()
+            if done == total or now - last[0] >= 1:
+                last[0] = now
+                self.stdout.write(f"  {done}/{total} ({done * 100 // total}%)")
+
+        self.stdout.write(f"Rendering report cards for {term} with {workers} workers...")
+        try:
+            run = generate_report_cards(
+                term,
+                archive,
+                workers=workers,
+                restart=options["restart"],
+                keep_parts=options["keep_parts"],
+                progress=progress,
+            )
+        except ReportCardError as e:
+            raise CommandError(str(e))
+
+        stats = run.summary()
+        if run.skipped:
+            self.stdout.write(f"Resumed: {run.skipped} cards reused from the interrupted run")
+        if run.rendered:
+            self.stdout.write(
+                f"Per card: mean {stats['mean_ms']} ms, p50 {stats['p50_ms']} ms, "
+                f"p95 {stats['p95_ms']} ms, max {stats['max_ms']} ms ({stats['slowest']})"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {run.total} report cards to {archive} in {run.seconds:.2f}s "
+                f"({stats['per_second']} rendered/s)"
+            )
+        )
@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+
+from django.core.management.base import BaseCommand
+
+from school.thumbnails import generate_thumbnails, thumbnail_fields
+
+
+class Command(BaseCommand):
+    help = "Backfill thumbnails for every uploaded teacher, user and student photo"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument(
+            "--force", action="store_true", help="Regenerate thumbnails that already exist"
+        )
+
+    def handle(self, *args, **options):
+        force = options["force"]
+        started = time.perf_counter()
+        originals = written = errors = 0
+
+        def work(model, name):
+            try:
+                return len(generate_thumbnails(name, force=force, model=model)), None
+            except Exception as e:
+                return 0, f"{name}: {e}"
+
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            for model, field_name in thumbnail_fields():
+                names = (
+                    model.objects.exclude(**{field_name: ""})
+                    .exclude(**{f"{field_name}__isnull": True})
+                    .values_list(field_name, flat=True)
+                    .iterator()
+                )
+                for count, error in pool.map(work, repeat(model), names):
+                    originals += 1
+                    written += count
+                    if error:
+                        errors += 1
+                        self.stderr.write(error)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {originals} images, wrote {written} thumbnails "
+                f"({errors} errors) in {elapsed:.2f}s"
+            )
+        )
@@ -0,0 +1,136 @@
+import csv
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from school.models import Subject, Teacher
+from school.timetable import (
+    Problem,
+    Requirement,
+    SchedulingError,
+    build_problem,
+    generate,
+    save_timetable,
+)
+
+
+def read_requirements(path):
+    """Rows of student_class,subject (code),teacher (email),sessions"""
+    subjects = dict(Subject.objects.values_list("code", "id"))
+    teachers = dict(Teacher.objects.values_list("email", "id"))
+    requirements = []
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        for line, row in enumerate(csv.DictReader(fh), start=2):
+            try:
+                requirements.append(
+                    Requirement(
+                        row["student_class"].strip(),
+                        subjects[row["subject"].strip()],
+                        teachers[row["teacher"].strip()],
+                        int(row["sessions"]),
+                    )
+                )
+            except KeyError as e:
+                raise CommandError(f"line {line}: unknown subject, teacher or column {e}")
+            except ValueError:
+                raise CommandError(f"line {line}: sessions must be a whole number")
+    return requirements
+
+
+def synthetic_problem(teachers, rooms, periods, periods_per_day=8, fill=0.9, seed=0):
+    """Classes filling ``fill`` of the rooms, each taught ``fill`` of the week"""
+    rng = random.Random(seed)
+    max_load = int(periods * fill)
+    load = [0] * teachers
+    requirements = []
+    for class_index in range(int(rooms * fill)):
+        remaining, subject = max_load, 0
+        while remaining:
+            sessions = min(remaining, rng.choice((3, 4, 5, 6)))
+            candidates = [t for t in range(teachers) if load[t] + sessions <= max_load]
+            teacher = rng.choice(candidates)
+            load[teacher] += sessions
+            requirements.append(Requirement(f"C{class_index}", subject, teacher, sessions))
+            remaining -= sessions
+            subject += 1
+    return Problem(
+        periods=[(i, i // periods_per_day) for i in range(periods)],
+        rooms=list(range(rooms)),
+        requirements=requirements,
+    )
+
+
+class Command(BaseCommand):
+    help = "Generate the weekly timetable from a requirements CSV, or benchmark the solver"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requirements", help="CSV with student_class,subject,teacher,sessions columns"
+        )
+        parser.add_argument(
+            "--week", type=datetime.date.fromisoformat, help="Close periods on that week's holidays"
+        )
+        parser.add_argument("--attempts", type=int, default=4, help="Seeds to try")
+        parser.add_argument("--workers", type=int, default=1, help="Processes for the seeds")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--dry-run", action="store_true", help="Solve without saving")
+        parser.add_argument(
+            "--benchmark", action="store_true", help="Solve a synthetic school (nothing is saved)"
+        )
+        parser.add_argument("--teachers", type=int, default=200)
+        parser.add_argument("--rooms", type=int, default=60)
+        parser.add_argument("--periods", type=int, default=40)
+
+    def handle(self, *args, **options):
+        if options["benchmark"]:
+            problem = synthetic_problem(
+                options["teachers"], options["rooms"], options["periods"], seed=options["seed"]
+            )
+        elif options["requirements"]:
+            problem = build_problem(read_requirements(options["requirements"]), options["week"])
+        else:
+            raise CommandError("Pass --requirements FILE or --benchmark")
+
+        sessions = sum(requirement.sessions for requirement in problem.requirements)
+        self.stdout.write(
+            f"Scheduling {sessions} sessions for "
+            f"{len({r.student_class for r in problem.requirements})} classes and "
+            f"{len({r.teacher_id for r in problem.requirements})} teachers into "
+            f"{len(problem.periods) - len(problem.unavailable)} periods x {len(problem.rooms)} rooms"
+        )
+        started = time.perf_counter()
+        try:
+            timetable = generate(
+                problem,
+                attempts=options["attempts"],
+                workers=options["workers"],
+                seed=options["seed"],
+            )
+        except SchedulingError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        for requirement in timetable.unplaced:
+            self.stderr.write(
+                f"Could not place {requirement.sessions} session(s) of subject "
+                f"{requirement.subject_id} for class {requirement.student_class}"
+            )
+        self.stdout.write(
+            f"Placed {len(timetable.lessons)}/{sessions} sessions in {elapsed:.2f}s "
+            f"(seed {timetable.seed}, {timetable.steps} steps)"
+        )
+        if options["benchmark"] or options["dry_run"]:
+            return
+        if not timetable.complete:
+            raise CommandError("Timetable is incomplete; nothing was saved")
+        try:
+            saved = save_timetable(timetable)
+        except IntegrityError as e:
+            # the timetable changed while this one was being solved
+            raise CommandError(
+                f"Timetable clashes with an existing assignment ({e}); nothing was saved"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Saved {saved} assignments"))
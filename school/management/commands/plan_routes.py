@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from school.transport import TransportError, plan_routes
+
+
+class Command(BaseCommand):
+    help = "Give bus riders stops and stops routes; current stops are kept unless --full is given"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full", action="store_true", help="Replan every stop and route (riders may move)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            run = plan_routes(full=options["full"])
+        except TransportError as e:
+            raise CommandError(e)
+        self.stdout.write(
+            f"Clustered in {run.cluster_seconds * 1000:.0f} ms, "
+            f"routed in {run.route_seconds * 1000:.0f} ms; {run.seconds:.2f}s in all"
+        )
+        self.stdout.write(self.style.SUCCESS(run.summary()))
@@ -0,0 +1,83 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from school import search
+from school.models import SearchEntry
+
+FIRST_NAMES = ("Ada", "Alan", "Grace", "Linus", "Barbara", "Dennis", "Katherine", "Edsger")
+LAST_NAMES = ("Lovelace", "Turing", "Hopper", "Torvalds", "Liskov", "Ritchie", "Johnson")
+QUERIES = ("a", "ad", "ada", "lov", "ada lov", "gra hop", "ada 7", "tur", "zzz", "st12")
+
+
+class Command(BaseCommand):
+    help = "Rebuild the global search index from teachers, students, subjects and departments"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--kind",
+            action="append",
+            choices=sorted(search.SOURCES),
+            help="Only rebuild this kind (repeatable)",
+        )
+        parser.add_argument("--chunk-size", type=int, default=search.INDEX_CHUNK_SIZE)
+        parser.add_argument(
+            "--benchmark",
+            type=int,
+            metavar="N",
+            help="Instead of rebuilding, time typeahead queries against N synthetic entries "
+            "(rolled back)",
+        )
+
+    def handle(self, *args, **options):
+        if options["benchmark"]:
+            return self.benchmark(options["benchmark"])
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            counts = search.rebuild(options["kind"], chunk_size=options["chunk_size"])
+        for kind, count in counts.items():
+            self.stdout.write(f"{kind}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {sum(counts.values())} records in {time.perf_counter() - started:.1f}s"
+            )
+        )
+
+    def benchmark(self, size):
+        rng = random.Random(42)
+        with transaction.atomic():
+            self.stdout.write(f"Indexing {size} synthetic entries...")
+            started = time.perf_counter()
+            SearchEntry.objects.bulk_create(
+                (
+                    SearchEntry(
+                        kind="student",
+                        object_id=10**9 + i,
+                        title=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}",
+                        body=f"ST{i} {i % 12 + 1} {rng.choice(LAST_NAMES)}",
+                    )
+                    for i in range(size)
+                ),
+                batch_size=5000,
+            )
+            self.stdout.write(f"  indexed in {time.perf_counter() - started:.1f}s")
+
+            for query in QUERIES:
+                timings = []
+                for _ in range(20):
+                    started = time.perf_counter()
+                    results = search.search(query, limit=10)
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"{query!r:>10}: median {statistics.median(timings):6.2f} ms, "
+                    f"max {max(timings):6.2f} ms ({len(results)} results)"
+                )
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("Changes rolled back"))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from school.metrics import clear_snapshots, load_snapshots, summarize
+
+
+class Command(BaseCommand):
+    help = "Print p50/p95/p99 wall, SQL and template timings per view from RequestMetricsMiddleware"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sort",
+            default="wall_p95",
+            help="Column to sort by, e.g. wall_p95, queries_p99, sql_p50 (default: wall_p95)",
+        )
+        parser.add_argument("--limit", type=int, default=50)
+        parser.add_argument("--reset", action="store_true", help="Delete collected samples")
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            clear_snapshots()
+            self.stdout.write(self.style.SUCCESS("Request metrics cleared"))
+            return
+
+        rows = summarize(load_snapshots(include_local=False), sort_by=options["sort"])
+        if not rows:
+            self.stdout.write("No samples yet. Is REQUEST_METRICS_ENABLED on?")
+            return
+
+        header = (
+            f"{'view':<36}{'n':>7}{'wall p50':>10}{'p95':>9}{'p99':>9}"
+            f"{'queries p50':>13}{'p99':>6}{'sql p95':>9}{'tmpl p95':>10}{'dup max':>9}"
+        )
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for row in rows[: options["limit"]]:
+            self.stdout.write(
+                f"{row['view'][:35]:<36}{row['count']:>7}"
+                f"{row['wall_p50']:>10.1f}{row['wall_p95']:>9.1f}{row['wall_p99']:>9.1f}"
+                f"{row['queries_p50']:>13}{row['queries_p99']:>6}"
+                f"{row['sql_p95']:>9.1f}{row['template_p95']:>10.1f}{row['duplicates_p99']:>9}"
+            )
+            if row["n_plus_one"]:
+                self.stdout.write(f"    possible N+1: {row['n_plus_one'][:120]}")
@@ -0,0 +1,305 @@
+"""Inbox messaging: threads, participants with read cursors, and batch sends.
+
+Messages are numbered within their thread (``seq``). Each participant row
+keeps the number of the last message its user has read and a copy of the
+thread's latest number and time, so:
+
+- a thread's unread count is ``last_seq - read_seq`` on one row;
+- a user's total unread count is a cached counter moved on send and read
+  (rebuilt by one aggregate over their rows on a cache miss);
+- the inbox is a keyset page over the ``(user, last_message_at, id)`` index,
+  with the subject and latest message read from the denormalised thread row.
+
+Sending to a role gives every member a private thread with the sender (as a
+bcc would), written with chunked bulk inserts. Only the recipients get rows on
+those copies, so a broadcast adds nothing to the sender's inbox; their "sent"
+folder lists threads by ``created_by``, and a copy joins their inbox when its
+recipient replies.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import Message, MessageThread, ThreadParticipant
+from .notifications import BROADCAST_CHUNK_SIZE, ROLE_FIELDS
+from .pagination import keyset_paginate
+
+INBOX_ORDERING = ("last_message_at", "id")
+INBOX_PAGE_SIZE = 25
+MESSAGE_PAGE_SIZE = 20
+FOLDERS = ("all", "unread", "sent")
+
+UNREAD_COUNT_KEY = "messages:unread:{user_id}"
+
+
+class MessagingError(ValueError):
+    """A message cannot be sent as requested"""
+
+
+def _unread_key(user_id):
+    return UNREAD_COUNT_KEY.format(user_id=user_id)
+
+
+def _count_timeout():
+    return getattr(settings, "MESSAGE_COUNT_CACHE_TIMEOUT", 300)
+
+
+def unread_count(user):
+    """Unread messages across all of a user's threads, from the cache when possible"""
+    if not user.is_authenticated:
+        return 0
+
+    key = _unread_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        totals = ThreadParticipant.objects.filter(user=user).aggregate(
+            unread=Sum(F("last_seq") - F("read_seq"))
+        )
+        count = totals["unread"] or 0
+        cache.set(key, count, _count_timeout())
+    return count
+
+
+def _adjust_unread_counts(deltas):
+    """Move cached counters by ``{user_id: delta}``; missing keys are rebuilt on read"""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if len(deltas) == 1:
+        [(user_id, delta)] = deltas.items()
+        try:
+            cache.incr(_unread_key(user_id), delta)
+        except ValueError:
+            pass
+        return
+    keys = {_unread_key(user_id): user_id for user_id in deltas}
+    cached = cache.get_many(keys)
+    if cached:
+        cache.set_many(
+            {key: count + deltas[keys[key]] for key, count in cached.items()}, _count_timeout()
+        )
+
+
+def preview(body):
+    return " ".join(body.split())[:255]
+
+
+def _user_ids(users):
+    return (getattr(user, "pk", user) for user in users)
+
+
+def start_thread(sender, recipients, subject, body):
+    """Open a thread from ``sender`` to ``recipients`` (users or ids) with its first message"""
+    recipient_ids = set(_user_ids(recipients)) - {sender.pk}
+    if not recipient_ids:
+        raise MessagingError("A message needs at least one recipient other than the sender")
+    if not body.strip():
+        raise MessagingError("The message is empty")
+
+    now = timezone.now()
+    with transaction.atomic():
+        thread = MessageThread.objects.create(
+            subject=subject,
+            created_by=sender,
+            last_seq=1,
+            last_message_at=now,
+            last_message_sender=sender,
+            last_message_preview=preview(body),
+        )
+        Message.objects.create(thread=thread, sender=sender, seq=1, body=body, created_at=now)
+        ThreadParticipant.objects.bulk_create(
+            [
+                ThreadParticipant(
+                    thread=thread,
+                    user_id=user_id,
+                    read_seq=1 if user_id == sender.pk else 0,
+                    last_seq=1,
+                    last_message_at=now,
+                )
+                for user_id in [sender.pk, *sorted(recipient_ids)]
+            ]
+        )
+        transaction.on_commit(
+            lambda: _adjust_unread_counts({user_id: 1 for user_id in recipient_ids})
+        )
+    return thread
+
+
+def send_message(thread, sender, body):
+    """Append a reply to ``thread``; the sender must be a participant
+
+    Replying also marks the thread read for the sender.
+    """
+    if not body.strip():
+        raise MessagingError("The message is empty")
+
+    with transaction.atomic():
+        # the row lock hands out message numbers one at a time
+        thread = MessageThread.objects.select_for_update().get(pk=getattr(thread, "pk", thread))
+        participants = ThreadParticipant.objects.filter(thread=thread)
+        read_seqs = dict(participants.values_list("user_id", "read_seq"))
+        if sender.pk not in read_seqs and sender.pk != thread.created_by_id:
+            raise MessagingError("Only participants can reply to a thread")
+        if thread.created_by_id is not None and thread.created_by_id not in read_seqs:
+            # a broadcast copy: its sender joins the conversation with the first reply
+            ThreadParticipant.objects.create(
+                thread=thread,
+                user_id=thread.created_by_id,
+                read_seq=thread.last_seq,
+                last_seq=thread.last_seq,
+                last_message_at=thread.last_message_at,
+            )
+            read_seqs[thread.created_by_id] = thread.last_seq
+        read_seq = read_seqs[sender.pk]
+
+        seq = thread.last_seq + 1
+        message = Message.objects.create(thread=thread, sender=sender, seq=seq, body=body)
+        thread.last_seq = seq
+        thread.last_message_at = message.created_at
+        thread.last_message_sender = sender
+        thread.last_message_preview = preview(body)
+        thread.save(
+            update_fields=[
+                "last_seq",
+                "last_message_at",
+                "last_message_sender",
+                "last_message_preview",
+            ]
+        )
+        participants.update(last_seq=seq, last_message_at=message.created_at)
+        participants.filter(user=sender).update(read_seq=seq)
+
+        deltas = dict.fromkeys(
+            participants.exclude(user=sender).values_list("user_id", flat=True), 1
+        )
+        deltas[sender.pk] = read_seq - (seq - 1)
+        transaction.on_commit(lambda: _adjust_unread_counts(deltas))
+    return message
+
+
+def _send_copies(sender, user_ids, subject, body, now):
+    threads = [
+        MessageThread(
+            subject=subject,
+            created_by=sender,
+            last_seq=1,
+            last_message_at=now,
+            last_message_sender=sender,
+            last_message_preview=preview(body),
+        )
+        for _user_id in user_ids
+    ]
+    if connection.features.can_return_rows_from_bulk_insert:
+        threads = MessageThread.objects.bulk_create(threads)
+    else:
+        for thread in threads:
+            thread.save()
+
+    Message.objects.bulk_create(
+        [
+            Message(thread=thread, sender=sender, seq=1, body=body, created_at=now)
+            for thread in threads
+        ]
+    )
+    participants = [
+        ThreadParticipant(thread=thread, user_id=user_id, last_seq=1, last_message_at=now)
+        for thread, user_id in zip(threads, user_ids)
+    ]
+    ThreadParticipant.objects.bulk_create(participants)
+    transaction.on_commit(lambda: _adjust_unread_counts(dict.fromkeys(user_ids, 1)))
+    return len(threads)
+
+
+def send_to_users(sender, users, subject, body, chunk_size=BROADCAST_CHUNK_SIZE):
+    """Send every user (or user id) in ``users`` a private copy of the message
+
+    ``users`` may be a streaming ``values_list(...).iterator()``. Returns the
+    number of threads created.
+    """
+    if not body.strip():
+        raise MessagingError("The message is empty")
+
+    now = timezone.now()
+    total = 0
+    batch = []
+    with transaction.atomic():
+        for user_id in _user_ids(users):
+            if user_id == sender.pk:
+                continue
+            batch.append(user_id)
+            if len(batch) >= chunk_size:
+                total += _send_copies(sender, batch, subject, body, now)
+                batch = []
+        if batch:
+            total += _send_copies(sender, batch, subject, body, now)
+    return total
+
+
+def send_to_role(sender, role, subject, body, chunk_size=BROADCAST_CHUNK_SIZE):
+    """Send every active user with ``role`` ("admin", "teacher", "student") a private copy"""
+    try:
+        field = ROLE_FIELDS[role]
+    except KeyError:
+        raise ValueError(f"Unknown role '{role}'. Expected one of: {', '.join(ROLE_FIELDS)}")
+
+    users = get_user_model().objects.filter(is_active=True, **{field: True})
+    user_ids = users.order_by().values_list("pk", flat=True).iterator(chunk_size=chunk_size)
+    return send_to_users(sender, user_ids, subject, body, chunk_size=chunk_size)
+
+
+def mark_read(thread, user):
+    """Move the user's read cursor to the end of ``thread``; returns the messages newly read"""
+    with transaction.atomic():
+        participant = (
+            ThreadParticipant.objects.select_for_update().filter(thread=thread, user=user).first()
+        )
+        if participant is None or not participant.unread:
+            return 0
+        newly_read = participant.unread
+        participant.read_seq = participant.last_seq
+        participant.save(update_fields=["read_seq"])
+        transaction.on_commit(lambda: _adjust_unread_counts({user.pk: -newly_read}))
+    return newly_read
+
+
+def mark_all_read(user):
+    """Mark every thread of ``user`` read in one statement; returns the threads changed"""
+    with transaction.atomic():
+        changed = ThreadParticipant.objects.filter(user=user, last_seq__gt=F("read_seq")).update(
+            read_seq=F("last_seq")
+        )
+        transaction.on_commit(lambda: cache.set(_unread_key(user.pk), 0, _count_timeout()))
+    return changed
+
+
+def inbox(user, folder="all"):
+    """The user's participant rows for an inbox folder, with their threads
+
+    The "sent" folder is the threads the user started, including broadcast
+    copies they have no participant row on.
+    """
+    if folder == "sent":
+        return MessageThread.objects.filter(created_by=user).select_related("last_message_sender")
+    rows = ThreadParticipant.objects.filter(user=user).select_related(
+        "thread", "thread__last_message_sender"
+    )
+    if folder == "unread":
+        rows = rows.filter(last_seq__gt=F("read_seq"))
+    return rows
+
+
+def inbox_page(user, folder="all", after=None, before=None, page_size=INBOX_PAGE_SIZE):
+    """One keyset page of the inbox, most recent conversation first"""
+    return keyset_paginate(
+        inbox(user, folder), INBOX_ORDERING, page_size, after=after, before=before, descending=True
+    )
+
+
+def message_page(thread, after=None, before=None, page_size=MESSAGE_PAGE_SIZE):
+    """One keyset page of a thread's messages, newest first"""
+    messages = Message.objects.filter(thread=thread).select_related("sender")
+    return keyset_paginate(
+        messages, ("seq",), page_size, after=after, before=before, descending=True
+    )
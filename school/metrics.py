@@ -0,0 +1,132 @@
+"""Rolling per-view request metrics collected by RequestMetricsMiddleware.
+
+Each worker process keeps the last ``REQUEST_METRICS_WINDOW`` samples per URL
+name in memory and periodically writes them to ``REQUEST_METRICS_DIR`` so the
+``request_metrics`` command and the admin page can merge every worker's view.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+
+SAMPLE_FIELDS = ("wall_ms", "queries", "sql_ms", "duplicates", "template_ms")
+PERCENTILES = (50, 95, 99)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class MetricsRegistry:
+    def __init__(self, window=None):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = defaultdict(self._new_window)
+        self.suspects = defaultdict(Counter)
+        self.last_flush = time.monotonic()
+
+    def _new_window(self):
+        return deque(maxlen=self.window or _setting("REQUEST_METRICS_WINDOW", 1000))
+
+    def record(self, view, sample, suspect_sql=None):
+        with self.lock:
+            self.samples[view].append(tuple(sample[field] for field in SAMPLE_FIELDS))
+            if suspect_sql:
+                self.suspects[view][suspect_sql] += 1
+        if time.monotonic() - self.last_flush > _setting("REQUEST_METRICS_FLUSH_SECONDS", 10):
+            self.flush()
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.suspects.clear()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "samples": {view: list(rows) for view, rows in self.samples.items()},
+                "suspects": {view: dict(counter) for view, counter in self.suspects.items()},
+            }
+
+    def flush(self, directory=None):
+        """Write this process's samples to ``<dir>/metrics-<pid>.json``"""
+        directory = directory or _setting("REQUEST_METRICS_DIR", None)
+        self.last_flush = time.monotonic()
+        if not directory:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(self.snapshot(), fh)
+        os.replace(tmp, path)
+        return path
+
+
+registry = MetricsRegistry()
+
+
+def load_snapshots(directory=None, include_local=True):
+    """Merge the flushed snapshots of every worker (and this process)"""
+    directory = directory or _setting("REQUEST_METRICS_DIR", None)
+    merged = {"samples": defaultdict(list), "suspects": defaultdict(Counter)}
+    snapshots = []
+    own_file = f"metrics-{os.getpid()}.json"
+
+    if directory and os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".json") or (include_local and name == own_file):
+                continue
+            try:
+                with open(os.path.join(directory, name)) as fh:
+                    snapshots.append(json.load(fh))
+            except (OSError, ValueError):
+                continue
+    if include_local:
+        snapshots.append(registry.snapshot())
+
+    for snapshot in snapshots:
+        for view, rows in snapshot["samples"].items():
+            merged["samples"][view].extend(rows)
+        for view, counter in snapshot["suspects"].items():
+            merged["suspects"][view].update(counter)
+    return merged
+
+
+def summarize(snapshot, sort_by="wall_p95"):
+    """One row per view with count and p50/p95/p99 of every sample field"""
+    rows = []
+    for view, samples in snapshot["samples"].items():
+        row = {"view": view, "count": len(samples)}
+        for index, field in enumerate(SAMPLE_FIELDS):
+            values = sorted(sample[index] for sample in samples)
+            short = field.replace("_ms", "")
+            for pct in PERCENTILES:
+                row[f"{short}_p{pct}"] = percentile(values, pct)
+        suspects = snapshot["suspects"].get(view)
+        row["n_plus_one"] = suspects.most_common(1)[0][0] if suspects else ""
+        rows.append(row)
+    rows.sort(key=lambda row: row.get(sort_by, 0), reverse=True)
+    return rows
+
+
+def clear_snapshots(directory=None):
+    registry.reset()
+    directory = directory or _setting("REQUEST_METRICS_DIR", None)
+    if directory and os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.startswith("metrics-"):
+                os.remove(os.path.join(directory, name))
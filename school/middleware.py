@@ -0,0 +1,203 @@
+import contextvars
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import setting_changed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.base import Template
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .metrics import registry
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+_original_render = None
+
+
+class _RequestState:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.signatures = Counter()
+        self.template_time = 0.0
+        self.template_depth = 0
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    """Count and time a query for the request being measured, if any
+
+    The state travels in a context variable, which sync_to_async copies into
+    its worker thread, so queries of async views are counted too.
+    """
+    state = _current.get()
+    if state is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        state.queries += 1
+        state.sql_time += time.perf_counter() - started
+        # Django hands us parameterised SQL, so the text itself is the signature
+        state.signatures[sql] += 1
+
+
+def _wrap_connection(connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+def _wrap_connections():
+    # connections are per thread; ones opened later are hooked by connection_created
+    for alias in connections:
+        _wrap_connection(connections[alias])
+
+
+def _instrument():
+    """Hook database connections and time the outermost Template._render"""
+    global _original_render
+    if _original_render is not None:
+        return
+    connection_created.connect(_wrap_connection, dispatch_uid="request_metrics")
+    original = _original_render = Template._render
+
+    def _render(self, context):
+        state = _current.get()
+        if state is None or state.template_depth:
+            return original(self, context)
+        state.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            state.template_depth -= 1
+            state.template_time += time.perf_counter() - started
+
+    Template._render = _render
+
+
+def _uninstrument():
+    global _original_render
+    if _original_render is None:
+        return
+    Template._render = _original_render
+    _original_render = None
+    connection_created.disconnect(dispatch_uid="request_metrics")
+    for connection in connections.all(initialized_only=True):
+        if _execute_wrapper in connection.execute_wrappers:
+            connection.execute_wrappers.remove(_execute_wrapper)
+
+
+@receiver(setting_changed)
+def _metrics_setting_changed(setting, value, **kwargs):
+    # nothing stays patched once metrics are switched off (e.g. by a test)
+    if setting == "REQUEST_METRICS_ENABLED" and not value:
+        _uninstrument()
+
+
+class RequestMetricsMiddleware:
+    """Opt-in per-view timing, SQL counting and N+1 detection
+
+    Enable with ``REQUEST_METRICS_ENABLED = True``; results are read with the
+    ``request_metrics`` command or the admin page at /admin/request-metrics/.
+    Under ASGI the middleware stays async, so async views keep the event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_METRICS_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.duplicate_threshold = getattr(settings, "REQUEST_METRICS_N_PLUS_ONE_THRESHOLD", 5)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.hooked = False
+        _instrument()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        _wrap_connections()
+        state = _RequestState()
+        token = _current.set(state)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, state, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not self.hooked:
+            # the ORM runs in sync_to_async's thread, whose connections may already be open
+            await sync_to_async(_wrap_connections)()
+            self.hooked = True
+        state = _RequestState()
+        token = _current.set(state)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, state, time.perf_counter() - started)
+        return response
+
+    def finish(self, request, state, wall_time):
+        match = getattr(request, "resolver_match", None)
+        if match is not None:
+            self.record(match.view_name or match._func_path, state, wall_time)
+
+    def record(self, view, state, wall_time):
+        suspect_sql, repeats = (state.signatures.most_common(1) or [(None, 0)])[0]
+        registry.record(
+            view,
+            {
+                "wall_ms": wall_time * 1000,
+                "queries": state.queries,
+                "sql_ms": state.sql_time * 1000,
+                "duplicates": repeats if repeats > 1 else 0,
+                "template_ms": state.template_time * 1000,
+            },
+            suspect_sql=suspect_sql if repeats >= self.duplicate_threshold else None,
+        )
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that keeps async views on the event loop under ASGI
+
+    The stock middleware is sync-only, so Django would run every async view
+    behind it through a worker thread. Looking a static file up is a dict
+    access (a stat with autorefresh), so the async path does it inline, serves
+    hits from a thread and awaits everything else.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("school", "0003_notification_unread_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="teacher",
+            index=models.Index(
+                fields=["last_name", "first_name", "id"], name="teacher_directory_idx"
+            ),
+        ),
+    ]
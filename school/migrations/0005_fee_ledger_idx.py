@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("school", "0004_teacher_directory_idx"),
+        ("student", "0002_student_department"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="fee",
+            index=models.Index(fields=["paid", "due_date"], name="fee_paid_due_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="fee",
+            index=models.Index(fields=["student", "due_date"], name="fee_student_due_idx"),
+        ),
+    ]
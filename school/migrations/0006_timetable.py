@@ -0,0 +1,131 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("school", "0005_fee_ledger_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Room",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+                ("capacity", models.PositiveIntegerField(default=40)),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="Period",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "day_of_week",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, "Monday"),
+                            (1, "Tuesday"),
+                            (2, "Wednesday"),
+                            (3, "Thursday"),
+                            (4, "Friday"),
+                            (5, "Saturday"),
+                            (6, "Sunday"),
+                        ]
+                    ),
+                ),
+                ("start_time", models.TimeField()),
+                ("end_time", models.TimeField()),
+            ],
+            options={
+                "ordering": ["day_of_week", "start_time"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day_of_week", "start_time"),
+                        name="period_day_start_uniq",
+                    ),
+                    models.CheckConstraint(
+                        condition=models.Q(("end_time__gt", models.F("start_time"))),
+                        name="period_ends_after_start",
+                    ),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="Assignment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("student_class", models.CharField(max_length=50)),
+                (
+                    "subject",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="school.subject"
+                    ),
+                ),
+                (
+                    "teacher",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="school.teacher"
+                    ),
+                ),
+                (
+                    "period",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="school.period"
+                    ),
+                ),
+                (
+                    "room",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="school.room"
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["period"],
+                "indexes": [
+                    models.Index(fields=["student_class", "period"], name="assignment_class_idx"),
+                    models.Index(fields=["teacher", "period"], name="assignment_teacher_idx"),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("period", "teacher"), name="assignment_teacher_uniq"
+                    ),
+                    models.UniqueConstraint(fields=("period", "room"), name="assignment_room_uniq"),
+                    models.UniqueConstraint(
+                        fields=("period", "student_class"), name="assignment_class_uniq"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,127 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("school", "0006_timetable"),
+        ("student", "0002_student_department"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AttendanceRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(help_text="First day of the month")),
+                ("sessions", models.PositiveIntegerField(default=0)),
+                ("present", models.PositiveIntegerField(default=0)),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attendance_rollups",
+                        to="student.student",
+                    ),
+                ),
+                (
+                    "subject",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="school.subject",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["month", "student"], name="attendance_rollup_month_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("student", "subject", "month"),
+                        name="attendance_rollup_uniq",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("subject__isnull", True)),
+                        fields=("student", "month"),
+                        name="attendance_rollup_roll_call_uniq",
+                    ),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="AttendanceSheet",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("student_class", models.CharField(max_length=50)),
+                ("date", models.DateField()),
+                ("roster", models.BinaryField()),
+                ("present", models.BinaryField()),
+                ("present_count", models.PositiveIntegerField(default=0)),
+                ("total", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "marked_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "subject",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="school.subject",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["date", "student_class"],
+                "indexes": [
+                    models.Index(
+                        fields=["student_class", "date"],
+                        name="attendance_class_date_idx",
+                    ),
+                    models.Index(fields=["date"], name="attendance_date_idx"),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("student_class", "subject", "date"),
+                        name="attendance_sheet_uniq",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("subject__isnull", True)),
+                        fields=("student_class", "date"),
+                        name="attendance_roll_call_uniq",
+                    ),
+                ],
+            },
+        ),
+    ]
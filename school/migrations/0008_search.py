@@ -0,0 +1,96 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:16
+
+from django.db import migrations, models
+
+# SQLite: an external-content FTS5 index over the entries, kept in sync by
+# triggers. Note that Django rebuilds SQLite tables on most ALTERs, which drops
+# triggers: a later migration changing SearchEntry must recreate them.
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE school_searchentry_fts USING fts5("
+    "title, body, kind, content='school_searchentry', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER school_searchentry_ai AFTER INSERT ON school_searchentry BEGIN "
+    "INSERT INTO school_searchentry_fts(rowid, title, body, kind) "
+    "VALUES (new.id, new.title, new.body, new.kind); END",
+    "CREATE TRIGGER school_searchentry_ad AFTER DELETE ON school_searchentry BEGIN "
+    "INSERT INTO school_searchentry_fts(school_searchentry_fts, rowid, title, body, kind) "
+    "VALUES ('delete', old.id, old.title, old.body, old.kind); END",
+    "CREATE TRIGGER school_searchentry_au AFTER UPDATE ON school_searchentry BEGIN "
+    "INSERT INTO school_searchentry_fts(school_searchentry_fts, rowid, title, body, kind) "
+    "VALUES ('delete', old.id, old.title, old.body, old.kind); "
+    "INSERT INTO school_searchentry_fts(rowid, title, body, kind) "
+    "VALUES (new.id, new.title, new.body, new.kind); END",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS school_searchentry_au",
+    "DROP TRIGGER IF EXISTS school_searchentry_ad",
+    "DROP TRIGGER IF EXISTS school_searchentry_ai",
+    "DROP TABLE IF EXISTS school_searchentry_fts",
+]
+
+# PostgreSQL: a GIN index on the same expression school.search.PG_VECTOR queries
+POSTGRESQL_FORWARD = [
+    "CREATE INDEX school_searchentry_vector_idx ON school_searchentry USING gin (("
+    "setweight(to_tsvector('simple'::regconfig, title), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, body), 'B')))",
+]
+POSTGRESQL_REVERSE = ["DROP INDEX IF EXISTS school_searchentry_vector_idx"]
+
+
+def _has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return "ENABLE_FTS5" in {row[0] for row in cursor.fetchall()}
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite" and _has_fts5(schema_editor.connection):
+        statements = SQLITE_FORWARD
+    elif vendor == "postgresql":
+        statements = POSTGRESQL_FORWARD
+    else:
+        statements = []  # school.search falls back to icontains
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_index(apps, schema_editor):
+    statements = {"sqlite": SQLITE_REVERSE, "postgresql": POSTGRESQL_REVERSE}
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("school", "0007_attendance"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("kind", models.CharField(max_length=20)),
+                ("object_id", models.PositiveBigIntegerField()),
+                ("title", models.CharField(max_length=255)),
+                ("body", models.TextField(blank=True)),
+                ("url", models.CharField(blank=True, max_length=255)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=("kind", "object_id"), name="search_entry_uniq")
+                ],
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,212 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("school", "0009_messaging"),
+        ("student", "0002_student_department"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Exam",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("term", models.CharField(help_text='e.g. "2025-T1"', max_length=20)),
+                (
+                    "exam_type",
+                    models.CharField(
+                        choices=[
+                            ("quiz", "Quiz"),
+                            ("midterm", "Midterm"),
+                            ("final", "Final"),
+                        ],
+                        default="final",
+                        max_length=10,
+                    ),
+                ),
+                ("start_date", models.DateField()),
+                ("end_date", models.DateField(blank=True, null=True)),
+                (
+                    "results_computed_at",
+                    models.DateTimeField(blank=True, editable=False, null=True),
+                ),
+            ],
+            options={
+                "ordering": ["-start_date", "name"],
+                "indexes": [
+                    models.Index(fields=["term", "start_date"], name="exam_term_idx")
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="ExamSubject",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(blank=True, null=True)),
+                ("max_marks", models.PositiveSmallIntegerField(default=100)),
+                (
+                    "credits",
+                    models.DecimalField(
+                        decimal_places=1,
+                        default=1,
+                        help_text="Weight of the paper in the GPA",
+                        max_digits=4,
+                    ),
+                ),
+                (
+                    "exam",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="papers",
+                        to="school.exam",
+                    ),
+                ),
+                (
+                    "subject",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="exam_papers",
+                        to="school.subject",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Mark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "score",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=5, null=True
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "entered_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "paper",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="marks",
+                        to="school.examsubject",
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="marks",
+                        to="student.student",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ExamResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("student_class", models.CharField(max_length=50)),
+                ("total", models.FloatField()),
+                ("max_total", models.PositiveIntegerField()),
+                ("percentage", models.FloatField()),
+                ("gpa", models.FloatField()),
+                ("class_rank", models.PositiveIntegerField()),
+                ("class_size", models.PositiveIntegerField()),
+                (
+                    "percentile",
+                    models.FloatField(
+                        help_text="Share of the exam's students scoring lower"
+                    ),
+                ),
+                (
+                    "exam",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="results",
+                        to="school.exam",
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="exam_results",
+                        to="student.student",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["exam", "student_class", "class_rank"],
+                        name="exam_result_rank_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("exam", "student"), name="exam_result_uniq"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="examsubject",
+            constraint=models.UniqueConstraint(
+                fields=("exam", "subject"), name="exam_subject_uniq"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="mark",
+            constraint=models.UniqueConstraint(
+                fields=("paper", "student"), name="mark_paper_student_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,184 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("school", "0011_library"),
+        ("student", "0002_student_department"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Hostel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+                (
+                    "gender",
+                    models.CharField(
+                        choices=[
+                            ("Male", "Male"),
+                            ("Female", "Female"),
+                            ("Others", "Others"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "warden",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="HostelApplication",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("applied_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "preferred_hostel",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="school.hostel",
+                    ),
+                ),
+                (
+                    "student",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="hostel_application",
+                        to="student.student",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["applied_at", "id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="HostelRoom",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("number", models.CharField(max_length=10)),
+                ("floor", models.PositiveSmallIntegerField(default=1)),
+                (
+                    "year_group",
+                    models.CharField(
+                        blank=True,
+                        help_text='Class the room is kept for, e.g. "Class X"; blank for any',
+                        max_length=50,
+                    ),
+                ),
+                (
+                    "is_available",
+                    models.BooleanField(
+                        default=True,
+                        help_text="Untick while the room is closed, e.g. for repairs",
+                    ),
+                ),
+                (
+                    "hostel",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rooms",
+                        to="school.hostel",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["hostel", "floor", "number"],
+            },
+        ),
+        migrations.CreateModel(
+            name="Bed",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("label", models.CharField(max_length=10)),
+                ("assigned_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "student",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="hostel_bed",
+                        to="student.student",
+                    ),
+                ),
+                (
+                    "room",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="beds",
+                        to="school.hostelroom",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["room", "label"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="hostelroom",
+            constraint=models.UniqueConstraint(
+                fields=("hostel", "number"), name="hostel_room_uniq"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="bed",
+            constraint=models.UniqueConstraint(
+                fields=("room", "label"), name="bed_label_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,157 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("school", "0012_hostel"),
+        ("student", "0002_student_department"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Bus",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("registration", models.CharField(max_length=20, unique=True)),
+                (
+                    "capacity",
+                    models.PositiveSmallIntegerField(
+                        default=40, help_text="Seats for students"
+                    ),
+                ),
+                ("driver_name", models.CharField(blank=True, max_length=100)),
+                ("driver_phone", models.CharField(blank=True, max_length=15)),
+                (
+                    "is_active",
+                    models.BooleanField(
+                        default=True, help_text="Untick while the bus is off the road"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "buses",
+                "ordering": ["registration"],
+            },
+        ),
+        migrations.CreateModel(
+            name="Route",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50)),
+                ("distance_km", models.FloatField(default=0)),
+                (
+                    "ride_minutes",
+                    models.FloatField(
+                        default=0, help_text="From the first pickup to school"
+                    ),
+                ),
+                ("rider_count", models.PositiveIntegerField(default=0)),
+                ("planned_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "bus",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="route",
+                        to="school.bus",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="Stop",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sequence", models.PositiveSmallIntegerField(default=0)),
+                ("name", models.CharField(blank=True, max_length=100)),
+                ("latitude", models.FloatField()),
+                ("longitude", models.FloatField()),
+                ("minutes_to_school", models.FloatField(default=0)),
+                ("rider_count", models.PositiveIntegerField(default=0)),
+                (
+                    "route",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="stops",
+                        to="school.route",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["route", "sequence"],
+            },
+        ),
+        migrations.CreateModel(
+            name="Rider",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("latitude", models.FloatField()),
+                ("longitude", models.FloatField()),
+                (
+                    "registered_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "student",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transport",
+                        to="student.student",
+                    ),
+                ),
+                (
+                    "stop",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="riders",
+                        to="school.stop",
+                    ),
+                ),
+            ],
+        ),
+    ]
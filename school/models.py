@@ -1,8 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
 import uuid
 
+GENDER_CHOICES = [("Male", "Male"), ("Female", "Female"), ("Others", "Others")]
+
 
 class Notification(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -11,6 +15,11 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "is_read", "created_at"], name="notification_unread_idx"),
+        ]
+
     def __str__(self):
         return self.message
 
@@ -20,14 +29,17 @@ class Teacher(models.Model):
     last_name = models.CharField(max_length=100)
     email = models.EmailField(max_length=255, unique=True)
     mobile = models.CharField(max_length=15)
-    gender = models.CharField(
-        max_length=10, choices=[("Male", "Male"), ("Female", "Female"), ("Others", "Others")]
-    )
+    gender = models.CharField(max_length=10, choices=GENDER_CHOICES)
     date_of_birth = models.DateField()
     address = models.TextField()
     joining_date = models.DateField()
     teacher_image = models.ImageField(upload_to="teachers/", blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["last_name", "first_name", "id"], name="teacher_directory_idx"),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
@@ -65,6 +77,12 @@ class Fee(models.Model):
     due_date = models.DateField()
     paid = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["paid", "due_date"], name="fee_paid_due_idx"),
+            models.Index(fields=["student", "due_date"], name="fee_student_due_idx"),
+        ]
+
     def __str__(self):
         return f"Fee for {self.student} - {self.amount}"
 
@@ -110,14 +128,630 @@ class Holiday(models.Model):
         """Check if holiday is upcoming"""
         from django.utils import timezone
 
-        return self.date >= timezone.now().date()
+        return self.date >= timezone.localdate()
 
     @property
     def days_until(self):
-        """Calculate days until holiday"""
+        """Calculate days until holiday
+
+        For lists use ``academic_calendar.upcoming_holidays``, which computes
+        today's date once instead of once per row.
+        """
         from django.utils import timezone
 
-        if self.is_upcoming:
-            delta = self.date - timezone.now().date()
-            return delta.days
-        return None
+        days = (self.date - timezone.localdate()).days
+        return days if days >= 0 else None
+
+
+class Room(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    capacity = models.PositiveIntegerField(default=40)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class Period(models.Model):
+    DAYS_OF_WEEK = [
+        (0, "Monday"),
+        (1, "Tuesday"),
+        (2, "Wednesday"),
+        (3, "Thursday"),
+        (4, "Friday"),
+        (5, "Saturday"),
+        (6, "Sunday"),
+    ]
+
+    day_of_week = models.PositiveSmallIntegerField(choices=DAYS_OF_WEEK)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    class Meta:
+        ordering = ["day_of_week", "start_time"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day_of_week", "start_time"], name="period_day_start_uniq"
+            ),
+            models.CheckConstraint(
+                condition=models.Q(end_time__gt=models.F("start_time")),
+                name="period_ends_after_start",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_day_of_week_display()} {self.start_time:%H:%M}-{self.end_time:%H:%M}"
+
+
+class Assignment(models.Model):
+    """One weekly lesson: a class is taught a subject by a teacher in a room"""
+
+    period = models.ForeignKey(Period, on_delete=models.CASCADE)
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE)
+    room = models.ForeignKey(Room, on_delete=models.CASCADE)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    student_class = models.CharField(max_length=50)
+
+    class Meta:
+        ordering = ["period"]
+        constraints = [
+            models.UniqueConstraint(fields=["period", "teacher"], name="assignment_teacher_uniq"),
+            models.UniqueConstraint(fields=["period", "room"], name="assignment_room_uniq"),
+            models.UniqueConstraint(
+                fields=["period", "student_class"], name="assignment_class_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["student_class", "period"], name="assignment_class_idx"),
+            models.Index(fields=["teacher", "period"], name="assignment_teacher_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.student_class}: {self.subject} with {self.teacher} ({self.period})"
+
+    def clean(self):
+        from .timetable import find_conflicts
+
+        if not (self.period_id and self.teacher_id and self.room_id and self.student_class):
+            return
+        conflicts = find_conflicts(self)
+        if conflicts:
+            kinds = sorted({kind for kind, _other in conflicts})
+            raise ValidationError(
+                f"This period overlaps another lesson of the same {', '.join(kinds)}"
+            )
+
+
+class AttendanceSheet(models.Model):
+    """Attendance of one class on one day, for a subject or the daily roll call
+
+    ``roster`` holds the class's student ids as little-endian uint32 and
+    ``present`` one bit per roster entry (most significant bit first), so a
+    class-day is a single row however many students or lessons it covers.
+    """
+
+    student_class = models.CharField(max_length=50)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, null=True, blank=True)
+    date = models.DateField()
+    roster = models.BinaryField()
+    present = models.BinaryField()
+    present_count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    marked_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["date", "student_class"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student_class", "subject", "date"], name="attendance_sheet_uniq"
+            ),
+            models.UniqueConstraint(
+                fields=["student_class", "date"],
+                condition=models.Q(subject__isnull=True),
+                name="attendance_roll_call_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["student_class", "date"], name="attendance_class_date_idx"),
+            models.Index(fields=["date"], name="attendance_date_idx"),
+        ]
+
+    def __str__(self):
+        subject = self.subject or "roll call"
+        return f"{self.student_class} {self.date} ({subject}): {self.present_count}/{self.total}"
+
+
+class AttendanceRollup(models.Model):
+    """Per-student monthly totals, kept current as sheets are marked"""
+
+    student = models.ForeignKey(
+        "student.Student", on_delete=models.CASCADE, related_name="attendance_rollups"
+    )
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, null=True, blank=True)
+    month = models.DateField(help_text="First day of the month")
+    sessions = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "subject", "month"], name="attendance_rollup_uniq"
+            ),
+            models.UniqueConstraint(
+                fields=["student", "month"],
+                condition=models.Q(subject__isnull=True),
+                name="attendance_rollup_roll_call_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["month", "student"], name="attendance_rollup_month_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.student} {self.month:%Y-%m}: {self.present}/{self.sessions}"
+
+
+class SearchEntry(models.Model):
+    """Denormalised text of one searchable record, indexed by ``school.search``
+
+    On SQLite the ``school_searchentry_fts`` FTS5 table mirrors these rows
+    through triggers; on PostgreSQL a GIN index covers their tsvector.
+    """
+
+    kind = models.CharField(max_length=20)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    url = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="search_entry_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.title}"
+
+
+class MessageThread(models.Model):
+    """A conversation; the last-message fields are copied here for the inbox"""
+
+    subject = models.CharField(max_length=255)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="started_threads",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_seq = models.PositiveIntegerField(default=0, help_text="Number of messages")
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_message_sender = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="+"
+    )
+    last_message_preview = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_by", "last_message_at", "id"], name="thread_sent_idx"),
+        ]
+
+    def __str__(self):
+        return self.subject
+
+
+class Message(models.Model):
+    thread = models.ForeignKey(MessageThread, on_delete=models.CASCADE, related_name="messages")
+    sender = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="+"
+    )
+    seq = models.PositiveIntegerField(help_text="Position in the thread, from 1")
+    body = models.TextField()
+    # not auto_now_add: a batch send stamps every copy and its thread alike
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["thread", "seq"], name="message_thread_seq_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.thread} #{self.seq}"
+
+
+class ThreadParticipant(models.Model):
+    """A user's membership of a thread and their read cursor
+
+    ``last_seq`` and ``last_message_at`` mirror the thread so the inbox is one
+    index range over a user's rows and the unread count of a thread is
+    ``last_seq - read_seq`` without touching its messages.
+    """
+
+    thread = models.ForeignKey(
+        MessageThread, on_delete=models.CASCADE, related_name="participants"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="thread_memberships"
+    )
+    read_seq = models.PositiveIntegerField(default=0, help_text="Last message read")
+    last_seq = models.PositiveIntegerField(default=0)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["thread", "user"], name="thread_participant_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "last_message_at", "id"], name="thread_inbox_idx"),
+        ]
+
+    @property
+    def unread(self):
+        return self.last_seq - self.read_seq
+
+    def __str__(self):
+        return f"{self.user} in {self.thread}"
+
+
+class Exam(models.Model):
+    """One examination sitting of a term, e.g. the Term 1 finals"""
+
+    EXAM_TYPES = [
+        ("quiz", "Quiz"),
+        ("midterm", "Midterm"),
+        ("final", "Final"),
+    ]
+
+    name = models.CharField(max_length=100)
+    term = models.CharField(max_length=20, help_text='e.g. "2025-T1"')
+    exam_type = models.CharField(max_length=10, choices=EXAM_TYPES, default="final")
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)
+    results_computed_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ["-start_date", "name"]
+        indexes = [
+            models.Index(fields=["term", "start_date"], name="exam_term_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.term})"
+
+
+class ExamSubject(models.Model):
+    """A subject paper of an exam"""
+
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name="papers")
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name="exam_papers")
+    date = models.DateField(null=True, blank=True)
+    max_marks = models.PositiveSmallIntegerField(default=100)
+    credits = models.DecimalField(
+        max_digits=4, decimal_places=1, default=1, help_text="Weight of the paper in the GPA"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["exam", "subject"], name="exam_subject_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.exam.name}: {self.subject.name}"
+
+
+class Mark(models.Model):
+    """A student's score on one paper; no score means absent"""
+
+    paper = models.ForeignKey(ExamSubject, on_delete=models.CASCADE, related_name="marks")
+    student = models.ForeignKey("student.Student", on_delete=models.CASCADE, related_name="marks")
+    score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    entered_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["paper", "student"], name="mark_paper_student_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.student} {self.paper}: {self.score if self.score is not None else 'absent'}"
+
+
+class ExamResult(models.Model):
+    """A student's computed standing in an exam, written by ``school.exams.compute_results``"""
+
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name="results")
+    student = models.ForeignKey(
+        "student.Student", on_delete=models.CASCADE, related_name="exam_results"
+    )
+    student_class = models.CharField(max_length=50)
+    total = models.FloatField()
+    max_total = models.PositiveIntegerField()
+    percentage = models.FloatField()
+    gpa = models.FloatField()
+    class_rank = models.PositiveIntegerField()
+    class_size = models.PositiveIntegerField()
+    percentile = models.FloatField(help_text="Share of the exam's students scoring lower")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["exam", "student"], name="exam_result_uniq"),
+        ]
+        indexes = [
+            models.Index(
+                fields=["exam", "student_class", "class_rank"], name="exam_result_rank_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.student} {self.exam}: {self.percentage:.1f}%"
+
+
+class Book(models.Model):
+    """A catalogue title; its circulating copies are :class:`Copy` rows
+
+    ``copies_total``, ``copies_available`` and ``loans_total`` are counters kept
+    by ``school.library`` so availability never needs a COUNT over copies.
+    """
+
+    isbn = models.CharField(max_length=13, unique=True, help_text="Digits only (ISBN-10 or 13)")
+    title = models.CharField(max_length=255)
+    title_key = models.CharField(max_length=255, editable=False)
+    author = models.CharField(max_length=255, blank=True)
+    category = models.CharField(max_length=50, blank=True)
+    language = models.CharField(max_length=30, blank=True)
+    published_year = models.PositiveSmallIntegerField(null=True, blank=True)
+    shelf = models.CharField(max_length=20, blank=True)
+    copies_total = models.PositiveIntegerField(default=0, editable=False)
+    copies_available = models.PositiveIntegerField(default=0, editable=False)
+    loans_total = models.PositiveIntegerField(default=0, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["title_key", "id"]
+        indexes = [
+            # prefix search on the normalised title; varchar_pattern_ops lets
+            # PostgreSQL use it for LIKE 'abc%' under any collation
+            models.Index(
+                fields=["title_key"], name="book_title_key_idx", opclasses=["varchar_pattern_ops"]
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        from .library import normalize_title
+
+        self.title_key = normalize_title(self.title)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.title
+
+
+class Copy(models.Model):
+    """One physical copy of a book, identified by its barcode"""
+
+    AVAILABLE, ON_LOAN, LOST, WITHDRAWN = "available", "on_loan", "lost", "withdrawn"
+    STATUSES = [
+        (AVAILABLE, "Available"),
+        (ON_LOAN, "On loan"),
+        (LOST, "Lost"),
+        (WITHDRAWN, "Withdrawn"),
+    ]
+
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="copies")
+    barcode = models.CharField(max_length=32, unique=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=AVAILABLE)
+    acquired_on = models.DateField(default=timezone.localdate)
+
+    class Meta:
+        verbose_name_plural = "copies"
+
+    def __str__(self):
+        return f"{self.barcode} ({self.book})"
+
+
+class Loan(models.Model):
+    """A copy lent to a user; open until ``returned_at`` is set"""
+
+    copy = models.ForeignKey(Copy, on_delete=models.CASCADE, related_name="loans")
+    borrower = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="library_loans"
+    )
+    issued_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    issued_at = models.DateTimeField(default=timezone.now)
+    due_date = models.DateField()
+    returned_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["copy"],
+                condition=models.Q(returned_at__isnull=True),
+                name="loan_open_copy_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["due_date", "returned_at"], name="loan_overdue_idx"),
+            models.Index(fields=["borrower", "returned_at"], name="loan_borrower_idx"),
+        ]
+
+    @property
+    def is_open(self):
+        return self.returned_at is None
+
+    def days_overdue(self, today=None):
+        today = today or timezone.localdate()
+        end = timezone.localdate(self.returned_at) if self.returned_at else today
+        return max((end - self.due_date).days, 0)
+
+    def __str__(self):
+        return f"{self.copy.barcode} to {self.borrower}"
+
+
+class Hostel(models.Model):
+    """A residence hall; all of its beds go to students of one gender"""
+
+    name = models.CharField(max_length=100, unique=True)
+    gender = models.CharField(max_length=10, choices=GENDER_CHOICES)
+    warden = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class HostelRoom(models.Model):
+    hostel = models.ForeignKey(Hostel, on_delete=models.CASCADE, related_name="rooms")
+    number = models.CharField(max_length=10)
+    floor = models.PositiveSmallIntegerField(default=1)
+    year_group = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text='Class the room is kept for, e.g. "Class X"; blank for any',
+    )
+    is_available = models.BooleanField(
+        default=True, help_text="Untick while the room is closed, e.g. for repairs"
+    )
+
+    class Meta:
+        ordering = ["hostel", "floor", "number"]
+        constraints = [
+            models.UniqueConstraint(fields=["hostel", "number"], name="hostel_room_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.hostel} {self.number}"
+
+
+class Bed(models.Model):
+    """One bed of a hostel room; ``student`` is set by ``school.hostel.allocate_beds``"""
+
+    room = models.ForeignKey(HostelRoom, on_delete=models.CASCADE, related_name="beds")
+    label = models.CharField(max_length=10)
+    student = models.OneToOneField(
+        "student.Student",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="hostel_bed",
+    )
+    assigned_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["room", "label"]
+        constraints = [
+            models.UniqueConstraint(fields=["room", "label"], name="bed_label_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.room} bed {self.label}"
+
+
+class HostelApplication(models.Model):
+    """A student's request for a bed; earlier applicants are placed first"""
+
+    student = models.OneToOneField(
+        "student.Student", on_delete=models.CASCADE, related_name="hostel_application"
+    )
+    preferred_hostel = models.ForeignKey(
+        Hostel, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    applied_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["applied_at", "id"]
+
+    def __str__(self):
+        return f"{self.student} ({self.applied_at:%d %b %Y})"
+
+
+class Bus(models.Model):
+    registration = models.CharField(max_length=20, unique=True)
+    capacity = models.PositiveSmallIntegerField(default=40, help_text="Seats for students")
+    driver_name = models.CharField(max_length=100, blank=True)
+    driver_phone = models.CharField(max_length=15, blank=True)
+    is_active = models.BooleanField(default=True, help_text="Untick while the bus is off the road")
+
+    class Meta:
+        ordering = ["registration"]
+        verbose_name_plural = "buses"
+
+    def __str__(self):
+        return self.registration
+
+
+class Route(models.Model):
+    """A bus's morning run to school, written by ``school.transport.plan_routes``"""
+
+    name = models.CharField(max_length=50)
+    bus = models.OneToOneField(
+        Bus, on_delete=models.SET_NULL, null=True, blank=True, related_name="route"
+    )
+    distance_km = models.FloatField(default=0)
+    ride_minutes = models.FloatField(default=0, help_text="From the first pickup to school")
+    rider_count = models.PositiveIntegerField(default=0)
+    planned_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class Stop(models.Model):
+    """A pickup point; stops without a route are too far from school for any bus"""
+
+    route = models.ForeignKey(
+        Route, on_delete=models.SET_NULL, null=True, blank=True, related_name="stops"
+    )
+    sequence = models.PositiveSmallIntegerField(default=0)
+    name = models.CharField(max_length=100, blank=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    minutes_to_school = models.FloatField(default=0)
+    rider_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["route", "sequence"]
+
+    def __str__(self):
+        return self.name or f"Stop {self.pk}"
+
+
+class Rider(models.Model):
+    """A student who takes the bus from home"""
+
+    student = models.OneToOneField(
+        "student.Student", on_delete=models.CASCADE, related_name="transport"
+    )
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    stop = models.ForeignKey(
+        Stop, on_delete=models.SET_NULL, null=True, blank=True, related_name="riders"
+    )
+    registered_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return str(self.student)
@@ -0,0 +1,233 @@
+"""Notification helpers: cached per-user unread counters, bulk fan-out and live push."""
+
+import json
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from .broker import get_broker
+from .models import Notification
+
+BROADCAST_CHUNK_SIZE = 1000
+# notifications replayed to a stream that reconnects with Last-Event-ID
+STREAM_REPLAY_LIMIT = 50
+# milliseconds an EventSource waits before reconnecting
+STREAM_RETRY = 5000
+
+ROLE_FIELDS = {
+    "admin": "is_admin",
+    "teacher": "is_teacher",
+    "student": "is_student",
+}
+
+UNREAD_COUNT_KEY = "notifications:unread:{user_id}"
+
+
+def _unread_key(user_id):
+    return UNREAD_COUNT_KEY.format(user_id=user_id)
+
+
+def _count_timeout():
+    return getattr(settings, "NOTIFICATION_COUNT_CACHE_TIMEOUT", 300)
+
+
+def get_unread_count(user):
+    """Return the unread notification count for a user, hitting the DB only on a cache miss"""
+    if not user.is_authenticated:
+        return 0
+
+    key = _unread_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user=user, is_read=False).count()
+        cache.set(key, count, _count_timeout())
+    return count
+
+
+async def aget_unread_count(user):
+    """Async get_unread_count for async views (the user must already be loaded)"""
+    if not user.is_authenticated:
+        return 0
+
+    key = _unread_key(user.pk)
+    count = await cache.aget(key)
+    if count is None:
+        count = await Notification.objects.filter(user=user, is_read=False).acount()
+        await cache.aset(key, count, _count_timeout())
+    return count
+
+
+def increment_unread_count(user_id, delta=1):
+    """Bump a cached counter in place; a missing key is rebuilt on the next read"""
+    try:
+        cache.incr(_unread_key(user_id), delta)
+    except ValueError:
+        pass
+
+
+def increment_unread_counts(user_ids, delta=1):
+    """Bump the cached counters of many users, skipping the ones not cached yet"""
+    keys = {_unread_key(user_id): user_id for user_id in user_ids}
+    cached = cache.get_many(keys)
+    if cached:
+        cache.set_many({key: count + delta for key, count in cached.items()}, _count_timeout())
+
+
+def reset_unread_count(user_id, count=0):
+    """Store a known unread count for a user (e.g. after marking everything as read)"""
+    cache.set(_unread_key(user_id), count, _count_timeout())
+
+
+async def areset_unread_count(user_id, count=0):
+    await cache.aset(_unread_key(user_id), count, _count_timeout())
+
+
+def forget_unread_count(user_id):
+    """Drop a cached counter so the next read recomputes it"""
+    cache.delete(_unread_key(user_id))
+
+
+def create_notification(user, message):
+    """Create a single notification; the counter is kept in sync by the post_save signal"""
+    return Notification.objects.create(user=user, message=message)
+
+
+def _flush(batch):
+    Notification.objects.bulk_create(batch)
+    user_ids = [notification.user_id for notification in batch]
+    transaction.on_commit(lambda: increment_unread_counts(user_ids))
+    transaction.on_commit(lambda: publish_notifications(batch))
+    return len(batch)
+
+
+def notify_users(messages, chunk_size=BROADCAST_CHUNK_SIZE):
+    """Create a notification per ``(user_id, message)`` pair using chunked bulk inserts
+
+    Returns the number of notifications created.
+    """
+    total = 0
+    batch = []
+    with transaction.atomic():
+        for user_id, message in messages:
+            batch.append(Notification(id=uuid.uuid4(), user_id=user_id, message=message))
+            if len(batch) >= chunk_size:
+                total += _flush(batch)
+                batch = []
+        if batch:
+            total += _flush(batch)
+    return total
+
+
+def broadcast(user_ids, message, chunk_size=BROADCAST_CHUNK_SIZE):
+    """Create one notification per user id using chunked bulk inserts
+
+    ``user_ids`` may be any iterable of primary keys, including a streaming
+    ``values_list(...).iterator()``, so no user objects are materialised. Returns
+    the number of notifications created.
+    """
+    return notify_users(((user_id, message) for user_id in user_ids), chunk_size)
+
+
+def broadcast_to_queryset(users, message, chunk_size=BROADCAST_CHUNK_SIZE):
+    """Broadcast to every user in a ``CustomUser`` queryset, streaming only the ids"""
+    user_ids = users.order_by().values_list("pk", flat=True).iterator(chunk_size=chunk_size)
+    return broadcast(user_ids, message, chunk_size=chunk_size)
+
+
+def broadcast_to_role(role, message, chunk_size=BROADCAST_CHUNK_SIZE):
+    """Broadcast to every active user with a role ("admin", "teacher" or "student")"""
+    try:
+        field = ROLE_FIELDS[role]
+    except KeyError:
+        raise ValueError(f"Unknown role '{role}'. Expected one of: {', '.join(ROLE_FIELDS)}")
+
+    users = get_user_model().objects.filter(is_active=True, **{field: True})
+    return broadcast_to_queryset(users, message, chunk_size=chunk_size)
+
+
+def broadcast_to_users(users, message, chunk_size=BROADCAST_CHUNK_SIZE):
+    """Broadcast to an explicit list of users or user ids"""
+    user_ids = (getattr(user, "pk", user) for user in users)
+    return broadcast(user_ids, message, chunk_size=chunk_size)
+
+
+def broadcast_to_department(department, message, chunk_size=BROADCAST_CHUNK_SIZE):
+    """Broadcast to the active user accounts of every student in a department"""
+    users = get_user_model().objects.filter(
+        is_active=True, student_profile__department=department
+    )
+    return broadcast_to_queryset(users, message, chunk_size=chunk_size)
+
+
+def notification_channel(user_id):
+    return f"notifications:{user_id}"
+
+
+def notification_event(notification):
+    return {
+        "id": str(notification.pk),
+        "message": notification.message,
+        "created_at": notification.created_at.isoformat(),
+    }
+
+
+def publish_notifications(notifications):
+    """Push notifications to their users' open streams (call once they are committed)"""
+    get_broker().publish_many(
+        (notification_channel(notification.user_id), notification_event(notification))
+        for notification in notifications
+    )
+
+
+def missed_notifications(user_id, last_event_id):
+    """Unread notifications created after ``last_event_id``, for a reconnecting stream"""
+    try:
+        last_event_id = uuid.UUID(last_event_id)
+    except (TypeError, ValueError):
+        return []
+    seen = Notification.objects.filter(pk=last_event_id, user_id=user_id).values("created_at")
+    missed = (
+        Notification.objects.filter(user_id=user_id, is_read=False, created_at__gte=seen)
+        .exclude(pk=last_event_id)
+        .order_by("created_at")[:STREAM_REPLAY_LIMIT]
+    )
+    return [notification_event(notification) for notification in missed]
+
+
+def _stream_keepalive():
+    return getattr(settings, "NOTIFICATION_STREAM_KEEPALIVE", 15)
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: notification\ndata: {json.dumps(event)}\n\n"
+
+
+async def notification_events(channel, replay=None, keepalive=None):
+    """Server-sent event stream of ``channel``, starting with the events ``replay`` returns
+
+    The subscription is opened when the stream starts, before the awaitable
+    ``replay()`` looks up missed events, so nothing committed in between is
+    lost; a stream that is never iterated holds no subscription. Waiting for
+    the next event is the only work done per connection; a comment line every
+    ``keepalive`` seconds (NOTIFICATION_STREAM_KEEPALIVE) keeps proxies from
+    closing an idle stream. The subscription is closed when the client goes away.
+    """
+    keepalive = _stream_keepalive() if keepalive is None else keepalive
+    subscription = get_broker().subscribe(channel)
+    try:
+        yield f"retry: {STREAM_RETRY}\n\n"
+        missed = await replay() if replay else []
+        replayed = {event["id"] for event in missed}
+        for event in missed:
+            yield format_event(event)
+        while True:
+            event = await subscription.get(keepalive)
+            if event is None:
+                yield ": keepalive\n\n"
+            elif event["id"] not in replayed:
+                yield format_event(event)
+    finally:
+        subscription.close()
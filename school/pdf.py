@@ -0,0 +1,139 @@
+"""A small PDF writer for text documents such as report cards.
+
+Pages are A4 and set in the standard PDF fonts that every viewer ships, so
+nothing is embedded, no network or external tool is involved and only the
+standard library is needed. Input is plain text with a line markup:
+
+- ``# Title`` and ``## Heading`` lines are set in bold;
+- ``---`` draws a horizontal rule;
+- any other line is set in Courier, so columns padded with spaces line up;
+- runs of blank lines collapse into one half-line gap.
+"""
+
+import zlib
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 50
+
+FONTS = {"F1": "Helvetica-Bold", "F2": "Courier"}
+# style: (font, size, line height)
+STYLES = {
+    "title": ("F1", 16, 24),
+    "heading": ("F1", 12, 20),
+    "body": ("F2", 10, 13),
+}
+RULE_HEIGHT = 8
+BLANK_HEIGHT = 7
+
+
+def _escape(text):
+    data = text.encode("cp1252", "replace")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def parse(text):
+    """``(style, text)`` for each line of marked-up text"""
+    lines = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if line.startswith("## "):
+            lines.append(("heading", line[3:]))
+        elif line.startswith("# "):
+            lines.append(("title", line[2:]))
+        elif line == "---":
+            lines.append(("rule", ""))
+        elif line:
+            lines.append(("body", line))
+        elif lines and lines[-1][0] != "blank":
+            lines.append(("blank", ""))
+    return lines
+
+
+def _height(style):
+    if style == "rule":
+        return RULE_HEIGHT
+    if style == "blank":
+        return BLANK_HEIGHT
+    return STYLES[style][2]
+
+
+def _pages(lines):
+    """Content stream of each page, breaking when a line no longer fits"""
+    pages, ops = [], []
+    y = PAGE_HEIGHT - MARGIN
+    for style, text in lines:
+        height = _height(style)
+        if y - height < MARGIN and ops:
+            pages.append(b"\n".join(ops))
+            ops, y = [], PAGE_HEIGHT - MARGIN
+            if style == "blank":
+                continue
+        y -= height
+        if style == "rule":
+            middle = y + height / 2
+            ops.append(
+                b"0.5 w %d %.1f m %d %.1f l S" % (MARGIN, middle, PAGE_WIDTH - MARGIN, middle)
+            )
+        elif style != "blank":
+            font, size, _line_height = STYLES[style]
+            ops.append(
+                b"BT /%s %d Tf %d %.1f Td (%s) Tj ET"
+                % (font.encode(), size, MARGIN, y + (height - size) / 2, _escape(text))
+            )
+    pages.append(b"\n".join(ops))
+    return pages
+
+
+def render(text, title=""):
+    """The PDF document for marked-up ``text`` as bytes"""
+    objects = []
+
+    def add(body=None):
+        objects.append(body)
+        return len(objects)
+
+    catalog, pages = add(), add()
+    fonts = {
+        name: add(
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>"
+            % (base.encode())
+        )
+        for name, base in FONTS.items()
+    }
+    resources = b"<< /Font << %s >> >>" % b" ".join(
+        b"/%s %d 0 R" % (name.encode(), ref) for name, ref in fonts.items()
+    )
+    kids = []
+    for content in _pages(parse(text)):
+        data = zlib.compress(content)
+        stream = add(
+            b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(data), data)
+        )
+        kids.append(
+            add(
+                b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources %s"
+                b" /Contents %d 0 R >>" % (pages, PAGE_WIDTH, PAGE_HEIGHT, resources, stream)
+            )
+        )
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages
+    objects[pages - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids),
+        len(kids),
+    )
+    info = add(b"<< /Title (%s) /Producer (Smart Campus) >>" % _escape(title))
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        catalog,
+        info,
+        xref,
+    )
+    return bytes(out)
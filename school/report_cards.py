@@ -0,0 +1,330 @@
+"""End-of-term report cards: one PDF per student, rendered in a process pool.
+
+:func:`generate_report_cards` reads a term's results and marks in two
+queries and hands plain-dict contexts to worker processes. Each worker
+renders the shared ``exams/report_card.txt`` template and typesets it with
+:mod:`school.pdf`. Finished documents are streamed into the zip archive as
+they arrive.
+
+A run is resumable. Every finished PDF is also kept under
+``<archive>.parts/`` next to a ``progress.jsonl`` journal. A rerun after a
+crash renders only the missing cards and then re-streams the archive. The
+journal also records the term's result computation times, so cards are
+rendered afresh once results have been recomputed.
+"""
+
+import json
+import os
+import shutil
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connections
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .exams import grade_for
+from .models import Exam, ExamResult, Mark
+from .pdf import render
+
+TEMPLATE_NAME = "exams/report_card.txt"
+BATCH_SIZE = 20  # cards per worker task
+JOURNAL_NAME = "progress.jsonl"
+
+_template = None
+
+
+class ReportCardError(ValueError):
+    """Report cards cannot be generated as requested"""
+
+
+def report_card_workers():
+    """Worker processes: ``REPORT_CARD_WORKERS`` or one per CPU"""
+    return getattr(settings, "REPORT_CARD_WORKERS", None) or os.cpu_count() or 1
+
+
+def card_name(student_class, student_slug):
+    """Archive path of a card, grouped by class and named by the student's unique slug"""
+    return f"{slugify(student_class) or 'unassigned'}/{student_slug}.pdf"
+
+
+def _score(score):
+    return "AB" if score is None else f"{float(score):g}"
+
+
+def _grade(score, max_marks):
+    if score is None:
+        return "-"
+    # a paper out of 0 scores 0%, as in exams.compute_results
+    return grade_for(float(score) * 100 / max_marks if max_marks else 0)[0]
+
+
+def report_card_contexts(term):
+    """Yield ``(name, context)`` for every student with results in ``term``
+
+    Contexts hold only strings and numbers so they can be sent to worker
+    processes.
+    """
+    papers = {}
+    marks = (
+        Mark.objects.filter(paper__exam__term=term)
+        .order_by("paper__subject__name")
+        .values_list(
+            "student_id", "paper__exam_id", "paper__subject__name", "paper__max_marks", "score"
+        )
+    )
+    for student_id, exam_id, subject, max_marks, score in marks.iterator(chunk_size=5000):
+        papers.setdefault((student_id, exam_id), []).append(
+            {
+                "subject": subject,
+                "score": _score(score),
+                "max_marks": max_marks,
+                "grade": _grade(score, max_marks),
+            }
+        )
+
+    results = (
+        ExamResult.objects.filter(exam__term=term)
+        .select_related("student", "exam")
+        .order_by("student_class", "student__last_name", "student_id", "exam__start_date")
+    )
+    school = getattr(settings, "SCHOOL_NAME", "Smart Campus")
+    generated_on = timezone.localdate().isoformat()
+    current = None
+    for result in results.iterator(chunk_size=2000):
+        if current is None or current[0] != result.student_id:
+            if current is not None:
+                yield current[1], current[2]
+            student = result.student
+            current = (
+                result.student_id,
+                card_name(result.student_class, student.slug or student.pk),
+                {
+                    "school": school,
+                    "term": term,
+                    "generated_on": generated_on,
+                    "student": {
+                        "name": f"{student.first_name} {student.last_name}",
+                        "student_id": student.student_id,
+                        "student_class": result.student_class,
+                        "section": student.section,
+                    },
+                    "exams": [],
+                },
+            )
+        current[2]["exams"].append(
+            {
+                "name": result.exam.name,
+                "type": result.exam.get_exam_type_display(),
+                "papers": papers.get((result.student_id, result.exam_id), []),
+                "total": f"{result.total:g}",
+                "max_total": result.max_total,
+                "percentage": f"{result.percentage:.1f}",
+                "gpa": f"{result.gpa:.2f}",
+                "class_rank": result.class_rank,
+                "class_size": result.class_size,
+                "percentile": f"{result.percentile:.1f}",
+            }
+        )
+    if current is not None:
+        yield current[1], current[2]
+
+
+def render_card(context):
+    """PDF bytes of one report card"""
+    global _template
+    if _template is None:
+        _template = get_template(TEMPLATE_NAME)
+    student = context["student"]
+    return render(
+        _template.render(context), title=f"{student['name']} - {context['term']} report card"
+    )
+
+
+def _render_batch(batch):
+    """Worker task: ``[(name, pdf, seconds)]`` for ``[(name, context)]``"""
+    rendered = []
+    for name, context in batch:
+        started = time.perf_counter()
+        pdf = render_card(context)
+        rendered.append((name, pdf, time.perf_counter() - started))
+    return rendered
+
+
+def _init_worker():
+    # a spawned (rather than forked) worker starts without Django set up
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@dataclass
+class ReportCardRun:
+    """Outcome of :func:`generate_report_cards`"""
+
+    archive: str
+    total: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+    timings: dict = field(default_factory=dict)  # name: render seconds
+
+    @property
+    def rendered(self):
+        return len(self.timings)
+
+    def summary(self):
+        """Render-time statistics of the documents rendered in this run"""
+        times = sorted(self.timings.values())
+        stats = {
+            "documents": self.total,
+            "rendered": self.rendered,
+            "skipped": self.skipped,
+            "seconds": round(self.seconds, 3),
+            "per_second": round(self.rendered / self.seconds, 1) if self.seconds else 0.0,
+        }
+        if times:
+            stats.update(
+                mean_ms=round(sum(times) / len(times) * 1000, 2),
+                p50_ms=round(times[len(times) // 2] * 1000, 2),
+                p95_ms=round(times[min(len(times) - 1, int(len(times) * 0.95))] * 1000, 2),
+                max_ms=round(times[-1] * 1000, 2),
+                slowest=max(self.timings, key=self.timings.get),
+            )
+        return stats
+
+
+def _fingerprint(term):
+    return [
+        [pk, computed.isoformat() if computed else None]
+        for pk, computed in Exam.objects.filter(term=term)
+        .order_by("pk")
+        .values_list("pk", "results_computed_at")
+    ]
+
+
+def _load_journal(parts, header):
+    """Names already rendered by an interrupted run with the same ``header``"""
+    try:
+        with open(os.path.join(parts, JOURNAL_NAME), encoding="utf-8") as journal:
+            lines = journal.read().splitlines()
+    except FileNotFoundError:
+        return None
+    try:
+        if not lines or json.loads(lines[0]) != header:
+            return None
+    except ValueError:
+        return None
+    done = set()
+    for line in lines[1:]:
+        try:
+            name = json.loads(line)["name"]
+        except (ValueError, KeyError):
+            break  # torn final line
+        if os.path.exists(os.path.join(parts, name)):
+            done.add(name)
+    return done
+
+
+def _stage(parts, name, pdf):
+    path = os.path.join(parts, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        f.write(pdf)
+    os.replace(path + ".tmp", path)
+
+
+def generate_report_cards(
+    term,
+    archive,
+    workers=None,
+    restart=False,
+    keep_parts=False,
+    progress=None,
+    batch_size=BATCH_SIZE,
+):
+    """Render every report card of ``term`` into the zip file ``archive``
+
+    ``workers=0`` renders in this process. ``progress(done, total)`` is
+    called as cards finish. Cards left by an interrupted run are reused
+    unless ``restart`` is set. Returns a :class:`ReportCardRun`.
+    """
+    started = time.perf_counter()
+    if not Exam.objects.filter(term=term, results_computed_at__isnull=False).exists():
+        raise ReportCardError(f"No computed results for term '{term}'")
+
+    parts = f"{archive}.parts"
+    header = {"term": term, "exams": _fingerprint(term)}
+    done = None if restart else _load_journal(parts, header)
+    if done is None:
+        shutil.rmtree(parts, ignore_errors=True)
+        done = set()
+    os.makedirs(parts, exist_ok=True)
+    journal_mode = "a" if done else "w"
+
+    cards = list(report_card_contexts(term))
+    run = ReportCardRun(archive=archive, total=len(cards), skipped=len(done))
+    pending = [(name, context) for name, context in cards if name not in done]
+
+    workers = report_card_workers() if workers is None else workers
+    partial = f"{archive}.partial"
+    with (
+        open(os.path.join(parts, JOURNAL_NAME), journal_mode, encoding="utf-8") as journal,
+        zipfile.ZipFile(partial, "w", zipfile.ZIP_STORED) as zf,
+    ):
+        if journal_mode == "w":
+            journal.write(json.dumps(header) + "\n")
+        for name, _context in cards:
+            if name in done:
+                zf.write(os.path.join(parts, name), name)
+
+        def finish(rendered):
+            for name, pdf, seconds in rendered:
+                _stage(parts, name, pdf)
+                zf.writestr(name, pdf)
+                journal.write(json.dumps({"name": name, "ms": round(seconds * 1000, 2)}) + "\n")
+                run.timings[name] = seconds
+            journal.flush()
+            if progress:
+                progress(run.skipped + run.rendered, run.total)
+
+        if workers <= 0:
+            for batch in _batches(pending, batch_size):
+                finish(_render_batch(batch))
+        else:
+            # forked workers must not share this process's database sockets
+            for connection in connections.all(initialized_only=True):
+                if not connection.in_atomic_block:
+                    connection.close()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                in_flight = set()
+                for batch in _batches(pending, batch_size):
+                    in_flight.add(pool.submit(_render_batch, batch))
+                    if len(in_flight) >= workers * 4:
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            finish(future.result())
+                for future in wait(in_flight).done:
+                    finish(future.result())
+
+    os.replace(partial, archive)
+    if not keep_parts:
+        shutil.rmtree(parts, ignore_errors=True)
+    run.seconds = time.perf_counter() - started
+    return run
@@ -0,0 +1,92 @@
+"""Role resolution for the is_admin / is_teacher / is_student user flags.
+
+A user's roles are resolved once and memoised on the user object. Django loads
+``request.user`` once per request, so the views, decorators and templates of a
+request share one lookup.
+"""
+
+ROLE_FLAGS = (
+    ("admin", "is_admin"),
+    ("teacher", "is_teacher"),
+    ("student", "is_student"),
+)
+
+ROLE_LABELS = {
+    "admin": "Administrator",
+    "teacher": "Teacher",
+    "student": "Student",
+    "user": "User",
+}
+
+# permission -> roles granted it
+PERMISSIONS = {
+    "department.manage": frozenset({"admin"}),
+    "holiday.manage": frozenset({"admin"}),
+    "hostel.allocate": frozenset({"admin"}),
+    "library.circulate": frozenset({"admin", "teacher"}),
+    "message.broadcast": frozenset({"admin", "teacher"}),
+    "subject.add": frozenset({"admin", "teacher"}),
+    "subject.change": frozenset({"admin", "teacher"}),
+    "subject.delete": frozenset({"admin", "teacher"}),
+    "teacher.manage": frozenset({"admin"}),
+    "transport.plan": frozenset({"admin"}),
+}
+
+NO_ROLES = frozenset()
+_CACHE_ATTR = "_school_roles"
+
+# every combination of flags maps to one shared frozenset
+_ROLE_SETS = {}
+
+
+def _role_set(flags):
+    roles = _ROLE_SETS.get(flags)
+    if roles is None:
+        roles = _ROLE_SETS[flags] = frozenset(
+            role for (role, _attr), enabled in zip(ROLE_FLAGS, flags) if enabled
+        )
+    return roles
+
+
+def get_roles(user):
+    """Frozenset of the user's roles, computed once per user object"""
+    roles = getattr(user, _CACHE_ATTR, None)
+    if roles is not None:
+        return roles
+    if user is None or not user.is_authenticated:
+        return NO_ROLES
+    flags = tuple(bool(getattr(user, attr, False)) for _role, attr in ROLE_FLAGS)
+    roles = _role_set(flags)
+    setattr(user, _CACHE_ATTR, roles)
+    return roles
+
+
+def clear_roles(user):
+    """Forget memoised roles, e.g. after changing a user's role flags"""
+    if getattr(user, _CACHE_ATTR, None) is not None:
+        delattr(user, _CACHE_ATTR)
+
+
+def has_role(user, role):
+    return role in get_roles(user)
+
+
+def has_any_role(user, roles):
+    return not get_roles(user).isdisjoint(roles)
+
+
+def primary_role(user):
+    """The highest-ranked role (admin > teacher > student), or "user" """
+    roles = get_roles(user)
+    for role, _attr in ROLE_FLAGS:
+        if role in roles:
+            return role
+    return "user"
+
+
+def role_label(user):
+    return ROLE_LABELS[primary_role(user)]
+
+
+def has_permission(user, permission):
+    return has_any_role(user, PERMISSIONS.get(permission, NO_ROLES))
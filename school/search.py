@@ -0,0 +1,266 @@
+"""Global search over teachers, students, subjects, books and departments.
+
+Every searchable record has one :class:`~school.models.SearchEntry` row
+holding its display title and searchable text, kept current by the signals in
+``school.signals`` (and by the roster importer for bulk inserts). Queries go
+to an inverted index rather than scanning with ``icontains``:
+
+- SQLite: the ``school_searchentry_fts`` FTS5 table (external content, kept in
+  sync by triggers, with 2- and 3-character prefix indexes for typeahead);
+- PostgreSQL: a GIN index over the entries' weighted tsvector, queried with
+  ``to_tsquery`` prefix terms.
+
+Other databases, or a SQLite build without FTS5, fall back to ``icontains``.
+Every word of the query must match, each as a prefix of an indexed word.
+"""
+
+import re
+from dataclasses import dataclass
+
+from django.apps import apps
+from django.db import connection
+from django.db.models import Q
+from django.urls import reverse
+
+from .models import SearchEntry
+
+FTS_TABLE = "school_searchentry_fts"
+# must match the expression indexed by migration 0008_search
+PG_VECTOR = (
+    "setweight(to_tsvector('simple'::regconfig, title), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, body), 'B')"
+)
+INDEX_CHUNK_SIZE = 2000
+# BM25 column weights on SQLite: title hits count ten times body hits
+FTS_RANK = "bm25(10.0, 1.0, 0.0)"
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _join(*parts):
+    return " ".join(str(part) for part in parts if part)
+
+
+@dataclass(frozen=True)
+class Source:
+    """How one model is turned into search entries"""
+
+    model: str
+    label: str
+    select_related: tuple
+    title: object
+    body: object
+    url: object
+
+    def get_model(self):
+        return apps.get_model(self.model)
+
+    def queryset(self):
+        return self.get_model().objects.select_related(*self.select_related).order_by("pk")
+
+    def entry(self, kind, obj):
+        return SearchEntry(
+            kind=kind,
+            object_id=obj.pk,
+            title=self.title(obj)[:255],
+            body=self.body(obj),
+            url=self.url(obj),
+        )
+
+
+SOURCES = {
+    "teacher": Source(
+        "school.Teacher",
+        "Teacher",
+        (),
+        lambda t: _join(t.first_name, t.last_name),
+        lambda t: _join(t.email, t.mobile, t.address),
+        lambda t: reverse("teacher_details", args=[t.pk]),
+    ),
+    "student": Source(
+        "student.Student",
+        "Student",
+        ("parent",),
+        lambda s: _join(s.first_name, s.last_name),
+        lambda s: _join(
+            s.student_id,
+            s.student_class,
+            s.section,
+            s.admission_number,
+            s.parent.father_name,
+            s.parent.mother_name,
+        ),
+        lambda s: reverse("view_student", args=[s.student_id]),
+    ),
+    "subject": Source(
+        "school.Subject",
+        "Subject",
+        ("department",),
+        lambda s: s.name,
+        lambda s: _join(s.code, s.department.name),
+        lambda s: reverse("subject_list"),
+    ),
+    "book": Source(
+        "school.Book",
+        "Book",
+        (),
+        lambda b: b.title,
+        lambda b: _join(b.author, b.isbn, b.category),
+        lambda b: f"{reverse('library')}?q={b.isbn}",
+    ),
+    "department": Source(
+        "school.Department",
+        "Department",
+        (),
+        lambda d: d.name,
+        lambda d: d.description,
+        lambda d: reverse("department_detail", args=[d.pk]),
+    ),
+}
+
+
+def kind_of(model):
+    """Search kind of a model class, or None if it is not indexed"""
+    for kind, source in SOURCES.items():
+        if source.model == model._meta.label:
+            return kind
+    return None
+
+
+def index_object(kind, obj):
+    """Insert or refresh the entry of one record"""
+    entry = SOURCES[kind].entry(kind, obj)
+    SearchEntry.objects.update_or_create(
+        kind=kind,
+        object_id=obj.pk,
+        defaults={"title": entry.title, "body": entry.body, "url": entry.url},
+    )
+
+
+def index_objects(kind, objects):
+    """Upsert the entries of many records in one statement"""
+    source = SOURCES[kind]
+    entries = [source.entry(kind, obj) for obj in objects]
+    if entries:
+        SearchEntry.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=["kind", "object_id"],
+            update_fields=["title", "body", "url"],
+        )
+    return len(entries)
+
+
+def unindex_object(kind, pk):
+    SearchEntry.objects.filter(kind=kind, object_id=pk).delete()
+
+
+def rebuild(kinds=None, chunk_size=INDEX_CHUNK_SIZE):
+    """Recreate the entries of ``kinds`` (default: all) from their models; returns counts"""
+    counts = {}
+    for kind in kinds or SOURCES:
+        SearchEntry.objects.filter(kind=kind).delete()
+        batch, counts[kind] = [], 0
+        for obj in SOURCES[kind].queryset().iterator(chunk_size=chunk_size):
+            batch.append(obj)
+            if len(batch) >= chunk_size:
+                counts[kind] += index_objects(kind, batch)
+                batch = []
+        counts[kind] += index_objects(kind, batch)
+    if _fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return counts
+
+
+def terms(query):
+    """Lower-cased words of a query, at most eight"""
+    return [word.lower() for word in _WORD.findall(query or "")][:8]
+
+
+_fts = {}
+
+
+def _fts_available():
+    if connection.vendor != "sqlite":
+        return False
+    if connection.alias not in _fts:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+            _fts[connection.alias] = cursor.fetchone() is not None
+    return _fts[connection.alias]
+
+
+def _kind_filter(kinds, column):
+    if not kinds:
+        return "", []
+    return f" AND {column} IN ({', '.join(['%s'] * len(kinds))})", list(kinds)
+
+
+def _search_fts(words, kinds, limit):
+    # every word as a quoted prefix of a title or body word; quoting keeps FTS5
+    # operators inert, and kinds are matched on the index's kind column
+    match = "{title body} : (%s)" % " ".join(f'"{word}"*' for word in words)
+    if kinds:
+        match += " AND kind : (%s)" % " OR ".join(f'"{kind}"' for kind in kinds)
+    # ORDER BY rank with a LIMIT lets FTS5 score every match and keep only the
+    # best rows; "rank MATCH" sets the weights of that rank for this query
+    sql = (
+        f"SELECT rowid FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s AND rank MATCH %s ORDER BY rank LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, FTS_RANK, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _search_postgresql(words, kinds, limit):
+    query = " & ".join(f"{word}:*" for word in words)
+    kind_sql, kind_params = _kind_filter(kinds, "kind")
+    sql = (
+        f"SELECT id FROM school_searchentry, to_tsquery('simple', %s) query "
+        f"WHERE ({PG_VECTOR}) @@ query{kind_sql} "
+        f"ORDER BY ts_rank({PG_VECTOR}, query) DESC, id LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [query, *kind_params, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _search_scan(words, kinds, limit):
+    entries = SearchEntry.objects.all()
+    if kinds:
+        entries = entries.filter(kind__in=kinds)
+    for word in words:
+        entries = entries.filter(Q(title__icontains=word) | Q(body__icontains=word))
+    return list(entries.order_by("title", "id").values_list("id", flat=True)[:limit])
+
+
+def search(query, kinds=None, limit=DEFAULT_LIMIT):
+    """Entries matching every word of ``query`` as a prefix, best first"""
+    words = terms(query)
+    kinds = [kind for kind in (kinds or ()) if kind in SOURCES]
+    if not words:
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+    if _fts_available():
+        ids = _search_fts(words, kinds, limit)
+    elif connection.vendor == "postgresql":
+        ids = _search_postgresql(words, kinds, limit)
+    else:
+        ids = _search_scan(words, kinds, limit)
+    entries = SearchEntry.objects.in_bulk(ids)
+    return [entries[pk] for pk in ids if pk in entries]
+
+
+def as_json(entry):
+    return {
+        "kind": entry.kind,
+        "label": SOURCES[entry.kind].label,
+        "id": entry.object_id,
+        "title": entry.title,
+        "body": entry.body,
+        "url": entry.url,
+    }
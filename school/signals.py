@@ -0,0 +1,152 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import academic_calendar, search, timetable
+from .dashboard import FRAGMENT_DEPENDENCIES, invalidate_model
+from .models import Assignment, Department, Holiday, Notification, Period, Subject
+from .notifications import forget_unread_count, increment_unread_count, publish_notifications
+from .thumbnails import (
+    delete_thumbnails,
+    schedule_thumbnails,
+    thumbnail_fields,
+    thumbnails_generated,
+)
+
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        increment_unread_count(instance.user_id)
+        transaction.on_commit(lambda: publish_notifications([instance]))
+    elif not created:
+        # Read state may have flipped; let the next read recompute the counter
+        forget_unread_count(instance.user_id)
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    if not instance.is_read:
+        increment_unread_count(instance.user_id, -1)
+
+
+def connect_thumbnail_field(model, field_name):
+    """Generate derivatives after an upload and remove them with the owner
+
+    Replacing an image also removes the derivatives of the one it replaced.
+    """
+    attname = model._meta.get_field(field_name).attname
+
+    def stored_name(instance):
+        # read the raw value so deferred fields are not loaded
+        value = instance.__dict__.get(attname)
+        return getattr(value, "name", value)
+
+    def image_loaded(sender, instance, **kwargs):
+        instance._thumbnail_sources = {
+            **getattr(instance, "_thumbnail_sources", {}),
+            field_name: stored_name(instance),
+        }
+
+    def image_saved(sender, instance, created, update_fields=None, **kwargs):
+        if update_fields is not None and field_name not in update_fields:
+            return
+        name = getattr(instance, field_name).name
+        previous = None if created else instance._thumbnail_sources.get(field_name)
+        if previous and previous != name:
+            transaction.on_commit(lambda: delete_thumbnails(previous))
+        instance._thumbnail_sources[field_name] = name
+        schedule_thumbnails(name, model=model)
+
+    def image_deleted(sender, instance, **kwargs):
+        name = getattr(instance, field_name).name
+        if name:
+            delete_thumbnails(name)
+
+    uid = f"thumbnails:{model._meta.label}.{field_name}"
+    post_init.connect(image_loaded, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(image_saved, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(image_deleted, sender=model, weak=False, dispatch_uid=uid)
+
+
+for model, field_name in thumbnail_fields():
+    connect_thumbnail_field(model, field_name)
+
+
+@receiver(thumbnails_generated)
+def thumbnails_written(sender, **kwargs):
+    # fragments rendered before the thumbnails existed link the original image
+    if sender is not None:
+        invalidate_model(sender._meta.label)
+
+
+def dashboard_model_changed(sender, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no dashboard fragment shows
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_model(sender._meta.label)
+
+
+for label in set().union(*FRAGMENT_DEPENDENCIES.values()):
+    model = apps.get_model(label)
+    uid = f"dashboard:{label}"
+    post_save.connect(dashboard_model_changed, sender=model, dispatch_uid=uid)
+    post_delete.connect(dashboard_model_changed, sender=model, dispatch_uid=uid)
+
+
+@receiver(post_save, sender=Assignment)
+def assignment_saved(sender, instance, **kwargs):
+    timetable.assignment_saved(instance)
+
+
+@receiver(post_delete, sender=Assignment)
+def assignment_deleted(sender, instance, **kwargs):
+    timetable.assignment_deleted(instance)
+
+
+@receiver(post_save, sender=Period)
+def period_saved(sender, instance, created, **kwargs):
+    # a deleted period's assignments are deleted, and unindexed, one by one
+    if not created:
+        timetable.period_saved(instance)
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def holiday_changed(sender, **kwargs):
+    # Now, so this transaction reads its own change, and again after commit,
+    # so a calendar another process built from the old rows meanwhile is dropped
+    academic_calendar.bump_version()
+    transaction.on_commit(academic_calendar.bump_version)
+
+
+def search_source_saved(sender, instance, **kwargs):
+    search.index_object(search.kind_of(sender), instance)
+
+
+def search_source_deleted(sender, instance, **kwargs):
+    search.unindex_object(search.kind_of(sender), instance.pk)
+
+
+for kind, source in search.SOURCES.items():
+    model = source.get_model()
+    uid = f"search:{kind}"
+    post_save.connect(search_source_saved, sender=model, dispatch_uid=uid)
+    post_delete.connect(search_source_deleted, sender=model, dispatch_uid=uid)
+
+
+@receiver(post_save, sender=Department)
+def department_renamed(sender, instance, created, **kwargs):
+    # subject entries carry their department's name
+    if not created:
+        subjects = Subject.objects.filter(department=instance).select_related("department")
+        search.index_objects("subject", subjects)
+
+
+@receiver(post_save, sender="student.Parent")
+def parent_saved(sender, instance, created, **kwargs):
+    # student entries carry their parents' names
+    student = getattr(instance, "student", None) if not created else None
+    if student is not None:
+        search.index_object("student", student)
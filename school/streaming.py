@@ -0,0 +1,75 @@
+"""Serving long-lived streaming views under ASGI without a thread per client.
+
+Django's ASGI handler gives every request a thread-sensitive context, and
+each ``MiddlewareMixin`` middleware runs its hooks in that context's worker
+thread, which then lives until the response is finished. That is harmless
+for ordinary requests and ruinous for a stream held open for hours: one idle
+thread per connected client.
+
+:func:`route_streams` wraps the ASGI application so views decorated with
+:func:`streaming_view` are served by :class:`StreamingASGIHandler` instead:
+no middleware and no per-request context, only the session attached so the
+view can identify the user. Everything else goes to Django as usual, as do
+streaming views when the app runs under WSGI or the test client.
+"""
+
+from importlib import import_module
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.urls import Resolver404, resolve
+
+
+def streaming_view(view):
+    """Mark an async view to be served outside the middleware chain under ASGI
+
+    The view must authenticate the request itself (``request.session`` is
+    set) and keep sync work off the request's thread-sensitive context.
+    """
+    view.streaming_view = True
+    return view
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """Calls a resolved streaming view with only the session attached"""
+
+    def load_middleware(self, is_async=False):
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+        self._middleware_chain = self.call_view
+        self.session_engine = import_module(settings.SESSION_ENGINE)
+
+    async def call_view(self, request):
+        request.session = self.session_engine.SessionStore(
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        )
+        match = resolve(request.path_info)
+        request.resolver_match = match
+        return await match.func(request, *match.args, **match.kwargs)
+
+    async def __call__(self, scope, receive, send):
+        await self.handle(scope, receive, send)
+
+
+def _is_streaming(scope):
+    if scope["type"] != "http":
+        return False
+    try:
+        match = resolve(scope["path"][len(scope.get("root_path", "")) :] or "/")
+    except Resolver404:
+        return False
+    return getattr(match.func, "streaming_view", False)
+
+
+def route_streams(application):
+    """Wrap ``application`` so streaming views are served by :class:`StreamingASGIHandler`"""
+    streams = StreamingASGIHandler()
+
+    async def router(scope, receive, send):
+        if _is_streaming(scope):
+            await streams(scope, receive, send)
+        else:
+            await application(scope, receive, send)
+
+    return router
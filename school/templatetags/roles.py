@@ -0,0 +1,30 @@
+from django import template
+
+from school import roles
+from school.roles import has_permission, has_role as user_has_role
+
+register = template.Library()
+
+
+@register.filter
+def has_role(user, role):
+    """Usage: {% if request.user|has_role:"admin" %}"""
+    return user_has_role(user, role)
+
+
+@register.filter
+def can(user, permission):
+    """Usage: {% if request.user|can:"subject.add" %}"""
+    return has_permission(user, permission)
+
+
+@register.filter
+def primary_role(user):
+    """Usage: {{ request.user|primary_role }} -> "admin", "teacher", "student" or "user" """
+    return roles.primary_role(user)
+
+
+@register.filter
+def role_label(user):
+    """Usage: {{ request.user|role_label }} -> "Administrator", "Teacher", ..."""
+    return roles.role_label(user)
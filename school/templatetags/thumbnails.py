@@ -0,0 +1,11 @@
+from django import template
+
+from school.thumbnails import thumbnail_url
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail(fieldfile, size="avatar"):
+    """Usage: {{ teacher.teacher_image|thumbnail:"card" }}"""
+    return thumbnail_url(fieldfile, size)
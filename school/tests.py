@@ -1,3 +1,2481 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import math
+import os
+import shutil
+import tempfile
+import zipfile
+import zlib
+from collections import Counter
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, connection
+from django.db.utils import ConnectionHandler
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+
+from Home.db import database_profile
+
+from . import (
+    academic_calendar,
+    attendance,
+    exams,
+    hostel,
+    library,
+    messaging,
+    middleware,
+    pdf,
+    report_cards,
+    search,
+    transport,
+)
+from .broker import LocalBroker, get_broker
+from .dashboard import fragment_key, fragment_stats, get_fragment
+from .fees import collection_by, ledger_summary, project_collections
+from .holidays import holiday_summary
+from .metrics import load_snapshots, registry, summarize
+from .pagination import InvalidCursor, encode_cursor, keyset_paginate
+from .roles import get_roles, has_permission, primary_role, role_label
+from .streaming import route_streams
+from .templatetags.thumbnails import thumbnail
+from .thumbnails import generate_thumbnails, thumbnail_name
+from .timetable import (
+    IntervalIndex,
+    Requirement,
+    SchedulingError,
+    build_problem,
+    generate,
+    save_timetable,
+)
+from .models import (
+    Assignment,
+    AttendanceSheet,
+    Bed,
+    Book,
+    Bus,
+    Copy,
+    Department,
+    Exam,
+    ExamResult,
+    ExamSubject,
+    Fee,
+    Mark,
+    Holiday,
+    Hostel,
+    HostelApplication,
+    HostelRoom,
+    Loan,
+    Message,
+    MessageThread,
+    Notification,
+    Period,
+    Rider,
+    Room,
+    Route,
+    SearchEntry,
+    Stop,
+    Subject,
+    Teacher,
+    ThreadParticipant,
+)
+from .notifications import (
+    broadcast_to_role,
+    broadcast_to_users,
+    create_notification,
+    get_unread_count,
+    notification_channel,
+)
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_jpeg(size=(1200, 900)):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, "JPEG")
+    return SimpleUploadedFile("photo.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+
+class HolidaySummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = datetime.date(2025, 6, 1)
+        Holiday.objects.create(
+            name="New Year", date=datetime.date(2025, 1, 1), holiday_type="national"
+        )
+        Holiday.objects.create(name="Eid", date=datetime.date(2025, 6, 7), holiday_type="religious")
+        Holiday.objects.create(
+            name="Labour Day", date=datetime.date(2025, 5, 1), holiday_type="international"
+        )
+        Holiday.objects.create(
+            name="Bank Close", date=datetime.date(2025, 6, 30), holiday_type="bank"
+        )
+        Holiday.objects.create(
+            name="Old", date=datetime.date(2025, 3, 1), holiday_type="special", is_active=False
+        )
+        Holiday.objects.create(
+            name="Next Year", date=datetime.date(2026, 1, 1), holiday_type="national"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_counts_grouping_and_upcoming(self):
+        summary = holiday_summary(2025, today=self.today)
+
+        self.assertEqual(summary["total_holidays"], 4)
+        self.assertEqual(
+            summary["holiday_type_counts"],
+            {"national": 1, "religious": 1, "international": 1, "special": 0, "bank": 1},
+        )
+        self.assertEqual(list(summary["holidays_by_month"]), ["January", "May", "June"])
+        self.assertEqual(len(summary["holidays_by_month"]["June"]), 2)
+        self.assertEqual(
+            [holiday.name for holiday in summary["upcoming_holidays"]],
+            ["Eid", "Bank Close", "Next Year"],
+        )
+
+    def test_summary_query_count(self):
+        # one query per calendar year (2025, and 2026 for the upcoming list)
+        with self.assertNumQueries(2):
+            holiday_summary(2025, today=self.today)
+        with self.assertNumQueries(0):
+            holiday_summary(2025, today=self.today)
+
+    def test_recurring_holidays_appear_in_later_years(self):
+        Holiday.objects.create(
+            name="Independence Day",
+            date=datetime.date(2024, 3, 26),
+            holiday_type="national",
+            is_recurring=True,
+        )
+        summary = holiday_summary(2027, today=datetime.date(2027, 3, 20))
+
+        self.assertEqual([h.name for h in summary["holidays"]], ["Independence Day"])
+        self.assertEqual(summary["holidays"][0].date, datetime.date(2027, 3, 26))
+        self.assertEqual(summary["holiday_type_counts"]["national"], 1)
+        self.assertEqual(summary["upcoming_holidays"][0].days_until, 6)
+        # not before the year it was first held
+        self.assertEqual(holiday_summary(2023, today=self.today)["total_holidays"], 0)
+
+    def test_holiday_page_query_count(self):
+        for day in range(1, 29):
+            Holiday.objects.create(name=f"Extra {day}", date=datetime.date(2025, 2, day))
+        user = User.objects.create_user(username="viewer", email="viewer@example.com", password="x")
+        self.client.force_login(user)
+        get_unread_count(user)
+        self.client.get(reverse("holiday_list"), {"year": 2025})
+
+        # session + user; the calendar years are cached
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("holiday_list"), {"year": 2025})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["holidays_by_month"]["February"]), 28)
+
+
+class AcademicCalendarTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Holiday.objects.create(name="New Year", date=datetime.date(2020, 1, 1), is_recurring=True)
+        # Thursday and Friday
+        Holiday.objects.create(name="Mid-term", date=datetime.date(2026, 10, 22))
+        Holiday.objects.create(name="Mid-term 2", date=datetime.date(2026, 10, 23))
+        # a Saturday holiday does not cost a working day
+        Holiday.objects.create(name="Sports Day", date=datetime.date(2026, 10, 24))
+        Holiday.objects.create(name="Cancelled", date=datetime.date(2026, 10, 20), is_active=False)
+
+    def test_working_days(self):
+        self.assertTrue(academic_calendar.is_working_day(datetime.date(2026, 10, 20)))
+        self.assertFalse(academic_calendar.is_working_day(datetime.date(2026, 10, 22)))
+        self.assertFalse(academic_calendar.is_working_day(datetime.date(2026, 10, 25)))
+        self.assertFalse(academic_calendar.is_working_day(datetime.date(2027, 1, 1)))
+
+        # Mon 19th .. Sun 1 Nov: 10 weekdays, 2 of them holidays
+        self.assertEqual(
+            academic_calendar.working_days_between(
+                datetime.date(2026, 10, 19), datetime.date(2026, 11, 1)
+            ),
+            8,
+        )
+        # across the new year: 2026-12-28 .. 2027-01-08 is 10 weekdays minus 1 January
+        self.assertEqual(
+            academic_calendar.working_days_between(
+                datetime.date(2026, 12, 28), datetime.date(2027, 1, 8)
+            ),
+            9,
+        )
+        self.assertEqual(
+            academic_calendar.working_days_between(
+                datetime.date(2026, 10, 2), datetime.date(2026, 10, 1)
+            ),
+            0,
+        )
+        self.assertEqual(
+            academic_calendar.next_working_day(datetime.date(2026, 10, 22)),
+            datetime.date(2026, 10, 26),
+        )
+
+    def test_lookups_are_cached_until_a_holiday_changes(self):
+        day = datetime.date(2026, 10, 21)
+        self.assertTrue(academic_calendar.is_working_day(day))
+        with self.assertNumQueries(0):
+            academic_calendar.working_days_between(day, datetime.date(2026, 12, 31))
+
+        holiday = Holiday.objects.create(name="Strike", date=day)
+        self.assertFalse(academic_calendar.is_working_day(day))
+        holiday.delete()
+        self.assertTrue(academic_calendar.is_working_day(day))
+
+    @override_settings(SCHOOL_WORKING_WEEKDAYS=(0, 1, 2, 3, 4, 5))
+    def test_working_weekdays_setting(self):
+        self.assertEqual(
+            academic_calendar.working_days_between(
+                datetime.date(2026, 10, 19), datetime.date(2026, 10, 25)
+            ),
+            3,
+        )
+
+    def test_leap_day_recurs_on_28_february(self):
+        Holiday.objects.create(name="Leap", date=datetime.date(2024, 2, 29), is_recurring=True)
+        self.assertEqual(
+            academic_calendar.holiday_dates(datetime.date(2027, 2, 1), datetime.date(2027, 3, 1)),
+            {datetime.date(2027, 2, 28): "Leap"},
+        )
+
+
+class UnreadNotificationCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="x"
+        )
+        self.client.force_login(self.user)
+
+    def test_counter_follows_creation_and_deletion(self):
+        self.assertEqual(get_unread_count(self.user), 0)
+        first = create_notification(self.user, "Exam timetable published")
+        create_notification(self.user, "Fees due")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.user), 2)
+
+        first.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.user), 1)
+
+    def test_mark_as_read_and_clear_reset_counter(self):
+        create_notification(self.user, "Library book overdue")
+        self.assertEqual(get_unread_count(self.user), 1)
+
+        response = self.client.post(reverse("mark_notification_as_read"))
+        self.assertEqual(response.json(), {"status": "success"})
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.user), 0)
+
+        create_notification(self.user, "Sports day moved")
+        self.client.post(reverse("clear_all_notification"))
+        self.assertFalse(Notification.objects.filter(user=self.user).exists())
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.user), 0)
+
+    def test_context_processor_exposes_count(self):
+        create_notification(self.user, "Welcome back")
+        response = self.client.get(reverse("holiday_list"))
+        self.assertEqual(response.context["unread_notification_count"], 1)
+        self.assertEqual(len(response.context["unread_notification"]), 1)
+
+    async def test_async_endpoints_with_async_client(self):
+        await Notification.objects.acreate(user=self.user, message="Async hello")
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.post(reverse("mark_notification_as_read"))
+        self.assertEqual(response.json(), {"status": "success"})
+        self.assertFalse(await Notification.objects.filter(is_read=False).aexists())
+
+        response = await self.async_client.post(reverse("clear_all_notification"))
+        self.assertEqual(response.json(), {"status": "success"})
+        self.assertEqual(await Notification.objects.acount(), 0)
+
+    def test_anonymous_post_is_forbidden(self):
+        self.client.logout()
+        response = self.client.post(reverse("mark_notification_as_read"))
+        self.assertEqual(response.status_code, 403)
+
+
+class DashboardCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(
+            username="counter-admin", email="ca@example.com", password="x", is_admin=True
+        )
+
+    def test_counters_are_cached_per_role(self):
+        Department.objects.create(name="Arts")
+        self.client.force_login(self.admin)
+        data = self.client.get(reverse("dashboard_counters")).json()
+        self.assertEqual(data["overview"]["departments"], 1)
+        self.assertEqual(data["unread_notifications"], 0)
+        self.assertEqual(data["overview"], get_fragment("admin", "overview", lambda: None))
+
+        # a new department invalidates the fragment through the signals
+        Department.objects.create(name="Music")
+        data = self.client.get(reverse("dashboard_counters")).json()
+        self.assertEqual(data["overview"]["departments"], 2)
+
+    def test_students_are_refused(self):
+        student = User.objects.create_user(
+            username="counter-pupil", email="cp@example.com", password="x", is_student=True
+        )
+        self.client.force_login(student)
+        self.assertEqual(self.client.get(reverse("dashboard_counters")).status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("dashboard_counters")).status_code, 302)
+
+    async def test_static_files_middleware_stays_async(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+
+        from .middleware import StaticFilesMiddleware
+
+        async def view(request):
+            return HttpResponse("from the view")
+
+        middleware = StaticFilesMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = await middleware(RequestFactory().get("/not-static/"))
+        self.assertEqual(response.content, b"from the view")
+
+
+class NotificationStreamTests(TransactionTestCase):
+    """The stream authenticates on a shared executor thread, so data must be committed"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="listener", email="listener@example.com", password="x"
+        )
+        self.channel = notification_channel(self.user.pk)
+
+    async def open_stream(self, **headers):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("notification_stream"), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b"retry: 5000\n\n")
+        return chunks
+
+    async def disconnect(self, chunks):
+        # what the ASGI handler does when the client goes away
+        pending = asyncio.ensure_future(anext(chunks))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(get_broker().subscriber_count(self.channel), 0)
+
+    async def test_committed_notifications_are_pushed(self):
+        chunks = await self.open_stream()
+        self.assertEqual(get_broker().subscriber_count(self.channel), 1)
+
+        notification = await sync_to_async(create_notification)(self.user, "Bus is late")
+        event = (await asyncio.wait_for(anext(chunks), 1)).decode()
+        self.assertTrue(event.startswith(f"id: {notification.pk}\nevent: notification\n"))
+        self.assertIn('"message": "Bus is late"', event)
+
+        # broadcasts publish after their bulk insert commits
+        await sync_to_async(broadcast_to_users)([self.user], "Sports day")
+        self.assertIn(b"Sports day", await asyncio.wait_for(anext(chunks), 1))
+        await self.disconnect(chunks)
+
+    @override_settings(NOTIFICATION_STREAM_KEEPALIVE=0.01)
+    async def test_idle_stream_sends_keepalives(self):
+        chunks = await self.open_stream()
+        self.assertEqual(await asyncio.wait_for(anext(chunks), 1), b": keepalive\n\n")
+        await self.disconnect(chunks)
+
+    async def test_reconnect_replays_missed_notifications(self):
+        seen = await sync_to_async(create_notification)(self.user, "Seen before the drop")
+        await sync_to_async(create_notification)(self.user, "Sent while offline")
+        chunks = await self.open_stream(last_event_id=str(seen.pk))
+        self.assertIn(b"Sent while offline", await anext(chunks))
+        await self.disconnect(chunks)
+
+    async def test_unstarted_stream_holds_no_subscription(self):
+        seen = await sync_to_async(create_notification)(self.user, "Seen before the drop")
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(
+            reverse("notification_stream"), headers={"last_event_id": str(seen.pk)}
+        )
+        self.assertEqual(response.status_code, 200)
+        # the client went away before the first chunk was sent
+        self.assertEqual(get_broker().subscriber_count(self.channel), 0)
+        await response.streaming_content.aclose()
+        self.assertEqual(get_broker().subscriber_count(self.channel), 0)
+
+    async def test_anonymous_and_wsgi_requests(self):
+        response = await self.async_client.get(reverse("notification_stream"))
+        self.assertEqual(response.status_code, 403)
+        await sync_to_async(self.client.force_login)(self.user)
+        response = await sync_to_async(self.client.get)(reverse("notification_stream"))
+        self.assertEqual(response.status_code, 204)
+
+    async def test_asgi_router_serves_streams_outside_the_middleware(self):
+        passed_on = []
+
+        async def django_app(scope, receive, send):
+            passed_on.append(scope["path"])
+
+        application = route_streams(django_app)
+        await self.async_client.aforce_login(self.user)
+        cookie = f"sessionid={self.async_client.cookies['sessionid'].value}"
+        gone = asyncio.Event()
+        requests = [{"type": "http.request", "body": b"", "more_body": False}]
+        sent = []
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await gone.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": reverse("notification_stream"),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"cookie", cookie.encode())],
+            "server": ("testserver", 80),
+            "client": ("127.0.0.1", 50000),
+        }
+        served = asyncio.ensure_future(application(scope, receive, send))
+        for _ in range(100):
+            if len(sent) >= 2:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertEqual(sent[1]["body"], b"retry: 5000\n\n")
+        self.assertEqual(get_broker().subscriber_count(self.channel), 1)
+
+        gone.set()
+        await asyncio.wait_for(served, 1)
+        self.assertEqual(get_broker().subscriber_count(self.channel), 0)
+
+        await application(dict(scope, path="/"), receive, send)
+        self.assertEqual(passed_on, ["/"])
+
+    async def test_broker_drops_oldest_events_of_slow_clients(self):
+        broker = LocalBroker(max_pending=2)
+        subscription = broker.subscribe("room")
+        await asyncio.to_thread(broker.publish_many, [("room", 1), ("room", 2), ("room", 3)])
+        await asyncio.sleep(0)
+        self.assertEqual([await subscription.get(1), await subscription.get(1)], [2, 3])
+        self.assertEqual(subscription.dropped, 1)
+        self.assertIsNone(await subscription.get(0.01))
+        subscription.close()
+        self.assertEqual(broker.subscriber_count(), 0)
+
+
+class BroadcastTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = [
+            User.objects.create_user(
+                username=f"student{i}", email=f"student{i}@example.com", is_student=True
+            )
+            for i in range(5)
+        ]
+        cls.teacher = User.objects.create_user(
+            username="teacher", email="teacher@example.com", is_teacher=True
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_broadcast_to_role_uses_chunked_inserts(self):
+        get_unread_count(self.students[0])
+
+        # savepoint + release, one streaming select for the ids, one insert per chunk of two
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(2 + 1 + 3):
+            created = broadcast_to_role("student", "Exams start Monday", chunk_size=2)
+
+        self.assertEqual(created, 5)
+        self.assertEqual(Notification.objects.filter(message="Exams start Monday").count(), 5)
+        self.assertFalse(Notification.objects.filter(user=self.teacher).exists())
+        self.assertEqual(get_unread_count(self.students[0]), 1)
+
+    def test_broadcast_to_users_accepts_users_and_ids(self):
+        created = broadcast_to_users([self.teacher, self.students[0].pk], "Staff meeting")
+        self.assertEqual(created, 2)
+
+    def test_unknown_role(self):
+        with self.assertRaises(ValueError):
+            broadcast_to_role("parent", "Hello")
+
+
+class TeacherDirectoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        names = [("Rahman", "Abir"), ("Ahmed", "Nadia"), ("Ahmed", "Karim"), ("Chowdhury", "Mim")]
+        names += [("Ahmed", "Karim")]  # duplicate name, ordered by id
+        for i, (last_name, first_name) in enumerate(names):
+            Teacher.objects.create(
+                first_name=first_name,
+                last_name=last_name,
+                email=f"teacher{i}@example.com",
+                mobile="0170000000",
+                gender="Female",
+                date_of_birth=datetime.date(1990, 1, 1),
+                address="Dhaka",
+                joining_date=datetime.date(2020, 1, 1),
+            )
+        cls.user = User.objects.create_user(username="staff", email="staff@example.com")
+
+    def test_keyset_pages_walk_forwards_and_backwards(self):
+        ordering = ("last_name", "first_name", "id")
+        expected = list(Teacher.objects.order_by(*ordering).values_list("id", flat=True))
+
+        seen = []
+        page = keyset_paginate(Teacher.objects.all(), ordering, 2)
+        self.assertFalse(page.has_previous)
+        while True:
+            seen += [teacher.id for teacher in page]
+            if not page.has_next:
+                break
+            last = page
+            page = keyset_paginate(Teacher.objects.all(), ordering, 2, after=page.next_cursor)
+        self.assertEqual(seen, expected)
+
+        back = keyset_paginate(Teacher.objects.all(), ordering, 2, before=page.previous_cursor)
+        self.assertEqual([teacher.id for teacher in back], [teacher.id for teacher in last])
+
+    def test_cursor_values_must_match_the_ordering(self):
+        ordering = ("last_name", "first_name", "id")
+        for values in (["Smith", "Ann", "x"], ["Smith", "Ann", None], ["Smith", "Ann"]):
+            with self.assertRaises(InvalidCursor):
+                keyset_paginate(Teacher.objects.all(), ordering, 2, after=encode_cursor(values))
+        page = keyset_paginate(
+            Teacher.objects.all(), ordering, 2, after=encode_cursor(["Smith", "Ann", "3"])
+        )
+        self.assertEqual(page.page_size, 2)
+
+        self.client.force_login(self.user)
+        cursor = encode_cursor(["not a date", "x"])
+        response = self.client.get(reverse("inbox"), {"after": cursor})
+        self.assertEqual(response.status_code, 404)
+
+    def test_teacher_api_uses_value_projection(self):
+        self.client.force_login(self.user)
+        get_unread_count(self.user)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("teacher_api"), {"page_size": 3})
+        data = response.json()
+        self.assertEqual(
+            [(row["last_name"], row["first_name"]) for row in data["results"]],
+            [("Ahmed", "Karim"), ("Ahmed", "Karim"), ("Ahmed", "Nadia")],
+        )
+        self.assertNotIn("address", data["results"][0])
+        self.assertIsNone(data["previous"])
+
+        response = self.client.get(reverse("teacher_api"), {"after": data["next"]})
+        self.assertEqual(len(response.json()["results"]), 2)
+        self.assertIsNone(response.json()["next"])
+
+    def test_directory_pages_render(self):
+        self.client.force_login(self.user)
+        for url in (reverse("teacher_list"), reverse("teacher_list_page")):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        teacher = Teacher.objects.first()
+        response = self.client.get(reverse("teacher_details", args=[teacher.pk]))
+        self.assertEqual(response.context["selected_teacher"], teacher)
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse("teacher_list"), {"after": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, THUMBNAIL_ASYNC=False)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_upload_generates_thumbnails(self):
+        from PIL import Image
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create_user(
+                username="pic", email="pic@example.com", profile_image=make_jpeg()
+            )
+
+        for size, pixels in (("avatar", 64), ("card", 300)):
+            name = thumbnail_name(user.profile_image.name, size)
+            self.assertTrue(default_storage.exists(name))
+            with default_storage.open(name) as thumb:
+                self.assertEqual(Image.open(thumb).size, (pixels, pixels))
+
+        self.assertIn("thumbnails/", thumbnail(user.profile_image, "avatar"))
+
+        user.delete()
+        self.assertFalse(default_storage.exists(thumbnail_name(user.profile_image.name, "card")))
+
+    def test_replaced_image_takes_its_thumbnails_with_it(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create_user(
+                username="swap", email="swap@example.com", profile_image=make_jpeg()
+            )
+        old = user.profile_image.name
+
+        user = User.objects.get(pk=user.pk)
+        user.profile_image = make_jpeg((640, 480))
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+
+        self.assertNotEqual(user.profile_image.name, old)
+        for size in ("avatar", "card"):
+            self.assertFalse(default_storage.exists(thumbnail_name(old, size)))
+            self.assertTrue(default_storage.exists(thumbnail_name(user.profile_image.name, size)))
+
+        reader = User.objects.create_user(username="reader", email="reader@example.com")
+        messaging.start_thread(user, [reader], "Hello", "New photo")
+        self.client.force_login(reader)
+        response = self.client.get(reverse("inbox"))
+        self.assertContains(response, thumbnail_name(user.profile_image.name, "avatar"))
+
+    def test_missing_thumbnail_falls_back_to_original(self):
+        user = User.objects.create_user(
+            username="raw", email="raw@example.com", profile_image=make_jpeg()
+        )
+        self.assertEqual(thumbnail(user.profile_image, "avatar"), user.profile_image.url)
+        self.assertEqual(thumbnail(None, "avatar"), "")
+
+    def test_backfill_command(self):
+        user = User.objects.create_user(
+            username="old", email="old@example.com", profile_image=make_jpeg()
+        )
+        call_command("generate_thumbnails", stdout=StringIO())
+        self.assertTrue(default_storage.exists(thumbnail_name(user.profile_image.name, "avatar")))
+        self.assertEqual(generate_thumbnails(user.profile_image.name), [])
+
+    def test_generated_thumbnails_refresh_the_cached_student_table(self):
+        cache.clear()
+        admin = User.objects.create_user(
+            username="boss", email="boss@example.com", is_admin=True, is_staff=True
+        )
+        student = User.objects.create_user(
+            username="face", email="face@example.com", is_student=True, profile_image=make_jpeg()
+        )
+        self.client.force_login(admin)
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, student.profile_image.url)
+        self.assertIsNotNone(cache.get(fragment_key("admin", "students")))
+
+        generate_thumbnails(student.profile_image.name, model=User)
+        self.assertIsNone(cache.get(fragment_key("admin", "students")))
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, thumbnail_name(student.profile_image.name, "avatar"))
+
+
+class DashboardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", is_admin=True, is_staff=True
+        )
+        User.objects.create_user(
+            username="stu", email="stu@example.com", first_name="Rafi", is_student=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        get_unread_count(self.admin)
+
+    def test_admin_dashboard_is_served_from_cache(self):
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, "Rafi")
+        self.assertEqual(response.context["overview"]["students"], 1)
+
+        # session + user only; overview and student table come from the cache
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("index"))
+        self.assertContains(response, "Rafi")
+
+        stats = {(row["role"], row["fragment"]): row for row in fragment_stats()}
+        self.assertEqual(stats[("admin", "students")]["hits"], 1)
+        self.assertEqual(stats[("admin", "students")]["misses"], 1)
+
+    def test_signals_invalidate_only_dependent_fragments(self):
+        self.client.get(reverse("index"))
+        self.assertIsNotNone(cache.get(fragment_key("admin", "students")))
+
+        Department.objects.create(name="Physics")
+        self.assertIsNone(cache.get(fragment_key("admin", "overview")))
+        self.assertIsNotNone(cache.get(fragment_key("admin", "students")))
+
+        User.objects.create_user(username="new", email="new@example.com", is_student=True)
+        self.assertIsNone(cache.get(fragment_key("admin", "students")))
+
+    def test_login_does_not_invalidate(self):
+        self.client.get(reverse("index"))
+        self.admin.save(update_fields=["last_login"])
+        self.assertIsNotNone(cache.get(fragment_key("admin", "students")))
+
+    def test_admin_stats_page(self):
+        self.admin.is_superuser = True
+        self.admin.save()
+        response = self.client.get(reverse("admin_dashboard_cache"))
+        self.assertContains(response, "dashboard:admin:students")
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_DIR=MEDIA_ROOT)
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="root", email="root@example.com", is_staff=True, is_superuser=True
+        )
+        for name in ("Maths", "Physics", "Chemistry", "Biology", "English", "History"):
+            Department.objects.create(name=name)
+
+    def setUp(self):
+        registry.reset()
+        self.client.force_login(self.admin)
+
+    def test_records_samples_per_url_name(self):
+        for _ in range(3):
+            self.client.get(reverse("holiday_list"))
+
+        rows = {row["view"]: row for row in summarize(load_snapshots())}
+        row = rows["holiday_list"]
+        self.assertEqual(row["count"], 3)
+        self.assertGreaterEqual(row["queries_p50"], 2)
+        self.assertGreater(row["wall_p99"], 0)
+        self.assertGreater(row["template_p50"], 0)
+
+    def test_flags_repeated_queries(self):
+        # DepartmentAdmin.subject_count runs one COUNT per row
+        self.client.get(reverse("admin:school_department_changelist"))
+
+        rows = {row["view"]: row for row in summarize(load_snapshots())}
+        row = rows["admin:school_department_changelist"]
+        self.assertGreaterEqual(row["duplicates_p50"], 6)
+        self.assertIn("COUNT", row["n_plus_one"])
+
+    def test_command_and_admin_page(self):
+        self.client.get(reverse("holiday_list"))
+        registry.flush()
+
+        out = StringIO()
+        call_command("request_metrics", stdout=out)
+        self.assertIn("holiday_list", out.getvalue())
+
+        response = self.client.get(reverse("admin_request_metrics"))
+        self.assertContains(response, "holiday_list")
+
+        call_command("request_metrics", "--reset", stdout=StringIO())
+        self.assertEqual(summarize(load_snapshots()), [])
+
+    async def test_async_views_stay_async_and_are_measured(self):
+        from django.http import HttpResponse
+
+        async def view(request):
+            return HttpResponse()
+
+        self.assertTrue(asyncio.iscoroutinefunction(middleware.RequestMetricsMiddleware(view)))
+
+        head = await User.objects.acreate(username="head", email="head@example.com", is_admin=True)
+        await self.async_client.aforce_login(head)
+        response = await self.async_client.get(reverse("dashboard_counters"))
+        self.assertEqual(response.status_code, 200)
+        # queries run by sync_to_async threads are counted for the request
+        row = {row["view"]: row for row in summarize(load_snapshots())}["dashboard_counters"]
+        self.assertGreater(row["queries_p50"], 0)
+
+    def test_template_timing_is_removed_when_metrics_are_disabled(self):
+        from django.template.base import Template
+
+        self.client.get(reverse("holiday_list"))
+        instrumented = Template._render
+        with self.settings(REQUEST_METRICS_ENABLED=False):
+            self.assertIsNot(Template._render, instrumented)
+            self.assertNotIn(middleware._execute_wrapper, connection.execute_wrappers)
+
+
+class RoleResolutionTests(TestCase):
+    def test_roles_are_memoised_per_user_object(self):
+        user = User(username="both", is_admin=True, is_teacher=True)
+        self.assertEqual(get_roles(user), {"admin", "teacher"})
+        self.assertIs(
+            get_roles(user), get_roles(User(username="x", is_admin=True, is_teacher=True))
+        )
+
+        user.is_admin = False
+        self.assertIn("admin", get_roles(user))  # memoised for the request
+
+        self.assertEqual(primary_role(user), "admin")
+        self.assertEqual(role_label(User(username="s", is_student=True)), "Student")
+        self.assertTrue(has_permission(user, "subject.add"))
+        self.assertFalse(has_permission(User(username="s", is_student=True), "subject.add"))
+
+    def test_role_required_decorator(self):
+        response = self.client.get(reverse("add_subject"))
+        self.assertEqual(response.status_code, 302)
+
+        student = User.objects.create_user(
+            username="learner", email="learner@example.com", is_student=True
+        )
+        self.client.force_login(student)
+        self.assertEqual(self.client.get(reverse("add_subject")).status_code, 403)
+        response = self.client.get(reverse("subject_list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context["can_add"])
+        self.assertEqual(response.context["user_role"], "student")
+        # the shared layout reads the same resolved roles
+        self.assertContains(response, "Student Dashboard")
+        self.assertNotContains(response, "Admin Dashboard")
+        self.assertNotContains(response, reverse("add_student"))
+
+    def test_templates_use_the_resolved_roles(self):
+        from django.template import Context, Template
+
+        user = User(username="head", is_admin=True)
+        get_roles(user)
+        user.is_admin = False
+        template = Template(
+            "{% load roles %}{{ user|role_label }} {{ user|primary_role }} "
+            '{% if user|has_role:"admin" %}admin{% endif %}'
+        )
+        self.assertEqual(template.render(Context({"user": user})), "Administrator admin admin")
+
+
+class FeeLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from student.models import Parent, Student
+
+        cls.today = datetime.date(2025, 6, 30)
+        science = Department.objects.create(name="Science")
+
+        def student(student_id, student_class, department=None):
+            return Student.objects.create(
+                parent=Parent.objects.create(father_name=f"Parent {student_id}"),
+                first_name="Pupil",
+                last_name=student_id,
+                student_id=student_id,
+                gender="Male",
+                date_of_birth=datetime.date(2012, 1, 1),
+                joining_date=datetime.date(2020, 1, 1),
+                student_class=student_class,
+                department=department,
+            )
+
+        cls.ada = student("S1", "5", science)
+        cls.alan = student("S2", "6")
+
+        def fee(student, amount, days_past_due, paid=False):
+            return Fee.objects.create(
+                student=student,
+                amount=amount,
+                due_date=cls.today - datetime.timedelta(days=days_past_due),
+                paid=paid,
+            )
+
+        fee(cls.ada, 100, 10, paid=True)
+        fee(cls.ada, 200, 10)  # 0-30
+        fee(cls.ada, 300, 45)  # 31-60
+        fee(cls.alan, 400, 120)  # 90+
+        fee(cls.alan, 500, -20)  # due next month
+
+    def test_summary_is_one_query(self):
+        with self.assertNumQueries(1):
+            summary = ledger_summary(today=self.today)
+
+        self.assertEqual(summary["billed"], 1500)
+        self.assertEqual(summary["collected"], 100)
+        self.assertEqual(summary["outstanding"], 1400)
+        self.assertEqual(summary["overdue"], 900)
+        self.assertEqual(summary["students_owing"], 2)
+        self.assertEqual(
+            [(bucket["label"], bucket["amount"]) for bucket in summary["buckets"]],
+            [("0-30", 200), ("31-60", 300), ("61-90", 0), ("90+", 400)],
+        )
+        # 100 of the 1000 already due has been paid; next month's fee does not count
+        self.assertAlmostEqual(summary["collection_rate"], 10.0)
+
+    def test_collection_by_class_and_department(self):
+        by_class = {row["name"]: row for row in collection_by("class", today=self.today)}
+        self.assertEqual(by_class["5"]["outstanding"], 500)
+        self.assertAlmostEqual(by_class["5"]["collection_rate"], 100 / 6)
+        self.assertEqual(by_class["6"]["overdue"], 400)
+
+        by_department = {row["name"]: row for row in collection_by("department", today=self.today)}
+        self.assertEqual(set(by_department), {"Science", "Unassigned"})
+        with self.assertRaises(ValueError):
+            collection_by("religion")
+
+    def test_projection(self):
+        projection = project_collections(
+            months=3, recovery_rates={"90+": 0.5}, fee_change=0.1, today=self.today
+        )
+        arrears = {row["label"]: row["expected"] for row in projection["arrears"]}
+        self.assertAlmostEqual(arrears["90+"], 200)
+        self.assertAlmostEqual(arrears["0-30"], 180)
+        self.assertEqual([row["scheduled"] for row in projection["months"]], [0, 550, 0])
+        self.assertAlmostEqual(projection["months"][1]["expected"], 55)
+
+    def test_report_views_are_admin_only(self):
+        teacher = User.objects.create_user(
+            username="teach", email="teach@example.com", is_teacher=True
+        )
+        self.client.force_login(teacher)
+        self.assertEqual(self.client.get(reverse("fees")).status_code, 403)
+
+        admin = User.objects.create_user(username="boss", email="boss@example.com", is_admin=True)
+        self.client.force_login(admin)
+        response = self.client.get(reverse("fees"))
+        self.assertContains(response, "Collection by Department")
+
+        data = self.client.get(reverse("fee_report"), {"projection": 1, "months": 2}).json()
+        self.assertEqual(float(data["summary"]["billed"]), 1500)
+        self.assertEqual(len(data["projection"]["months"]), 2)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="boss", email="boss@example.com", is_admin=True
+        )
+        science = Department.objects.create(name="Science", description="Labs")
+        Subject.objects.create(name="Physics", code="PHY", department=science)
+        for i in range(3):
+            Teacher.objects.create(
+                first_name=f"Teacher{i}",
+                last_name="Smith",
+                email=f"t{i}@example.com",
+                mobile="123",
+                gender="Male",
+                date_of_birth=datetime.date(1980, 1, 1),
+                joining_date=datetime.date(2010, 1, 1),
+                address="Somewhere",
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_csv_is_streamed(self):
+        response = self.client.get(reverse("export", args=["teachers", "csv"]))
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+
+        with self.assertNumQueries(1):
+            lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["ID", "First Name", "Last Name"])
+        self.assertEqual(len(lines), 4)
+        self.assertIn("t0@example.com", lines[1])
+
+    def test_xlsx_export(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get(reverse("export", args=["users", "xlsx"]))
+        self.assertTrue(response.streaming)
+        workbook = load_workbook(BytesIO(b"".join(response.streaming_content)), read_only=True)
+        rows = list(workbook.active.iter_rows(values_only=True))
+        self.assertEqual(rows[0][:2], ("ID", "Username"))
+        self.assertEqual(rows[1][1], "boss")
+        self.assertIsInstance(rows[1][9], datetime.datetime)
+
+        response = self.client.get(reverse("export", args=["departments", "csv"]))
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[1], "Science,Labs,1")
+
+    def test_formulas_are_exported_as_text(self):
+        from openpyxl import load_workbook
+
+        Department.objects.create(name='=HYPERLINK("http://evil.example")', description="@SUM(1)")
+        Department.objects.create(name="+1-555", description="-2+3")
+
+        response = self.client.get(reverse("export", args=["departments", "csv"]))
+        rows = list(csv.reader(b"".join(response.streaming_content).decode().splitlines()))
+        self.assertIn(["'+1-555", "'-2+3", "0"], rows)
+        self.assertIn(["'=HYPERLINK(\"http://evil.example\")", "'@SUM(1)", "0"], rows)
+
+        response = self.client.get(reverse("export", args=["departments", "xlsx"]))
+        workbook = load_workbook(BytesIO(b"".join(response.streaming_content)))
+        cells = [cell for row in workbook.active.iter_rows(min_row=2) for cell in row]
+        self.assertTrue(all(cell.data_type != "f" for cell in cells))
+        self.assertIn("'=HYPERLINK(\"http://evil.example\")", [cell.value for cell in cells])
+
+    def test_unknown_export_and_permissions(self):
+        self.assertEqual(self.client.get("/export/grades.csv").status_code, 404)
+        self.assertEqual(self.client.get("/export/teachers.pdf").status_code, 404)
+
+        teacher = User.objects.create_user(
+            username="teach", email="teach@example.com", is_teacher=True
+        )
+        self.client.force_login(teacher)
+        response = self.client.get(reverse("export", args=["users", "csv"]))
+        self.assertEqual(response.status_code, 403)
+
+
+class TimetableTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Science")
+        cls.subjects = [
+            Subject.objects.create(name=f"Subject {i}", code=f"S{i}", department=cls.department)
+            for i in range(3)
+        ]
+        cls.teachers = [
+            Teacher.objects.create(
+                first_name=f"Teacher{i}",
+                last_name="T",
+                email=f"tt{i}@example.com",
+                mobile="1",
+                gender="Male",
+                date_of_birth=datetime.date(1980, 1, 1),
+                joining_date=datetime.date(2010, 1, 1),
+                address="-",
+            )
+            for i in range(3)
+        ]
+        cls.rooms = [Room.objects.create(name=f"Room {i}") for i in range(2)]
+        # Monday and Tuesday, three periods each
+        cls.periods = [
+            Period.objects.create(
+                day_of_week=day,
+                start_time=datetime.time(8 + slot),
+                end_time=datetime.time(9 + slot),
+            )
+            for day in (0, 1)
+            for slot in range(3)
+        ]
+
+    def requirements(self):
+        return [
+            Requirement("5A", self.subjects[0].pk, self.teachers[0].pk, 3),
+            Requirement("5A", self.subjects[1].pk, self.teachers[1].pk, 3),
+            Requirement("5B", self.subjects[0].pk, self.teachers[0].pk, 3),
+            Requirement("5B", self.subjects[2].pk, self.teachers[2].pk, 3),
+        ]
+
+    def test_generated_timetable_has_no_double_bookings(self):
+        timetable = generate(build_problem(self.requirements()), attempts=3)
+
+        self.assertTrue(timetable.complete)
+        self.assertEqual(len(timetable.lessons), 12)
+        for attribute in ("teacher_id", "room_id", "student_class"):
+            keys = [(lesson.period_id, getattr(lesson, attribute)) for lesson in timetable.lessons]
+            self.assertEqual(len(keys), len(set(keys)), attribute)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(save_timetable(timetable), 12)
+        self.assertEqual(Assignment.objects.filter(student_class="5A").count(), 6)
+
+    def test_holidays_close_periods(self):
+        Holiday.objects.create(
+            name="Founders Day", date=datetime.date(2020, 3, 2), is_recurring=True
+        )
+        # 2026-03-02 is a Monday
+        problem = build_problem(self.requirements()[:1], week_of=datetime.date(2026, 3, 4))
+        self.assertEqual(problem.unavailable, {p.pk for p in self.periods[:3]})
+
+        timetable = generate(problem)
+        self.assertTrue(
+            all(
+                lesson.period_id in {p.pk for p in self.periods[3:]} for lesson in timetable.lessons
+            )
+        )
+
+        with self.assertRaises(SchedulingError):
+            generate(build_problem(self.requirements(), week_of=datetime.date(2026, 3, 4)))
+
+    def test_partial_plan_works_around_kept_classes(self):
+        save_timetable(generate(build_problem(self.requirements()[:2])))
+        kept = set(
+            Assignment.objects.filter(teacher=self.teachers[1]).values_list("period_id", flat=True)
+        )
+        # 5C shares Teacher1 with 5A, whose timetable is kept
+        problem = build_problem([Requirement("5C", self.subjects[1].pk, self.teachers[1].pk, 3)])
+        self.assertEqual(problem.booked_teachers[self.teachers[1].pk], kept)
+        for seed in range(5):
+            timetable = generate(problem, seed=seed)
+            self.assertTrue(timetable.complete)
+            self.assertTrue(kept.isdisjoint(lesson.period_id for lesson in timetable.lessons))
+        self.assertEqual(save_timetable(timetable), 3)
+        self.assertEqual(Assignment.objects.count(), 9)
+
+        busy = Requirement("5C", self.subjects[1].pk, self.teachers[1].pk, 4)
+        with self.assertRaises(SchedulingError):
+            generate(build_problem([busy]))
+
+    def test_command_reports_clashes_on_save(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as fh:
+            fh.write(f"student_class,subject,teacher,sessions\n5A,S0,{self.teachers[0].email},2\n")
+        self.addCleanup(os.remove, fh.name)
+        with mock.patch(
+            "school.management.commands.generate_timetable.save_timetable",
+            side_effect=IntegrityError("UNIQUE constraint failed"),
+        ):
+            with self.assertRaisesMessage(CommandError, "clashes with an existing assignment"):
+                call_command("generate_timetable", "--requirements", fh.name, stdout=StringIO())
+
+    def test_interval_index(self):
+        index = IntervalIndex()
+        index.add("t", 0, 60, "a")
+        index.add("t", 120, 180, "b")
+        self.assertEqual(index.overlapping("t", 30, 130), ["b", "a"])
+        self.assertEqual(index.overlapping("t", 60, 120), [])
+        index.remove("t", 0, "a")
+        self.assertEqual(index.overlapping("t", 0, 60), [])
+        # a long interval stored under a shorter, later-starting one
+        index.add("t", 100, 300, "long")
+        self.assertEqual(index.overlapping("t", 250, 260), ["long"])
+        self.assertEqual(index.overlapping("t", 190, 200), ["long"])
+        self.assertEqual(index.overlapping("t", 300, 400), [])
+
+    def test_saves_update_the_index_in_place(self):
+        from school import timetable
+
+        lesson = dict(subject=self.subjects[0], room=self.rooms[0], student_class="5A")
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Assignment.objects.create(
+                period=self.periods[0], teacher=self.teachers[0], **lesson
+            )
+        timetable.bump_index_version()  # drop an index another test loaded
+        timetable.get_index()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second = Assignment.objects.create(
+                period=self.periods[1], teacher=self.teachers[1], **lesson
+            )
+            first.period = self.periods[2]
+            first.save()
+        probe = Assignment(
+            period=self.periods[2],
+            teacher=self.teachers[0],
+            room=self.rooms[1],
+            subject=self.subjects[1],
+            student_class="5B",
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(timetable.find_conflicts(probe), [("teacher", first.pk)])
+            probe.period = self.periods[1]
+            self.assertEqual(timetable.find_conflicts(probe), [])
+            probe.student_class = "5A"
+            self.assertEqual(timetable.find_conflicts(probe), [("class", second.pk)])
+
+        # a period moved onto another's time takes its lessons with it
+        with self.captureOnCommitCallbacks(execute=True):
+            period = self.periods[2]
+            period.start_time, period.end_time = datetime.time(9, 30), datetime.time(10, 30)
+            period.save()
+            second.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                timetable.find_conflicts(probe), [("teacher", first.pk), ("class", first.pk)]
+            )
+
+        # another process's change makes the next check reload
+        timetable.bump_index_version()
+        with self.assertNumQueries(1):
+            timetable.find_conflicts(probe)
+
+    def test_overlapping_edit_is_rejected(self):
+        from django.core.exceptions import ValidationError
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Assignment.objects.create(
+                period=self.periods[0],
+                teacher=self.teachers[0],
+                room=self.rooms[0],
+                subject=self.subjects[0],
+                student_class="5A",
+            )
+            overlapping = Period.objects.create(
+                day_of_week=0, start_time=datetime.time(8, 30), end_time=datetime.time(9, 30)
+            )
+
+        clash = Assignment(
+            period=overlapping,
+            teacher=self.teachers[0],
+            room=self.rooms[1],
+            subject=self.subjects[1],
+            student_class="5B",
+        )
+        with self.assertRaisesMessage(ValidationError, "teacher"):
+            clash.full_clean()
+
+        clash.teacher = self.teachers[1]
+        clash.full_clean()
+
+    def test_time_table_view(self):
+        user = User.objects.create_user(username="viewer", email="viewer@example.com")
+        self.client.force_login(user)
+        timetable = generate(build_problem(self.requirements()))
+        save_timetable(timetable)
+
+        response = self.client.get(reverse("time_table"), {"view": "class", "key": "5A"})
+        self.assertEqual(response.status_code, 200)
+        lessons = [
+            cell["lesson"] for row in response.context["grid"]["rows"] for cell in row["cells"]
+        ]
+        self.assertEqual(len([lesson for lesson in lessons if lesson]), 6)
+        self.assertContains(response, "Subject 1")
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command(
+            "generate_timetable",
+            "--benchmark",
+            "--teachers",
+            "20",
+            "--rooms",
+            "6",
+            "--periods",
+            "10",
+            stdout=out,
+        )
+        self.assertIn("Placed", out.getvalue())
+
+
+class AttendanceTests(TestCase):
+    # 2026-10-19 .. 2026-10-23 is Monday to Friday
+    monday = datetime.date(2026, 10, 19)
+
+    @classmethod
+    def setUpTestData(cls):
+        from student.models import Parent, Student
+
+        cls.students = [
+            Student.objects.create(
+                parent=Parent.objects.create(father_name=f"Parent {i}"),
+                first_name="Pupil",
+                last_name=str(i),
+                student_id=f"A{i}",
+                gender="Female",
+                date_of_birth=datetime.date(2012, 1, 1),
+                joining_date=datetime.date(2020, 1, 1),
+                student_class="7",
+                user=User.objects.create_user(
+                    username=f"pupil{i}", email=f"pupil{i}@example.com", is_student=True
+                ),
+            )
+            for i in range(10)
+        ]
+        cls.teacher = User.objects.create_user(
+            username="form-tutor", email="tutor@example.com", password="pw", is_teacher=True
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def day(self, offset):
+        return self.monday + datetime.timedelta(days=offset)
+
+    def ids(self, *indexes):
+        return [self.students[i].pk for i in indexes]
+
+    def test_bitmap_round_trip(self):
+        flags = [True, False, True] * 7
+        packed = attendance.pack_bits(flags)
+        self.assertEqual(len(packed), 3)
+        self.assertEqual(attendance.unpack_bits(packed, len(flags)), flags)
+        self.assertEqual(attendance.popcount(packed), 14)
+        self.assertEqual(attendance.unpack_roster(attendance.pack_roster([5, 70000])), [5, 70000])
+
+    def test_one_row_per_class_day_and_rollups(self):
+        sheet = attendance.mark_class("7", self.day(0), self.ids(0, 1, 2, 3, 4, 5, 6, 7))
+        self.assertEqual((sheet.present_count, sheet.total), (8, 10))
+        # re-marking replaces the day and moves the roll-ups by the difference
+        attendance.mark_class("7", self.day(0), self.ids(0, 1, 2, 3, 4, 5, 6, 7, 8))
+        attendance.mark_class("7", self.day(1), self.ids(0))
+
+        self.assertEqual(AttendanceSheet.objects.count(), 2)
+        self.assertEqual(
+            attendance.student_attendance(self.students[0]),
+            {"sessions": 2, "present": 2, "percentage": 100.0},
+        )
+        self.assertEqual(attendance.student_attendance(self.students[8])["present"], 1)
+        self.assertEqual(attendance.student_attendance(self.students[9])["percentage"], 0.0)
+        self.assertEqual(
+            [
+                row["present"]
+                for row in attendance.class_daily_totals("7", self.day(0), self.day(4))
+            ],
+            [9, 1],
+        )
+
+    def test_concurrent_first_marks_do_not_fail(self):
+        locked_sheet = attendance._locked_sheet
+        raced = []
+
+        def racing_lookup(*args):
+            # the first lookup misses the sheet another request is about to save
+            if not raced:
+                raced.append(args)
+                attendance.mark_class("7", self.day(0), self.ids(0, 1))
+                return None
+            return locked_sheet(*args)
+
+        with mock.patch.object(attendance, "_locked_sheet", racing_lookup):
+            sheet = attendance.mark_class("7", self.day(0), self.ids(2))
+
+        self.assertTrue(raced)
+        self.assertEqual(AttendanceSheet.objects.get().pk, sheet.pk)
+        self.assertEqual(sheet.present_count, 1)
+        self.assertEqual(attendance.student_attendance(self.students[0])["present"], 0)
+        self.assertEqual(
+            attendance.student_attendance(self.students[2]),
+            {"sessions": 1, "present": 1, "percentage": 100.0},
+        )
+
+    def test_marking_queries_do_not_grow_with_class_size(self):
+        attendance.mark_class("7", self.day(0), self.ids(0))
+        # roster, savepoint, sheet select and update, one update per kind of change, release
+        with self.assertNumQueries(7):
+            attendance.mark_class("7", self.day(0), self.ids(1, 2, 3))
+
+    def test_low_attendance_and_alerts(self):
+        for offset in range(4):
+            attendance.mark_class("7", self.day(offset), self.ids(*range(1, 10)))
+        attendance.mark_class("7", self.day(4), self.ids(0, 1, 2, 3, 4, 5, 6, 7, 8, 9))
+
+        low = attendance.low_attendance(self.day(0), self.day(4))
+        self.assertEqual(len(low), 1)
+        self.assertEqual(low[0]["student_id"], self.students[0].pk)
+        self.assertEqual(low[0]["percentage"], 20.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(attendance.send_low_attendance_alerts(self.day(0), self.day(4)), 1)
+        self.assertIn("20%", Notification.objects.get(user=self.students[0].user).message)
+
+    def test_subject_attendance_is_separate(self):
+        subject = Subject.objects.create(
+            name="Maths", code="M1", department=Department.objects.create(name="Sci")
+        )
+        attendance.mark_class("7", self.day(0), self.ids(0), subject=subject)
+        attendance.mark_class("7", self.day(0), self.ids(0, 1))
+        self.assertEqual(
+            attendance.student_attendance(self.students[1], subject=subject)["present"], 0
+        )
+        self.assertEqual(attendance.student_attendance(self.students[1])["present"], 1)
+
+    def test_invalid_marks(self):
+        with self.assertRaises(attendance.AttendanceError):
+            attendance.mark_class("7", self.day(5), self.ids(0))  # Saturday
+        Holiday.objects.create(name="Closed", date=self.day(2))
+        with self.assertRaises(attendance.AttendanceError):
+            attendance.mark_class("7", self.day(2), self.ids(0))
+        with self.assertRaises(attendance.AttendanceError):
+            attendance.mark_class("8", self.day(0), [])
+        with self.assertRaises(attendance.AttendanceError):
+            attendance.mark_class("7", self.day(0), [999999])
+
+    def test_mark_endpoint(self):
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            reverse("mark_attendance"),
+            {"student_class": "7", "date": self.day(0).isoformat(), "present": self.ids(0, 1)},
+        )
+        self.assertEqual(response.json()["present"], 2)
+
+        response = self.client.post(
+            reverse("mark_attendance"),
+            {"student_class": "7", "date": self.day(1).isoformat(), "all_present": "1"},
+        )
+        self.assertEqual(response.json()["present"], 10)
+
+        response = self.client.post(
+            reverse("mark_attendance"), {"student_class": "7", "date": self.day(5).isoformat()}
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(
+            reverse("attendance_report"),
+            {"student_class": "7", "start": self.day(0), "end": self.day(4)},
+        )
+        data = response.json()
+        self.assertEqual([day["present"] for day in data["days"]], [2, 10])
+        self.assertEqual(len(data["below_threshold"]), 8)
+
+    def test_students_cannot_mark(self):
+        self.client.force_login(self.students[0].user)
+        response = self.client.post(reverse("mark_attendance"), {"student_class": "7"})
+        self.assertEqual(response.status_code, 403)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.science = Department.objects.create(name="Science", description="Labs and physics")
+        cls.physics = Subject.objects.create(name="Physics", code="PHY1", department=cls.science)
+        cls.teacher = Teacher.objects.create(
+            first_name="Grace",
+            last_name="Hopper",
+            email="grace@example.com",
+            mobile="123",
+            gender="Female",
+            date_of_birth=datetime.date(1980, 1, 1),
+            address="Arlington",
+            joining_date=datetime.date(2020, 1, 1),
+        )
+        cls.user = User.objects.create_user(
+            username="searcher", email="searcher@example.com", password="x"
+        )
+
+    def titles(self, query, **kwargs):
+        return [entry.title for entry in search.search(query, **kwargs)]
+
+    def test_signals_keep_the_index_current(self):
+        self.assertEqual(self.titles("gra hop"), ["Grace Hopper"])
+        # title matches rank above body matches
+        self.assertEqual(self.titles("phy"), ["Physics", "Science"])
+        self.assertEqual(self.titles("phy", kinds=["department"]), ["Science"])
+
+        self.teacher.last_name = "Murray"
+        self.teacher.save()
+        self.assertEqual(self.titles("hopper"), [])
+        self.assertEqual(self.titles("murr"), ["Grace Murray"])
+
+        self.science.name = "Natural Sciences"
+        self.science.save()
+        self.assertEqual(self.titles("natural", kinds=["subject"]), ["Physics"])
+
+        self.physics.delete()
+        self.assertEqual(self.titles("phy"), ["Natural Sciences"])
+
+    def test_updates_keep_the_fts_index_intact(self):
+        if not search._fts_available():
+            self.skipTest("SQLite FTS5 is not available")
+        book = Book.objects.create(isbn="9780451524935", title="Nineteen Eighty-Four")
+        book.title = "1984"
+        book.save()
+        self.teacher.save()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {search.FTS_TABLE}({search.FTS_TABLE}, rank) "
+                "VALUES ('integrity-check', 1)"
+            )
+        self.assertEqual(self.titles("nineteen"), [])
+        self.assertEqual(self.titles("1984"), ["1984"])
+
+    def test_best_match_is_found_among_many(self):
+        SearchEntry.objects.bulk_create(
+            SearchEntry(kind="book", object_id=pk, title=f"Book {pk}", body="a physics primer")
+            for pk in range(1, 1001)
+        )
+        # added last, so it has the highest rowid of all the matches
+        SearchEntry.objects.create(kind="book", object_id=1001, title="Physics Workbook")
+        self.assertCountEqual(self.titles("physics", limit=3)[:2], ["Physics", "Physics Workbook"])
+
+    def test_operators_in_queries_are_inert(self):
+        for query in ('"', "gra* OR", "NEAR(", "-", "kind:teacher", ""):
+            search.search(query)
+        self.assertEqual(self.titles("GRACE, hopper!"), ["Grace Hopper"])
+
+    def test_rebuild(self):
+        SearchEntry.objects.all().delete()
+        self.assertEqual(self.titles("grace"), [])
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("Indexed 3 records", out.getvalue())
+        self.assertEqual(self.titles("grace"), ["Grace Hopper"])
+
+    def test_imported_students_are_indexed(self):
+        from student.importer import import_roster
+
+        import_roster(
+            [
+                (
+                    2,
+                    {
+                        "first_name": "Ada",
+                        "last_name": "Lovelace",
+                        "student_id": "S77",
+                        "gender": "Female",
+                        "date_of_birth": "2010-12-10",
+                        "student_class": "5",
+                        "joining_date": "2020-06-01",
+                        "father_name": "Byron",
+                    },
+                )
+            ]
+        )
+        [entry] = search.search("lovel byr")
+        self.assertEqual(entry.url, reverse("view_student", args=["S77"]))
+
+    def test_endpoints(self):
+        self.client.force_login(self.user)
+        data = self.client.get(reverse("search_api"), {"q": "hop"}).json()
+        self.assertEqual(
+            data["results"][0]["url"], reverse("teacher_details", args=[self.teacher.pk])
+        )
+        self.assertEqual(data["results"][0]["label"], "Teacher")
+
+        response = self.client.get(reverse("search"), {"q": "physics"})
+        self.assertContains(response, "Physics")
+
+
+class MessagingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username="ms-teacher", email="mt@example.com", password="x", is_teacher=True
+        )
+        cls.students = [
+            User.objects.create_user(
+                username=f"ms-student{i}", email=f"ms{i}@example.com", password="x", is_student=True
+            )
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_read_cursors_drive_unread_counts(self):
+        pupil = self.students[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            thread = messaging.start_thread(self.teacher, [pupil], "Homework", "Page 12 please")
+        self.assertEqual(messaging.unread_count(pupil), 1)
+        self.assertEqual(messaging.unread_count(self.teacher), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            messaging.send_message(thread, self.teacher, "And page 13")
+        with self.assertNumQueries(0):
+            self.assertEqual(messaging.unread_count(pupil), 2)
+
+        # replying reads the thread for the sender
+        with self.captureOnCommitCallbacks(execute=True):
+            reply = messaging.send_message(thread, pupil, "Done")
+        self.assertEqual(reply.seq, 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(messaging.unread_count(pupil), 0)
+            self.assertEqual(messaging.unread_count(self.teacher), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(messaging.mark_read(thread, self.teacher), 1)
+        self.assertEqual(messaging.unread_count(self.teacher), 0)
+        cache.clear()
+        self.assertEqual(messaging.unread_count(self.teacher), 0)
+
+        thread.refresh_from_db()
+        self.assertEqual(thread.last_message_preview, "Done")
+        self.assertEqual(thread.last_message_sender, pupil)
+
+        with self.assertRaises(messaging.MessagingError):
+            messaging.send_message(thread, self.students[1], "Can I join?")
+
+    def test_send_to_role_writes_private_threads_in_chunks(self):
+        messaging.unread_count(self.students[0])
+        # savepoint + release, the streamed ids, then threads, messages and participants per chunk
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(2 + 1 + 3 * 3):
+            sent = messaging.send_to_role(
+                self.teacher, "student", "Trip", "Bring a packed lunch", chunk_size=2
+            )
+        self.assertEqual(sent, 5)
+        self.assertEqual(MessageThread.objects.count(), 5)
+        self.assertEqual(Message.objects.count(), 5)
+        self.assertEqual(messaging.unread_count(self.students[0]), 1)
+        # the copies stay out of the sender's inbox but are all in their sent folder
+        self.assertFalse(ThreadParticipant.objects.filter(user=self.teacher).exists())
+        self.assertEqual(len(messaging.inbox_page(self.teacher)), 0)
+        self.assertEqual(len(messaging.inbox_page(self.teacher, "sent")), 5)
+
+    def test_reply_to_a_broadcast_copy_reaches_its_sender(self):
+        messaging.send_to_role(self.teacher, "student", "Trip", "Bring a packed lunch")
+        pupil = self.students[1]
+        thread = MessageThread.objects.get(participants__user=pupil)
+        messaging.unread_count(self.teacher)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            messaging.send_message(thread, pupil, "Can I bring crisps?")
+        self.assertEqual(messaging.unread_count(self.teacher), 1)
+        self.assertEqual(
+            [row.thread for row in messaging.inbox_page(self.teacher, "unread")], [thread]
+        )
+
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse("inbox_thread", args=[thread.pk]))
+        self.assertContains(response, "Can I bring crisps?")
+        response = self.client.get(reverse("inbox"), {"folder": "sent"})
+        self.assertContains(response, "Bring a packed lunch")
+        self.client.force_login(self.students[2])
+        response = self.client.get(reverse("inbox_thread", args=[thread.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_inbox_pages_newest_first(self):
+        threads = [
+            messaging.start_thread(self.teacher, [pupil], f"Note {i}", "Hello")
+            for i, pupil in enumerate(self.students)
+        ]
+        messaging.send_message(threads[0], self.students[0], "Bumped")
+
+        first = messaging.inbox_page(self.teacher, page_size=3)
+        self.assertEqual([row.thread.subject for row in first], ["Note 0", "Note 4", "Note 3"])
+        second = messaging.inbox_page(self.teacher, after=first.next_cursor, page_size=3)
+        self.assertEqual([row.thread.subject for row in second], ["Note 2", "Note 1"])
+        self.assertFalse(second.has_next)
+        back = messaging.inbox_page(self.teacher, before=second.previous_cursor, page_size=3)
+        self.assertEqual([row.pk for row in back], [row.pk for row in first])
+
+        self.assertEqual(
+            [row.thread.subject for row in messaging.inbox_page(self.teacher, "unread")],
+            ["Note 0"],
+        )
+        self.assertEqual(len(messaging.inbox_page(self.students[0], "sent")), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(messaging.mark_all_read(self.teacher), 1)
+        self.assertEqual(messaging.unread_count(self.teacher), 0)
+
+    def test_compose_and_read_views(self):
+        pupil = self.students[0]
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            reverse("send_inbox_message"),
+            {
+                "recipient": "specific",
+                "specific_user": "MS1@example.com",
+                "subject": "Report",
+                "message": "See me after class",
+            },
+        )
+        thread = MessageThread.objects.get(subject="Report")
+        self.assertRedirects(response, reverse("inbox_thread", args=[thread.pk]))
+        self.assertEqual(thread.participants.count(), 2)
+
+        self.client.force_login(self.students[1])
+        response = self.client.get(reverse("inbox"))
+        self.assertContains(response, "See me after class")
+        self.assertEqual(response.context["unread_messages"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(reverse("inbox_thread", args=[thread.pk]))
+        self.assertContains(response, "See me after class")
+        self.assertEqual(messaging.unread_count(self.students[1]), 0)
+
+        # students may not message a whole role, nor read other people's threads
+        response = self.client.post(
+            reverse("send_inbox_message"),
+            {"recipient": "teachers", "subject": "Hi", "message": "Hello all"},
+        )
+        self.assertEqual(response.status_code, 403)
+        self.client.force_login(pupil)
+        self.assertEqual(
+            self.client.get(reverse("inbox_thread", args=[thread.pk])).status_code, 404
+        )
+
+
+class ExamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from student.models import Parent, Student
+
+        cls.students = [
+            Student.objects.create(
+                parent=Parent.objects.create(father_name=f"Parent {i}"),
+                first_name="Pupil",
+                last_name=str(i),
+                student_id=f"E{i}",
+                gender="Male",
+                date_of_birth=datetime.date(2012, 1, 1),
+                joining_date=datetime.date(2020, 1, 1),
+                student_class="7" if i < 4 else "8",
+            )
+            for i in range(5)
+        ]
+        department = Department.objects.create(name="Exams")
+        cls.exam = Exam.objects.create(
+            name="Finals",
+            term="2026-T1",
+            start_date=datetime.date(2026, 3, 2),
+            end_date=datetime.date(2026, 3, 6),
+        )
+        cls.maths = ExamSubject.objects.create(
+            exam=cls.exam,
+            subject=Subject.objects.create(name="Maths", code="EM", department=department),
+            max_marks=100,
+            credits=2,
+        )
+        cls.art = ExamSubject.objects.create(
+            exam=cls.exam,
+            subject=Subject.objects.create(name="Art", code="EA", department=department),
+            max_marks=50,
+            credits=1,
+        )
+        cls.admin = User.objects.create_user(
+            username="exam-admin", email="exam-admin@example.com", is_admin=True
+        )
+        cls.teacher = User.objects.create_user(
+            username="exam-teacher", email="exam-teacher@example.com", is_teacher=True
+        )
+
+    def enter(self, maths, art):
+        ids = [student.pk for student in self.students]
+        exams.record_marks(self.maths, dict(zip(ids, maths)))
+        exams.record_marks(self.art, dict(zip(ids, art)))
+
+    def results(self):
+        return {result.student_id: result for result in ExamResult.objects.filter(exam=self.exam)}
+
+    def test_record_marks_upserts(self):
+        pk = self.students[0].pk
+        self.assertEqual(exams.record_marks(self.maths, {pk: 40, self.students[1].pk: ""}), 2)
+        exams.record_marks(self.maths, {pk: "72.5"}, entered_by=self.teacher)
+        mark = Mark.objects.get(paper=self.maths, student_id=pk)
+        self.assertEqual((mark.score, mark.entered_by), (Decimal("72.50"), self.teacher))
+        self.assertIsNone(Mark.objects.get(paper=self.maths, student=self.students[1]).score)
+        self.assertEqual(Mark.objects.count(), 2)
+
+    def test_invalid_scores_write_nothing(self):
+        for bad in (101, -1, "ten", "NaN", float("nan"), "-Infinity"):
+            with self.assertRaises(exams.ExamError):
+                exams.record_marks(self.maths, {self.students[0].pk: 50, self.students[1].pk: bad})
+        self.assertFalse(Mark.objects.exists())
+
+    def test_compute_results(self):
+        self.enter(maths=[90, 80, 70, None, 100], art=[45, 40, 50, 20, 0])
+        self.assertEqual(exams.compute_results(self.exam), 5)
+        results = self.results()
+        s0, s1, s2, s3, s4 = (results[student.pk] for student in self.students)
+
+        self.assertEqual((s0.total, s0.max_total, s0.percentage), (135, 150, 90))
+        self.assertEqual(s3.total, 20)  # absent from Maths
+        # credit-weighted grade points: (3.3 * 2 + 4.0) / 3
+        self.assertEqual([s0.gpa, s1.gpa, s2.gpa, s3.gpa], [4.0, 3.7, 3.53, 0.33])
+        # competition ranking within each class
+        self.assertEqual([r.class_rank for r in (s0, s1, s2, s3)], [1, 2, 2, 4])
+        self.assertEqual((s4.student_class, s4.class_rank, s4.class_size), ("8", 1, 1))
+        self.assertEqual(s0.class_size, 4)
+        # share of the whole exam scoring strictly lower
+        self.assertEqual([r.percentile for r in (s0, s1, s2, s3, s4)], [80, 40, 40, 0, 20])
+
+        self.exam.refresh_from_db()
+        self.assertIsNotNone(self.exam.results_computed_at)
+
+        # recomputing replaces the previous rows
+        self.enter(maths=[0, 80, 70, 60, 100], art=[0, 40, 50, 20, 0])
+        exams.compute_results(self.exam)
+        results = self.results()
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[self.students[0].pk].class_rank, 4)
+        self.assertEqual(
+            [r.student_id for r in exams.class_results(self.exam, "7")][:2],
+            [self.students[1].pk, self.students[2].pk],
+        )
+
+    def test_missing_mark_counts_as_absent(self):
+        first, second = self.students[:2]
+        exams.record_marks(self.maths, {first.pk: 80, second.pk: 80})
+        exams.record_marks(self.art, {first.pk: None})  # absent; no row for the second
+        exams.compute_results(self.exam)
+        results = self.results()
+        for pk in (first.pk, second.pk):
+            result = results[pk]
+            self.assertEqual((result.total, result.max_total), (80, 150))
+            self.assertEqual((result.percentage, result.gpa), (53.33, 2.47))
+        self.assertEqual(results[first.pk].class_rank, results[second.pk].class_rank)
+
+    def test_grades_and_status(self):
+        self.assertEqual(exams.grade_for(85), ("A", 3.7))
+        self.assertEqual(exams.grade_for(12), ("F", 0.0))
+        self.assertEqual(exams.exam_status(self.exam, datetime.date(2026, 3, 1)), "upcoming")
+        self.assertEqual(exams.exam_status(self.exam, datetime.date(2026, 3, 6)), "ongoing")
+        self.assertEqual(exams.exam_status(self.exam, datetime.date(2026, 3, 7)), "completed")
+        with self.assertRaises(exams.ExamError):
+            exams.compute_results(
+                Exam.objects.create(name="Empty", term="x", start_date="2026-1-1")
+            )
+
+    def test_marks_endpoint_and_results_page(self):
+        url = reverse("record_exam_marks", args=[self.maths.pk])
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            url,
+            {"marks": {str(self.students[0].pk): 88, str(self.students[1].pk): None}},
+            content_type="application/json",
+        )
+        self.assertEqual(response.json(), {"paper": self.maths.pk, "written": 2})
+        for body in (
+            {"marks": {str(self.students[0].pk): 500}},
+            {"scores": {}},
+            {"marks": {"999999": 1}},
+            {"marks": {str(self.students[0].pk): "NaN"}},
+        ):
+            response = self.client.post(url, body, content_type="application/json")
+            self.assertEqual(response.status_code, 400)
+
+        # only admins compute
+        compute = reverse("compute_exam_results", args=[self.exam.pk])
+        self.assertEqual(self.client.post(compute).status_code, 403)
+        self.client.force_login(self.admin)
+        response = self.client.post(compute, follow=True)
+        self.assertContains(response, "Results computed for 2 students.")
+        self.assertContains(response, "88.00 / 150")  # no Art mark yet: 0 of 50
+
+        response = self.client.get(reverse("exams"))
+        self.assertEqual(response.context["stats"]["total"], 1)
+        self.assertEqual(response.context["stats"]["published"], 1)
+        self.assertContains(response, "Maths")
+        self.assertEqual(
+            len(self.client.get(reverse("exams"), {"type": "quiz"}).context["papers"]), 0
+        )
+
+        student = User.objects.create_user(
+            username="exam-pupil", email="exam-pupil@example.com", is_student=True
+        )
+        self.client.force_login(student)
+        self.assertEqual(
+            self.client.post(url, {}, content_type="application/json").status_code, 403
+        )
+
+
+class ReportCardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from student.models import Parent, Student
+
+        cls.students = [
+            Student.objects.create(
+                parent=Parent.objects.create(father_name=f"Parent {i}"),
+                first_name="Card",
+                last_name=f"Holder{i}",
+                student_id=f"RC{i}",
+                gender="Female",
+                date_of_birth=datetime.date(2012, 1, 1),
+                joining_date=datetime.date(2020, 1, 1),
+                student_class="9B",
+            )
+            for i in range(3)
+        ]
+        cls.exam = Exam.objects.create(
+            name="Finals", term="2026-T2", start_date=datetime.date(2026, 6, 1)
+        )
+        paper = ExamSubject.objects.create(
+            exam=cls.exam,
+            subject=Subject.objects.create(
+                name="History (World)",
+                code="RH",
+                department=Department.objects.create(name="Humanities"),
+            ),
+        )
+        exams.record_marks(paper, {cls.students[0].pk: 91, cls.students[1].pk: 64.5})
+        exams.record_marks(paper, {cls.students[2].pk: None})
+        exams.compute_results(cls.exam)
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.archive = f"{self.tmp}/cards.zip"
+
+    def text(self, document):
+        """Decompressed page content of a PDF from :mod:`school.pdf`"""
+        streams = document.split(b">>\nstream\n")[1:]
+        return b"".join(zlib.decompress(part.split(b"\nendstream")[0]) for part in streams)
+
+    def test_pdf_structure(self):
+        document = pdf.render("# Title\n---\n" + "line (1)\n" * 120, title="T")
+        self.assertTrue(document.startswith(b"%PDF-1.4"))
+        self.assertTrue(document.endswith(b"%%EOF\n"))
+        self.assertIn(b"/Count 3", document)  # 120 body lines do not fit on two pages
+        xref = int(document.rsplit(b"startxref\n", 1)[1].split(b"\n")[0])
+        entries = document[xref:].split(b"\n")[3:]
+        for number, entry in enumerate(entries[: document.count(b" 0 obj")], 1):
+            offset = int(entry.split()[0])
+            self.assertTrue(document[offset:].startswith(b"%d 0 obj" % number))
+        self.assertIn(b"(line \\(1\\)) Tj", self.text(document))
+
+    def test_generates_archive(self):
+        seen = []
+        run = report_cards.generate_report_cards(
+            "2026-T2", self.archive, workers=0, progress=lambda *args: seen.append(args)
+        )
+        self.assertEqual((run.total, run.rendered, run.skipped), (3, 3, 0))
+        self.assertEqual(seen[-1], (3, 3))
+        self.assertEqual(run.summary()["rendered"], 3)
+        self.assertIn("p95_ms", run.summary())
+        with zipfile.ZipFile(self.archive) as zf:
+            self.assertEqual(
+                sorted(zf.namelist()),
+                [f"9b/card-holder{i}-rc{i}.pdf" for i in range(3)],
+            )
+            text = self.text(zf.read("9b/card-holder1-rc1.pdf"))
+            absent = self.text(zf.read("9b/card-holder2-rc2.pdf"))
+        self.assertIn(b"Card Holder1", text)
+        self.assertIn(b"History \\(World\\)", text)
+        self.assertIn(b"64.5", text)
+        self.assertIn(b"AB", absent)
+        self.assertFalse(os.path.exists(f"{self.archive}.parts"))
+
+        with self.assertRaises(report_cards.ReportCardError):
+            report_cards.generate_report_cards("1999-T1", self.archive, workers=0)
+
+    def test_zero_mark_papers_and_case_variant_ids(self):
+        from student.models import Parent, Student
+
+        twin = Student.objects.create(
+            parent=Parent.objects.create(father_name="Parent 0b"),
+            first_name="Card",
+            last_name="Holder0",
+            student_id="rc0",
+            gender="Female",
+            date_of_birth=datetime.date(2012, 1, 1),
+            joining_date=datetime.date(2020, 1, 1),
+            student_class="9B",
+        )
+        oral = ExamSubject.objects.create(
+            exam=self.exam,
+            subject=Subject.objects.create(
+                name="Oral", code="RO", department=Department.objects.get()
+            ),
+            max_marks=0,
+        )
+        exams.record_marks(oral, {self.students[0].pk: 0, twin.pk: 0})
+        exams.compute_results(self.exam)
+
+        run = report_cards.generate_report_cards("2026-T2", self.archive, workers=0)
+        self.assertEqual(run.rendered, 4)
+        with zipfile.ZipFile(self.archive) as zf:
+            self.assertIn("9b/card-holder0-rc0-2.pdf", zf.namelist())
+            self.assertIn(b"Oral", self.text(zf.read("9b/card-holder0-rc0.pdf")))
+
+    def test_resumes_after_interruption(self):
+        def crash(done, total):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            report_cards.generate_report_cards(
+                "2026-T2", self.archive, workers=0, batch_size=1, progress=crash
+            )
+        self.assertFalse(os.path.exists(self.archive))
+
+        run = report_cards.generate_report_cards(
+            "2026-T2", self.archive, workers=0, keep_parts=True
+        )
+        self.assertEqual((run.skipped, run.rendered), (1, 2))
+        with zipfile.ZipFile(self.archive) as zf:
+            self.assertEqual(len(zf.namelist()), 3)
+
+        # recomputed results invalidate the cards already rendered
+        exams.compute_results(self.exam)
+        run = report_cards.generate_report_cards("2026-T2", self.archive, workers=0)
+        self.assertEqual((run.skipped, run.rendered), (0, 3))
+
+    def test_process_pool(self):
+        run = report_cards.generate_report_cards("2026-T2", self.archive, workers=2)
+        self.assertEqual(run.rendered, 3)
+        with zipfile.ZipFile(self.archive) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(len(zf.namelist()), 3)
+
+
+@override_settings(LIBRARY_LOAN_LIMIT=2, LIBRARY_LOAN_DAYS=14)
+class LibraryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.books = {
+            title: Book.objects.create(isbn=isbn, title=title, author="Anon")
+            for isbn, title in [
+                ("9780141439518", "Pride and Prejudice"),
+                ("9780141439556", "Wuthering Heights"),
+                ("0451524934", "1984"),
+                ("9781853260001", "Pride & Honour: A History"),
+            ]
+        }
+        library.add_copies(cls.books["Pride and Prejudice"], ["PP-1", "PP-2"])
+        library.add_copies(cls.books["Wuthering Heights"], ["WH-1"])
+        cls.librarian = User.objects.create_user(
+            username="librarian", email="librarian@example.com", is_teacher=True
+        )
+        cls.reader = User.objects.create_user(
+            username="reader", email="reader@example.com", is_student=True
+        )
+
+    def book(self, title):
+        return Book.objects.get(pk=self.books[title].pk)
+
+    def test_search_by_title_and_isbn_prefix(self):
+        def titles(query):
+            return [book.title for book in library.search_catalog(query)]
+
+        self.assertEqual(titles("pride"), ["Pride and Prejudice", "Pride & Honour: A History"])
+        self.assertEqual(titles("PRIDE  AND p"), ["Pride and Prejudice"])
+        self.assertEqual(titles("pride honour"), ["Pride & Honour: A History"])
+        self.assertEqual(titles("978-0141"), ["Pride and Prejudice", "Wuthering Heights"])
+        self.assertEqual(titles("0451"), ["1984"])
+        self.assertEqual(titles("19"), ["1984"])  # too short for an ISBN: a title
+        self.assertEqual(titles("1984"), ["1984"])  # ISBN-like, but only the title matches
+        Book.objects.create(isbn="9781984000000", title="2001: A Space Odyssey")
+        self.assertEqual(titles("2001"), ["2001: A Space Odyssey"])
+        self.assertEqual(titles("978198"), ["2001: A Space Odyssey"])
+        self.assertEqual(titles("zz"), [])
+        self.assertEqual(library.normalize_isbn("0-451-52493-4"), "0451524934")
+        with self.assertRaises(library.LibraryError):
+            library.normalize_isbn("12345")
+
+    def test_queries_use_indexes(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite query plans")
+
+        def plan(queryset):
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                return " ".join(row[-1] for row in cursor.fetchall())
+
+        key = library.normalize_title("pride")
+        self.assertIn(
+            "book_title_key_idx",
+            plan(Book.objects.filter(library._prefix("title_key", key)).order_by("title_key")),
+        )
+        self.assertIn("isbn", plan(Book.objects.filter(library._prefix("isbn", "978"))))
+        self.assertIn("loan_overdue_idx", plan(library.overdue_loans(datetime.date(2026, 1, 1))))
+
+    def test_checkout_and_return_keep_counters(self):
+        loan = library.checkout("PP-1", self.reader, issued_by=self.librarian)
+        self.assertEqual(loan.due_date, timezone.localdate() + datetime.timedelta(days=14))
+        book = self.book("Pride and Prejudice")
+        self.assertEqual((book.copies_total, book.copies_available, book.loans_total), (2, 1, 1))
+        self.assertEqual(Copy.objects.get(barcode="PP-1").status, Copy.ON_LOAN)
+
+        with self.assertRaises(library.LibraryError):
+            library.checkout("PP-1", self.librarian)  # already out
+        with self.assertRaises(library.LibraryError):
+            library.checkout("NOPE", self.reader)
+
+        library.checkout("WH-1", self.reader)
+        with self.assertRaises(library.LibraryError):
+            library.checkout("PP-2", self.reader)  # loan limit of 2
+
+        returned = library.return_copy("PP-1")
+        self.assertIsNotNone(returned.returned_at)
+        self.assertEqual(self.book("Pride and Prejudice").copies_available, 2)
+        with self.assertRaises(library.LibraryError):
+            library.return_copy("PP-1")
+
+        library.set_copy_status("PP-2", Copy.LOST)
+        book = self.book("Pride and Prejudice")
+        self.assertEqual((book.copies_total, book.copies_available), (1, 1))
+        with self.assertRaises(library.LibraryError):
+            library.set_copy_status("WH-1", Copy.LOST)  # on loan
+
+        # recount agrees with the counters kept incrementally
+        before = list(
+            Book.objects.order_by("pk").values_list(
+                "copies_total", "copies_available", "loans_total"
+            )
+        )
+        Book.objects.update(copies_total=0, copies_available=0, loans_total=0)
+        library.recount()
+        after = list(
+            Book.objects.order_by("pk").values_list(
+                "copies_total", "copies_available", "loans_total"
+            )
+        )
+        self.assertEqual(after, before)
+
+    def test_overdue_and_stats(self):
+        long_ago = timezone.localdate() - datetime.timedelta(days=30)
+        loan = library.checkout("PP-1", self.reader, today=long_ago)
+        library.checkout("WH-1", self.reader)
+        self.assertEqual(list(library.overdue_loans()), [loan])
+        self.assertEqual(loan.days_overdue(), 16)
+        stats = library.library_stats()
+        self.assertEqual(
+            {k: stats[k] for k in ("titles", "copies", "on_loan", "overdue", "borrowers")},
+            {"titles": 4, "copies": 3, "on_loan": 2, "overdue": 1, "borrowers": 1},
+        )
+
+    def test_counter_desk_views(self):
+        self.client.force_login(self.reader)
+        response = self.client.post(
+            reverse("library_checkout"), {"barcode": "PP-1", "borrower": "reader"}
+        )
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(self.librarian)
+        response = self.client.post(
+            reverse("library_checkout"),
+            {"barcode": "PP-1", "borrower": "READER@example.com"},
+            follow=True,
+        )
+        self.assertContains(response, "Pride and Prejudice lent to reader")
+        self.assertEqual(Loan.objects.get().issued_by, self.librarian)
+        response = self.client.post(reverse("library_return"), {"barcode": "PP-1"}, follow=True)
+        self.assertContains(response, "Pride and Prejudice returned.")
+        response = self.client.post(reverse("library_return"), {"barcode": "PP-1"}, follow=True)
+        self.assertContains(response, "is not on loan")
+
+        response = self.client.get(reverse("library"), {"q": "wuther"})
+        self.assertEqual([book.title for book in response.context["books"]], ["Wuthering Heights"])
+        response = self.client.get(reverse("library_search_api"), {"q": "9780141439556"})
+        self.assertEqual(response.json()["results"][0]["available"], 1)
+
+
+class HostelTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from student.models import Parent, Student
+
+        cls.north = Hostel.objects.create(name="North", gender="Male")
+        cls.east = Hostel.objects.create(name="East", gender="Male")
+        cls.south = Hostel.objects.create(name="South", gender="Female")
+        cls.rooms = {}
+        for hostel, number, year_group, available in [
+            (cls.north, "N1", "7", True),
+            (cls.north, "N2", "", True),
+            (cls.north, "N3", "", True),
+            (cls.north, "N4", "", False),
+            (cls.east, "E1", "", True),
+            (cls.south, "S1", "", True),
+            (cls.south, "S2", "", True),
+        ]:
+            room = cls.rooms[number] = HostelRoom.objects.create(
+                hostel=hostel, number=number, year_group=year_group, is_available=available
+            )
+            for label in "AB":
+                Bed.objects.create(room=room, label=label)
+
+        cls.students = {}
+        applied = timezone.now() - datetime.timedelta(days=30)
+        for i, (key, gender, year, preferred) in enumerate(
+            [
+                ("m7a", "Male", "7", None),
+                ("m8a", "Male", "8", None),
+                ("m7b", "Male", "7", None),
+                ("m8c", "Male", "8", cls.east),
+                ("f7a", "Female", "7", None),
+                ("m7c", "Male", "7", None),
+                ("f7b", "Female", "7", None),
+                ("m8b", "Male", "8", None),
+                ("f8", "Female", "8", None),
+                ("f9a", "Female", "9", None),
+                ("f9b", "Female", "9", None),  # applied last: no female bed left
+            ]
+        ):
+            student = cls.students[key] = Student.objects.create(
+                parent=Parent.objects.create(father_name=f"Parent {key}"),
+                first_name=key,
+                last_name="Boarder",
+                student_id=f"H-{key}",
+                gender=gender,
+                date_of_birth=datetime.date(2012, 1, 1),
+                joining_date=datetime.date(2020, 1, 1),
+                student_class=year,
+            )
+            HostelApplication.objects.create(
+                student=student,
+                preferred_hostel=preferred,
+                applied_at=applied + datetime.timedelta(hours=i),
+            )
+
+    def beds(self):
+        return {
+            bed.student.first_name: bed
+            for bed in Bed.objects.filter(student__isnull=False).select_related(
+                "student", "room__hostel"
+            )
+        }
+
+    def test_full_allocation(self):
+        run = hostel.allocate_beds(full=True)
+        self.assertEqual((run.placed, run.moved, run.waiting), (10, 0, 1))
+        beds = self.beds()
+        self.assertNotIn("f9b", beds)
+        for bed in beds.values():
+            self.assertEqual(bed.student.gender, bed.room.hostel.gender)
+            self.assertTrue(bed.room.is_available)
+        self.assertEqual(beds["m8c"].room.hostel, self.east)
+        # the room kept for year 7 goes to year 7, and cohorts share rooms
+        self.assertEqual({beds["m7a"].room.number, beds["m7b"].room.number}, {"N1"})
+        self.assertEqual(beds["m8a"].room, beds["m8c"].room)
+        years = {}
+        for bed in beds.values():
+            years.setdefault(bed.room.number, set()).add(bed.student.student_class)
+        self.assertEqual([number for number, classes in years.items() if len(classes) > 1], ["S2"])
+        self.assertEqual(run.mixed_rooms, 1)  # two females of year 9 for one free bed
+        self.assertEqual(list(hostel.waiting_list()), [self.students["f9b"].hostel_application])
+
+    def test_incremental_allocation_keeps_residents(self):
+        hostel.allocate_beds()
+        before = {name: bed.pk for name, bed in self.beds().items()}
+
+        from student.models import Parent, Student
+
+        self.students["m7c"].hostel_application.delete()
+        HostelRoom.objects.filter(pk=self.beds()["m8b"].room_id).update(is_available=False)
+        newcomer = Student.objects.create(
+            parent=Parent.objects.create(father_name="Parent m7d"),
+            first_name="m7d",
+            last_name="Boarder",
+            student_id="H-m7d",
+            gender="Male",
+            date_of_birth=datetime.date(2012, 1, 1),
+            joining_date=datetime.date(2020, 1, 1),
+            student_class="7",
+        )
+        HostelApplication.objects.create(student=newcomer)
+
+        run = hostel.allocate_beds()
+        self.assertEqual((run.placed, run.moved, run.released), (1, 1, 1))
+        self.assertLessEqual(run.beds_written, 4)
+        after = {name: bed.pk for name, bed in self.beds().items()}
+        self.assertNotIn("m7c", after)
+        self.assertNotEqual(after["m8b"], before["m8b"])
+        for name in ("m7a", "m7b", "m8a", "m8c", "f7a", "f7b", "f8", "f9a"):
+            self.assertEqual(after[name], before[name], name)
+
+        # nothing changed: nothing is written
+        self.assertEqual(hostel.allocate_beds().beds_written, 0)
+
+    def test_repair_swaps_strays(self):
+        a = hostel._Room(1, 1, "Male", "", [], Counter())
+        b = hostel._Room(2, 1, "Male", "", [], Counter())
+        index = hostel._Index([a, b])
+        students = []
+        for pk, (year, room) in enumerate([("7", a), ("8", a), ("8", b), ("7", b)], 1):
+            student = hostel._Student(pk, "Male", year, None)
+            room.free.append(pk)
+            hostel._place(student, room, index)
+            students.append(student)
+        self.assertEqual(a.cost() + b.cost(), 2)
+        hostel._repair(students, index)
+        self.assertEqual(a.cost() + b.cost(), 0)
+        self.assertEqual(students[0].room, students[3].room)
+
+    def test_views(self):
+        boarder = User.objects.create_user(
+            username="boarder", email="boarder@example.com", is_student=True
+        )
+        self.students["m7a"].user = boarder
+        self.students["m7a"].save()
+        self.client.force_login(boarder)
+        self.assertEqual(self.client.post(reverse("hostel_allocate")).status_code, 403)
+
+        warden = User.objects.create_user(
+            username="warden", email="warden@example.com", is_admin=True
+        )
+        self.client.force_login(warden)
+        response = self.client.post(reverse("hostel_allocate"), follow=True)
+        self.assertContains(response, "10 placed, 0 moved, 0 released, 1 waiting")
+        self.assertEqual(response.context["totals"]["occupied"], 10)
+        self.assertEqual(response.context["totals"]["closed"], 1)
+        response = self.client.get(reverse("hostel"), {"hostel": self.south.pk, "floor": "1"})
+        self.assertEqual([room.number for room in response.context["rooms"]], ["S1", "S2"])
+        self.assertContains(response, "f9b")  # waiting list
+
+        self.client.force_login(boarder)
+        response = self.client.get(reverse("hostel"))
+        self.assertEqual(response.context["my_bed"].room.number, "N1")
+
+
+@override_settings(
+    SCHOOL_LOCATION=(23.75, 90.4),
+    TRANSPORT_WALK_METRES=400,
+    TRANSPORT_MAX_RIDE_MINUTES=60,
+    TRANSPORT_SPEED_KMH=20,
+    TRANSPORT_STOP_MINUTES=1,
+    TRANSPORT_DETOUR=1.3,
+)
+class TransportTests(TestCase):
+    HOMES = {
+        # six riders 3 km east, three 3 km north, and one too far for a 60 minute ride
+        "e1": (3000, 0),
+        "e2": (3050, 20),
+        "e3": (2980, -40),
+        "e4": (3020, 60),
+        "e5": (2950, 30),
+        "e6": (3080, -20),
+        "n1": (0, 3000),
+        "n2": (30, 3040),
+        "n3": (-40, 2990),
+        "far": (40000, 0),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        Bus.objects.create(registration="B-1", capacity=4, driver_name="Karim")
+        Bus.objects.create(registration="B-2", capacity=5)
+        cls.riders = {name: cls.add_rider(name, *cls.HOMES[name]) for name in cls.HOMES}
+
+    @staticmethod
+    def at(east, north):
+        """Latitude and longitude ``east`` and ``north`` metres from the school"""
+        lat, lon = 23.75, 90.4
+        return (
+            lat + north / 111_195,
+            lon + east / (111_195 * math.cos(math.radians(lat))),
+        )
+
+    @classmethod
+    def add_rider(cls, name, east, north):
+        from student.models import Parent, Student
+
+        student = Student.objects.create(
+            parent=Parent.objects.create(father_name=f"Parent {name}"),
+            first_name=name,
+            last_name="Rider",
+            student_id=f"T-{name}",
+            gender="Male",
+            date_of_birth=datetime.date(2012, 1, 1),
+            joining_date=datetime.date(2020, 1, 1),
+            student_class="7",
+        )
+        latitude, longitude = cls.at(east, north)
+        return Rider.objects.create(student=student, latitude=latitude, longitude=longitude)
+
+    def stops(self):
+        return dict(Rider.objects.values_list("student__first_name", "stop"))
+
+    def test_cluster_stops(self):
+        np = transport._numpy()
+        homes = np.array([[0, 0], [100, 0], [0, 100], [50, 50], [2000, 0], [2300, 0]], float)
+        stops = transport.cluster_stops(np, homes, 3, 400)
+        self.assertEqual(sorted(len(members) for _point, members in stops), [1, 2, 3])
+        self.assertEqual(sorted(i for _point, members in stops for i in members), list(range(6)))
+        for point, members in stops:
+            for i in members:
+                self.assertLessEqual(np.hypot(*(homes[i] - point)), 400)
+
+    def test_full_plan(self):
+        run = transport.plan_routes(full=True)
+        self.assertEqual((run.riders, run.unrouted, run.moved), (10, 1, 0))
+        # four seats on every route, so any bus can run it: three routes for two buses
+        self.assertEqual((run.routes, run.without_bus), (3, 1))
+        self.assertLessEqual(run.longest_ride, 60)
+        for route in Route.objects.all():
+            self.assertLessEqual(route.rider_count, 4)
+            self.assertLessEqual(route.ride_minutes, 60)
+            self.assertEqual(route.rider_count, route.stops.aggregate(n=Sum("rider_count"))["n"])
+        np = transport._numpy()
+        origin = transport.transport_limits().origin
+        for rider in Rider.objects.select_related("stop"):
+            home = transport._project(np, [rider.latitude], [rider.longitude], origin)
+            stop = transport._project(np, [rider.stop.latitude], [rider.stop.longitude], origin)
+            self.assertLessEqual(np.hypot(*(home - stop)[0]), 400.5)
+        far = Rider.objects.get(pk=self.riders["far"].pk).stop
+        self.assertIsNone(far.route)
+        self.assertEqual(Route.objects.filter(bus__isnull=True).get().rider_count, 2)
+
+        # unchanged: nothing moves
+        run = transport.plan_routes()
+        self.assertEqual((run.new_stops, run.moved), (0, 0))
+
+    def test_incremental_plan(self):
+        transport.plan_routes()
+        before = self.stops()
+        north = Stop.objects.get(pk=before["n1"])
+
+        self.add_rider("n4", 20, 3010)
+        run = transport.plan_routes()
+        self.assertEqual((run.new_stops, run.moved), (0, 0))
+        after = self.stops()
+        self.assertEqual(after["n4"], north.pk)
+        self.assertEqual({name: after[name] for name in before}, before)
+        self.assertEqual(Stop.objects.get(pk=north.pk).rider_count, 4)
+
+        # a stop left without riders is dropped, and its route with it
+        Rider.objects.filter(student__first_name__startswith="n").delete()
+        run = transport.plan_routes()
+        self.assertFalse(Stop.objects.filter(pk=north.pk).exists())
+        self.assertEqual(run.routes, 2)
+        self.assertEqual(self.stops(), {name: before[name] for name in before if name[0] != "n"})
+
+    def test_no_buses(self):
+        Bus.objects.update(is_active=False)
+        with self.assertRaises(transport.TransportError):
+            transport.plan_routes()
+
+    def test_views(self):
+        rider = User.objects.create_user(
+            username="rider", email="rider@example.com", is_student=True
+        )
+        student = self.riders["e1"].student
+        student.user = rider
+        student.save()
+        self.client.force_login(rider)
+        self.assertEqual(self.client.post(reverse("transport_plan")).status_code, 403)
+
+        planner = User.objects.create_user(
+            username="planner", email="planner@example.com", is_admin=True
+        )
+        self.client.force_login(planner)
+        response = self.client.post(reverse("transport_plan"), follow=True)
+        self.assertContains(response, "10 riders at")
+        self.assertEqual(response.context["totals"]["unrouted"], 1)
+        self.assertEqual(len(response.context["routes"]), 3)
+        self.assertContains(response, "Karim")
+
+        self.client.force_login(rider)
+        response = self.client.get(reverse("transport"))
+        my_stop = response.context["my_stop"]
+        self.assertEqual(my_stop.pk, Rider.objects.get(pk=self.riders["e1"].pk).stop_id)
+        self.assertContains(response, "Pickup at")
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    # lets the scratch connection below open; the test database is not touched
+    databases = {"default"}
+
+    def test_profile_is_chosen_by_the_environment(self):
+        with mock.patch.dict(os.environ, {"SQLITE_PATH": "/tmp/campus.sqlite3"}):
+            os.environ.pop("DJANGO_DB_PROFILE", None)
+            database = database_profile("/srv")
+        self.assertEqual(database["ENGINE"], "django.db.backends.sqlite3")
+        self.assertEqual(database["NAME"], "/tmp/campus.sqlite3")
+        self.assertEqual(database["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+
+        env = {"DJANGO_DB_PROFILE": "Postgres", "DB_NAME": "campus", "DB_POOL_MAX_SIZE": "4"}
+        with mock.patch.dict(os.environ, env):
+            database = database_profile("/srv")
+        self.assertEqual(database["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(database["NAME"], "campus")
+        self.assertEqual(database["CONN_MAX_AGE"], 0)
+        self.assertEqual(database["OPTIONS"]["pool"]["max_size"], 4)
+
+        env = {"DJANGO_DB_PROFILE": "postgresql", "DB_POOL": "off", "DB_CONN_MAX_AGE": "30"}
+        with mock.patch.dict(os.environ, env):
+            database = database_profile("/srv")
+        self.assertEqual(database["CONN_MAX_AGE"], 30)
+        self.assertNotIn("pool", database["OPTIONS"])
+
+        with mock.patch.dict(os.environ, {"DJANGO_DB_PROFILE": "mysql"}):
+            with self.assertRaises(ValueError):
+                database_profile("/srv")
+
+    def test_sqlite_connections_get_the_pragmas(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        with mock.patch.dict(os.environ, {"SQLITE_PATH": os.path.join(tmp, "campus.sqlite3")}):
+            handler = ConnectionHandler({"default": database_profile(tmp, "sqlite")})
+        sqlite = handler["default"]
+        self.addCleanup(sqlite.close)
+
+        with sqlite.cursor() as cursor:
+            pragmas = {
+                name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                for name in ("journal_mode", "synchronous", "busy_timeout")
+            }
+        self.assertEqual(pragmas, {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000})
+        self.assertEqual(sqlite.transaction_mode, "IMMEDIATE")
+        self.assertEqual(sqlite.get_connection_params()["timeout"], 5)
@@ -0,0 +1,163 @@
+"""Fixed-size derivative images (thumbnails) for uploaded photos.
+
+Thumbnails are written to the default storage under ``thumbnails/``, e.g. ``teachers/R.jpeg`` -> ``thumbnails/teachers/R.avatar.webp``.
+They are generated after upload on a small worker pool and referenced from
+templates with the ``thumbnail`` filter (``{% load thumbnails %}``).
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.dispatch import Signal
+from PIL import features, Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Roughly 2x the rendered sizes so avatars (31-45px) and cards (150px) stay sharp
+DEFAULT_THUMBNAIL_SIZES = {
+    "avatar": 64,
+    "card": 300,
+}
+
+# Image fields that get derivatives, as "app_label.Model.field"
+THUMBNAIL_FIELDS = [
+    "school.Teacher.teacher_image",
+    "home_auth.CustomUser.profile_image",
+    "student.Student.student_image",
+]
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# sent with ``name`` after derivatives were written; the sender is the model
+# owning the image when known, so pages cached with the original can refresh
+thumbnails_generated = Signal()
+
+
+def thumbnail_fields():
+    """Yield ``(model, field_name)`` for every registered image field"""
+    for path in THUMBNAIL_FIELDS:
+        model_label, field_name = path.rsplit(".", 1)
+        yield apps.get_model(model_label), field_name
+
+
+def thumbnail_sizes():
+    return getattr(settings, "THUMBNAIL_SIZES", DEFAULT_THUMBNAIL_SIZES)
+
+
+def thumbnail_format():
+    """WebP when Pillow was built with it, JPEG otherwise"""
+    fmt = getattr(settings, "THUMBNAIL_FORMAT", "WEBP").upper()
+    if fmt == "WEBP" and not features.check("webp"):
+        fmt = "JPEG"
+    return fmt
+
+
+def thumbnail_name(name, size):
+    """Storage path of the ``size`` derivative for an original file name"""
+    base, _ext = os.path.splitext(name)
+    extension = "webp" if thumbnail_format() == "WEBP" else "jpg"
+    return f"thumbnails/{base}.{size}.{extension}"
+
+
+def _render(image, pixels, fmt):
+    thumb = ImageOps.fit(image, (pixels, pixels), Image.LANCZOS)
+    buffer = BytesIO()
+    thumb.save(buffer, fmt, quality=82, optimize=fmt == "JPEG")
+    return buffer.getvalue()
+
+
+def generate_thumbnails(name, storage=None, force=False, model=None):
+    """Write every configured derivative of ``name``; returns the names written
+
+    ``model`` is the model whose image field holds ``name``, if known.
+    """
+    storage = storage or default_storage
+    fmt = thumbnail_format()
+    targets = {
+        size: thumbnail_name(name, size)
+        for size in thumbnail_sizes()
+        if force or not storage.exists(thumbnail_name(name, size))
+    }
+    if not targets:
+        return []
+
+    written = []
+    with storage.open(name, "rb") as source:
+        image = Image.open(source)
+        # Let the JPEG decoder downscale by a power of two before we resample
+        largest = max(thumbnail_sizes()[size] for size in targets)
+        image.draft("RGB", (largest * 2, largest * 2))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+
+        for size, target in targets.items():
+            data = _render(image, thumbnail_sizes()[size], fmt)
+            if storage.exists(target):
+                storage.delete(target)
+            written.append(storage.save(target, ContentFile(data)))
+    if written:
+        thumbnails_generated.send(sender=model, name=name)
+    return written
+
+
+def _safe_generate(name, force=False, model=None):
+    try:
+        return generate_thumbnails(name, force=force, model=model)
+    except Exception:
+        logger.exception("Could not generate thumbnails for %s", name)
+        return []
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "THUMBNAIL_WORKERS", 2),
+                thread_name_prefix="thumbnails",
+            )
+    return _executor
+
+
+def schedule_thumbnails(name, force=False, model=None):
+    """Generate thumbnails for ``name`` on the worker pool once the upload commits
+
+    With ``THUMBNAIL_ASYNC = False`` the work runs inline, which is what tests and
+    management commands want.
+    """
+    if not name:
+        return
+
+    def submit():
+        if getattr(settings, "THUMBNAIL_ASYNC", True):
+            get_executor().submit(_safe_generate, name, force, model)
+        else:
+            _safe_generate(name, force, model)
+
+    transaction.on_commit(submit)
+
+
+def delete_thumbnails(name, storage=None):
+    storage = storage or default_storage
+    for size in thumbnail_sizes():
+        target = thumbnail_name(name, size)
+        if storage.exists(target):
+            storage.delete(target)
+
+
+def thumbnail_url(fieldfile, size):
+    """URL of a derivative, falling back to the original until it has been generated"""
+    if not fieldfile:
+        return ""
+    name = thumbnail_name(fieldfile.name, size)
+    if size in thumbnail_sizes() and fieldfile.storage.exists(name):
+        return fieldfile.storage.url(name)
+    return fieldfile.url
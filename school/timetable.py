@@ -0,0 +1,628 @@
+"""Weekly timetable generation and conflict checking.
+
+Generation
+    :func:`generate` places every session of every :class:`Requirement`
+    (class + subject + teacher + sessions per week) into a weekly
+    :class:`~school.models.Period` so that no teacher, class or room is booked
+    twice. Each teacher's and each class's week is a bitmask over the periods,
+    so the free periods of a lesson are one ``&`` of three integers. Lessons are
+    placed most-constrained first and spread over the week. When a lesson has
+    no free period, the cheapest period is freed by evicting the lessons
+    blocking it, which are then re-queued (a bounded min-conflicts repair).
+    The teachers and rooms booked by classes outside the requirements are
+    fixed and never evicted. Several seeds can be tried in a process pool.
+
+Edits
+    :class:`TimetableIndex` keeps every teacher's, class's and room's bookings
+    as sorted week-minute intervals, so checking a new or moved assignment is
+    a ``bisect`` per resource instead of a scan. Each process loads the index
+    once; its own saves and deletes are applied to it in place, and it is
+    reloaded only when another process changed the timetable.
+"""
+
+import bisect
+import datetime
+import random
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .academic_calendar import holiday_dates
+from .models import Assignment, Period, Room
+
+MINUTES_PER_DAY = 24 * 60
+INDEX_VERSION_KEY = "timetable:index-version"
+
+
+class SchedulingError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Requirement:
+    student_class: str
+    subject_id: int
+    teacher_id: int
+    sessions: int
+
+
+@dataclass(frozen=True)
+class Lesson:
+    student_class: str
+    subject_id: int
+    teacher_id: int
+    period_id: int
+    room_id: int
+
+
+@dataclass
+class Problem:
+    """Plain, picklable input of the solver"""
+
+    periods: list  # [(period_id, day_of_week)]
+    rooms: list  # [room_id]
+    requirements: list  # [Requirement]
+    unavailable: frozenset = frozenset()  # period ids that cannot be used
+    # bookings kept from classes outside the requirements
+    booked_teachers: dict = field(default_factory=dict)  # {teacher_id: frozenset(period ids)}
+    booked_rooms: dict = field(default_factory=dict)  # {period_id: frozenset(room ids)}
+
+    def validate(self):
+        if not self.periods or not self.rooms:
+            raise SchedulingError("Define at least one period and one room first")
+        sessions = sum(requirement.sessions for requirement in self.requirements)
+        open_periods = [p for p, _day in self.periods if p not in self.unavailable]
+        usable = len(open_periods)
+        room_slots = sum(
+            len(set(self.rooms) - self.booked_rooms.get(p, frozenset())) for p in open_periods
+        )
+        if sessions > room_slots:
+            raise SchedulingError(
+                f"{sessions} sessions cannot fit in the {room_slots} free room slots of "
+                f"{usable} periods x {len(self.rooms)} rooms"
+            )
+        teachers, classes = Counter(), Counter()
+        for requirement in self.requirements:
+            teachers[requirement.teacher_id] += requirement.sessions
+            classes[requirement.student_class] += requirement.sessions
+        for kind, load in (("Teacher", teachers), ("Class", classes)):
+            for key, sessions in load.items():
+                free = usable
+                if kind == "Teacher":
+                    free -= len(self.booked_teachers.get(key, frozenset()) & set(open_periods))
+                if sessions > free:
+                    raise SchedulingError(
+                        f"{kind} {key} needs {sessions} sessions but only {free} periods are free"
+                    )
+
+
+@dataclass
+class Timetable:
+    lessons: list
+    unplaced: list = field(default_factory=list)  # [Requirement] with sessions left over
+    seed: int = 0
+    steps: int = 0
+
+    @property
+    def complete(self):
+        return not self.unplaced
+
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _solve(problem, seed, max_steps=None):
+    """One randomised greedy-plus-repair run; returns a Timetable (maybe partial)"""
+    rng = random.Random(seed)
+    period_count = len(problem.periods)
+    room_count = len(problem.rooms)
+    day_of = [day for _period_id, day in problem.periods]
+    room_index = {room_id: index for index, room_id in enumerate(problem.rooms)}
+    # rooms already taken in each period by the classes kept as they are
+    kept_rooms = [
+        {room_index[room] for room in problem.booked_rooms.get(period_id, ()) if room in room_index}
+        for period_id, _day in problem.periods
+    ]
+    capacity = [room_count - len(rooms) for rooms in kept_rooms]
+    available = 0
+    for index, (period_id, _day) in enumerate(problem.periods):
+        if period_id not in problem.unavailable and capacity[index] > 0:
+            available |= 1 << index
+    period_index = {period_id: index for index, (period_id, _day) in enumerate(problem.periods)}
+    kept_teacher_mask = defaultdict(int)
+    for teacher_id, period_ids in problem.booked_teachers.items():
+        for period_id in period_ids:
+            if period_id in period_index:
+                kept_teacher_mask[teacher_id] |= 1 << period_index[period_id]
+
+    requirements = problem.requirements
+    lessons = [r for r, requirement in enumerate(requirements) for _ in range(requirement.sessions)]
+    teacher_load = Counter()
+    class_load = Counter()
+    for requirement in requirements:
+        teacher_load[requirement.teacher_id] += requirement.sessions
+        class_load[requirement.student_class] += requirement.sessions
+
+    def difficulty(lesson):
+        requirement = requirements[lessons[lesson]]
+        return teacher_load[requirement.teacher_id] + class_load[requirement.student_class]
+
+    queue = sorted(range(len(lessons)), key=lambda l: (difficulty(l), rng.random()))
+
+    teacher_mask = defaultdict(int)
+    class_mask = defaultdict(int)
+    full_mask = 0
+    teacher_at = {}
+    class_at = {}
+    at_period = [set() for _ in range(period_count)]
+    day_count = Counter()  # (requirement, day) -> sessions that day
+    placed = [None] * len(lessons)
+    placed_step = [-1] * len(lessons)
+
+    def place(lesson, p, step):
+        nonlocal full_mask
+        requirement = requirements[lessons[lesson]]
+        teacher_mask[requirement.teacher_id] |= 1 << p
+        class_mask[requirement.student_class] |= 1 << p
+        teacher_at[requirement.teacher_id, p] = lesson
+        class_at[requirement.student_class, p] = lesson
+        at_period[p].add(lesson)
+        if len(at_period[p]) >= capacity[p]:
+            full_mask |= 1 << p
+        day_count[lessons[lesson], day_of[p]] += 1
+        placed[lesson] = p
+        placed_step[lesson] = step
+
+    def unplace(lesson):
+        nonlocal full_mask
+        p = placed[lesson]
+        requirement = requirements[lessons[lesson]]
+        teacher_mask[requirement.teacher_id] &= ~(1 << p)
+        class_mask[requirement.student_class] &= ~(1 << p)
+        del teacher_at[requirement.teacher_id, p]
+        del class_at[requirement.student_class, p]
+        at_period[p].discard(lesson)
+        full_mask &= ~(1 << p)
+        day_count[lessons[lesson], day_of[p]] -= 1
+        placed[lesson] = None
+
+    def place_if_free(lesson, step):
+        r = lessons[lesson]
+        requirement = requirements[r]
+        free = (
+            available
+            & ~kept_teacher_mask[requirement.teacher_id]
+            & ~teacher_mask[requirement.teacher_id]
+            & ~class_mask[requirement.student_class]
+            & ~full_mask
+        )
+        if not free:
+            return False
+        # spread a subject over the week, then balance room use
+        best = min(
+            _bits(free),
+            key=lambda p: (day_count[r, day_of[p]], len(at_period[p]), rng.random()),
+        )
+        place(lesson, best, step)
+        return True
+
+    max_steps = max_steps or 50 * len(lessons) + 1000
+    tabu = 8
+    step = 0
+    stuck = []
+    while queue and step < max_steps:
+        step += 1
+        lesson = queue.pop()
+        if place_if_free(lesson, step):
+            continue
+
+        requirement = requirements[lessons[lesson]]
+
+        best, best_cost, best_victims = None, None, None
+        # kept bookings cannot be evicted
+        for p in _bits(available & ~kept_teacher_mask[requirement.teacher_id]):
+            victims = set()
+            if teacher_mask[requirement.teacher_id] >> p & 1:
+                victims.add(teacher_at[requirement.teacher_id, p])
+            if class_mask[requirement.student_class] >> p & 1:
+                victims.add(class_at[requirement.student_class, p])
+            if not victims and full_mask >> p & 1:
+                victims.add(rng.choice(tuple(at_period[p])))
+            cost = len(victims) + rng.random()
+            cost += sum(10 for v in victims if step - placed_step[v] < tabu)
+            if best_cost is None or cost < best_cost:
+                best, best_cost, best_victims = p, cost, victims
+        if best is None:
+            # every open period holds a kept booking of this teacher
+            stuck.append(lesson)
+            continue
+        for victim in best_victims:
+            unplace(victim)
+            queue.append(victim)
+        place(lesson, best, step)
+
+    # out of repair budget: keep whatever still fits without evicting anything
+    queue = [lesson for lesson in queue + stuck if not place_if_free(lesson, step)]
+    unplaced = Counter(lessons[lesson] for lesson in queue)
+    timetable = Timetable(
+        lessons=[],
+        unplaced=[
+            Requirement(
+                requirements[r].student_class,
+                requirements[r].subject_id,
+                requirements[r].teacher_id,
+                count,
+            )
+            for r, count in sorted(unplaced.items())
+        ],
+        seed=seed,
+        steps=step,
+    )
+
+    # rooms are interchangeable: keep each class in the same room where possible
+    class_room = {
+        student_class: index % room_count for index, student_class in enumerate(sorted(class_load))
+    }
+    for p, occupants in enumerate(at_period):
+        taken = set(kept_rooms[p])
+        for lesson in sorted(occupants, key=lambda l: requirements[lessons[l]].student_class):
+            room = class_room[requirements[lessons[lesson]].student_class]
+            while room in taken:
+                room = (room + 1) % room_count
+            taken.add(room)
+            requirement = requirements[lessons[lesson]]
+            timetable.lessons.append(
+                Lesson(
+                    requirement.student_class,
+                    requirement.subject_id,
+                    requirement.teacher_id,
+                    problem.periods[p][0],
+                    problem.rooms[room],
+                )
+            )
+    return timetable
+
+
+def generate(problem, attempts=1, workers=None, seed=0):
+    """Solve ``problem``, trying up to ``attempts`` seeds (in parallel if ``workers`` > 1)
+
+    Returns the first complete timetable found, otherwise the one with the
+    fewest unplaced sessions.
+    """
+    problem.validate()
+    seeds = [seed + attempt for attempt in range(max(attempts, 1))]
+    best = None
+
+    def better(result):
+        return best is None or sum(r.sessions for r in result.unplaced) < sum(
+            r.sessions for r in best.unplaced
+        )
+
+    if workers and workers > 1 and len(seeds) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_solve, problem, s) for s in seeds]
+            for future in as_completed(futures):
+                result = future.result()
+                if better(result):
+                    best = result
+                if result.complete:
+                    for other in futures:
+                        other.cancel()
+                    break
+        return best
+
+    for s in seeds:
+        result = _solve(problem, s)
+        if better(result):
+            best = result
+        if result.complete:
+            break
+    return best
+
+
+def week_start(date):
+    return date - datetime.timedelta(days=date.weekday())
+
+
+def holiday_periods(periods, week_of):
+    """Ids of the periods that fall on a holiday in the week containing ``week_of``"""
+    monday = week_start(week_of)
+    holidays = holiday_dates(monday, monday + datetime.timedelta(days=6))
+    closed_days = {date.weekday() for date in holidays}
+    return frozenset(period_id for period_id, day in periods if day in closed_days)
+
+
+def build_problem(requirements, week_of=None):
+    """Load periods, rooms and the bookings of the classes the requirements leave alone
+
+    With ``week_of``, periods on that week's holidays are closed. The teachers
+    and rooms booked by other classes stay unavailable to the solver, since
+    :func:`save_timetable` keeps those classes' assignments.
+    """
+    requirements = list(requirements)
+    periods = list(
+        Period.objects.order_by("day_of_week", "start_time").values_list("id", "day_of_week")
+    )
+    rooms = list(Room.objects.order_by("name").values_list("id", flat=True))
+    unavailable = holiday_periods(periods, week_of) if week_of else frozenset()
+
+    booked_teachers, booked_rooms = defaultdict(set), defaultdict(set)
+    kept = Assignment.objects.exclude(
+        student_class__in={requirement.student_class for requirement in requirements}
+    )
+    for period_id, teacher_id, room_id in kept.values_list("period_id", "teacher_id", "room_id"):
+        booked_teachers[teacher_id].add(period_id)
+        booked_rooms[period_id].add(room_id)
+    return Problem(
+        periods,
+        rooms,
+        requirements,
+        unavailable,
+        booked_teachers={key: frozenset(value) for key, value in booked_teachers.items()},
+        booked_rooms={key: frozenset(value) for key, value in booked_rooms.items()},
+    )
+
+
+def save_timetable(timetable, replace_classes=True):
+    """Write the lessons as Assignments, replacing the timetables of the classes involved"""
+    classes = {lesson.student_class for lesson in timetable.lessons}
+    with transaction.atomic():
+        if replace_classes:
+            Assignment.objects.filter(student_class__in=classes).delete()
+        Assignment.objects.bulk_create(
+            (
+                Assignment(
+                    student_class=lesson.student_class,
+                    subject_id=lesson.subject_id,
+                    teacher_id=lesson.teacher_id,
+                    period_id=lesson.period_id,
+                    room_id=lesson.room_id,
+                )
+                for lesson in timetable.lessons
+            ),
+            batch_size=1000,
+        )
+        transaction.on_commit(bump_index_version)
+    return len(timetable.lessons)
+
+
+class IntervalIndex:
+    """Sorted ``[start, end)`` intervals per key
+
+    Lookups bisect the interval starts and scan back no further than the
+    longest interval stored under the key, so checking a key costs O(log n)
+    plus the intervals starting within that span. Intervals may overlap, e.g.
+    periods of different lengths booked for one teacher.
+    """
+
+    def __init__(self):
+        self._starts = defaultdict(list)
+        self._entries = defaultdict(list)  # (start, end, value), parallel to _starts
+        self._longest = defaultdict(int)  # never shrinks, which only widens the scan
+
+    def overlapping(self, key, start, end):
+        starts = self._starts.get(key)
+        if not starts:
+            return []
+        found = []
+        i = bisect.bisect_left(starts, end) - 1
+        entries = self._entries[key]
+        # an interval starting at or before this ends by ``start``
+        horizon = start - self._longest[key]
+        while i >= 0 and starts[i] > horizon:
+            if entries[i][1] > start:
+                found.append(entries[i][2])
+            i -= 1
+        return found
+
+    def add(self, key, start, end, value):
+        i = bisect.bisect_left(self._starts[key], start)
+        self._starts[key].insert(i, start)
+        self._entries[key].insert(i, (start, end, value))
+        self._longest[key] = max(self._longest[key], end - start)
+
+    def remove(self, key, start, value):
+        starts = self._starts.get(key, [])
+        entries = self._entries.get(key, [])
+        i = bisect.bisect_left(starts, start)
+        while i < len(starts) and starts[i] == start:
+            if entries[i][2] == value:
+                del starts[i]
+                del entries[i]
+                return
+            i += 1
+
+
+def _minutes(period):
+    start = (
+        period.day_of_week * MINUTES_PER_DAY
+        + period.start_time.hour * 60
+        + period.start_time.minute
+    )
+    end = period.day_of_week * MINUTES_PER_DAY + period.end_time.hour * 60 + period.end_time.minute
+    return start, end
+
+
+def _keys(assignment):
+    return (
+        ("teacher", assignment.teacher_id),
+        ("room", assignment.room_id),
+        ("class", assignment.student_class),
+    )
+
+
+class TimetableIndex:
+    """Per-resource interval index of every Assignment, for conflict checks on edits"""
+
+    def __init__(self, assignments=()):
+        self.intervals = IntervalIndex()
+        self._placed = {}  # assignment id: (period id, resource keys, start, end)
+        self._periods = defaultdict(set)  # period id: assignment ids
+        for assignment in assignments:
+            self.add(assignment)
+
+    @classmethod
+    def load(cls):
+        return cls(Assignment.objects.select_related("period"))
+
+    def add(self, assignment):
+        """Index ``assignment``, replacing its previous entry"""
+        self.place(
+            assignment.pk, assignment.period_id, _keys(assignment), *_minutes(assignment.period)
+        )
+
+    def place(self, pk, period_id, keys, start, end):
+        self.discard(pk)
+        for key in keys:
+            self.intervals.add(key, start, end, pk)
+        self._placed[pk] = (period_id, keys, start, end)
+        self._periods[period_id].add(pk)
+
+    def discard(self, pk):
+        placed = self._placed.pop(pk, None)
+        if placed is None:
+            return
+        period_id, keys, start, _end = placed
+        for key in keys:
+            self.intervals.remove(key, start, pk)
+        self._periods[period_id].discard(pk)
+
+    def remove(self, assignment):
+        self.discard(assignment.pk)
+
+    def retime(self, period_id, start, end):
+        """Move the assignments of a period whose times changed"""
+        for pk in list(self._periods.get(period_id, ())):
+            _period_id, keys, _start, _end = self._placed[pk]
+            self.place(pk, period_id, keys, start, end)
+
+    def conflicts(self, assignment):
+        """[(resource, other assignment id)] overlapping ``assignment``, ignoring itself"""
+        start, end = _minutes(assignment.period)
+        return [
+            (kind, other)
+            for kind, value in _keys(assignment)
+            for other in self.intervals.overlapping((kind, value), start, end)
+            if other != assignment.pk
+        ]
+
+
+_index = None
+_index_version = None
+
+
+def bump_index_version():
+    """Tell every process that its cached TimetableIndex is stale; returns the new version"""
+    if cache.add(INDEX_VERSION_KEY, 1, None):
+        return 1
+    try:
+        return cache.incr(INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(INDEX_VERSION_KEY, 1, None)
+        return 1
+
+
+def get_index():
+    """The process-wide TimetableIndex, reloaded only after another process changed it"""
+    global _index, _index_version
+    version = cache.get(INDEX_VERSION_KEY, 0)
+    if _index is None or version != _index_version:
+        _index, _index_version = TimetableIndex.load(), version
+    return _index
+
+
+def _apply(change):
+    """Apply a committed edit of this process to its index and publish a new version
+
+    When the version moved by more than our own bump, another process changed
+    the timetable too, and the index is reloaded on next use instead.
+    """
+    global _index, _index_version
+    version = bump_index_version()
+    if _index is not None and _index_version is not None and version == _index_version + 1:
+        change(_index)
+        _index_version = version
+    else:
+        _index = None
+
+
+def assignment_saved(assignment):
+    """Index a saved assignment once its transaction commits"""
+    entry = (assignment.pk, assignment.period_id, _keys(assignment), *_minutes(assignment.period))
+    transaction.on_commit(lambda: _apply(lambda index: index.place(*entry)))
+
+
+def assignment_deleted(assignment):
+    pk = assignment.pk
+    transaction.on_commit(lambda: _apply(lambda index: index.discard(pk)))
+
+
+def period_saved(period):
+    """Move a period's assignments once its new times are committed"""
+    entry = (period.pk, *_minutes(period))
+    transaction.on_commit(lambda: _apply(lambda index: index.retime(*entry)))
+
+
+def find_conflicts(assignment):
+    return get_index().conflicts(assignment)
+
+
+# colour classes defined by time_table.html, cycled by subject
+SUBJECT_COLOURS = (
+    "math",
+    "english",
+    "physics",
+    "chemistry",
+    "biology",
+    "bangla",
+    "ict",
+    "geography",
+    "pe",
+    "study",
+)
+
+
+def weekly_grid(assignments, week_of):
+    """Rows of time slots by columns of days for one class, teacher or room
+
+    ``assignments`` should already be filtered to one resource and use
+    ``select_related("period", "subject", "teacher", "room")``.
+    """
+    monday = week_start(week_of)
+    periods = list(Period.objects.order_by("day_of_week", "start_time"))
+    days = sorted({period.day_of_week for period in periods})
+    slots = sorted({(period.start_time, period.end_time) for period in periods})
+    holidays = holiday_dates(monday, monday + datetime.timedelta(days=6))
+    labels = dict(Period.DAYS_OF_WEEK)
+
+    cells = {}
+    for assignment in assignments:
+        assignment.colour = SUBJECT_COLOURS[assignment.subject_id % len(SUBJECT_COLOURS)]
+        cells[assignment.period.day_of_week, assignment.period.start_time] = assignment
+
+    columns = []
+    for day in days:
+        date = monday + datetime.timedelta(days=day)
+        columns.append({"name": labels[day], "date": date, "holiday": holidays.get(date)})
+    rows = [
+        {
+            "start": start,
+            "end": end,
+            "cells": [
+                {
+                    "holiday": column["holiday"],
+                    "lesson": None if column["holiday"] else cells.get((day, start)),
+                }
+                for day, column in zip(days, columns)
+            ],
+        }
+        for start, end in slots
+    ]
+    return {"week_start": monday, "days": columns, "rows": rows}
@@ -0,0 +1,534 @@
+"""School bus route planning.
+
+:func:`plan_routes` turns riders' home coordinates into stops and stops into
+morning runs to school:
+
+- riders are grouped into stops within ``TRANSPORT_WALK_METRES`` of home.
+  A greedy set cover over a rider-by-rider distance matrix makes a stop of
+  the home that reaches the most riders still without one;
+- stops are joined into routes with the Clarke-Wright savings heuristic.
+  Routes hold at most the seats of the smallest active bus, so any bus can
+  run any route, and take at most ``TRANSPORT_MAX_RIDE_MINUTES`` from the
+  first pickup to school. A 2-opt pass then shortens each route;
+- routes go to active buses, fullest route first. Routes beyond the fleet
+  keep no bus, and stops too far for the ride limit get no route.
+
+Distances are straight lines on a flat projection around ``SCHOOL_LOCATION``,
+stretched by ``TRANSPORT_DETOUR`` for the road network.
+
+Reruns are incremental unless ``full=True``. Riders within walking distance
+of their stop keep it, and stops left without riders are dropped. New or
+moved riders join a nearby stop whose bus has a seat. The rest are clustered
+into new stops, which are inserted into existing routes where they fit or
+planned into new routes on idle buses.
+"""
+
+import datetime
+import itertools
+import math
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Bus, Rider, Route, Stop
+
+EARTH_RADIUS_M = 6_371_000
+COVER_CHUNK_SIZE = 1000  # riders per block of the distance matrix
+WRITE_CHUNK_SIZE = 500
+
+DEFAULT_SCHOOL_LOCATION = (23.7465, 90.3760)
+DEFAULT_ARRIVAL_TIME = "07:45"
+DEFAULT_WALK_METRES = 400
+DEFAULT_MAX_RIDE_MINUTES = 60
+DEFAULT_SPEED_KMH = 20
+DEFAULT_STOP_MINUTES = 1
+DEFAULT_DETOUR = 1.3
+
+
+class TransportError(ValueError):
+    """Routes cannot be planned as requested"""
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImproperlyConfigured("Route planning requires numpy (pip install numpy)")
+    return numpy
+
+
+@dataclass(frozen=True)
+class Limits:
+    """Planning parameters from the ``SCHOOL_LOCATION`` and ``TRANSPORT_*`` settings"""
+
+    origin: tuple  # school (latitude, longitude)
+    walk: float  # metres from home to stop
+    ride: float  # minutes from the first pickup to school
+    speed: float  # metres per minute
+    dwell: float  # minutes per stop
+    detour: float  # road metres per straight-line metre
+
+
+def transport_limits():
+    return Limits(
+        origin=tuple(getattr(settings, "SCHOOL_LOCATION", DEFAULT_SCHOOL_LOCATION)),
+        walk=getattr(settings, "TRANSPORT_WALK_METRES", DEFAULT_WALK_METRES),
+        ride=getattr(settings, "TRANSPORT_MAX_RIDE_MINUTES", DEFAULT_MAX_RIDE_MINUTES),
+        speed=getattr(settings, "TRANSPORT_SPEED_KMH", DEFAULT_SPEED_KMH) * 1000 / 60,
+        dwell=getattr(settings, "TRANSPORT_STOP_MINUTES", DEFAULT_STOP_MINUTES),
+        detour=getattr(settings, "TRANSPORT_DETOUR", DEFAULT_DETOUR),
+    )
+
+
+def pickup_time(minutes_to_school):
+    """Clock time of a pickup ``minutes_to_school`` before ``TRANSPORT_ARRIVAL_TIME``"""
+    arrival = datetime.datetime.combine(
+        datetime.date.today(),
+        datetime.time.fromisoformat(
+            getattr(settings, "TRANSPORT_ARRIVAL_TIME", DEFAULT_ARRIVAL_TIME)
+        ),
+    )
+    return (arrival - datetime.timedelta(minutes=math.ceil(minutes_to_school))).time()
+
+
+def _project(np, latitudes, longitudes, origin):
+    """Metres east and north of ``origin`` as an ``(n, 2)`` array"""
+    lat0, lon0 = map(math.radians, origin)
+    x = (np.radians(np.asarray(longitudes, dtype=float)) - lon0) * math.cos(lat0)
+    y = np.radians(np.asarray(latitudes, dtype=float)) - lat0
+    return np.column_stack([x, y]).reshape(-1, 2) * EARTH_RADIUS_M
+
+
+def _unproject(point, origin):
+    lat0, lon0 = map(math.radians, origin)
+    x, y = (float(v) / EARTH_RADIUS_M for v in point)
+    return math.degrees(lat0 + y), math.degrees(lon0 + x / math.cos(lat0))
+
+
+def _distances(np, a, b):
+    """Straight-line metres from every point of ``a`` to every point of ``b``"""
+    return np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2))
+
+
+def cluster_stops(np, homes, capacity, walk):
+    """Group home points into stops of at most ``capacity`` riders
+
+    Returns ``[(stop point, member indices)]``. Each stop moves to its
+    members' centroid when that keeps all of them within ``walk`` metres.
+    """
+    n = len(homes)
+    reach = np.zeros((n, n), dtype=bool)
+    for start in range(0, n, COVER_CHUNK_SIZE):
+        block = homes[start : start + COVER_CHUNK_SIZE]
+        reach[start : start + len(block)] = _distances(np, block, homes) <= walk
+    counts = reach.sum(axis=0)
+    uncovered = np.ones(n, dtype=bool)
+    stops = []
+    while uncovered.any():
+        # every uncovered home reaches itself, so the best count is positive
+        best = int(counts.argmax())
+        members = np.flatnonzero(reach[:, best] & uncovered)
+        if len(members) > capacity:
+            near = _distances(np, homes[members], homes[best : best + 1])[:, 0]
+            members = members[np.argsort(near, kind="stable")[:capacity]]
+        uncovered[members] = False
+        counts -= reach[members].sum(axis=0)
+        point = homes[members].mean(axis=0)
+        if _distances(np, homes[members], point[None])[:, 0].max() > walk:
+            point = homes[best]
+        stops.append((point, members))
+    return stops
+
+
+def _minutes(np, points, limits):
+    """Travel minutes between stops; index ``m`` is the school and ``m + 1`` a free start"""
+    m = len(points)
+    nodes = np.vstack([points, np.zeros((1, 2))])
+    minutes = np.zeros((m + 2, m + 2))
+    minutes[: m + 1, : m + 1] = _distances(np, nodes, nodes) * limits.detour / limits.speed
+    return minutes
+
+
+def _ride(minutes, path, limits):
+    """Minutes from the first pickup of ``path`` to school"""
+    school = len(minutes) - 2
+    legs = sum(minutes[a, b] for a, b in zip(path, path[1:] + [school]))
+    return legs + limits.dwell * len(path)
+
+
+def _two_opt(np, minutes, path):
+    """Reverse stretches of ``path`` while that shortens the ride to school"""
+    school, start = len(minutes) - 2, len(minutes) - 1
+    nodes = [start] + list(path) + [school]
+    improved = True
+    while improved:
+        improved = False
+        for i in range(len(nodes) - 3):
+            # reversing nodes[i + 1 : j + 1], for every j at once
+            arr = np.asarray(nodes)
+            js = np.arange(i + 2, len(nodes) - 1)
+            delta = (
+                minutes[arr[i], arr[js]]
+                + minutes[arr[i + 1], arr[js + 1]]
+                - minutes[arr[i], arr[i + 1]]
+                - minutes[arr[js], arr[js + 1]]
+            )
+            best = int(delta.argmin())
+            if delta[best] < -1e-9:
+                j = int(js[best])
+                nodes[i + 1 : j + 1] = nodes[i + 1 : j + 1][::-1]
+                improved = True
+    return nodes[1:-1]
+
+
+def _savings(np, minutes, stops, loads, capacity, limits):
+    """Clarke-Wright routes over ``stops``; returns ``(routes, unroutable stops)``"""
+    school = len(minutes) - 2
+    to_school = minutes[:, school]
+    unroutable = [
+        s for s in stops if to_school[s] + limits.dwell > limits.ride or loads[s] > capacity
+    ]
+    routable = [s for s in stops if s not in set(unroutable)]
+    paths = {s: [s] for s in routable}  # keyed by the stop the route started from
+    load = {s: loads[s] for s in routable}
+    length = {s: 0.0 for s in routable}
+    route_of = {s: s for s in routable}
+
+    if len(routable) > 1:
+        ids = np.asarray(routable)
+        gain = to_school[ids][:, None] + to_school[ids][None, :] - minutes[np.ix_(ids, ids)]
+        rows, cols = np.triu_indices(len(ids), 1)
+        gain = gain[rows, cols]
+        order = np.argsort(-gain, kind="stable")
+        order = order[gain[order] > 0]
+        for a, b in zip(ids[rows[order]].tolist(), ids[cols[order]].tolist()):
+            ra, rb = route_of[a], route_of[b]
+            if ra == rb or load[ra] + load[rb] > capacity:
+                continue
+            pa, pb = paths[ra], paths[rb]
+            if a not in (pa[0], pa[-1]) or b not in (pb[0], pb[-1]):
+                continue  # only route ends can be joined
+            if pa[-1] != a:
+                pa = pa[::-1]
+            if pb[0] != b:
+                pb = pb[::-1]
+            path = pa + pb
+            joined = length[ra] + length[rb] + minutes[a, b]
+            ride = joined + min(to_school[path[0]], to_school[path[-1]])
+            if ride + limits.dwell * len(path) > limits.ride:
+                continue
+            paths[ra], load[ra], length[ra] = path, load[ra] + load[rb], joined
+            for s in pb:
+                route_of[s] = ra
+            del paths[rb], load[rb], length[rb]
+
+    routes = []
+    for path in paths.values():
+        if to_school[path[0]] < to_school[path[-1]]:
+            path = path[::-1]  # finish at the stop nearest school
+        routes.append(_two_opt(np, minutes, path))
+    return routes, unroutable
+
+
+def _insert(np, minutes, stop, routes, loads, capacities, limits):
+    """Cheapest feasible position for ``stop`` in ``routes``: ``(route index, position)``"""
+    school, start = len(minutes) - 2, len(minutes) - 1
+    best, best_delta = None, math.inf
+    for r, path in enumerate(routes):
+        if sum(loads[s] for s in path) + loads[stop] > capacities[r]:
+            continue
+        nodes = np.asarray([start] + path + [school])
+        delta = (
+            minutes[nodes[:-1], stop] + minutes[stop, nodes[1:]] - minutes[nodes[:-1], nodes[1:]]
+        )
+        position = int(delta.argmin())
+        if delta[position] >= best_delta:
+            continue
+        if _ride(minutes, path, limits) + delta[position] + limits.dwell > limits.ride:
+            continue
+        best, best_delta = (r, position), delta[position]
+    return best
+
+
+@dataclass
+class PlanRun:
+    """Outcome of :func:`plan_routes`"""
+
+    full: bool
+    riders: int = 0
+    stops: int = 0
+    new_stops: int = 0
+    routes: int = 0
+    moved: int = 0  # riders given a different stop
+    unrouted: int = 0  # riders at stops too far from school for the ride limit
+    without_bus: int = 0  # routes beyond the fleet
+    longest_ride: float = 0.0
+    cluster_seconds: float = 0.0
+    route_seconds: float = 0.0
+    seconds: float = 0.0
+
+    def summary(self):
+        return (
+            f"{self.riders} riders at {self.stops} stops ({self.new_stops} new) on "
+            f"{self.routes} routes; {self.moved} changed stop, {self.unrouted} unrouted, "
+            f"{self.without_bus} routes without a bus; longest ride {self.longest_ride:.0f} min"
+        )
+
+
+@dataclass(eq=False)
+class _Route:
+    pk: int  # None until saved
+    bus: int  # None when the fleet has run out
+    path: list  # stop indices, school after the last
+    name: str = ""
+
+
+def _timetable(minutes, path, limits):
+    """Minutes from each stop of ``path`` to school"""
+    school = len(minutes) - 2
+    times, total, following = [], 0.0, school
+    for stop in reversed(path):
+        total += minutes[stop, following] + limits.dwell
+        times.append(total)
+        following = stop
+    return times[::-1]
+
+
+def plan_routes(full=False):
+    """Give every rider a stop and every stop a route; returns a :class:`PlanRun`
+
+    ``full`` replans all stops and routes instead of adjusting the current ones.
+    """
+    np = _numpy()
+    limits = transport_limits()
+    started = time.perf_counter()
+    run = PlanRun(full=full)
+    with transaction.atomic():
+        buses = list(
+            Bus.objects.select_for_update()
+            .filter(is_active=True)
+            .order_by("-capacity", "registration")
+        )
+        if not buses:
+            raise TransportError("There are no active buses to plan routes for")
+        capacity = min(bus.capacity for bus in buses)
+        seats = {bus.pk: bus.capacity for bus in buses}
+
+        riders = list(
+            Rider.objects.order_by("pk").values_list("pk", "latitude", "longitude", "stop")
+        )
+        homes = _project(np, [r[1] for r in riders], [r[2] for r in riders], limits.origin)
+        stops = {}  # pk: (route, sequence, minutes_to_school, rider_count)
+        coordinates = []
+        routes = {}  # pk: _Route
+        if not full:
+            for pk, route, sequence, lat, lon, to_school, count in Stop.objects.order_by(
+                "sequence", "pk"
+            ).values_list(
+                "pk",
+                "route",
+                "sequence",
+                "latitude",
+                "longitude",
+                "minutes_to_school",
+                "rider_count",
+            ):
+                stops[pk] = (route, sequence, to_school, count)
+                coordinates.append((lat, lon))
+            routes = {
+                pk: _Route(pk, bus if bus in seats else None, [], name)
+                for pk, bus, name in Route.objects.values_list("pk", "bus", "name")
+            }
+        old_buses = {pk: route.bus for pk, route in routes.items()}
+
+        # riders in walking distance of their stop keep it
+        stop_pks = list(stops)
+        index_of = {pk: i for i, pk in enumerate(stop_pks)}
+        points = list(
+            _project(np, [c[0] for c in coordinates], [c[1] for c in coordinates], limits.origin)
+        )
+        members = [[] for _ in stop_pks]
+        pending = []
+        for r, (_pk, _lat, _lon, stop) in enumerate(riders):
+            i = index_of.get(stop)
+            if i is not None and math.dist(homes[r], points[i]) <= limits.walk:
+                members[i].append(r)
+            else:
+                pending.append(r)
+        for pk, (route, *_rest) in stops.items():
+            if route in routes and members[index_of[pk]]:
+                routes[route].path.append(index_of[pk])  # stops were read in sequence
+        routes = [route for route in routes.values() if route.path]
+        route_at = {i: route for route in routes for i in route.path}
+
+        def free_seats(route):
+            return seats.get(route.bus, capacity) - sum(len(members[i]) for i in route.path)
+
+        # new and moved riders join a stop in walking distance with a seat on its bus
+        if pending and points:
+            near = _distances(np, homes[pending], np.asarray(points))
+            left = []
+            for row, r in enumerate(pending):
+                nearby = np.flatnonzero(near[row] <= limits.walk)
+                for i in nearby[np.argsort(near[row, nearby], kind="stable")].tolist():
+                    if i in route_at and free_seats(route_at[i]) > 0:
+                        members[i].append(r)
+                        break
+                else:
+                    left.append(r)
+            pending = left
+
+        # the rest become new stops
+        clustering = time.perf_counter()
+        for point, group in cluster_stops(np, homes[pending], capacity, limits.walk):
+            points.append(point)
+            stop_pks.append(None)
+            members.append([pending[g] for g in group])
+        run.cluster_seconds = time.perf_counter() - clustering
+
+        # new stops join existing routes where they fit; the rest get routes of their own
+        routing = time.perf_counter()
+        loads = [len(group) for group in members]
+        minutes = _minutes(np, np.asarray(points).reshape(-1, 2), limits)
+        waiting = [i for i, group in enumerate(members) if group and i not in route_at]
+        leftover = []
+        for i in sorted(waiting, key=lambda i: -loads[i]):
+            spot = _insert(
+                np,
+                minutes,
+                i,
+                [route.path for route in routes],
+                loads,
+                [seats.get(route.bus, capacity) for route in routes],
+                limits,
+            )
+            if spot is None:
+                leftover.append(i)
+            else:
+                routes[spot[0]].path.insert(spot[1], i)
+        paths, unroutable = _savings(np, minutes, leftover, loads, capacity, limits)
+        routes.extend(_Route(None, None, path) for path in paths)
+        for route in routes:
+            route.path = _two_opt(np, minutes, route.path)
+
+        # idle buses go to the fullest routes without one
+        busy = {route.bus for route in routes}
+        idle = [bus for bus in buses if bus.pk not in busy]
+        for route in sorted(routes, key=lambda route: -sum(loads[i] for i in route.path)):
+            load = sum(loads[i] for i in route.path)
+            bus = next((bus for bus in idle if bus.capacity >= load), None)
+            if route.bus is not None or bus is None:
+                continue
+            route.bus = bus.pk
+            idle.remove(bus)
+        run.route_seconds = time.perf_counter() - routing
+
+        # write
+        now = timezone.now()
+        if full:
+            Route.objects.all().delete()
+            Stop.objects.all().delete()
+        Route.objects.exclude(pk__in=[route.pk for route in routes if route.pk]).delete()
+        # a bus runs one route: take buses off their old routes before handing them on
+        Route.objects.filter(
+            pk__in=[route.pk for route in routes if route.pk and route.bus != old_buses[route.pk]]
+        ).update(bus=None)
+        _name_routes(routes, points)
+        timetables = [_timetable(minutes, route.path, limits) for route in routes]
+        rows = [
+            Route(
+                pk=route.pk,
+                name=route.name,
+                bus_id=route.bus,
+                distance_km=round((times[0] - limits.dwell * len(times)) * limits.speed / 1000, 2),
+                ride_minutes=round(times[0], 2),
+                rider_count=sum(loads[i] for i in route.path),
+                planned_at=now,
+            )
+            for route, times in zip(routes, timetables)
+        ]
+        Route.objects.bulk_update(
+            [row for row in rows if row.pk],
+            ["bus", "distance_km", "ride_minutes", "rider_count", "planned_at"],
+        )
+        created = Route.objects.bulk_create([row for row in rows if not row.pk])
+        for route, row in zip([route for route in routes if not route.pk], created):
+            route.pk = row.pk
+
+        school = len(minutes) - 2
+        placement = {i: (None, 0, minutes[i, school] + limits.dwell) for i in unroutable}
+        for route, times in zip(routes, timetables):
+            for sequence, (i, to_school) in enumerate(zip(route.path, times), 1):
+                placement[i] = (route.pk, sequence, to_school)
+        new_stops, changed_stops = [], []
+        for i, group in enumerate(members):
+            if not group:
+                continue
+            route, sequence, to_school = placement[i]
+            values = (route, sequence, round(float(to_school), 2), len(group))
+            if stop_pks[i] is not None and values == stops[stop_pks[i]]:
+                continue
+            lat, lon = _unproject(points[i], limits.origin)
+            stop = Stop(
+                pk=stop_pks[i],
+                route_id=route,
+                sequence=sequence,
+                latitude=lat,
+                longitude=lon,
+                minutes_to_school=values[2],
+                rider_count=len(group),
+            )
+            (new_stops if stop_pks[i] is None else changed_stops).append((i, stop))
+        created = Stop.objects.bulk_create([stop for _i, stop in new_stops])
+        for (i, _stop), row in zip(new_stops, created):
+            stop_pks[i] = row.pk
+        # an upsert on the primary key writes a chunk in one statement, as for beds
+        changed = [stop for _i, stop in changed_stops]
+        for start in range(0, len(changed), WRITE_CHUNK_SIZE):
+            Stop.objects.bulk_create(
+                changed[start : start + WRITE_CHUNK_SIZE],
+                update_conflicts=True,
+                unique_fields=["id"],
+                update_fields=["route", "sequence", "minutes_to_school", "rider_count"],
+            )
+
+        moves = {}  # stop pk: [rider pk]
+        for i, group in enumerate(members):
+            for r in group:
+                if riders[r][3] != stop_pks[i]:
+                    moves.setdefault(stop_pks[i], []).append(riders[r][0])
+                    run.moved += riders[r][3] is not None
+        for stop, pks in moves.items():
+            for start in range(0, len(pks), WRITE_CHUNK_SIZE):
+                Rider.objects.filter(pk__in=pks[start : start + WRITE_CHUNK_SIZE]).update(stop=stop)
+        if not full:
+            dropped = [pk for i, pk in enumerate(stop_pks) if pk is not None and not members[i]]
+            for start in range(0, len(dropped), WRITE_CHUNK_SIZE):
+                Stop.objects.filter(pk__in=dropped[start : start + WRITE_CHUNK_SIZE]).delete()
+
+    run.riders = len(riders)
+    run.stops = sum(1 for group in members if group)
+    run.new_stops = len(new_stops)
+    run.routes = len(routes)
+    run.unrouted = sum(loads[i] for i in unroutable)
+    run.without_bus = sum(1 for route in routes if route.bus is None)
+    run.longest_ride = max((times[0] for times in timetables if times), default=0.0)
+    run.seconds = time.perf_counter() - started
+    return run
+
+
+def _name_routes(routes, points):
+    """Number routes clockwise from north, keeping the names of existing routes"""
+    named = {route.name for route in routes if route.name}
+    numbers = (n for n in itertools.count(1) if f"Route {n}" not in named)
+
+    def bearing(route):
+        x, y = points[route.path[0]]
+        return math.atan2(x, y) % (2 * math.pi)
+
+    for route in sorted((route for route in routes if not route.name), key=bearing):
+        route.name = f"Route {next(numbers)}"
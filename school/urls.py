@@ -12,6 +12,8 @@ urlpatterns = [
         name="mark_notification_as_read",
     ),
     path("notification/clear-all/", views.clear_all_notification, name="clear_all_notification"),
+    path("notification/stream/", views.notification_stream, name="notification_stream"),
+    path("api/dashboard/counters/", views.dashboard_counters, name="dashboard_counters"),
     # Teacher URLs
     path("teachers/", views.teacher_list, name="teacher_list"),
     path("teachers/add/", views.add_teacher, name="add_teacher"),
@@ -20,6 +22,7 @@ urlpatterns = [
     path("teacher-dashboard.html", views.teacher_dashboard, name="teacher_dashboard"),
     path("teacherlist.html", views.teacher_list_page, name="teacher_list_page"),
     path("teacher-details.html/<int:pk>/", views.teacher_details, name="teacher_details"),
+    path("api/teachers/", views.teacher_api, name="teacher_api"),
     # Student Dashboard URLs
     path("student-dashboard/", views.student_dashboard, name="student_dashboard"),
     path("student-dashboard.html", views.student_dashboard, name="student_dashboard_html"),
@@ -43,9 +46,21 @@ urlpatterns = [
     # Fees URLs
     path("fees.html", views.fees_list, name="fees_list"),
     path("fees/", views.fees_list, name="fees"),
+    path("fees/report/", views.fee_report_api, name="fee_report"),
+    # Attendance URLs
+    path("attendance/mark/", views.mark_attendance, name="mark_attendance"),
+    path("attendance/report/", views.attendance_report, name="attendance_report"),
+    # Search
+    path("search/", views.search_page, name="search"),
+    path("api/search/", views.search_api, name="search_api"),
+    # Exports
+    path("export/<slug:name>.<slug:fmt>", views.export_list, name="export"),
     # Exam URLs
     path("exam.html", views.exam_list, name="exam_list"),
     path("exams/", views.exam_list, name="exams"),
+    path("exams/<int:pk>/results/", views.exam_results, name="exam_results"),
+    path("exams/<int:pk>/compute/", views.compute_exam_results, name="compute_exam_results"),
+    path("exams/papers/<int:pk>/marks/", views.record_exam_marks, name="record_exam_marks"),
     # Events URLs
     path("event.html", views.events_list, name="events_list"),
     path("events/", views.events_list, name="events"),
@@ -55,18 +70,26 @@ urlpatterns = [
     # Library URLs
     path("library.html", views.library, name="library"),
     path("library/", views.library, name="library_management"),
+    path("library/checkout/", views.library_checkout, name="library_checkout"),
+    path("library/return/", views.library_return, name="library_return"),
+    path("api/library/search/", views.library_search_api, name="library_search_api"),
     # Hostel URLs
     path("hostel.html", views.hostel, name="hostel"),
     path("hostel/", views.hostel, name="hostel_management"),
+    path("hostel/allocate/", views.hostel_allocate, name="hostel_allocate"),
     # Transport URLs
     path("transport.html", views.transport, name="transport"),
     path("transport/", views.transport, name="transport_management"),
+    path("transport/plan/", views.transport_plan, name="transport_plan"),
     # Sports URLs
     path("sports.html", views.sports, name="sports"),
     path("sports/", views.sports, name="sports_management"),
     # Inbox URLs
     path("inbox/", views.inbox, name="inbox"),
     path("inbox.html", views.inbox, name="inbox_html"),
+    path("inbox/send/", views.send_inbox_message, name="send_inbox_message"),
+    path("inbox/read-all/", views.mark_inbox_read, name="mark_inbox_read"),
+    path("inbox/<int:pk>/", views.inbox_thread, name="inbox_thread"),
     # Other URLs
     path(
         "student-dashboard.html",
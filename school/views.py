@@ -1,17 +1,166 @@
+"""Views for school app (teachers, dashboard, profiles, notifications)."""
+
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, HttpResponseForbidden
+from django.http import (
+    HttpResponse,
+    JsonResponse,
+    HttpResponseForbidden,
+    Http404,
+    StreamingHttpResponse,
+)
+from django.contrib.auth import get_user
 from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.db.models import Count, F, Prefetch, Q, Sum
+from django.db.models.functions import Coalesce
 from django.contrib import messages
-from django.core.exceptions import PermissionDenied
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
 from django.utils import timezone
-from functools import wraps
+from functools import partial, wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+import datetime
+import json
 from django import forms
-from .models import Notification, Teacher, Department, Holiday, Subject
+from .models import (
+    Assignment,
+    Bed,
+    Book,
+    Bus,
+    Exam,
+    ExamResult,
+    ExamSubject,
+    Notification,
+    Teacher,
+    Department,
+    Holiday,
+    HostelRoom,
+    Loan,
+    MessageThread,
+    Rider,
+    Room,
+    Route,
+    Stop,
+    Subject,
+)
+from .attendance import (
+    AttendanceError,
+    class_daily_totals,
+    class_roster,
+    low_attendance,
+    mark_class,
+)
+from .dashboard import (
+    abuild_overview,
+    aget_fragment,
+    build_overview,
+    get_fragment,
+    render_student_table,
+)
+from .exams import ExamError, class_results, compute_results, exam_status, record_marks
+from .exports import export_response
+from .fees import fee_report, project_collections
+from .holidays import holiday_summary
+from .hostel import allocate_beds, hostel_occupancy, waiting_list
+from .library import (
+    LibraryError,
+    borrower_loans,
+    checkout,
+    find_borrower,
+    library_stats,
+    overdue_loans,
+    return_copy,
+    search_catalog,
+)
+from .messaging import (
+    FOLDERS as INBOX_FOLDERS,
+    MessagingError,
+    inbox_page,
+    mark_all_read,
+    mark_read,
+    message_page,
+    send_message,
+    send_to_role,
+    start_thread,
+    unread_count as unread_message_count,
+)
+from .notifications import (
+    aget_unread_count,
+    areset_unread_count,
+    missed_notifications,
+    notification_channel,
+    notification_events,
+)
+from .pagination import InvalidCursor, keyset_paginate
+from .roles import get_roles, has_permission, has_role, primary_role, role_label
+from .search import SOURCES as SEARCH_SOURCES, as_json, search
+from .streaming import streaming_view
+from .timetable import weekly_grid
+from .transport import TransportError, pickup_time, plan_routes
+
+
+TEACHER_PAGE_SIZE = 25
+TEACHER_ORDERING = ("last_name", "first_name", "id")
+TEACHER_API_FIELDS = ("id", "first_name", "last_name", "email", "mobile", "gender", "joining_date")
+TEACHER_LIST_FIELDS = TEACHER_API_FIELDS + ("teacher_image",)
+
+
+def _check_roles(user, allowed):
+    """None if ``user`` has one of the ``allowed`` roles, else a login redirect or 403"""
+    if get_roles(user).isdisjoint(allowed):
+        if not user.is_authenticated:
+            return redirect("login")
+        raise PermissionDenied
+    return None
+
+
+def role_required(*allowed_roles):
+    """Decorator to check if user has required role (works on sync and async views)"""
+    allowed = frozenset(allowed_roles)
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                denied = _check_roles(await request.auser(), allowed)
+                if denied is not None:
+                    return denied
+                return await view_func(request, *args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            denied = _check_roles(request.user, allowed)
+            if denied is not None:
+                return denied
+            return view_func(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def paginate_teachers(request, queryset=None, page_size=TEACHER_PAGE_SIZE):
+    """Keyset-paginate teachers on (last_name, first_name, id) using ?after= / ?before="""
+    if queryset is None:
+        queryset = Teacher.objects.only(*TEACHER_LIST_FIELDS)
+    try:
+        return keyset_paginate(
+            queryset,
+            TEACHER_ORDERING,
+            page_size,
+            after=request.GET.get("after"),
+            before=request.GET.get("before"),
+        )
+    except InvalidCursor:
+        raise Http404("Invalid page cursor")
 
 
 def teacher_details(request, pk):
-    teachers = Teacher.objects.all()
-    selected = teachers.filter(pk=pk).first()
+    selected = Teacher.objects.filter(pk=pk).first()
+    teachers = paginate_teachers(request)
     return render(
         request,
         "teacher-details.html",
@@ -19,18 +168,34 @@ def teacher_details(request, pk):
             "teacher": selected,  # backward compatibility
             "selected_teacher": selected,
             "teachers": teachers,
+            "page": teachers,
         },
     )
 
 
 def teacher_list_page(request):
-    from .models import Teacher
+    teachers = paginate_teachers(request)
+    return render(request, "teacherlist.html", {"teachers": teachers, "page": teachers})
 
-    teachers = Teacher.objects.all()
-    return render(request, "teacherlist.html", {"teachers": teachers})
 
+@login_required
+async def teacher_api(request):
+    """JSON teacher directory, keyset-paginated and projected to plain values"""
+    try:
+        page_size = min(max(int(request.GET.get("page_size", TEACHER_PAGE_SIZE)), 1), 100)
+    except ValueError:
+        page_size = TEACHER_PAGE_SIZE
 
-"""Views for school app (teachers, dashboard, profiles, notifications)."""
+    page = await sync_to_async(paginate_teachers)(
+        request, Teacher.objects.values(*TEACHER_API_FIELDS), page_size=page_size
+    )
+    return JsonResponse(
+        {
+            "results": page.object_list,
+            "next": page.next_cursor,
+            "previous": page.previous_cursor,
+        }
+    )
 
 
 # Teacher Form
@@ -60,8 +225,8 @@ class TeacherForm(forms.ModelForm):
 
 # List Teachers
 def teacher_list(request):
-    teachers = Teacher.objects.all()
-    return render(request, "teachers.html", {"teachers": teachers})
+    teachers = paginate_teachers(request)
+    return render(request, "teachers.html", {"teachers": teachers, "page": teachers})
 
 
 # Add Teacher
@@ -106,15 +271,13 @@ def teacher_dashboard(request):
     if not request.user.is_authenticated:
         return redirect("login")
 
-    if not (hasattr(request.user, "is_teacher") and request.user.is_teacher):
+    if not has_role(request.user, "teacher"):
         messages.error(request, "Access denied. Teachers only.")
         return redirect("index")
 
-    from .models import Teacher
-
-    teachers = Teacher.objects.all()
+    overview = get_fragment("teacher", "overview", build_overview)
     return render(
-        request, "Home/teacher-dashboard.html", {"welcome_user": "Teacher", "teachers": teachers}
+        request, "Home/teacher-dashboard.html", {"welcome_user": "Teacher", "overview": overview}
     )
 
 
@@ -123,23 +286,22 @@ def index(request):
         return render(request, "authentication/login.html")
 
     # Redirect to appropriate dashboard based on user role
-    if hasattr(request.user, "is_admin") and request.user.is_admin:
-        from django.contrib.auth import get_user_model
-
-        User = get_user_model()
-
-        # Get all students for display
-        students = User.objects.filter(is_student=True).order_by("first_name", "last_name")
-
+    role = primary_role(request.user)
+    if role == "admin":
+        # Overview counts and the student table are cached per role (school.dashboard)
+        overview = get_fragment("admin", "overview", build_overview)
         context = {
             "welcome_user": "Admin",
-            "students": students,
-            "total_students": students.count(),
+            "overview": overview,
+            "students_table": get_fragment(
+                "admin", "students", lambda: render_student_table(request)
+            ),
+            "total_students": overview["students"],
         }
         return render(request, "Home/index.html", context)
-    elif hasattr(request.user, "is_teacher") and request.user.is_teacher:
+    elif role == "teacher":
         return redirect("teacher_dashboard")  # Redirect teachers to their dashboard
-    elif hasattr(request.user, "is_student") and request.user.is_student:
+    elif role == "student":
         return redirect("student_dashboard")  # Redirect students to their dashboard
     else:
         return render(request, "authentication/login.html")
@@ -155,7 +317,7 @@ def student_dashboard(request):
     if not request.user.is_authenticated:
         return redirect("login")
 
-    if not (hasattr(request.user, "is_student") and request.user.is_student):
+    if not has_role(request.user, "student"):
         messages.error(request, "Access denied. Students only.")
         return redirect("index")
 
@@ -163,20 +325,81 @@ def student_dashboard(request):
     return render(request, "student-dashboard.html", context)
 
 
-def mark_notification_as_read(request):
+async def mark_notification_as_read(request):
     if request.method == "POST":
-        notification = Notification.objects.filter(user=request.user, is_read=False)
-        notification.update(is_read=True)
+        user = await request.auser()
+        if not user.is_authenticated:
+            return HttpResponseForbidden()
+        await Notification.objects.filter(user=user, is_read=False).aupdate(is_read=True)
+        await areset_unread_count(user.pk)
         return JsonResponse({"status": "success"})
     return HttpResponseForbidden()
 
 
-def clear_all_notification(request):
+async def clear_all_notification(request):
     if request.method == "POST":
-        notification = Notification.objects.filter(user=request.user)
-        notification.delete()
+        user = await request.auser()
+        if not user.is_authenticated:
+            return HttpResponseForbidden()
+        await Notification.objects.filter(user=user).adelete()
+        await areset_unread_count(user.pk)
         return JsonResponse({"status": "success"})
-    return HttpResponseForbidden
+    return HttpResponseForbidden()
+
+
+def _on_shared_thread(func):
+    """Run sync ``func`` on the loop's shared executor, closing its DB connection after
+
+    A thread-sensitive call (``request.auser()``, the async ORM) gives the
+    request its own worker thread and connection until the response ends;
+    for a stream held open for hours that would be one idle thread and
+    connection per client.
+    """
+
+    def call(*args):
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(call, thread_sensitive=False)
+
+
+@streaming_view
+async def notification_stream(request):
+    """Server-sent events carrying the user's new notifications (ASGI only)"""
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI each stream would hold a worker; 204 stops EventSource reconnecting
+        return HttpResponse(status=204)
+    user = await _on_shared_thread(get_user)(request)
+    if not user.is_authenticated:
+        return HttpResponseForbidden()
+
+    replay = None
+    last_event_id = request.headers.get("Last-Event-ID")
+    if last_event_id:
+        replay = partial(_on_shared_thread(missed_notifications), user.pk, last_event_id)
+    response = StreamingHttpResponse(
+        notification_events(notification_channel(user.pk), replay),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@login_required
+@role_required("admin", "teacher")
+async def dashboard_counters(request):
+    """Dashboard headline counts and the caller's unread count, for polling"""
+    user = await request.auser()
+    role = "admin" if has_role(user, "admin") else "teacher"
+    return JsonResponse(
+        {
+            "overview": await aget_fragment(role, "overview", abuild_overview),
+            "unread_notifications": await aget_unread_count(user),
+        }
+    )
 
 
 def profile_view(request):
@@ -184,13 +407,7 @@ def profile_view(request):
         return redirect("index")
 
     # Determine user role for profile customization
-    user_role = "User"
-    if hasattr(request.user, "is_admin") and request.user.is_admin:
-        user_role = "Admin"
-    elif hasattr(request.user, "is_teacher") and request.user.is_teacher:
-        user_role = "Teacher"
-    elif hasattr(request.user, "is_student") and request.user.is_student:
-        user_role = "Student"
+    user_role = primary_role(request.user).capitalize()
 
     context = {"user_role": user_role, "user": request.user}
 
@@ -223,7 +440,7 @@ def admin_required(function):
     @wraps(function)
     @login_required
     def wrap(request, *args, **kwargs):
-        if not hasattr(request.user, "is_admin") or not request.user.is_admin:
+        if not has_role(request.user, "admin"):
             messages.error(request, "You don't have permission to access this page.")
             raise PermissionDenied("Admin access required")
         return function(request, *args, **kwargs)
@@ -267,7 +484,7 @@ def department_list(request):
     context = {
         "departments": departments,
         "total_departments": departments.count(),
-        "user_is_admin": hasattr(request.user, "is_admin") and request.user.is_admin,
+        "user_is_admin": has_role(request.user, "admin"),
     }
     return render(request, "departments/department_list.html", context)
 
@@ -353,7 +570,7 @@ def department_detail(request, pk):
     context = {
         "department": department,
         "subjects": subjects,
-        "user_is_admin": hasattr(request.user, "is_admin") and request.user.is_admin,
+        "user_is_admin": has_role(request.user, "admin"),
     }
     return render(request, "departments/department_detail.html", context)
 
@@ -412,40 +629,13 @@ def holiday_list(request):
     except (ValueError, TypeError):
         year = current_year
 
-    # Get holidays for the specified year
-    holidays = Holiday.objects.filter(date__year=year, is_active=True).order_by("date")
-
-    # Get upcoming holidays
-    upcoming_holidays = Holiday.objects.filter(
-        date__gte=timezone.now().date(), is_active=True
-    ).order_by("date")[:5]
-
-    # Group holidays by month
-    holidays_by_month = {}
-    for holiday in holidays:
-        month = holiday.date.strftime("%B")
-        if month not in holidays_by_month:
-            holidays_by_month[month] = []
-        holidays_by_month[month].append(holiday)
-
-    # Get holiday statistics
-    total_holidays = holidays.count()
-    holiday_type_counts = {
-        "national": holidays.filter(holiday_type="national").count(),
-        "religious": holidays.filter(holiday_type="religious").count(),
-        "international": holidays.filter(holiday_type="international").count(),
-        "special": holidays.filter(holiday_type="special").count(),
-        "bank": holidays.filter(holiday_type="bank").count(),
-    }
+    # Holidays, statistics and upcoming list come from the aggregation layer
+    summary = holiday_summary(year)
 
     context = {
-        "holidays": holidays,
-        "holidays_by_month": holidays_by_month,
-        "upcoming_holidays": upcoming_holidays,
+        **summary,
         "current_year": year,
-        "total_holidays": total_holidays,
-        "holiday_type_counts": holiday_type_counts,
-        "user_is_admin": hasattr(request.user, "is_admin") and request.user.is_admin,
+        "user_is_admin": has_role(request.user, "admin"),
         "available_years": range(current_year - 2, current_year + 3),
     }
     return render(request, "holiday.html", context)
@@ -511,19 +701,271 @@ def delete_holiday(request, pk):
 
 
 # Fees view
+@login_required
+@role_required("admin")
 def fees_list(request):
     """Display fees management page"""
-    context = {"title": "Fees Management", "page_title": "Fees Management System"}
+    report = fee_report()
+    context = {
+        "title": "Fees Management",
+        "page_title": "Fees Management System",
+        "report": report,
+        "collection_tables": [("Class", report["by_class"]), ("Department", report["by_department"])],
+    }
     return render(request, "fees.html", context)
 
 
+@login_required
+@role_required("admin")
+async def fee_report_api(request):
+    """Ledger report as JSON; ``?projection=1&months=6&fee_change=0.05`` adds a what-if"""
+    data = await sync_to_async(fee_report)()
+    if request.GET.get("projection"):
+        try:
+            months = min(max(int(request.GET.get("months", 6)), 1), 36)
+            fee_change = float(request.GET.get("fee_change", 0))
+        except ValueError:
+            return JsonResponse({"error": "months and fee_change must be numbers"}, status=400)
+        try:
+            data["projection"] = await sync_to_async(project_collections)(
+                months=months, fee_change=fee_change
+            )
+        except ImproperlyConfigured as e:
+            return JsonResponse({"error": str(e)}, status=501)
+    return JsonResponse(data)
+
+
+@login_required
+@role_required("admin")
+def export_list(request, name, fmt):
+    """Download a list page (teachers, users, subjects, ...) as CSV or XLSX"""
+    try:
+        return export_response(name, fmt)
+    except KeyError:
+        raise Http404("Unknown export")
+    except ImproperlyConfigured as e:
+        return HttpResponse(str(e), status=501, content_type="text/plain")
+
+
+def _parse_date(value, default=None):
+    try:
+        return datetime.date.fromisoformat(value or "")
+    except ValueError:
+        return default
+
+
+@login_required
+@role_required("admin", "teacher")
+async def mark_attendance(request):
+    """Mark a whole class in one POST
+
+    Fields: ``student_class``, ``date`` (default today), optional ``subject`` id,
+    and either repeated ``present`` student ids or ``all_present=1``.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required"}, status=405)
+    student_class = request.POST.get("student_class", "").strip()
+    date = _parse_date(request.POST.get("date"), timezone.localdate())
+    subject = request.POST.get("subject") or None
+    user = await request.auser()
+    try:
+        if subject is not None:
+            subject = int(subject)
+        if request.POST.get("all_present"):
+            present = await sync_to_async(class_roster)(student_class)
+        else:
+            present = [int(pk) for pk in request.POST.getlist("present")]
+        sheet = await sync_to_async(mark_class)(
+            student_class, date, present, subject=subject, marked_by=user
+        )
+    except (AttendanceError, ValueError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse(
+        {
+            "student_class": sheet.student_class,
+            "date": sheet.date,
+            "subject": sheet.subject_id,
+            "present": sheet.present_count,
+            "total": sheet.total,
+        }
+    )
+
+
+@login_required
+@role_required("admin", "teacher")
+async def attendance_report(request):
+    """Daily totals and below-threshold students of a class as JSON
+
+    ``?student_class=5A&start=2026-09-01&end=2026-09-30&subject=3``; the range
+    defaults to the last 30 days.
+    """
+    student_class = request.GET.get("student_class", "").strip()
+    if not student_class:
+        return JsonResponse({"error": "student_class is required"}, status=400)
+    end = _parse_date(request.GET.get("end"), timezone.localdate())
+    start = _parse_date(request.GET.get("start"), end - datetime.timedelta(days=30))
+    subject = request.GET.get("subject") or None
+    if subject is not None and not subject.isdigit():
+        return JsonResponse({"error": "subject must be an id"}, status=400)
+    data = {
+        "student_class": student_class,
+        "start": start,
+        "end": end,
+        "days": await sync_to_async(class_daily_totals)(student_class, start, end, subject=subject),
+    }
+    try:
+        data["below_threshold"] = await sync_to_async(low_attendance)(
+            start, end, student_class=student_class, subject=subject
+        )
+    except ImproperlyConfigured as e:
+        return JsonResponse({"error": str(e)}, status=501)
+    return JsonResponse(data)
+
+
+def _search_params(request):
+    query = request.GET.get("q", "").strip()
+    kinds = [kind for kind in request.GET.getlist("kind") if kind in SEARCH_SOURCES]
+    try:
+        limit = int(request.GET.get("limit", 10))
+    except ValueError:
+        limit = 10
+    return query, kinds, limit
+
+
+@login_required
+async def search_api(request):
+    """Typeahead JSON: ``?q=ada lov&kind=student&limit=10``"""
+    query, kinds, limit = _search_params(request)
+    results = await sync_to_async(search)(query, kinds, limit)
+    return JsonResponse({"query": query, "results": [as_json(entry) for entry in results]})
+
+
+@login_required
+def search_page(request):
+    """Results page for the search box in the top bar"""
+    query, kinds, _limit = _search_params(request)
+    results = search(query, kinds, limit=50)
+    context = {
+        "title": "Search",
+        "query": query,
+        "kinds": [(kind, source.label) for kind, source in SEARCH_SOURCES.items()],
+        "selected_kinds": kinds,
+        "results": [(SEARCH_SOURCES[entry.kind].label, entry) for entry in results],
+    }
+    return render(request, "search.html", context)
+
+
+EXAM_PAPER_PAGE_SIZE = 25
+
+
 # Exam List view
+@login_required
 def exam_list(request):
-    """Display exam list page"""
-    context = {"title": "Exam List", "page_title": "Examination Management"}
+    """Exam statistics and the paper schedule, latest first (?type=quiz|midterm|final)"""
+    today = timezone.localdate()
+    exams = Exam.objects.annotate(ends=Coalesce("end_date", "start_date"))
+    stats = exams.aggregate(
+        total=Count("pk"),
+        upcoming=Count("pk", filter=Q(start_date__gt=today)),
+        ongoing=Count("pk", filter=Q(start_date__lte=today, ends__gte=today)),
+        completed=Count("pk", filter=Q(ends__lt=today)),
+        published=Count("pk", filter=Q(results_computed_at__isnull=False)),
+    )
+
+    exam_type = request.GET.get("type", "")
+    papers = ExamSubject.objects.select_related("exam", "subject").annotate(
+        exam_start=F("exam__start_date")
+    )
+    if exam_type in dict(Exam.EXAM_TYPES):
+        papers = papers.filter(exam__exam_type=exam_type)
+    else:
+        exam_type = ""
+    try:
+        page = keyset_paginate(
+            papers,
+            ("exam_start", "id"),
+            EXAM_PAPER_PAGE_SIZE,
+            after=request.GET.get("after"),
+            before=request.GET.get("before"),
+            descending=True,
+        )
+    except InvalidCursor:
+        raise Http404("Invalid page cursor")
+
+    context = {
+        "title": "Exam List",
+        "page_title": "Examination Management",
+        "stats": stats,
+        "exam_types": Exam.EXAM_TYPES,
+        "exam_type": exam_type,
+        "papers": [(paper, exam_status(paper.exam, today)) for paper in page],
+        "page": page,
+    }
     return render(request, "exam_list.html", context)
 
 
+@login_required
+@role_required("admin", "teacher")
+def exam_results(request, pk):
+    """Stored results of one exam by class and rank (?class=5A)"""
+    exam = get_object_or_404(Exam, pk=pk)
+    student_class = request.GET.get("class", "").strip()
+    classes = (
+        ExamResult.objects.filter(exam=exam)
+        .order_by("student_class")
+        .values_list("student_class", flat=True)
+        .distinct()
+    )
+    context = {
+        "title": f"{exam.name} results",
+        "exam": exam,
+        "papers": exam.papers.select_related("subject").order_by("subject__name"),
+        "classes": classes,
+        "student_class": student_class,
+        "results": class_results(exam, student_class),
+        "can_compute": has_role(request.user, "admin"),
+    }
+    return render(request, "exams/results.html", context)
+
+
+@login_required
+@role_required("admin", "teacher")
+def record_exam_marks(request, pk):
+    """Bulk marks entry for one paper as JSON: ``{"marks": {"<student id>": 87.5}}``
+
+    A null score records the student as absent; posting again overwrites.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required"}, status=405)
+    paper = get_object_or_404(ExamSubject.objects.select_related("subject"), pk=pk)
+    try:
+        scores = json.loads(request.body)["marks"]
+        scores = {int(student_id): score for student_id, score in scores.items()}
+        written = record_marks(paper, scores, entered_by=request.user)
+    except (KeyError, TypeError, AttributeError):
+        return JsonResponse({"error": 'Expected {"marks": {student id: score}}'}, status=400)
+    except ValueError as e:
+        # malformed JSON, a non-numeric id or an ExamError
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse({"paper": paper.pk, "written": written})
+
+
+@login_required
+@role_required("admin")
+def compute_exam_results(request, pk):
+    """Recompute totals, GPA, class ranks and percentiles of an exam"""
+    exam = get_object_or_404(Exam, pk=pk)
+    if request.method != "POST":
+        return redirect("exam_results", pk=exam.pk)
+    try:
+        count = compute_results(exam)
+    except ExamError as e:
+        messages.error(request, str(e))
+    else:
+        messages.success(request, f"Results computed for {count} students.")
+    return redirect("exam_results", pk=exam.pk)
+
+
 # Events view
 def events_list(request):
     """Display events page"""
@@ -532,33 +974,290 @@ def events_list(request):
 
 
 # Time Table view
+@login_required
 def time_table(request):
-    """Display time table page"""
-    context = {"title": "Time Table", "page_title": "Class Schedule"}
+    """Weekly timetable of one class, teacher or room (?view=class|teacher|room&key=...)"""
+    view_type = request.GET.get("view", "class")
+    if view_type not in ("class", "teacher", "room"):
+        view_type = "class"
+    try:
+        week_of = datetime.date.fromisoformat(request.GET.get("week", ""))
+    except ValueError:
+        week_of = timezone.localdate()
+
+    classes = list(
+        Assignment.objects.order_by("student_class")
+        .values_list("student_class", flat=True)
+        .distinct()
+    )
+    choices = {
+        "class": [(name, name) for name in classes],
+        "teacher": [(str(t.pk), str(t)) for t in Teacher.objects.only("first_name", "last_name")],
+        "room": [(str(r.pk), r.name) for r in Room.objects.all()],
+    }[view_type]
+    key = request.GET.get("key") or (choices[0][0] if choices else "")
+
+    assignments = Assignment.objects.select_related("period", "subject", "teacher", "room")
+    if view_type == "class":
+        assignments = assignments.filter(student_class=key)
+    elif key.isdigit():
+        assignments = assignments.filter(**{f"{view_type}_id": key})
+    else:
+        assignments = assignments.none()
+
+    grid = weekly_grid(assignments, week_of)
+    context = {
+        "title": "Time Table",
+        "page_title": "Class Schedule",
+        "view_type": view_type,
+        "choices": choices,
+        "selected": key,
+        "selected_label": dict(choices).get(key, ""),
+        "grid": grid,
+        "previous_week": grid["week_start"] - datetime.timedelta(days=7),
+        "next_week": grid["week_start"] + datetime.timedelta(days=7),
+    }
     return render(request, "time_table.html", context)
 
 
 # Library view
+BOOK_PAGE_SIZE = 25
+
+
+@login_required
 def library(request):
-    """Display library page"""
-    context = {"title": "Library", "page_title": "Library Management"}
+    """Catalogue (?q= ISBN or title prefix), circulation totals and overdue loans"""
+    query = request.GET.get("q", "").strip()
+    if query:
+        books, page = search_catalog(query, limit=50), None
+    else:
+        try:
+            page = keyset_paginate(
+                Book.objects.all(),
+                ("title_key", "id"),
+                BOOK_PAGE_SIZE,
+                after=request.GET.get("after"),
+                before=request.GET.get("before"),
+            )
+        except InvalidCursor:
+            raise Http404("Invalid page cursor")
+        books = page.object_list
+
+    can_circulate = has_permission(request.user, "library.circulate")
+    context = {
+        "title": "Library",
+        "page_title": "Library Management",
+        "query": query,
+        "books": books,
+        "page": page,
+        "stats": library_stats(),
+        "can_circulate": can_circulate,
+        "my_loans": borrower_loans(request.user),
+        "popular": Book.objects.filter(loans_total__gt=0).order_by("-loans_total")[:5],
+    }
+    if can_circulate:
+        context["overdue"] = overdue_loans()[:10]
+        context["recent_loans"] = Loan.objects.select_related("copy__book", "borrower").order_by(
+            "-pk"
+        )[:6]
     return render(request, "library.html", context)
 
 
-# Hostel view
+@login_required
+async def library_search_api(request):
+    """Catalogue typeahead JSON: ``?q=978-0`` or ``?q=pride and``"""
+    query = request.GET.get("q", "").strip()
+    books = await sync_to_async(search_catalog)(query) if query else []
+    return JsonResponse(
+        {
+            "query": query,
+            "results": [
+                {
+                    "id": book.pk,
+                    "isbn": book.isbn,
+                    "title": book.title,
+                    "author": book.author,
+                    "available": book.copies_available,
+                    "copies": book.copies_total,
+                }
+                for book in books
+            ],
+        }
+    )
+
+
+@login_required
+@role_required("admin", "teacher")
+def library_checkout(request):
+    """Counter desk: lend the scanned copy (``barcode``) to ``borrower``"""
+    if request.method != "POST":
+        return redirect("library")
+    try:
+        borrower = find_borrower(request.POST.get("borrower"))
+        loan = checkout(request.POST.get("barcode", ""), borrower, issued_by=request.user)
+    except LibraryError as e:
+        messages.error(request, str(e))
+    else:
+        messages.success(
+            request,
+            f"{loan.copy.book} lent to {borrower.get_full_name() or borrower.username}, "
+            f"due {loan.due_date:%d %b %Y}.",
+        )
+    return redirect("library")
+
+
+@login_required
+@role_required("admin", "teacher")
+def library_return(request):
+    """Counter desk: take back the scanned copy (``barcode``)"""
+    if request.method != "POST":
+        return redirect("library")
+    try:
+        loan = return_copy(request.POST.get("barcode", ""))
+    except LibraryError as e:
+        messages.error(request, str(e))
+    else:
+        late = loan.days_overdue()
+        messages.success(
+            request,
+            f"{loan.copy.book} returned" + (f", {late} days late." if late else "."),
+        )
+    return redirect("library")
+
+
+# Hostel views
+@login_required
 def hostel(request):
-    """Display hostel page"""
-    context = {"title": "Hostel Management", "page_title": "Student Accommodation"}
+    """Occupancy by hostel and floor, one floor's rooms (?hostel=&floor=) and the waiting list"""
+    hostels = list(hostel_occupancy())
+    selected = next((h for h in hostels if str(h.pk) == request.GET.get("hostel")), None)
+    if selected is None and hostels:
+        selected = hostels[0]
+
+    floors, rooms, floor = [], [], None
+    if selected is not None:
+        floors = list(
+            Bed.objects.filter(room__hostel=selected)
+            .values(floor=F("room__floor"))
+            .annotate(beds=Count("pk"), occupied=Count("student"))
+            .order_by("floor")
+        )
+        for row in floors:
+            row["rate"] = row["occupied"] * 100 // row["beds"]
+        numbers = [row["floor"] for row in floors]
+        floor = request.GET.get("floor", "")
+        floor = int(floor) if floor.isdigit() and int(floor) in numbers else None
+        if floor is None and numbers:
+            floor = numbers[0]
+        rooms = (
+            HostelRoom.objects.filter(hostel=selected, floor=floor)
+            .annotate(free_beds=Count("beds", filter=Q(beds__student__isnull=True)))
+            .prefetch_related(Prefetch("beds", queryset=Bed.objects.select_related("student")))
+        )
+
+    can_allocate = has_permission(request.user, "hostel.allocate")
+    beds = sum(h.bed_count for h in hostels)
+    occupied = sum(h.occupied for h in hostels)
+    context = {
+        "title": "Hostel Management",
+        "page_title": "Student Accommodation",
+        "hostels": hostels,
+        "selected": selected,
+        "floors": floors,
+        "floor": floor,
+        "rooms": rooms,
+        "totals": {
+            "rooms": sum(h.room_count for h in hostels),
+            "beds": beds,
+            "occupied": occupied,
+            "rate": occupied * 100 // beds if beds else 0,
+            "free": beds - occupied,
+            "closed": HostelRoom.objects.filter(is_available=False).count(),
+            "waiting": waiting_list().count(),
+        },
+        "can_allocate": can_allocate,
+        "my_bed": Bed.objects.filter(student__user=request.user)
+        .select_related("room__hostel")
+        .first(),
+    }
+    if can_allocate:
+        context["waiting"] = waiting_list()[:10]
+        context["recent"] = (
+            Bed.objects.filter(assigned_at__isnull=False)
+            .select_related("student", "room__hostel")
+            .order_by("-assigned_at", "-pk")[:6]
+        )
     return render(request, "hostel.html", context)
 
 
-# Transport view
+@login_required
+@role_required("admin")
+def hostel_allocate(request):
+    """Place waiting applicants; ``full`` replans every bed instead of only the changes"""
+    if request.method != "POST":
+        return redirect("hostel")
+    run = allocate_beds(full=bool(request.POST.get("full")))
+    messages.success(request, f"Beds allocated in {run.seconds:.2f}s: {run.summary()}.")
+    return redirect("hostel")
+
+
+# Transport views
+@login_required
 def transport(request):
-    """Display transport page"""
-    context = {"title": "Transport Management", "page_title": "School Transportation"}
+    """Planned routes with their buses and stops, and the signed-in student's pickup"""
+    routes = list(
+        Route.objects.select_related("bus").prefetch_related(
+            Prefetch("stops", queryset=Stop.objects.order_by("sequence"))
+        )
+    )
+    for route in routes:
+        route.departure = pickup_time(route.ride_minutes)
+    buses = Bus.objects.filter(is_active=True).aggregate(count=Count("pk"), seats=Sum("capacity"))
+    riders = Rider.objects.count()
+    my_stop = (
+        Stop.objects.filter(riders__student__user=request.user)
+        .select_related("route__bus")
+        .first()
+    )
+    if my_stop is not None and my_stop.route_id:
+        my_stop.pickup = pickup_time(my_stop.minutes_to_school)
+    context = {
+        "title": "Transport Management",
+        "page_title": "School Transportation",
+        "routes": routes,
+        "totals": {
+            "buses": buses["count"],
+            "seats": buses["seats"] or 0,
+            "idle": Bus.objects.filter(is_active=True, route__isnull=True).count(),
+            "off_road": Bus.objects.filter(is_active=False).count(),
+            "riders": riders,
+            "unplanned": Rider.objects.filter(stop__isnull=True).count(),
+            "unrouted": Rider.objects.filter(stop__isnull=False, stop__route__isnull=True).count(),
+            "routes": len(routes),
+            "stops": Stop.objects.count(),
+            "without_bus": sum(1 for route in routes if route.bus is None),
+        },
+        "can_plan": has_permission(request.user, "transport.plan"),
+        "my_stop": my_stop,
+    }
     return render(request, "transport.html", context)
 
 
+@login_required
+@role_required("admin")
+def transport_plan(request):
+    """Replan stops and routes; ``full`` starts over instead of adjusting the current plan"""
+    if request.method != "POST":
+        return redirect("transport")
+    try:
+        run = plan_routes(full=bool(request.POST.get("full")))
+    except TransportError as e:
+        messages.error(request, str(e))
+    else:
+        messages.success(request, f"Routes planned in {run.seconds:.2f}s: {run.summary()}.")
+    return redirect("transport")
+
+
 # Sports view
 def sports(request):
     """Display sports page"""
@@ -566,82 +1265,118 @@ def sports(request):
     return render(request, "sports.html", context)
 
 
-# Inbox view
+# Inbox views
+
+INBOX_ROLE_RECIPIENTS = {"admin": "admin", "teachers": "teacher", "students": "student"}
+
+
 @login_required
 def inbox(request):
-    """Display inbox page for messaging system"""
-    from django.contrib.auth import get_user_model
-    from .models import Teacher
-
-    User = get_user_model()
-
-    # Get real users from database
-    admins = User.objects.filter(is_admin=True)[:2]
-    teachers = Teacher.objects.all()[:3]  # Using Teacher model for more details
-    students = User.objects.filter(is_student=True)[:2]
-
-    # Prepare sample messages with real users
-    sample_messages = []
-
-    # Add admin messages
-    for admin in admins:
-        sample_messages.append(
-            {
-                "sender": admin,
-                "sender_type": "Administrator",
-                "subject": "New Academic Year Guidelines",
-                "content": "Please review the updated guidelines for the new academic year. Important changes have been made to the curriculum...",
-                "time": "2 hrs ago",
-                "is_unread": True,
-                "is_starred": False,
-            }
-        )
-
-    # Add teacher messages
-    for teacher in teachers:
-        sample_messages.append(
-            {
-                "sender": teacher,
-                "sender_type": "Teacher",
-                "subject": "Meeting Schedule Update",
-                "content": "The weekly staff meeting has been rescheduled to Thursday at 3:00 PM. Please update your calendars accordingly.",
-                "time": "5 hrs ago",
-                "is_unread": False,
-                "is_starred": True,
-            }
-        )
-        break  # Only show one teacher message for demo
-
-    # Add student messages
-    for student in students:
-        sample_messages.append(
-            {
-                "sender": student,
-                "sender_type": "Student",
-                "subject": "Assignment Submission Query",
-                "content": "I have a question about the submission deadline for the Mathematics assignment. Could you please clarify...",
-                "time": "1 day ago",
-                "is_unread": True,
-                "is_starred": False,
-            }
+    """A user's conversations, most recent first"""
+    folder = request.GET.get("folder", "all")
+    if folder not in INBOX_FOLDERS:
+        folder = "all"
+    try:
+        page = inbox_page(
+            request.user, folder, after=request.GET.get("after"), before=request.GET.get("before")
         )
-        break  # Only show one student message for demo
+    except InvalidCursor:
+        raise Http404("Invalid page cursor")
 
     context = {
         "title": "Inbox",
         "page_title": "Message Center",
-        "sample_messages": sample_messages,
-        "user_role": "Administrator"
-        if hasattr(request.user, "is_admin") and request.user.is_admin
-        else "Teacher"
-        if hasattr(request.user, "is_teacher") and request.user.is_teacher
-        else "Student"
-        if hasattr(request.user, "is_student") and request.user.is_student
-        else "User",
+        "threads": page,
+        "page": page,
+        "folder": folder,
+        "unread_messages": unread_message_count(request.user),
+        "can_broadcast": has_permission(request.user, "message.broadcast"),
+        "user_role": role_label(request.user),
     }
     return render(request, "inbox.html", context)
 
 
+@login_required
+def send_inbox_message(request):
+    """Compose form: a new thread with one user, or a private copy to each member of a role"""
+    if request.method != "POST":
+        return redirect("inbox")
+    from django.contrib.auth import get_user_model
+    from django.db.models import Q
+
+    recipient = request.POST.get("recipient", "")
+    subject = request.POST.get("subject", "").strip() or "(no subject)"
+    body = request.POST.get("message", "")
+    try:
+        if recipient in INBOX_ROLE_RECIPIENTS:
+            if not has_permission(request.user, "message.broadcast"):
+                raise PermissionDenied
+            sent = send_to_role(request.user, INBOX_ROLE_RECIPIENTS[recipient], subject, body)
+            messages.success(request, f"Message sent to {sent} recipient(s).")
+        elif recipient == "specific":
+            lookup = request.POST.get("specific_user", "").strip()
+            user = (
+                get_user_model()
+                .objects.filter(Q(username__iexact=lookup) | Q(email__iexact=lookup))
+                .filter(is_active=True)
+                .first()
+                if lookup
+                else None
+            )
+            if user is None:
+                raise MessagingError(f"No user matches '{lookup}'")
+            thread = start_thread(request.user, [user], subject, body)
+            messages.success(request, "Message sent.")
+            return redirect("inbox_thread", pk=thread.pk)
+        else:
+            raise MessagingError("Choose who to send the message to")
+    except MessagingError as e:
+        messages.error(request, str(e))
+    return redirect("inbox")
+
+
+@login_required
+def inbox_thread(request, pk):
+    """One conversation, newest messages last; opening it marks it read"""
+    thread = get_object_or_404(MessageThread, pk=pk)
+    # senders of a broadcast have no participant row on its copies until a reply
+    if (
+        thread.created_by_id != request.user.pk
+        and not thread.participants.filter(user=request.user).exists()
+    ):
+        raise Http404("No such conversation")
+    if request.method == "POST":
+        try:
+            send_message(thread, request.user, request.POST.get("message", ""))
+        except MessagingError as e:
+            messages.error(request, str(e))
+        return redirect("inbox_thread", pk=pk)
+
+    try:
+        page = message_page(
+            thread, after=request.GET.get("after"), before=request.GET.get("before")
+        )
+    except InvalidCursor:
+        raise Http404("Invalid page cursor")
+    mark_read(thread, request.user)
+
+    context = {
+        "title": thread.subject,
+        "thread": thread,
+        "page": page,
+        "thread_messages": list(reversed(page.object_list)),
+        "participants": thread.participants.select_related("user").order_by("id")[:20],
+    }
+    return render(request, "messages/thread.html", context)
+
+
+@login_required
+def mark_inbox_read(request):
+    if request.method == "POST":
+        mark_all_read(request.user)
+    return redirect("inbox")
+
+
 # Subject Management Views
 
 
@@ -660,33 +1395,6 @@ class SubjectForm(forms.ModelForm):
         }
 
 
-def role_required(*allowed_roles):
-    """Decorator to check if user has required role"""
-
-    def decorator(view_func):
-        @wraps(view_func)
-        def wrapper(request, *args, **kwargs):
-            if not request.user.is_authenticated:
-                return redirect("login")
-
-            user_roles = []
-            if hasattr(request.user, "is_admin") and request.user.is_admin:
-                user_roles.append("admin")
-            if hasattr(request.user, "is_teacher") and request.user.is_teacher:
-                user_roles.append("teacher")
-            if hasattr(request.user, "is_student") and request.user.is_student:
-                user_roles.append("student")
-
-            if any(role in allowed_roles for role in user_roles):
-                return view_func(request, *args, **kwargs)
-            else:
-                raise PermissionDenied
-
-        return wrapper
-
-    return decorator
-
-
 @login_required
 @role_required("admin", "teacher", "student")
 def subject_list(request):
@@ -696,25 +1404,14 @@ def subject_list(request):
     # Calculate unique department count
     department_count = subjects.values("department").distinct().count()
 
-    # More robust role detection
-    is_admin = hasattr(request.user, "is_admin") and request.user.is_admin
-    is_teacher = hasattr(request.user, "is_teacher") and request.user.is_teacher
-    is_student = hasattr(request.user, "is_student") and request.user.is_student
-
     context = {
         "subjects": subjects,
         "title": "Subject List",
-        "can_add": is_admin or is_teacher,
-        "can_edit": is_admin or is_teacher,
-        "can_delete": is_admin or is_teacher,
+        "can_add": has_permission(request.user, "subject.add"),
+        "can_edit": has_permission(request.user, "subject.change"),
+        "can_delete": has_permission(request.user, "subject.delete"),
         "department_count": department_count,
-        "user_role": "admin"
-        if is_admin
-        else "teacher"
-        if is_teacher
-        else "student"
-        if is_student
-        else "user",
+        "user_role": primary_role(request.user),
     }
     return render(request, "subjects/subject_list.html", context)
 
@@ -0,0 +1,187 @@
+"""Compare concurrent throughput of the async endpoints under ASGI and WSGI.
+
+Serves the app with uvicorn (``Home.asgi``) and with gunicorn (``Home.wsgi``;
+``django-admin runserver`` when gunicorn is not installed), logs a throwaway
+admin in, hammers each path from a pool of client threads and prints one row
+per server and path.
+
+    python scripts/loadtest_asgi.py --concurrency 64 --duration 10 \\
+        --paths /api/dashboard/counters/ "/api/search/?q=ad" /api/teachers/
+
+Both servers use the same database profile (DJANGO_DB_PROFILE) and number of
+worker processes. Requires uvicorn (pip install uvicorn).
+"""
+
+import argparse
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATHS = ["/api/dashboard/counters/", "/api/search/?q=ad", "/api/teachers/"]
+BENCH_USERNAME = "loadtest-asgi"
+
+
+def server_command(kind, port, workers):
+    bind = f"127.0.0.1:{port}"
+    if kind == "asgi":
+        return [
+            sys.executable, "-m", "uvicorn", "Home.asgi:application",
+            "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+            "--no-access-log",
+        ]
+    if importlib.util.find_spec("gunicorn"):
+        return [
+            sys.executable, "-m", "gunicorn", "Home.wsgi", "--bind", bind,
+            "--workers", str(workers), "--log-level", "warning",
+        ]
+    return [sys.executable, "-m", "django", "runserver", bind, "--noreload"]
+
+
+def server_label(kind):
+    if kind == "asgi":
+        return "uvicorn"
+    return "gunicorn" if importlib.util.find_spec("gunicorn") else "runserver"
+
+
+def login_cookie():
+    """Create (or reuse) an admin account and return a session cookie for it"""
+    import django
+
+    django.setup()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    user, _created = get_user_model().objects.get_or_create(
+        username=BENCH_USERNAME,
+        defaults={"email": f"{BENCH_USERNAME}@example.com", "is_admin": True},
+    )
+    client = Client()
+    client.force_login(user)
+    return f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+
+def remove_user():
+    from django.contrib.auth import get_user_model
+
+    get_user_model().objects.filter(username=BENCH_USERNAME).delete()
+
+
+def fetch(url, cookie):
+    request = urllib.request.Request(url, headers={"Cookie": cookie})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        response.read()
+        if response.status != 200 or response.url != url:
+            raise RuntimeError(f"{url} answered {response.status} at {response.url}")
+
+
+def wait_until_ready(url, cookie, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            fetch(url, cookie)
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.25)
+    raise RuntimeError(f"Server did not answer {url} within {timeout}s")
+
+
+def hammer(url, cookie, concurrency, duration):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                fetch(url, cookie)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def run_server(kind, cookie, env, args):
+    server = subprocess.Popen(server_command(kind, args.port, args.workers), cwd=ROOT, env=env)
+    base = f"http://127.0.0.1:{args.port}"
+    results = []
+    try:
+        wait_until_ready(base + args.paths[0], cookie)
+        for path in args.paths:
+            hammer(base + path, cookie, args.concurrency, 1)  # warm up caches
+            latencies, errors = hammer(base + path, cookie, args.concurrency, args.duration)
+            latencies.sort()
+            results.append(
+                {
+                    "server": server_label(kind),
+                    "path": path,
+                    "requests": len(latencies),
+                    "errors": errors,
+                    "rps": len(latencies) / args.duration,
+                    "p50": statistics.median(latencies) * 1000 if latencies else 0,
+                    "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0,
+                }
+            )
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paths", nargs="+", default=DEFAULT_PATHS)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=2, help="worker processes per server")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    if not importlib.util.find_spec("uvicorn"):
+        parser.error("uvicorn is required for the ASGI run (pip install uvicorn)")
+
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE="Home.settings")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    os.environ.update(DJANGO_SETTINGS_MODULE=env["DJANGO_SETTINGS_MODULE"])
+    sys.path.insert(0, ROOT)
+    subprocess.run(
+        [sys.executable, "-m", "django", "migrate", "--noinput", "-v", "0"],
+        cwd=ROOT, env=env, check=True,
+    )
+
+    cookie = login_cookie()
+    try:
+        results = run_server("wsgi", cookie, env, args) + run_server("asgi", cookie, env, args)
+    finally:
+        remove_user()
+
+    print(
+        f"\n{'server':<11}{'path':<32}{'requests':>10}{'errors':>8}"
+        f"{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+    )
+    for r in results:
+        print(
+            f"{r['server']:<11}{r['path']:<32}{r['requests']:>10}{r['errors']:>8}"
+            f"{r['rps']:>10.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
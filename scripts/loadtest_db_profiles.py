@@ -0,0 +1,123 @@
+"""Compare requests/second of the app under each database profile.
+
+For every profile this starts the app with DJANGO_DB_PROFILE set (gunicorn when
+it is installed, ``django-admin runserver`` otherwise), applies migrations,
+hammers one URL from a pool of client threads and prints a summary table.
+
+    python scripts/loadtest_db_profiles.py --profiles sqlite postgresql \\
+        --path /teachers/ --concurrency 32 --duration 15
+
+The postgresql profile reads DB_NAME, DB_USER, DB_PASSWORD, DB_HOST and DB_PORT.
+"""
+
+import argparse
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def server_command(port, workers):
+    if importlib.util.find_spec("gunicorn"):
+        return [
+            sys.executable, "-m", "gunicorn", "Home.wsgi",
+            "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--log-level", "warning",
+        ]
+    return [
+        sys.executable, "-m", "django", "runserver", f"127.0.0.1:{port}", "--noreload",
+    ]
+
+
+def wait_until_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=2).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.25)
+    raise RuntimeError(f"Server did not answer {url} within {timeout}s")
+
+
+def hammer(url, concurrency, duration):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                urllib.request.urlopen(url, timeout=30).read()
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def run_profile(profile, args):
+    env = dict(os.environ, DJANGO_DB_PROFILE=profile, DJANGO_SETTINGS_MODULE="Home.settings")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    subprocess.run(
+        [sys.executable, "-m", "django", "migrate", "--noinput", "-v", "0"],
+        cwd=ROOT, env=env, check=True,
+    )
+    server = subprocess.Popen(server_command(args.port, args.workers), cwd=ROOT, env=env)
+    url = f"http://127.0.0.1:{args.port}{args.path}"
+    try:
+        wait_until_ready(url)
+        hammer(url, args.concurrency, 1)  # warm up connections and caches
+        latencies, errors = hammer(url, args.concurrency, args.duration)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    latencies.sort()
+    return {
+        "profile": profile,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / args.duration,
+        "p50": statistics.median(latencies) * 1000 if latencies else 0,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", default=["sqlite"])
+    parser.add_argument("--path", default="/teachers/")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    results = [run_profile(profile, args) for profile in args.profiles]
+
+    print(f"\n{'profile':<12}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for r in results:
+        print(
+            f"{r['profile']:<12}{r['requests']:>10}{r['errors']:>8}"
+            f"{r['rps']:>10.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Hold thousands of idle notification streams open against one ASGI process.
+
+Starts a single uvicorn process, logs a throwaway user in, opens
+``--connections`` concurrent ``/notification/stream/`` requests and keeps them
+idle for ``--hold`` seconds, then reports what the server spent on them:
+
+    python scripts/loadtest_sse.py --connections 5000 --hold 30
+
+Columns are the server's resident memory and thread count before and with
+every stream open, the CPU it used while they sat idle, how many database
+files it had open, and the keep-alive comments the clients received. Server
+figures are read from /proc, so they are only reported on Linux.
+
+Requires uvicorn (pip install uvicorn). Publishing is not exercised here: the
+default LocalBroker only reaches streams of the publishing process.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import resource
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_USERNAME = "loadtest-sse"
+STREAM_PATH = "/notification/stream/"
+
+
+def raise_file_limit(needed):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+def login_cookie():
+    """Create (or reuse) an account and return a session cookie for it"""
+    import django
+
+    django.setup()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    user, _created = get_user_model().objects.get_or_create(
+        username=BENCH_USERNAME, defaults={"email": f"{BENCH_USERNAME}@example.com"}
+    )
+    client = Client()
+    client.force_login(user)
+    return f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+
+def remove_user():
+    from django.contrib.auth import get_user_model
+
+    get_user_model().objects.filter(username=BENCH_USERNAME).delete()
+
+
+def process_stats(pid):
+    """(rss_kb, threads, cpu_seconds, open_db_files) of a process, or None off Linux"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            fields = dict(line.split(":", 1) for line in status if ":" in line)
+        with open(f"/proc/{pid}/stat") as stat:
+            ticks = stat.read().rsplit(")", 1)[1].split()
+        fd_dir = f"/proc/{pid}/fd"
+        targets = []
+        for fd in os.listdir(fd_dir):
+            try:
+                targets.append(os.readlink(os.path.join(fd_dir, fd)))
+            except OSError:
+                pass
+    except OSError:
+        return None
+    cpu = (int(ticks[11]) + int(ticks[12])) / os.sysconf("SC_CLK_TCK")
+    db_files = sum(target.endswith((".sqlite3", ".db")) for target in targets)
+    return int(fields["VmRSS"].split()[0]), int(fields["Threads"]), cpu, db_files
+
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=5).read()
+            return
+        except urllib.error.HTTPError:
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.25)
+    raise RuntimeError(f"Server did not start within {timeout}s")
+
+
+class Stream:
+    def __init__(self):
+        self.opened = False
+        self.keepalives = 0
+        self.error = None
+
+
+async def open_stream(port, cookie, stream, gate, stop):
+    request = (
+        f"GET {STREAM_PATH} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n"
+        f"Accept: text/event-stream\r\nCookie: {cookie}\r\n\r\n"
+    ).encode()
+    try:
+        async with gate:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            status = await reader.readline()
+            if b" 200 " not in status:
+                raise RuntimeError(status.decode().strip() or "connection closed")
+            await reader.readuntil(b"retry:")
+        stream.opened = True
+        while not stop.is_set():
+            chunk = await reader.read(4096)
+            if not chunk:
+                raise RuntimeError("server closed the stream")
+            stream.keepalives += chunk.count(b": keepalive")
+    except Exception as exc:
+        stream.error = exc
+        return
+    writer.close()
+
+
+async def hold(args, cookie, server_pid):
+    streams = [Stream() for _ in range(args.connections)]
+    gate = asyncio.Semaphore(args.connect_concurrency)
+    stop = asyncio.Event()
+
+    before = process_stats(server_pid)
+    started = time.perf_counter()
+    tasks = [
+        asyncio.create_task(open_stream(args.port, cookie, stream, gate, stop))
+        for stream in streams
+    ]
+    while sum(s.opened or s.error is not None for s in streams) < len(streams):
+        await asyncio.sleep(0.1)
+    connect_time = time.perf_counter() - started
+
+    opened = process_stats(server_pid)
+    await asyncio.sleep(args.hold)
+    idle = process_stats(server_pid)
+    stop.set()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return streams, connect_time, before, opened, idle
+
+
+def report(args, streams, connect_time, before, opened, idle):
+    open_count = sum(s.opened and s.error is None for s in streams)
+    errors = [s.error for s in streams if s.error is not None]
+    print(f"\nstreams open     {open_count} / {args.connections}  (opened in {connect_time:.1f}s)")
+    if errors:
+        print(f"errors           {len(errors)}, first: {errors[0]!r}")
+    print(f"keep-alives      {sum(s.keepalives for s in streams)} received in {args.hold:.0f}s")
+    if before and opened and idle:
+        per_stream = (opened[0] - before[0]) / max(open_count, 1)
+        print(f"server RSS       {before[0] / 1024:.1f} MB -> {opened[0] / 1024:.1f} MB "
+              f"({per_stream:.1f} KB per stream)")
+        print(f"server threads   {before[1]} -> {opened[1]}")
+        print(f"idle CPU         {idle[2] - opened[2]:.2f}s over {args.hold:.0f}s")
+        print(f"open DB files    {opened[3]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--hold", type=float, default=30, help="seconds to keep the streams idle")
+    parser.add_argument("--connect-concurrency", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    if not importlib.util.find_spec("uvicorn"):
+        parser.error("uvicorn is required (pip install uvicorn)")
+    limit = raise_file_limit(args.connections + 256)
+    if limit < args.connections + 256:
+        parser.error(f"open file limit is {limit}; raise it (ulimit -n) for {args.connections}")
+
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE="Home.settings")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    os.environ.update(DJANGO_SETTINGS_MODULE=env["DJANGO_SETTINGS_MODULE"])
+    sys.path.insert(0, ROOT)
+    subprocess.run(
+        [sys.executable, "-m", "django", "migrate", "--noinput", "-v", "0"],
+        cwd=ROOT, env=env, check=True,
+    )
+
+    cookie = login_cookie()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "Home.asgi:application", "--port", str(args.port),
+            "--log-level", "warning", "--no-access-log", "--backlog", "8192",
+        ],
+        cwd=ROOT, env=env,
+    )
+    try:
+        wait_until_ready(args.port)
+        results = asyncio.run(hold(args, cookie, server.pid))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        remove_user()
+    report(args, *results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from .models import Parent, Student
+
+
+@admin.register(Parent)
+class ParentAdmin(admin.ModelAdmin):
+    list_display = ("father_name", "mother_name", "father_mobile", "mother_mobile")
+    search_fields = ("father_name", "mother_name", "father_email", "mother_email")
+
+
+@admin.register(Student)
+class StudentAdmin(admin.ModelAdmin):
+    list_display = ("student_id", "first_name", "last_name", "student_class", "section")
+    list_filter = ("student_class", "gender", "department")
+    search_fields = ("student_id", "first_name", "last_name", "admission_number")
+    list_select_related = ("parent",)
+    raw_id_fields = ("parent", "user")
+    prepopulated_fields = {"slug": ("first_name", "last_name", "student_id")}
@@ -0,0 +1,290 @@
+"""Streaming CSV/XLSX student roster import.
+
+Rows are read one at a time (the ``csv`` module or openpyxl's read-only mode),
+validated, and written in chunks: each chunk is one transaction doing a single
+``bulk_create`` for the parents, one for the students and one for their search
+entries. Invalid rows are reported with their line number and skipped; they
+never abort the import or the rest of their chunk.
+"""
+
+import csv
+import datetime
+import io
+import os
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+
+from school import search
+from school.models import Department
+
+from .models import Parent, Student
+
+STUDENT_COLUMNS = (
+    "first_name",
+    "last_name",
+    "student_id",
+    "gender",
+    "date_of_birth",
+    "student_class",
+    "religion",
+    "joining_date",
+    "mobile_number",
+    "admission_number",
+    "section",
+)
+PARENT_COLUMNS = (
+    "father_name",
+    "father_occupation",
+    "father_mobile",
+    "father_email",
+    "mother_name",
+    "mother_occupation",
+    "mother_mobile",
+    "mother_email",
+    "present_address",
+    "permanent_address",
+)
+REQUIRED_COLUMNS = (
+    "first_name",
+    "last_name",
+    "student_id",
+    "gender",
+    "date_of_birth",
+    "student_class",
+    "joining_date",
+    "father_name",
+)
+DATE_COLUMNS = ("date_of_birth", "joining_date")
+EMAIL_COLUMNS = ("father_email", "mother_email")
+GENDERS = {value.lower(): value for value, _label in Student.GENDER_CHOICES}
+_MAX_LENGTHS = {
+    f.name: f.max_length
+    for model in (Student, Parent)
+    for f in model._meta.concrete_fields
+    if f.max_length and f.get_internal_type() == "CharField"
+}
+
+IMPORT_CHUNK_SIZE = getattr(settings, "STUDENT_IMPORT_CHUNK_SIZE", 1000)
+
+
+class RosterError(ValueError):
+    """The file itself cannot be imported (unknown format, missing columns)"""
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, message):
+        self.skipped += 1
+        self.errors.append((line, message))
+
+
+def _normalise_header(name):
+    return str(name or "").strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def _check_header(header):
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise RosterError(f"Missing required columns: {', '.join(missing)}")
+
+
+def read_csv(fileobj):
+    """Yield ``(line_number, row_dict)`` from a text or binary CSV file object"""
+    if isinstance(fileobj.read(0), bytes):
+        fileobj = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    reader = csv.reader(fileobj)
+    header = [_normalise_header(name) for name in next(reader, [])]
+    _check_header(header)
+    for values in reader:
+        if any(values):
+            yield reader.line_num, dict(zip(header, values))
+
+
+def read_xlsx(fileobj):
+    """Yield ``(line_number, row_dict)`` from the first sheet of a workbook"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RosterError("Importing .xlsx files requires openpyxl (pip install openpyxl)")
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [_normalise_header(name) for name in next(rows, ())]
+        _check_header(header)
+        for line, values in enumerate(rows, start=2):
+            if any(value not in (None, "") for value in values):
+                yield line, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def read_roster(fileobj, name=""):
+    """Pick the reader from the file name's extension"""
+    extension = os.path.splitext(name or getattr(fileobj, "name", ""))[1].lower()
+    if extension in (".xlsx", ".xlsm"):
+        return read_xlsx(fileobj)
+    if extension in (".csv", ".txt", ""):
+        return read_csv(fileobj)
+    raise RosterError(f"Unsupported roster format '{extension}'; use .csv or .xlsx")
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        # spreadsheets store numeric ids and phone numbers as floats
+        value = int(value)
+    return str(value).strip()
+
+
+def _date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    parsed = parse_date(_text(value))
+    if parsed is None:
+        raise ValueError
+    return parsed
+
+
+def clean_row(row, departments=None):
+    """Validate one roster row and return ``(student_fields, parent_fields)``
+
+    Raises ``ValueError`` with a readable message for the first problem found.
+    """
+    data = {column: _text(row.get(column)) for column in STUDENT_COLUMNS + PARENT_COLUMNS}
+
+    for column in REQUIRED_COLUMNS:
+        if not data[column]:
+            raise ValueError(f"{column} is required")
+
+    for column in DATE_COLUMNS:
+        try:
+            data[column] = _date(row.get(column))
+        except ValueError:
+            raise ValueError(f"{column} '{data[column]}' is not a YYYY-MM-DD date")
+
+    try:
+        data["gender"] = GENDERS[data["gender"].lower()]
+    except KeyError:
+        raise ValueError(f"gender '{data['gender']}' must be one of {', '.join(GENDERS.values())}")
+
+    for column in EMAIL_COLUMNS:
+        if data[column]:
+            try:
+                validate_email(data[column])
+            except ValidationError:
+                raise ValueError(f"{column} '{data[column]}' is not a valid email address")
+
+    for name in STUDENT_COLUMNS + PARENT_COLUMNS:
+        max_length = _MAX_LENGTHS.get(name)
+        if max_length and len(str(data[name])) > max_length:
+            raise ValueError(f"{name} is longer than {max_length} characters")
+
+    student = {column: data[column] for column in STUDENT_COLUMNS}
+    parent = {column: data[column] for column in PARENT_COLUMNS}
+
+    department = _text(row.get("department"))
+    if department:
+        if departments is None or department.lower() not in departments:
+            raise ValueError(f"Unknown department '{department}'")
+        student["department_id"] = departments[department.lower()]
+    return student, parent
+
+
+def _existing(student_ids, slugs):
+    """The student ids and slugs of ``student_ids``/``slugs`` already in the database"""
+    taken = Student.objects.filter(Q(student_id__in=student_ids) | Q(slug__in=slugs))
+    pairs = list(taken.values_list("student_id", "slug"))
+    return {student_id for student_id, _slug in pairs}, {slug for _id, slug in pairs}
+
+
+def _insert(rows):
+    with transaction.atomic():
+        parents = Parent.objects.bulk_create([Parent(**parent) for _l, _s, parent in rows])
+        students = [
+            Student(parent=parent, **student) for (_line, student, _p), parent in zip(rows, parents)
+        ]
+        Student.objects.bulk_create(students)
+        # bulk_create sends no post_save, so index the chunk here
+        search.index_objects("student", students)
+
+
+def _write_chunk(chunk, result):
+    """Insert one chunk of cleaned rows in a single transaction
+
+    A row the database still rejects (e.g. inserted concurrently) sends the
+    chunk through row by row, so only that row is reported and skipped.
+    """
+    for _line, student, _parent in chunk:
+        student["slug"] = Student.build_slug(
+            student["first_name"], student["last_name"], student["student_id"]
+        )
+    existing_ids, taken_slugs = _existing(
+        [student["student_id"] for _line, student, _parent in chunk],
+        [student["slug"] for _line, student, _parent in chunk],
+    )
+
+    rows = []
+    for line, student, parent in chunk:
+        if student["student_id"] in existing_ids:
+            result.add_error(line, f"student_id '{student['student_id']}' already exists")
+        elif student["slug"] in taken_slugs:
+            result.add_error(line, f"slug '{student['slug']}' is used by another student")
+        else:
+            taken_slugs.add(student["slug"])
+            rows.append((line, student, parent))
+    if not rows:
+        return
+
+    try:
+        _insert(rows)
+    except IntegrityError:
+        for row in rows:
+            try:
+                _insert([row])
+            except IntegrityError as e:
+                result.add_error(row[0], f"not imported, rejected by the database: {e}")
+            else:
+                result.created += 1
+        return
+    result.created += len(rows)
+
+
+def import_roster(rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """Import ``(line_number, row_dict)`` pairs, e.g. from :func:`read_roster`"""
+    result = ImportResult()
+    departments = {name.lower(): pk for pk, name in Department.objects.values_list("pk", "name")}
+    seen = set()
+    chunk = []
+
+    for line, row in rows:
+        try:
+            student, parent = clean_row(row, departments)
+        except ValueError as e:
+            result.add_error(line, str(e))
+            continue
+        if student["student_id"] in seen:
+            result.add_error(line, f"student_id '{student['student_id']}' is repeated in the file")
+            continue
+        seen.add(student["student_id"])
+
+        chunk.append((line, student, parent))
+        if len(chunk) >= chunk_size:
+            _write_chunk(chunk, result)
+            chunk = []
+    if chunk:
+        _write_chunk(chunk, result)
+    return result
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student.importer import IMPORT_CHUNK_SIZE, RosterError, import_roster, read_roster
+
+
+class Command(BaseCommand):
+    help = "Import a student roster from a .csv or .xlsx file (one row per student and parents)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Roster file with a header row")
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument(
+            "--max-errors", type=int, default=50, help="How many row errors to print"
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options["path"], "rb") as fh:
+                result = import_roster(
+                    read_roster(fh, options["path"]), chunk_size=options["chunk_size"]
+                )
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['path']}: {e}")
+        except RosterError as e:
+            raise CommandError(str(e))
+
+        for line, message in result.errors[: options["max_errors"]]:
+            self.stderr.write(f"line {line}: {message}")
+        if len(result.errors) > options["max_errors"]:
+            self.stderr.write(f"... and {len(result.errors) - options['max_errors']} more")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.created} students, skipped {result.skipped} rows "
+                f"in {elapsed:.2f}s"
+            )
+        )
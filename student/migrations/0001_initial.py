@@ -0,0 +1,103 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Parent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("father_name", models.CharField(max_length=100)),
+                ("father_occupation", models.CharField(blank=True, max_length=100)),
+                ("father_mobile", models.CharField(blank=True, max_length=15)),
+                ("father_email", models.EmailField(blank=True, max_length=100)),
+                ("mother_name", models.CharField(blank=True, max_length=100)),
+                ("mother_occupation", models.CharField(blank=True, max_length=100)),
+                ("mother_mobile", models.CharField(blank=True, max_length=15)),
+                ("mother_email", models.EmailField(blank=True, max_length=100)),
+                ("present_address", models.TextField(blank=True)),
+                ("permanent_address", models.TextField(blank=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Student",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("first_name", models.CharField(max_length=100)),
+                ("last_name", models.CharField(max_length=100)),
+                ("student_id", models.CharField(max_length=20, unique=True)),
+                (
+                    "gender",
+                    models.CharField(
+                        choices=[
+                            ("Male", "Male"),
+                            ("Female", "Female"),
+                            ("Others", "Others"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("date_of_birth", models.DateField()),
+                ("student_class", models.CharField(max_length=50)),
+                ("religion", models.CharField(blank=True, max_length=50)),
+                ("joining_date", models.DateField()),
+                ("mobile_number", models.CharField(blank=True, max_length=15)),
+                ("admission_number", models.CharField(blank=True, max_length=20)),
+                ("section", models.CharField(blank=True, max_length=10)),
+                ("student_image", models.ImageField(blank=True, upload_to="students/")),
+                ("slug", models.SlugField(blank=True, max_length=255, unique=True)),
+                (
+                    "parent",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE, to="student.parent"
+                    ),
+                ),
+                (
+                    "user",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="student_profile",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["student_class", "last_name", "first_name"],
+                "indexes": [
+                    models.Index(
+                        fields=["student_class", "last_name"],
+                        name="student_class_name_idx",
+                    )
+                ],
+            },
+        ),
+    ]
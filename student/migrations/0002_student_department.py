@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Separate from 0001 because school's initial migration depends on this
+    # app's first migration (school.Fee -> student.Student).
+
+    dependencies = [
+        ("school", "0001_initial"),
+        ("student", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="student",
+            name="department",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="school.department",
+            ),
+        ),
+    ]
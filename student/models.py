@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.db import models
+from django.utils.text import slugify
+
+
+class Parent(models.Model):
+    father_name = models.CharField(max_length=100)
+    father_occupation = models.CharField(max_length=100, blank=True)
+    father_mobile = models.CharField(max_length=15, blank=True)
+    father_email = models.EmailField(max_length=100, blank=True)
+    mother_name = models.CharField(max_length=100, blank=True)
+    mother_occupation = models.CharField(max_length=100, blank=True)
+    mother_mobile = models.CharField(max_length=15, blank=True)
+    mother_email = models.EmailField(max_length=100, blank=True)
+    present_address = models.TextField(blank=True)
+    permanent_address = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.father_name} & {self.mother_name}"
+
+
+class Student(models.Model):
+    GENDER_CHOICES = [("Male", "Male"), ("Female", "Female"), ("Others", "Others")]
+
+    first_name = models.CharField(max_length=100)
+    last_name = models.CharField(max_length=100)
+    student_id = models.CharField(max_length=20, unique=True)
+    gender = models.CharField(max_length=10, choices=GENDER_CHOICES)
+    date_of_birth = models.DateField()
+    student_class = models.CharField(max_length=50)
+    religion = models.CharField(max_length=50, blank=True)
+    joining_date = models.DateField()
+    mobile_number = models.CharField(max_length=15, blank=True)
+    admission_number = models.CharField(max_length=20, blank=True)
+    section = models.CharField(max_length=10, blank=True)
+    student_image = models.ImageField(upload_to="students/", blank=True)
+    parent = models.OneToOneField(Parent, on_delete=models.CASCADE)
+    department = models.ForeignKey(
+        "school.Department", on_delete=models.SET_NULL, blank=True, null=True
+    )
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="student_profile",
+    )
+    slug = models.SlugField(max_length=255, unique=True, blank=True)
+
+    class Meta:
+        ordering = ["student_class", "last_name", "first_name"]
+        indexes = [
+            models.Index(fields=["student_class", "last_name"], name="student_class_name_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.first_name} {self.last_name} ({self.student_id})"
+
+    @staticmethod
+    def build_slug(first_name, last_name, student_id):
+        return slugify(f"{first_name}-{last_name}-{student_id}")
+
+    @classmethod
+    def available_slug(cls, slug):
+        """``slug``, or ``slug-2``, ``slug-3``... if another student has it
+
+        Slugs are lower-cased, so student ids differing only in case share a base.
+        """
+        taken = set(cls.objects.filter(slug__startswith=slug).values_list("slug", flat=True))
+        candidate, number = slug, 1
+        while candidate in taken:
+            number += 1
+            candidate = f"{slug}-{number}"
+        return candidate
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = self.available_slug(
+                self.build_slug(self.first_name, self.last_name, self.student_id)
+            )
+        super().save(*args, **kwargs)
@@ -0,0 +1,290 @@
+import datetime
+import os
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from school.models import Department, Notification
+from school.notifications import broadcast_to_department
+
+from . import importer
+from .importer import RosterError, import_roster, read_csv, read_roster, read_xlsx
+from .models import Parent, Student
+
+User = get_user_model()
+
+HEADER = (
+    "First Name,Last Name,Student ID,Gender,Date of Birth,Student Class,"
+    "Joining Date,Father Name,Father Email,Department\n"
+)
+
+
+def roster(*rows):
+    return StringIO(HEADER + "".join(f"{row}\n" for row in rows))
+
+
+def make_student(student_id, first_name="Ada", last_name="Lovelace", **kwargs):
+    parent = Parent.objects.create(father_name="Parent of " + first_name)
+    return Student.objects.create(
+        parent=parent,
+        first_name=first_name,
+        last_name=last_name,
+        student_id=student_id,
+        gender="Female",
+        date_of_birth=datetime.date(2010, 1, 1),
+        student_class="5",
+        joining_date=datetime.date(2020, 6, 1),
+        **kwargs,
+    )
+
+
+class RosterImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.science = Department.objects.create(name="Science")
+
+    def test_valid_rows_are_imported_with_parents_and_slugs(self):
+        result = import_roster(
+            read_csv(
+                roster(
+                    "Ada,Lovelace,S1,female,2010-12-10,5,2020-06-01,Byron,byron@example.com,Science",
+                    "Alan,Turing,S2,Male,2011-06-23,5,2020-06-01,Julius,,",
+                )
+            )
+        )
+
+        self.assertEqual((result.created, result.skipped), (2, 0))
+        ada = Student.objects.select_related("parent").get(student_id="S1")
+        self.assertEqual(ada.gender, "Female")
+        self.assertEqual(ada.slug, "ada-lovelace-s1")
+        self.assertEqual(ada.parent.father_email, "byron@example.com")
+        self.assertEqual(ada.department, self.science)
+        self.assertIsNone(Student.objects.get(student_id="S2").department)
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        make_student("S9")
+        result = import_roster(
+            read_csv(
+                roster(
+                    "Ada,Lovelace,S1,Female,2010-12-10,5,2020-06-01,Byron,,",
+                    "Bad,Date,S2,Female,10/12/2010,5,2020-06-01,Someone,,",
+                    "No,Father,S3,Male,2010-01-01,5,2020-06-01,,,",
+                    "Dupe,Row,S1,Male,2010-01-01,5,2020-06-01,Someone,,",
+                    "Already,There,S9,Male,2010-01-01,5,2020-06-01,Someone,,",
+                    "Wrong,Dept,S4,Male,2010-01-01,5,2020-06-01,Someone,,History",
+                    "Bad,Email,S5,Male,2010-01-01,5,2020-06-01,Someone,nope,",
+                )
+            )
+        )
+
+        self.assertEqual(result.created, 1)
+        errors = dict(result.errors)
+        self.assertEqual(sorted(errors), [3, 4, 5, 6, 7, 8])
+        self.assertIn("date_of_birth", errors[3])
+        self.assertIn("repeated", errors[5])
+        self.assertIn("already exists", errors[6])
+        self.assertEqual(Parent.objects.count(), 2)
+
+    def test_one_bad_row_does_not_reject_its_chunk(self):
+        make_student("s9")
+        result = import_roster(
+            read_csv(
+                roster(
+                    "Ada,Lovelace,S1,Female,2010-12-10,5,2020-06-01,Byron,,Science",
+                    # same slug as the existing "s9" and as S1 above
+                    "Ada,Lovelace,S9,Female,2010-12-10,5,2020-06-01,Byron,,",
+                    "Ada,Lovelace,s1,Female,2010-12-10,5,2020-06-01,Byron,,",
+                    "Wrong,Dept,S4,Male,2010-01-01,5,2020-06-01,Someone,,History",
+                    "Alan,Turing,S2,Male,2011-06-23,5,2020-06-01,Julius,,",
+                )
+            ),
+            chunk_size=10,
+        )
+
+        self.assertEqual(result.created, 2)
+        errors = dict(result.errors)
+        self.assertEqual(sorted(errors), [3, 4, 5])
+        self.assertIn("slug 'ada-lovelace-s9'", errors[3])
+        self.assertIn("slug 'ada-lovelace-s1'", errors[4])
+        self.assertIn("Unknown department", errors[5])
+        self.assertEqual(
+            sorted(Student.objects.values_list("student_id", flat=True)), ["S1", "S2", "s9"]
+        )
+
+    def test_rows_rejected_by_the_database_are_isolated(self):
+        make_student("S9")
+        rows = read_csv(
+            roster(
+                "Ada,Lovelace,S1,Female,2010-12-10,5,2020-06-01,Byron,,",
+                "Late,Insert,S9,Male,2010-01-01,5,2020-06-01,Someone,,",
+                "Alan,Turing,S2,Male,2011-06-23,5,2020-06-01,Julius,,",
+            )
+        )
+        # as if S9 had been inserted after the chunk's lookup
+        with mock.patch.object(importer, "_existing", return_value=(set(), set())):
+            result = import_roster(rows)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual([line for line, _message in result.errors], [3])
+        self.assertIn("rejected by the database", result.errors[0][1])
+        self.assertEqual(Parent.objects.count(), 3)
+
+    def test_chunks_are_bulk_inserted(self):
+        rows = [
+            f"First{i},Last{i},ID{i},Male,2010-01-01,6,2020-06-01,Father{i},," for i in range(10)
+        ]
+        parsed = list(read_csv(roster(*rows)))
+
+        # departments, then per chunk of 5: existing id/slug lookup, savepoint,
+        # parent insert, student insert, search entries insert, release
+        with self.assertNumQueries(1 + 2 * 6):
+            result = import_roster(parsed, chunk_size=5)
+
+        self.assertEqual(result.created, 10)
+        self.assertEqual(Student.objects.filter(student_class="6").count(), 10)
+
+    def test_missing_columns(self):
+        with self.assertRaises(RosterError):
+            list(read_csv(StringIO("first_name,last_name\nAda,Lovelace\n")))
+
+    def test_xlsx_roster(self):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(HEADER.strip().split(","))
+        sheet.append(
+            [
+                "Ada",
+                "Lovelace",
+                1001,
+                "Female",
+                datetime.datetime(2010, 12, 10),
+                5,
+                datetime.date(2020, 6, 1),
+                "Byron",
+                None,
+                None,
+            ]
+        )
+        buffer = BytesIO()
+        workbook.save(buffer)
+        buffer.seek(0)
+
+        result = import_roster(read_xlsx(buffer))
+
+        self.assertEqual(result.created, 1)
+        student = Student.objects.get(student_id="1001")
+        self.assertEqual(student.student_class, "5")
+        self.assertEqual(student.date_of_birth, datetime.date(2010, 12, 10))
+
+    def test_unsupported_format(self):
+        with self.assertRaises(RosterError):
+            read_roster(BytesIO(), "roster.pdf")
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as fh:
+            fh.write(HEADER + "Ada,Lovelace,S1,Female,2010-12-10,5,2020-06-01,Byron,,\n")
+        self.addCleanup(os.remove, fh.name)
+        out = StringIO()
+        call_command("import_students", fh.name, stdout=out, stderr=StringIO())
+        self.assertIn("Imported 1 students", out.getvalue())
+
+
+class StudentViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username="teacher", email="teacher@example.com", password="pw", is_teacher=True
+        )
+        cls.student_user = User.objects.create_user(
+            username="pupil", email="pupil@example.com", password="pw", is_student=True
+        )
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def form_data(self, **overrides):
+        data = {
+            "first_name": "Ada",
+            "last_name": "Lovelace",
+            "student_id": "S1",
+            "gender": "Female",
+            "date_of_birth": "2010-12-10",
+            "student_class": "5",
+            "joining_date": "2020-06-01",
+            "father_name": "Byron",
+            "father_email": "byron@example.com",
+        }
+        data.update(overrides)
+        return data
+
+    def test_add_edit_and_delete(self):
+        response = self.client.post(reverse("add_student"), self.form_data())
+        self.assertRedirects(response, reverse("student_list"))
+        student = Student.objects.get(student_id="S1")
+        self.assertEqual(student.parent.father_name, "Byron")
+
+        response = self.client.post(
+            reverse("edit_student", args=[student.slug]),
+            self.form_data(section="B", father_name="Lord Byron"),
+        )
+        self.assertRedirects(response, reverse("student_list"))
+        student.refresh_from_db()
+        self.assertEqual(student.section, "B")
+        self.assertEqual(Parent.objects.get().father_name, "Lord Byron")
+
+        self.client.post(reverse("delete_student", args=[student.slug]))
+        self.assertFalse(Student.objects.exists())
+        self.assertFalse(Parent.objects.exists())
+
+    def test_student_ids_differing_in_case_get_their_own_slug(self):
+        make_student("A1")
+        response = self.client.post(reverse("add_student"), self.form_data(student_id="a1"))
+        self.assertRedirects(response, reverse("student_list"))
+        self.assertEqual(Student.objects.get(student_id="a1").slug, "ada-lovelace-a1-2")
+        self.assertEqual(make_student("A1-2").slug, "ada-lovelace-a1-2-2")
+
+    def test_invalid_form_is_not_saved(self):
+        response = self.client.post(reverse("add_student"), self.form_data(gender="?"))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Student.objects.exists())
+
+    def test_students_cannot_add(self):
+        self.client.force_login(self.student_user)
+        response = self.client.post(reverse("add_student"), self.form_data())
+        self.assertEqual(response.status_code, 403)
+
+    def test_list_is_keyset_paginated(self):
+        for i in range(3):
+            make_student(f"S{i}", last_name=f"Name{i}")
+        with self.assertNumQueries(3):  # session, user, one page of students with parents
+            response = self.client.get(reverse("student_list"))
+        self.assertContains(response, "Name2")
+        self.assertEqual(len(response.context["student_list"]), 3)
+
+        response = self.client.get(reverse("view_student", args=["S1"]))
+        self.assertContains(response, "Ada")
+
+
+class DepartmentBroadcastTests(TestCase):
+    def test_broadcast_to_department(self):
+        science = Department.objects.create(name="Science")
+        arts = Department.objects.create(name="Arts")
+        users = [
+            User.objects.create_user(username=f"s{i}", email=f"s{i}@example.com", is_student=True)
+            for i in range(3)
+        ]
+        make_student("S1", user=users[0], department=science)
+        make_student("S2", user=users[1], department=science)
+        make_student("S3", user=users[2], department=arts)
+
+        self.assertEqual(broadcast_to_department(science, "Lab closed"), 2)
+        self.assertEqual(
+            set(Notification.objects.values_list("user__username", flat=True)), {"s0", "s1"}
+        )
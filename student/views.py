@@ -0,0 +1,140 @@
+from django import forms
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import Http404
+from django.shortcuts import get_object_or_404, redirect, render
+
+from school.pagination import InvalidCursor, keyset_paginate
+from school.views import role_required
+
+from .models import Parent, Student
+
+STUDENT_PAGE_SIZE = 50
+# matches the student_class_name_idx index
+STUDENT_ORDERING = ("student_class", "last_name", "id")
+
+
+class StudentForm(forms.ModelForm):
+    class Meta:
+        model = Student
+        fields = [
+            "first_name",
+            "last_name",
+            "student_id",
+            "gender",
+            "date_of_birth",
+            "student_class",
+            "religion",
+            "joining_date",
+            "mobile_number",
+            "admission_number",
+            "section",
+            "student_image",
+        ]
+
+
+class ParentForm(forms.ModelForm):
+    class Meta:
+        model = Parent
+        fields = [
+            "father_name",
+            "father_occupation",
+            "father_mobile",
+            "father_email",
+            "mother_name",
+            "mother_occupation",
+            "mother_mobile",
+            "mother_email",
+            "present_address",
+            "permanent_address",
+        ]
+
+
+def _form_errors(request, *forms):
+    for form in forms:
+        for field, errors in form.errors.items():
+            label = form.fields[field].label if field in form.fields else field
+            messages.error(request, f"{label}: {' '.join(errors)}")
+
+
+@login_required
+def student_list(request):
+    queryset = Student.objects.select_related("parent").only(
+        "first_name",
+        "last_name",
+        "student_id",
+        "student_class",
+        "date_of_birth",
+        "mobile_number",
+        "student_image",
+        "slug",
+        "parent",
+        "parent__father_name",
+        "parent__mother_name",
+        "parent__present_address",
+    )
+    try:
+        page = keyset_paginate(
+            queryset,
+            STUDENT_ORDERING,
+            STUDENT_PAGE_SIZE,
+            after=request.GET.get("after"),
+            before=request.GET.get("before"),
+        )
+    except InvalidCursor:
+        raise Http404("Invalid page cursor")
+    return render(request, "students/students.html", {"student_list": page, "page": page})
+
+
+@login_required
+@role_required("admin", "teacher")
+def add_student(request):
+    if request.method == "POST":
+        student_form = StudentForm(request.POST, request.FILES)
+        parent_form = ParentForm(request.POST)
+        if student_form.is_valid() and parent_form.is_valid():
+            with transaction.atomic():
+                student = student_form.save(commit=False)
+                student.parent = parent_form.save()
+                student.save()
+            messages.success(request, "Student added successfully")
+            return redirect("student_list")
+        _form_errors(request, student_form, parent_form)
+    return render(request, "students/add-student.html")
+
+
+@login_required
+def view_student(request, student_id):
+    student = get_object_or_404(Student.objects.select_related("parent"), student_id=student_id)
+    return render(request, "students/student-details.html", {"student": student})
+
+
+@login_required
+@role_required("admin", "teacher")
+def edit_student(request, slug):
+    student = get_object_or_404(Student.objects.select_related("parent"), slug=slug)
+    parent = student.parent
+    if request.method == "POST":
+        student_form = StudentForm(request.POST, request.FILES, instance=student)
+        parent_form = ParentForm(request.POST, instance=parent)
+        if student_form.is_valid() and parent_form.is_valid():
+            with transaction.atomic():
+                parent_form.save()
+                student_form.save()
+            messages.success(request, "Student updated successfully")
+            return redirect("student_list")
+        _form_errors(request, student_form, parent_form)
+    return render(request, "students/edit-student.html", {"student": student, "parent": parent})
+
+
+@login_required
+@role_required("admin", "teacher")
+def delete_student(request, slug):
+    if request.method == "POST":
+        student = get_object_or_404(Student, slug=slug)
+        name = f"{student.first_name} {student.last_name}"
+        # the parent row owns the student through the one-to-one, so delete both
+        student.parent.delete()
+        messages.success(request, f"Student {name} deleted successfully")
+    return redirect("student_list")